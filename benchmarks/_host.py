@@ -0,0 +1,641 @@
+"""
+Host (CPython) stand-ins for running firmware modules on Linux.
+Only covers what the benchmarks touch, not a full CircuitPython emulation.
+"""
+
+import os
+import select as _select
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NETWORKED = os.path.join(ROOT, "buckets_networked")
+
+
+def install_micropython():
+    """Provides `micropython` and the typing-only modules the libraries import"""
+    if "micropython" not in sys.modules:
+        mod = types.ModuleType("micropython")
+        mod.const = lambda x: x
+        sys.modules["micropython"] = mod
+    if "circuitpython_typing" not in sys.modules:
+        pkg = types.ModuleType("circuitpython_typing")
+        pkg.io = types.ModuleType("circuitpython_typing.io")
+        pkg.io.ROValueIO = object
+        sys.modules["circuitpython_typing"] = pkg
+        sys.modules["circuitpython_typing.io"] = pkg.io
+
+
+class _Poll:
+    """`select.poll` with the MicroPython `ipoll` extension"""
+
+    def __init__(self):
+        self._poll = _select.poll()
+        self._objs = {}
+
+    def register(self, obj, mask):
+        self._objs[obj.fileno()] = obj
+        self._poll.register(obj, mask)
+
+    def modify(self, obj, mask):
+        self._poll.modify(obj, mask)
+
+    def unregister(self, obj):
+        self._objs.pop(obj.fileno(), None)
+        self._poll.unregister(obj)
+
+    def ipoll(self, timeout=-1):
+        if not self._objs:
+            if timeout > 0:
+                time.sleep(timeout / 1000)
+            return ()
+        return [(self._objs[fd], ev) for fd, ev in self._poll.poll(timeout)]
+
+
+def install_select():
+    """Provides a `select` module whose poll objects support `ipoll`"""
+    if not isinstance(sys.modules.get("select"), types.ModuleType) or not hasattr(
+        sys.modules["select"], "_host"
+    ):
+        mod = types.ModuleType("select")
+        for name in dir(_select):
+            if name.startswith("POLL"):
+                setattr(mod, name, getattr(_select, name))
+        mod.poll = _Poll
+        mod._host = True
+        sys.modules["select"] = mod
+
+
+def use_lib(lib_dir=None):
+    """
+    Puts a firmware `lib` directory ahead of the standard library. asyncio is
+    kept if it came from lib_dir, so nodes loaded side by side share one
+    scheduler.
+    """
+    install_micropython()
+    install_select()
+    lib_dir = lib_dir or os.path.join(NETWORKED, "lib")
+    loaded = getattr(sys.modules.get("asyncio"), "__file__", None) or ""
+    if not loaded.startswith(os.path.join(lib_dir, "")):
+        for name in list(sys.modules):
+            if name == "asyncio" or name.startswith("asyncio."):
+                del sys.modules[name]
+    sys.path.insert(0, lib_dir)
+    return lib_dir
+
+
+def checkout(ref, path="buckets_networked"):
+    """Extracts `path` at git `ref` into a temp dir, for before/after runs"""
+    out = tempfile.mkdtemp(prefix="bench_")
+    archive = subprocess.run(
+        ["git", "-C", ROOT, "archive", ref, path],
+        check=True,
+        capture_output=True,
+    ).stdout
+    subprocess.run(["tar", "-x", "-C", out], input=archive, check=True)
+    return os.path.join(out, path)
+
+
+def checkout_lib(ref):
+    """The bucket `lib` directory at git `ref`"""
+    return checkout(ref, "buckets_networked/lib")
+
+
+def load_asyncio():
+    """Imports the bundled asyncio, resolving its lazy attributes up front"""
+    import importlib
+    import warnings
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", SyntaxWarning)
+        asyncio = importlib.import_module("asyncio")
+        for attr, mod in asyncio._attrs.items():
+            sub = importlib.import_module("asyncio." + mod)
+            if hasattr(sub, attr):
+                setattr(asyncio, attr, getattr(sub, attr))
+    return asyncio
+
+
+"""
+Bucket emulation: fake hardware and ESP-NOW so main_esp_buckets imports
+and runs on the host, with the real LCD driver, debouncers and asyncio.
+"""
+
+
+class FakePin:
+    """Digital pin, inputs idle high on their pull-up"""
+
+    def __init__(self, value=True):
+        self.value = value
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.position = 0
+
+
+class FakeI2C:
+    """
+    Decodes the PCF8574/HD44780 4-bit traffic into a DDRAM image instead of
+    driving a bus. `delay` emulates the bus time of each write in seconds.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.writes = 0
+        self.mark = None
+        self.hit = None
+        self.ddram = bytearray(b" " * 0x80)
+        self.addr = 0
+        self.cgram = False
+
+    def try_lock(self):
+        return True
+
+    def scan(self):
+        return [0x27]
+
+    def writeto(self, addr, buf):
+        self.writes += 1
+        if self.mark is not None and self.hit is None:
+            self.hit = time.perf_counter()
+        if self.delay:
+            time.sleep(self.delay)
+        if len(buf) == 4:
+            self._decode(buf[1] & 0x01, (buf[1] & 0xF0) | (buf[3] >> 4))
+
+    def _decode(self, rs, value):
+        if rs:
+            if not self.cgram:
+                self.ddram[self.addr & 0x7F] = value
+                self.addr += 1
+        elif value & 0x80:
+            self.addr = value & 0x7F
+            self.cgram = False
+        elif value & 0x40:
+            self.cgram = True
+        elif value == 0x01:
+            self.ddram[:] = b" " * 0x80
+            self.addr = 0
+        elif value == 0x02:
+            self.addr = 0
+
+    def screen(self):
+        """The two visible 16-character rows"""
+        return [
+            self.ddram[0:16].decode("latin-1"),
+            self.ddram[0x40:0x50].decode("latin-1"),
+        ]
+
+    def watch(self):
+        """Starts timing until the next write, read back from .hit"""
+        self.hit = None
+        self.mark = time.perf_counter()
+        return self.mark
+
+
+class FakeDisplay:
+    """DisplayWrapper over the real I2cLcd driver and a FakeI2C"""
+
+    def __init__(self, delay=0.0):
+        from lcd_i2c8574_m import I2cLcd
+
+        self.i2c = FakeI2C(delay)
+        self.display = I2cLcd(self.i2c, 0x27, (16, 2))
+
+    def write(self, text):
+        self.display.write(text)
+
+    def clear(self):
+        self.display.clear()
+
+    def write_at(self, text, x=0, y=0):
+        self.display.move_to(x, y)
+        self.display.write(text, "")
+
+    def write_codes_at(self, codes, start, end, x=0, y=0):
+        self.display.move_to(x, y)
+        self.display.write_codes(codes, start, end)
+
+
+class FakePixels:
+    """NeoPixel stand-in holding the frame as a list of tuples"""
+
+    def __init__(self, n):
+        self.n = n
+        self.brightness = 1
+        self.pixels = [(0, 0, 0)] * n
+        self.shows = 0
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, color):
+        self.pixels[i] = color
+
+    def __getitem__(self, i):
+        return self.pixels[i]
+
+    def fill(self, color):
+        for i in range(self.n):
+            self.pixels[i] = color
+
+    def show(self):
+        self.shows += 1
+
+
+class FakePacket:
+    def __init__(self, msg, mac=b"\x00" * 6):
+        self.msg = msg
+        self.mac = mac
+
+
+class FakeESPNow:
+    """In-memory ESP-NOW endpoint; tests push packets onto .inbox"""
+
+    def __init__(self, *args, **kwargs):
+        self.inbox = []
+        self.sent = []
+        self.peers = []
+
+    def __len__(self):
+        return len(self.inbox)
+
+    def read(self):
+        return self.inbox.pop(0) if self.inbox else None
+
+    def send(self, message, peer=None):
+        self.sent.append((message, peer))
+
+
+class FakePeer:
+    def __init__(self, mac=b"", **kwargs):
+        self.mac = mac
+
+
+def install_gc(heap=2 * 1024 * 1024):
+    """
+    Adds MicroPython's mem_free/mem_alloc to gc, backed by tracemalloc, with
+    `heap` bytes of emulated heap
+    """
+    import gc
+    import tracemalloc
+
+    def mem_alloc():
+        return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+    gc.mem_alloc = mem_alloc
+    gc.mem_free = lambda: max(0, heap - mem_alloc())
+
+
+def install_bucket_hardware(led_count=58, lcd_delay=0.0, mac=None):
+    """
+    Provides the `hardware`, `neopixel`, `microcontroller`, `espnow` and `wifi`
+    modules a bucket imports, with an erased nvm
+    """
+    from adafruit_debouncer import Button
+
+    hw = types.ModuleType("hardware")
+    hw.DISPLAY = FakeDisplay(lcd_delay)
+    hw.RGB_LED = FakePixels(led_count)
+    hw.ENCODER = FakeEncoder()
+    hw.ENC, hw.RED, hw.BLUE = FakePin(), FakePin(), FakePin()
+    hw.ENCB = Button(hw.ENC, long_duration_ms=2000)
+    hw.REDB = Button(hw.RED, long_duration_ms=1000)
+    hw.BLUEB = Button(hw.BLUE, long_duration_ms=1000)
+    hw.RED_LED, hw.BLUE_LED = FakePin(False), FakePin(False)
+    sys.modules["hardware"] = hw
+
+    pixels = types.ModuleType("neopixel")
+    pixels.NeoPixel = FakePixels
+    sys.modules["neopixel"] = pixels
+
+    mcu = types.ModuleType("microcontroller")
+    mcu.nvm = bytearray(b"\xff" * 8192)
+    sys.modules["microcontroller"] = mcu
+
+    install_espnow(mac)
+    return hw
+
+
+def install_espnow(mac=None):
+    """Provides `espnow`, and `wifi` with the radio's MAC address"""
+    mac = mac or b"\x02\x00\x00\x00\x00\x01"
+    esp = types.ModuleType("espnow")
+    esp.ESPNow = FakeESPNow
+    esp.Peer = FakePeer
+    sys.modules["espnow"] = esp
+
+    wifi = types.ModuleType("wifi")
+    wifi.radio = FakeRadio(mac)
+    sys.modules["wifi"] = wifi
+
+
+class FakeRadio:
+    """wifi.radio, its soft AP on localhost"""
+
+    def __init__(self, mac):
+        self.mac_address = mac
+        self.ap = None
+        self.ipv4_address_ap = None
+
+    def start_ap(self, ssid, password="", *, channel=1, **kwargs):
+        self.ap = {"ssid": ssid, "password": password, "channel": channel}
+        self.ipv4_address_ap = "127.0.0.1"
+
+
+class _Pool_Socket(socket.socket):
+    """A CPython socket that binds a free port when asked for one"""
+
+    def bind(self, address):
+        super().bind((address[0], 0))
+        FakeSocketPool.ports[address[1]] = self.getsockname()[1]
+
+
+class FakeSocketPool:
+    """
+    socketpool.SocketPool on CPython sockets. Sockets bind a free port instead
+    of the one asked for, found in .ports by the port asked for.
+    """
+
+    AF_INET = socket.AF_INET
+    SOCK_STREAM = socket.SOCK_STREAM
+    SOL_SOCKET = socket.SOL_SOCKET
+    SO_REUSEADDR = socket.SO_REUSEADDR
+    ports = {}
+
+    def __init__(self, radio=None):
+        pass
+
+    def socket(self, family=socket.AF_INET, type=socket.SOCK_STREAM):
+        return _Pool_Socket(family, type)
+
+
+class FakeScanEntry:
+    """_bleio.ScanEntry, one advertisement or scan response heard"""
+
+    def __init__(self, address, data, rssi=-60, connectable=False, scan_response=False):
+        self.address = address
+        self.advertisement_bytes = data
+        self.rssi = rssi
+        self.connectable = connectable
+        self.scan_response = scan_response
+
+    def matches(self, prefixes, *, match_all=True):
+        """Whether the data structures start with all (or any) of prefixes"""
+        structures = []
+        i = 0
+        while i < len(self.advertisement_bytes) and self.advertisement_bytes[i]:
+            length = self.advertisement_bytes[i]
+            structures.append(self.advertisement_bytes[i + 1 : i + 1 + length])
+            i += 1 + length
+        found = []
+        i = 0
+        while i < len(prefixes):
+            prefix = prefixes[i + 1 : i + 1 + prefixes[i]]
+            found.append(any(s.startswith(prefix) for s in structures))
+            i += 1 + prefixes[i]
+        if not found:
+            return True
+        return all(found) if match_all else any(found)
+
+
+class FakeBLEAdapter:
+    """
+    _bleio.adapter on a shared air, a list of every adapter in range. What one
+    advertises, start_scan() on the others hears once per call, with its scan
+    response only when scanning actively.
+    """
+
+    def __init__(self, air, address, name="CIRCUITPY"):
+        self.air = air
+        self.address = types.SimpleNamespace(address_bytes=address)
+        self.name = name
+        self.advertising = False
+        self.advertisement = None
+        self.scan_response = b""
+        self.connectable = False
+        self.interval = None
+        self.starts = 0
+        self.scans = []
+        air.append(self)
+
+    def start_advertising(
+        self, data, *, scan_response=b"", connectable=True, interval=0.1, **kwargs
+    ):
+        if self.advertising:
+            raise RuntimeError("Already advertising")
+        if len(data) > 31 or len(scan_response) > 31:
+            raise ValueError("Data too large for advertisement type")
+        self.advertising = True
+        self.advertisement = bytes(data)
+        self.scan_response = bytes(scan_response)
+        self.connectable = connectable
+        self.interval = interval
+        self.starts += 1
+
+    def stop_advertising(self):
+        self.advertising = False
+
+    def start_scan(self, prefixes=b"", *, active=True, **kwargs):
+        self.scans.append(active)
+        for other in self.air:
+            if other is self or not other.advertising:
+                continue
+            heard = [(other.advertisement, False)]
+            if active and other.scan_response:
+                heard.append((other.scan_response, True))
+            for data, scan_response in heard:
+                entry = FakeScanEntry(
+                    other.address.address_bytes,
+                    data,
+                    connectable=other.connectable,
+                    scan_response=scan_response,
+                )
+                if entry.matches(prefixes, match_all=False):
+                    yield entry
+
+    def stop_scan(self):
+        pass
+
+
+def install_bleio(adapter=None):
+    """
+    Provides `_bleio` with adapter as `_bleio.adapter`, enough for adafruit_ble
+    to import and to advertise and scan through FakeBLEAdapter
+    """
+    bleio = types.ModuleType("_bleio")
+    bleio.adapter = adapter
+    bleio.Attribute = types.SimpleNamespace(
+        NO_ACCESS=0,
+        OPEN=1,
+        ENCRYPT_NO_MITM=2,
+        ENCRYPT_WITH_MITM=3,
+        LESC_ENCRYPT_WITH_MITM=4,
+        SIGNED_NO_MITM=5,
+        SIGNED_WITH_MITM=6,
+    )
+    bleio.Characteristic = types.SimpleNamespace(
+        BROADCAST=1, READ=2, WRITE_NO_RESPONSE=4, WRITE=8, NOTIFY=16, INDICATE=32
+    )
+    bleio.Adapter = FakeBLEAdapter
+    bleio.ScanEntry = FakeScanEntry
+    bleio.UUID = bleio.Service = bleio.Address = bleio.Connection = object
+    sys.modules["_bleio"] = bleio
+    return bleio
+
+
+def load_bucket(networked_dir=None, lcd_delay=0.0, mac=None):
+    """
+    Imports main_esp_buckets on emulated hardware, returns (module, hardware).
+    Each call imports a fresh copy, so several buckets can run side by side
+    with their own `mac`.
+    """
+    import importlib
+
+    networked_dir = networked_dir or NETWORKED
+    use_lib(os.path.join(networked_dir, "lib"))
+    load_asyncio()
+    install_gc()
+    for name in (
+        "hardware",
+        "neopixel",
+        "espnow",
+        "wifi",
+        "microcontroller",
+        "led_commands",
+        "display_commands",
+        "memory_commands",
+        "preset_commands",
+        "config_commands",
+        "dashboard_commands",
+        "main_esp_buckets",
+    ):
+        sys.modules.pop(name, None)
+    hw = install_bucket_hardware(lcd_delay=lcd_delay, mac=mac)
+    sys.path.insert(0, networked_dir)
+    bucket = importlib.import_module("main_esp_buckets")
+    return bucket, hw
+
+
+class FakeSound:
+    """Sound_Control stand-in that keeps the tracks played"""
+
+    def __init__(self, audio=None):
+        self.tracks = []
+
+    def play_track(self, track):
+        self.tracks.append(track)
+
+    def set_vol(self, level=30):
+        pass
+
+
+def load_speakerbox(networked_dir=None, mac=None):
+    """
+    Imports main_esp_speakerbox with a FakeSound, returns the module. Each call
+    imports a fresh copy, like load_bucket().
+    """
+    import importlib
+
+    networked_dir = networked_dir or NETWORKED
+    use_lib(os.path.join(networked_dir, "lib"))
+    load_asyncio()
+    for name in ("hardware", "audio_commands", "espnow", "wifi", "main_esp_speakerbox"):
+        sys.modules.pop(name, None)
+    hw = types.ModuleType("hardware")
+    hw.AUDIO_OUT = None
+    sys.modules["hardware"] = hw
+    audio = types.ModuleType("audio_commands")
+    audio.Sound_Control = FakeSound
+    sys.modules["audio_commands"] = audio
+    install_espnow(mac)
+    sys.path.insert(0, networked_dir)
+    return importlib.import_module("main_esp_speakerbox")
+
+
+def load_timerbox(networked_dir=None, mac=None):
+    """
+    Imports main_esp_timerbox on emulated hardware, returns (module, hardware).
+    The peers' MACs and DASHBOARD_SSID come from the environment, as getenv()
+    reads settings.toml on the board. Each call imports a fresh copy.
+    """
+    import importlib
+    from adafruit_debouncer import Button
+
+    networked_dir = networked_dir or NETWORKED
+    use_lib(os.path.join(networked_dir, "lib"))
+    load_asyncio()
+    install_gc()
+    for name in (
+        "hardware",
+        "espnow",
+        "wifi",
+        "socketpool",
+        "config_commands",
+        "transfer_commands",
+        "trace_commands",
+        "dashboard_commands",
+        "main_esp_timerbox",
+    ):
+        sys.modules.pop(name, None)
+    hw = types.ModuleType("hardware")
+    hw.DISPLAY = FakeDisplay()
+    hw.ENCODER = FakeEncoder()
+    hw.ENC = FakePin()
+    hw.ENCB = Button(hw.ENC, long_duration_ms=2000)
+    sys.modules["hardware"] = hw
+    install_espnow(mac)
+    pool = types.ModuleType("socketpool")
+    pool.SocketPool = FakeSocketPool
+    sys.modules["socketpool"] = pool
+    sys.path.insert(0, networked_dir)
+    return importlib.import_module("main_esp_timerbox"), hw
+
+
+class Counted:
+    """Coroutine proxy that counts how often the scheduler resumes it"""
+
+    def __init__(self, coro, counter):
+        self.coro = coro
+        self.counter = counter
+
+    def send(self, value):
+        self.counter[0] += 1
+        return self.coro.send(value)
+
+    def throw(self, *args):
+        self.counter[0] += 1
+        return self.coro.throw(*args)
+
+    def close(self):
+        return self.coro.close()
+
+
+async def press(asyncio, pin, seconds=0.1):
+    """Holds a button down for `seconds`, then lets the debouncer settle"""
+    pin.value = False
+    await asyncio.sleep(seconds)
+    pin.value = True
+    await asyncio.sleep(0.4)
+
+
+async def start_game(asyncio, hw, mode_index, length_steps=0):
+    """From the menu, picks a mode with a game length and starts it"""
+    await asyncio.sleep(2.5)
+    for _ in range(mode_index):
+        hw.ENCODER.position += 1
+        await asyncio.sleep(0.05)
+    await press(asyncio, hw.ENC)
+    await asyncio.sleep(0.6)
+    for _ in range(length_steps):
+        hw.ENCODER.position += 1
+        await asyncio.sleep(0.05)
+    await press(asyncio, hw.ENC)
+    await asyncio.sleep(1.2)
+    await press(asyncio, hw.ENC)
+    await asyncio.sleep(1.0)
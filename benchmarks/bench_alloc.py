@@ -0,0 +1,155 @@
+"""
+Heap allocated per game-minute by the per-second scoreboard during a
+Domination game held by Red, in the game task and the LCD task.
+
+    python benchmarks/bench_alloc.py
+    python benchmarks/bench_alloc.py --ref HEAD~1
+
+CPython frees garbage straight away, so gc.mem_alloc can't grow the way it
+does between collections on the board. Instead each resume of a task is
+charged with its tracemalloc high-water mark above where it started, as an
+estimate of what it allocated. Resuming a task costs CPython a few hundred
+bytes on its own (the StopIteration traceback from the scheduler's singleton
+generators), which MicroPython doesn't pay, so the cost of an empty resume is
+measured first and taken off every step. What's left in the LCD task is mostly
+CPython range objects and the emulated I2C bus.
+The game clock runs SPEED times faster than real time so a game-minute passes
+in a few seconds.
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import time
+import tracemalloc
+
+import _host
+
+DOMINATION = 5
+SPEED = 20
+
+
+class Probe:
+    """Coroutine proxy that charges each resume with its allocation high-water"""
+
+    def __init__(self, coro, step, floor=0):
+        self.coro = coro
+        self.step = step
+        self.floor = floor
+
+    def _charge(self, resume, value):
+        # Read before resetting, so the probe's own tuple isn't charged
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            return resume(value)
+        finally:
+            peak = tracemalloc.get_traced_memory()[1]
+            self.step(max(0, peak - start - self.floor))
+
+    def send(self, value):
+        return self._charge(self.coro.send, value)
+
+    def throw(self, *args):
+        return self._charge(lambda _: self.coro.throw(*args), None)
+
+    def close(self):
+        return self.coro.close()
+
+
+def empty_resume(asyncio, count=500):
+    """Median bytes charged to a resume that does nothing but sleep(0)"""
+    steps = []
+
+    async def idle():
+        for _ in range(count):
+            await asyncio.sleep(0)
+
+    async def driver():
+        await asyncio.create_task(Probe(idle(), steps.append))
+
+    tracemalloc.start()
+    asyncio.run(driver())
+    tracemalloc.stop()
+    return statistics.median(steps)
+
+
+def measure(bucket, hw, asyncio, minutes=1.0, floor=0):
+    """
+    Returns (updates, game bytes, display bytes) over `minutes` of game time.
+    Game bytes only count the resumes that queued a status line.
+    """
+    totals = {"updates": 0, "game": 0, "display": 0, "on": False}
+    lcd = bucket.LCD
+    queued = [0]
+
+    # Fixed signatures, so the counting itself doesn't allocate an args tuple
+    update = lcd.update
+    show = getattr(lcd, "show", None)
+
+    def counted_update(message):
+        queued[0] += 1
+        update(message)
+
+    def counted_show(template, a=0, b=0, c=0):
+        queued[0] += 1
+        show(template, a, b, c)
+
+    lcd.update = counted_update
+    lcd.show = counted_show
+
+    def game_step(nbytes, seen=[0]):
+        if queued[0] != seen[0]:
+            seen[0] = queued[0]
+            if totals["on"]:
+                totals["updates"] += 1
+                totals["game"] += nbytes
+
+    def display_step(nbytes):
+        if totals["on"]:
+            totals["display"] += nbytes
+
+    chain = bucket.game_task_chain
+    bucket.game_task_chain = lambda: Probe(chain(), game_step, floor)
+    draw = lcd.display_control
+    lcd.display_control = lambda: Probe(draw(), display_step, floor)
+    origin = time.monotonic()
+    bucket.monotonic = lambda: origin + (time.monotonic() - origin) * SPEED
+
+    async def driver():
+        main = asyncio.create_task(bucket.main())
+        await _host.start_game(asyncio, hw, DOMINATION, length_steps=8)
+        # Capture for Red so the score on the LCD changes every second
+        await _host.press(asyncio, hw.RED, 1.3)
+        totals["on"] = True
+        await asyncio.sleep(minutes * 60 / SPEED)
+        totals["on"] = False
+        main.cancel()
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(driver())
+    tracemalloc.stop()
+    return totals["updates"], totals["game"], totals["display"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ref", help="git ref to benchmark instead of the tree")
+    parser.add_argument("--minutes", type=float, default=1.0)
+    args = parser.parse_args()
+    bucket, hw = _host.load_bucket(_host.checkout(args.ref) if args.ref else None)
+    import asyncio
+
+    floor = empty_resume(asyncio)
+    updates, game, display = measure(bucket, hw, asyncio, args.minutes, floor)
+    per_minute = 1 / args.minutes
+    print(f"empty resume, taken off each step: {floor:.0f} bytes")
+    print(f"status updates per game-minute: {updates * per_minute:.0f}")
+    print(f"game task bytes per game-minute: {game * per_minute:.0f}")
+    print(f"LCD task bytes per game-minute: {display * per_minute:.0f}")
+    print("screen:", hw.DISPLAY.i2c.screen())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Scheduler yield rate of the bundled asyncio with the bucket's task set.
+
+Four tasks mirror main_esp_buckets.main(): the game loop, RGB animation,
+encoder poll and button monitor. All but the RGB task spin on sleep(0).
+
+    python benchmarks/bench_asyncio.py            # working tree
+    python benchmarks/bench_asyncio.py --ref HEAD # a git ref, for before/after
+
+With --stats, also runs with per-task accounting enabled and prints the dump.
+
+Also checks that a task parked on the ready queue can be cancelled after the
+tick clock has moved on by more than half its period, as on a board left on
+for days, without corrupting the timer heap. Exits 1 if it can't.
+"""
+import argparse
+import sys
+import time
+
+import _host
+
+
+def bucket_tasks(asyncio, counts, stop):
+    """The four long-running tasks a bucket runs during a game"""
+
+    async def game():
+        while not stop[0]:
+            counts[0] += 1
+            await asyncio.sleep(0)
+
+    async def rgb():
+        while not stop[0]:
+            counts[1] += 1
+            await asyncio.sleep(0.005)
+            await asyncio.sleep(0)
+
+    async def enc():
+        while not stop[0]:
+            counts[2] += 1
+            await asyncio.sleep(0)
+
+    async def buttons():
+        while not stop[0]:
+            counts[3] += 1
+            await asyncio.sleep(0)
+
+    return game(), rgb(), enc(), buttons()
+
+
+def yield_rate(asyncio, seconds=2.0):
+    """Returns total yields per second across the bucket task set"""
+    counts = [0, 0, 0, 0]
+    stop = [False]
+
+    async def main():
+        tasks = [asyncio.create_task(c) for c in bucket_tasks(asyncio, counts, stop)]
+        await asyncio.sleep(seconds)
+        stop[0] = True
+        await asyncio.gather(*tasks)
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def check_cancel_after_wrap(asyncio):
+    """
+    Cancels a task spinning on sleep(0) after a simulated jump of more than
+    half the tick period, beside timers on the heap. Returns the problems.
+    """
+    import adafruit_ticks
+
+    core = asyncio.core
+    ticks = core.ticks
+    offset = [0]
+    core.ticks = lambda: (ticks() + offset[0]) % adafruit_ticks._TICKS_PERIOD
+    problems = []
+    woken = []
+
+    async def spin():
+        while True:
+            await asyncio.sleep(0)
+
+    async def sleeper(n):
+        await asyncio.sleep_ms(20 * n)
+        woken.append(n)
+
+    async def jump():
+        spinner = asyncio.create_task(spin())
+        sleepers = [asyncio.create_task(sleeper(n)) for n in range(1, 4)]
+        await asyncio.sleep(0)
+        offset[0] = adafruit_ticks._TICKS_HALFPERIOD + 1000
+        await asyncio.sleep(0)
+        spinner.cancel()
+        try:
+            await spinner
+            problems.append("the spinning task wasn't cancelled")
+        except asyncio.CancelledError:
+            pass
+        await asyncio.wait_for_ms(asyncio.gather(*sleepers), 1000)
+
+    try:
+        asyncio.run(jump())
+    except Exception as error:  # pylint: disable=broad-except
+        problems.append(f"cancelling after the jump raised {error!r}")
+    finally:
+        core.ticks = ticks
+    if sorted(woken) != [1, 2, 3]:
+        problems.append(f"only timers {sorted(woken)} of [1, 2, 3] fired")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ref", help="git ref to benchmark instead of the tree")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--stats", action="store_true", help="also time with stats on")
+    args = parser.parse_args()
+    _host.use_lib(_host.checkout_lib(args.ref) if args.ref else None)
+    asyncio = _host.load_asyncio()
+    print(f"yields/sec (4 tasks): {yield_rate(asyncio, args.seconds):,.0f}")
+    if args.stats:
+        asyncio.enable_stats(clock=time.perf_counter_ns, diff=_ns_to_us)
+        rate = yield_rate(asyncio, args.seconds)
+        print(f"yields/sec (4 tasks, stats on): {rate:,.0f}")
+        asyncio.stats_dump()
+        asyncio.disable_stats()
+    problems = check_cancel_after_wrap(asyncio)
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+def _ns_to_us(a, b):
+    return (a - b) // 1000
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+The hub's game advertisement, encoded, put on the air and scanned back.
+
+    python benchmarks/bench_ble_advert.py
+    python benchmarks/bench_ble_advert.py --states 20000 --phones 50
+
+Runs advert_commands from the deprecated BLE hub's lib-cirpy with the real
+adafruit_ble advertising code, through BLERadio on the FakeBLEAdapter from
+_host.py. Random game states, and the edge cases in EDGES, are set with
+Field_Advertisement.update(), advertised by a hub, and scanned back passively
+by --phones boards, each asking start_scan() for Field_Advertisement only.
+Other boards on the air advertise a name, an AdafruitColor, another company's
+manufacturer data, and the same key with LAYOUT_VERSION + 1.
+
+Checks that every phone gets back the state set, with times capped at 0xFFFF,
+teams past MAX_BUCKETS left out and teams that don't fit a nibble as NO_TEAM,
+that every advertisement is ADVERTISEMENT_SIZE bytes and within the 31 of a
+legacy advertisement along with its scan response, that nothing but the
+hub's advertisement gets through the scan, that decode_state() refuses
+another version, length or status, and that update() only asks for a
+restart when the state changed. Reports the sizes and the time to encode
+and to decode a state. Exits 1 if a check fails.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+HUB_ADDRESS = b"\x02\x00\x00\x00\x00\x01"
+# (status, timer, red_time, blue_time, teams)
+EDGES = [
+    ("Waiting", 0, 0, 0, []),
+    ("Running", 0xFFFF, 0xFFFF, 0xFFFF, [3, 3, 3, 3, 3, 3]),
+    ("Ended", 70000, 1 << 20, 0x10000, [0, 1, 2, 3, 0, 1, 2, 3]),
+    ("Paused", 1, 2, 3, [0xF, 0xF, 0xF, 0xF, 0xF, 2]),
+    ("Running", 300, 12, 40, [1, 20, -1]),
+]
+
+
+def expected(advert_commands, state):
+    """The state as a scanner gets it back"""
+    status, timer, red_time, blue_time, teams = state
+    teams = [
+        team if 0 <= team < advert_commands.NO_TEAM else advert_commands.NO_TEAM
+        for team in teams[: advert_commands.MAX_BUCKETS]
+    ]
+    while teams and teams[-1] == advert_commands.NO_TEAM:
+        teams.pop()
+    return (
+        status,
+        min(timer, 0xFFFF),
+        min(red_time, 0xFFFF),
+        min(blue_time, 0xFFFF),
+        teams,
+    )
+
+
+def random_state(advert_commands, rng):
+    return (
+        rng.choice(advert_commands.STATUSES),
+        rng.randrange(0x10000),
+        rng.randrange(0x10000),
+        rng.randrange(0x10000),
+        [rng.randrange(4) for _ in range(rng.randint(0, 6))],
+    )
+
+
+def other_boards(air, advert_commands, BLERadio):
+    """Boards advertising things the phones aren't scanning for"""
+    from adafruit_ble.advertising import Advertisement
+    from adafruit_ble.advertising.adafruit import AdafruitColor
+
+    named = Advertisement()
+    named.complete_name = "timer_bucket"
+    color = AdafruitColor()
+    color.color = 0xFF0000
+    other_company = Advertisement()
+    # An iBeacon, Apple's manufacturer data
+    other_company.data_dict[0xFF] = b"\x4c\x00\x02\x15" + bytes(21)
+    newer = advert_commands.Field_Advertisement()
+    newer.update("Running", 1, 2, 3, [1])
+    data = newer.manufacturer_data.data[advert_commands.STATE_KEY]
+    newer.manufacturer_data.data[advert_commands.STATE_KEY] = (
+        bytes([advert_commands.LAYOUT_VERSION + 1]) + data[1:]
+    )
+    for n, advertisement in enumerate((named, color, other_company, newer)):
+        radio = BLERadio(_host.FakeBLEAdapter(air, bytes((3, 0, 0, 0, 0, n))))
+        radio.start_advertising(advertisement)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--states", type=int, default=5000)
+    parser.add_argument("--phones", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    _host.install_bleio()
+    from adafruit_ble import BLERadio
+    import advert_commands
+
+    rng = random.Random(args.seed)
+    problems = []
+    air = []
+    hub = BLERadio(_host.FakeBLEAdapter(air, HUB_ADDRESS, "bucket_hub"))
+    phones = [
+        BLERadio(_host.FakeBLEAdapter(air, bytes((4, 0, 0, 0, 0, n))))
+        for n in range(args.phones)
+    ]
+    other_boards(air, advert_commands, BLERadio)
+
+    advert = advert_commands.Field_Advertisement()
+    states = EDGES + [random_state(advert_commands, rng) for _ in range(args.states)]
+    sizes = set()
+    restarts = 0
+    last = None
+    adapter = hub._adapter
+    for state in states:
+        want = expected(advert_commands, state)
+        changed = advert.update(*state)
+        if changed != (want != last):
+            problems.append(f"{state} after {last}: update() returned {changed}")
+        if changed:
+            restarts += 1
+            hub.stop_advertising()
+            hub.start_advertising(advert)
+        if advert.update(*state):
+            problems.append(f"{state} set twice asked for a restart")
+        last = want
+        sizes.add(len(adapter.advertisement))
+        if len(adapter.advertisement) > advert_commands.LEGACY_SIZE:
+            problems.append(f"{len(adapter.advertisement)} byte advertisement")
+        for phone in phones:
+            heard = list(
+                phone.start_scan(advert_commands.Field_Advertisement, active=False)
+            )
+            if len(heard) != 1 or heard[0].address != adapter.address.address_bytes:
+                problems.append(
+                    f"a phone heard {[bytes(advertisement) for advertisement in heard]}"
+                )
+                break
+            got = heard[0].state
+            if got != want:
+                problems.append(f"{state} came back as {got}, expected {want}")
+                break
+        if len(problems) > 10:
+            break
+
+    if sizes != {advert_commands.ADVERTISEMENT_SIZE}:
+        problems.append(
+            f"advertisements of {sorted(sizes)} bytes,"
+            f" ADVERTISEMENT_SIZE is {advert_commands.ADVERTISEMENT_SIZE}"
+        )
+    if advert_commands.ADVERTISEMENT_SIZE > advert_commands.LEGACY_SIZE:
+        problems.append("ADVERTISEMENT_SIZE past a legacy advertisement")
+    if len(adapter.scan_response) > advert_commands.LEGACY_SIZE:
+        problems.append(f"{len(adapter.scan_response)} byte scan response")
+    if any(any(phone._adapter.scans) for phone in phones):
+        problems.append("a phone scanned actively")
+
+    data = advert_commands.encode_state(*EDGES[1])
+    refused = {
+        "version": bytes([advert_commands.LAYOUT_VERSION + 1]) + data[1:],
+        "short": data[:-1],
+        "long": data + b"\x00",
+        "status": data[:1] + bytes([len(advert_commands.STATUSES)]) + data[2:],
+        "empty": b"",
+    }
+    for name, bad in refused.items():
+        if advert_commands.decode_state(bad) is not None:
+            problems.append(f"decode_state() took a payload with the wrong {name}")
+    if advert_commands.decode_state(None) is not None:
+        problems.append("decode_state() took None")
+
+    payloads = [advert_commands.encode_state(*state) for state in states]
+    start = time.perf_counter()
+    for state in states:
+        advert_commands.encode_state(*state)
+    encode_us = (time.perf_counter() - start) / len(states) * 1e6
+    start = time.perf_counter()
+    for payload in payloads:
+        advert_commands.decode_state(payload)
+    decode_us = (time.perf_counter() - start) / len(states) * 1e6
+
+    print(
+        f"state {advert_commands.STATE_SIZE} B, advertisement"
+        f" {advert_commands.ADVERTISEMENT_SIZE}/{advert_commands.LEGACY_SIZE} B,"
+        f" scan response {len(adapter.scan_response)} B"
+    )
+    print(
+        f"{len(states)} states, {restarts} advertising restarts, heard by"
+        f" {args.phones} passive phones"
+    )
+    print(f"encode {encode_us:.2f} us, decode {decode_us:.2f} us per state on host")
+
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Crazy King's activation check: the compiled Activation_Schedule against the
+range membership test on Game_States it replaces.
+
+    python benchmarks/bench_crazyking.py
+
+First checks that the schedule is active at exactly the same game_lengths as
+the bucket_interval_upper/lower ranges, counting down through every game for
+all bucket_count, id_index and dd_loop settings, and exits 1 on a mismatch.
+Then times one pass of each check.
+"""
+import argparse
+import sys
+import timeit
+
+import _host
+
+GAME_LENGTHS = list(range(0, 1201, 15)) + [1, 7, 61, 599, 1001, 3600]
+
+
+def in_windows(state, game_length):
+    """The check start_crazyking used to run on every pass"""
+    return game_length in range(*state.bucket_interval_upper) or game_length in range(
+        *state.bucket_interval_lower
+    )
+
+
+def check(bucket):
+    """Returns a list of mismatches as (bucket_count, id_index, dd_loop, length, at)"""
+    bad = []
+    state = bucket.Game_States()
+    for bucket_count in range(len(bucket.BUCKET_IDS)):
+        for id_index in range(len(bucket.BUCKET_IDS)):
+            for dd_loop in (1, 2):
+                for length in GAME_LENGTHS:
+                    state.bucket_count = bucket_count
+                    state.id_index = id_index
+                    state.dd_loop = dd_loop
+                    state.game_length = length
+                    setting = (bucket_count, id_index, dd_loop, length)
+                    schedule = bucket.Activation_Schedule(
+                        state.activation_windows(), length
+                    )
+                    if not bucket_count:
+                        # The ranges divide by zero here, the schedule is empty
+                        if schedule.edges:
+                            bad.append(setting + (length,))
+                        continue
+                    for at in range(length, 0, -1):
+                        if at <= schedule.next:
+                            schedule.advance(at)
+                        if schedule.active != in_windows(state, at):
+                            bad.append(setting + (at,))
+                            break
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+    bucket, _ = _host.load_bucket()
+
+    bad = check(bucket)
+    print(f"mismatches: {len(bad)}")
+    for mismatch in bad[:10]:
+        print(
+            "  bucket_count={} id_index={} dd_loop={} length={} at={}".format(*mismatch)
+        )
+    if bad:
+        sys.exit(1)
+
+    state = bucket.Game_States()
+    state.game_length = 600
+    schedule = bucket.Activation_Schedule(state.activation_windows(), 600)
+    number = 200000
+    ranges = timeit.timeit(lambda: in_windows(state, 450), number=number)
+    compiled = timeit.timeit(
+        lambda: schedule.active if 450 > schedule.next else None, number=number
+    )
+    print(f"range membership: {ranges / number * 1e6:.2f} us per pass")
+    print(f"compiled schedule: {compiled / number * 1e6:.2f} us per pass")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Longest gap between button scans during a Domination game held by Red, with
+the LCD redrawn every second over an emulated 100 kHz I2C bus.
+
+    python benchmarks/bench_display.py
+    python benchmarks/bench_display.py --ref HEAD~1
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import _host
+
+I2C_WRITE_S = 0.00045  # 5 bytes at 100 kHz, per I2cLcd._wr
+DOMINATION = 5
+
+
+def measure(bucket, hw, asyncio, seconds=5.0):
+    """
+    Returns the longest gap between ENCB.update() calls in ms, overall and
+    among gaps that contained an LCD write. The second isolates the display
+    from host scheduling noise.
+    """
+    gaps = []
+    last = [None]
+    wrote = [False]
+    update = hw.ENCB.update
+    writeto = hw.DISPLAY.i2c.writeto
+
+    def timed_update(*args):
+        now = time.perf_counter()
+        if last[0] is not None:
+            gaps.append((now - last[0], wrote[0]))
+        last[0] = now
+        wrote[0] = False
+        update(*args)
+
+    def marked_writeto(addr, buf):
+        wrote[0] = True
+        writeto(addr, buf)
+
+    async def driver():
+        main = asyncio.create_task(bucket.main())
+        await _host.start_game(asyncio, hw, DOMINATION, length_steps=8)
+        # Capture for Red so the score on the LCD changes every second
+        await _host.press(asyncio, hw.RED, 1.3)
+        hw.ENCB.update = timed_update
+        hw.DISPLAY.i2c.writeto = marked_writeto
+        await asyncio.sleep(seconds)
+        hw.ENCB.update = update
+        main.cancel()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(driver())
+    worst = max(gap for gap, _ in gaps)
+    worst_lcd = max((gap for gap, lcd in gaps if lcd), default=0.0)
+    return worst * 1000, worst_lcd * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ref", help="git ref to benchmark instead of the tree")
+    args = parser.parse_args()
+    bucket, hw = _host.load_bucket(
+        _host.checkout(args.ref) if args.ref else None, lcd_delay=I2C_WRITE_S
+    )
+    import asyncio
+
+    worst, worst_lcd = measure(bucket, hw, asyncio)
+    print(f"longest button scan gap: {worst:.2f} ms")
+    print(f"longest gap spanning an LCD write: {worst_lcd:.2f} ms")
+    print("screen:", hw.DISPLAY.i2c.screen())
+
+
+if __name__ == "__main__":
+    main()
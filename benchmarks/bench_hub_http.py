@@ -0,0 +1,245 @@
+"""
+Load test of the hub's HTTP server, 20 clients at once against poll() and
+against serve_async(), with a game loop ticking alongside.
+
+    python benchmarks/bench_hub_http.py
+    python benchmarks/bench_hub_http.py --clients 40 --requests 30
+
+Runs adafruit_httpserver and asyncio from the deprecated BLE hub's lib-cirpy
+on CPython sockets over localhost. Each client is its own process and sends
+--requests requests one after another, each on a new connection as the hub
+closes them, for the page or for /get-data. SLOW_CLIENTS of them trickle
+each request out over SLOW_SECONDS, like a phone on a weak link. The game
+loop sleeps TICK_MS at a time, as the hub's does, and records how late each
+tick wakes.
+
+poll() is driven the way hub/main.py drove it, between game loop passes.
+Reports request latency and tick lateness, p50/p90/p99/max in ms, for each.
+Connections past start()'s listen backlog of 10 are dropped by the kernel
+and retried by the client a second later, in either mode, which shows up in
+the request p99.
+Checks that every request to serve_async() got its page or data, that no
+tick was held up by as much as half of SLOW_SECONDS, and that serve_async()
+answers headers longer than its buffer with a 431 and a body longer than it
+with a 413. Exits 1 if a check fails.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+TICK_MS = 10
+SLOW_CLIENTS = 2
+SLOW_SECONDS = 0.5
+DATA = {"timer": "05:00", "bucket1": "Red"}
+
+
+def fetch(port, path, slow):
+    """One GET on a new connection, returns (status line, body)"""
+    request = f"GET {path} HTTP/1.1\r\nHost: hub\r\nUser-Agent: bench\r\n\r\n"
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        if slow:
+            step = len(request) // 5 + 1
+            for start in range(0, len(request), step):
+                sock.sendall(request[start : start + step].encode())
+                time.sleep(SLOW_SECONDS / 5)
+        else:
+            sock.sendall(request.encode())
+        reply = b""
+        while chunk := sock.recv(4096):
+            reply += chunk
+    head, _, body = reply.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0].decode(), body
+
+
+def send_raw(port, request):
+    """Sends request on a new connection, returns the status line of the reply"""
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        sock.sendall(request)
+        reply = b""
+        try:
+            while chunk := sock.recv(4096):
+                reply += chunk
+        except ConnectionResetError:
+            # The hub closed with some of the request unread
+            pass
+    return reply.split(b"\r\n")[0].decode()
+
+
+def client(port, requests, slow, page, results):
+    """Sends requests one after another, puts (latencies, failures) on results"""
+    latencies = []
+    failures = []
+    for n in range(requests):
+        path = "/" if n % 2 else "/get-data"
+        start = time.perf_counter()
+        try:
+            status, body = fetch(port, path, slow)
+        except OSError as error:
+            failures.append(f"{path}: {error}")
+            continue
+        latencies.append(time.perf_counter() - start)
+        expected = page if path == "/" else json.dumps(DATA).encode()
+        if not status.endswith("200 OK") or body != expected:
+            failures.append(f"{path}: {status}, {len(body)} bytes")
+    results.put((latencies, failures))
+
+
+def make_server(http):
+    server = http.Server(socket, HUB)
+
+    @server.route("/")
+    def page(request):
+        return http.FileResponse(request, "index.html", HUB)
+
+    @server.route("/get-data")
+    def get_data(request):
+        return http.JSONResponse(request, DATA)
+
+    server.start("127.0.0.1", 0)
+    return server, server._sock.getsockname()[1]
+
+
+async def run_mode(asyncio, http, mode, args, page):
+    """Serves the clients in mode, returns (latencies, failures, tick lateness)"""
+    server, port = make_server(http)
+    results = multiprocessing.Queue()
+    clients = [
+        multiprocessing.Process(
+            target=client,
+            args=(port, args.requests, n < SLOW_CLIENTS, page, results),
+        )
+        for n in range(args.clients)
+    ]
+    for process in clients:
+        process.start()
+    late = []
+    done = []
+
+    async def game_loop():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep_ms(TICK_MS)
+            late.append(time.perf_counter() - start - TICK_MS / 1000)
+
+    async def poll_loop():
+        while not done:
+            try:
+                server.poll()
+            except Exception:  # pylint: disable=broad-except
+                pass
+            await asyncio.sleep(0.01)
+
+    async def wait_clients(serving):
+        while any(process.is_alive() for process in clients):
+            await asyncio.sleep(0.05)
+        done.append(True)
+        if serving is not None:
+            serving.cancel()
+
+    serving = None
+    if mode == "serve_async":
+        serving = asyncio.create_task(server.serve_async())
+        tasks = [game_loop(), wait_clients(serving)]
+    else:
+        tasks = [game_loop(), poll_loop(), wait_clients(None)]
+    await asyncio.gather(*tasks)
+    if not server.stopped:
+        server.stop()
+
+    latencies = []
+    failures = []
+    for _ in clients:
+        got = results.get()
+        latencies += got[0]
+        failures += got[1]
+    return latencies, failures, late
+
+
+async def check_too_large(asyncio, http):
+    """Sends serve_async() requests too large for its buffer, returns problems"""
+    server, port = make_server(http)
+    size = len(server._buffer)
+    requests = {
+        "431": b"GET / HTTP/1.1\r\nCookie: " + b"a" * size + b"\r\n\r\n",
+        "413": (
+            f"POST /get-data HTTP/1.1\r\nContent-Length: {size}\r\n\r\n".encode()
+            + b"a" * size
+        ),
+    }
+    serving = asyncio.create_task(server.serve_async())
+    problems = []
+    for code, request in requests.items():
+        replies = []
+        thread = threading.Thread(
+            target=lambda: replies.append(send_raw(port, request))
+        )
+        thread.start()
+        while thread.is_alive():
+            await asyncio.sleep(0.01)
+        if not replies or not replies[0].startswith(f"HTTP/1.1 {code} "):
+            problems.append(f"{len(request)} byte request for a {code} got {replies}")
+    serving.cancel()
+    await asyncio.sleep(0)
+    if not server.stopped:
+        server.stop()
+    return problems
+
+
+def spread(values):
+    """p50/p90/p99/max of values in seconds, as ms"""
+    values = sorted(values)
+    return " ".join(
+        f"{values[min(len(values) - 1, int(len(values) * f))] * 1000:8.1f}"
+        for f in (0.5, 0.9, 0.99, 1)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    asyncio = _host.load_asyncio()
+    import adafruit_httpserver as http
+
+    with open(os.path.join(HUB, "index.html"), "rb") as f:
+        page = f.read()
+    print(
+        f"{args.clients} clients ({SLOW_CLIENTS} slow) x {args.requests} requests,"
+        f" ms:  p50      p90      p99      max"
+    )
+    failed = False
+    for mode in ("poll", "serve_async"):
+        latencies, failures, late = asyncio.run(
+            run_mode(asyncio, http, mode, args, page)
+        )
+        print(f"{mode:<11} requests {spread(latencies)}")
+        print(f"{mode:<11} ticks    {spread(late)}")
+        if mode == "serve_async":
+            for failure in sorted(set(failures)):
+                failed = True
+                print(f"  {failures.count(failure)} x {failure}")
+            if max(late) >= SLOW_SECONDS / 2:
+                failed = True
+                print(f"  a tick was held up {max(late) * 1000:.0f} ms")
+        elif failures:
+            print(f"  {len(failures)} failed")
+    for problem in asyncio.run(check_too_large(asyncio, http)):
+        failed = True
+        print("  " + problem)
+    print("failed" if failed else "ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
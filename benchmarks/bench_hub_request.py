@@ -0,0 +1,316 @@
+"""
+Request parsing in the hub's adafruit_httpserver, the parser reading
+headers in place against the old one that decoded and split them, with a
+parity check between the two.
+
+    python benchmarks/bench_hub_request.py
+    python benchmarks/bench_hub_request.py --fuzz 20000
+
+The old parser is adafruit_httpserver 4.4.1's, as the hub had it, copied in
+below: Server._receive_header_bytes() added each chunk received to a bytes
+object, then Request decoded the headers to a string, split it into lines
+and split each line into a name and a value. The parser receives into the
+server's buffer, copies the request out once, finds the start line and the
+headers in it by offset and keeps each header value as its offset in it,
+decoded when it is first read.
+
+Checks that both give the same method, path, query parameters, HTTP version,
+headers and body, or both refuse the request, for --fuzz random requests,
+well formed and not, each received in random chunks. Header values are
+printable ASCII and a few other letters; the old parser also split lines
+and stripped on other control and Unicode whitespace characters, which the
+fuzz leaves out. The two differences, that a request with no headers at all
+now parses and that headers longer than the buffer are now dropped, are
+checked separately, as is that a value isn't decoded until it is read.
+Then reports the peak memory allocated and the time to receive and parse a
+phone browser's GET and read the headers the hub reads. Exits 1 if a check
+fails.
+"""
+import argparse
+import errno
+import os
+import random
+import socket
+import sys
+import time
+import tracemalloc
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+
+# A phone browser loading the page, as it arrives
+BROWSER_GET = (
+    b"GET /get-data?since=1048577 HTTP/1.1\r\n"
+    b"Host: 192.168.4.1\r\n"
+    b"Connection: keep-alive\r\n"
+    b"User-Agent: Mozilla/5.0 (Linux; Android 14; Pixel 7) AppleWebKit/537.36"
+    b" (KHTML, like Gecko) Chrome/129.0.0.0 Mobile Safari/537.36\r\n"
+    b"Accept: */*\r\n"
+    b"Referer: http://192.168.4.1/\r\n"
+    b"Accept-Encoding: gzip, deflate\r\n"
+    b"Accept-Language: en-US,en;q=0.9,de;q=0.8\r\n"
+    b'If-None-Match: "5d41402abc4b2a76"\r\n'
+    b"Cookie: team=Red; player=7\r\n"
+    b"\r\n"
+)
+# What the hub reads of every request
+READ_HEADERS = ("Content-Length", "Accept-Encoding", "If-None-Match")
+
+NAMES = [
+    "Host", "User-Agent", "Accept", "Accept-Encoding", "Accept-Language",
+    "Connection", "Content-Type", "Cookie", "Referer",
+    "If-None-Match", "Upgrade", "Sec-WebSocket-Key", "X-Team",
+]  # fmt: skip
+METHODS = ["GET", "POST", "PUT", "HEAD", "DELETE", "OPTIONS"]
+VALUE_CHARACTERS = [chr(c) for c in range(32, 127)] + ["é", "ü", "→", "ß"]
+SPACES = ["", " ", "  ", "\t", "\r\n", " \r\n"]
+
+
+def reference_receive_header_bytes(sock, buffer):
+    """Server._receive_header_bytes() as in adafruit_httpserver 4.4.1"""
+    received_bytes = bytes()
+    while b"\r\n\r\n" not in received_bytes:
+        try:
+            length = sock.recv_into(buffer, len(buffer))
+            received_bytes += buffer[:length]
+        except OSError as ex:
+            if ex.errno == errno.ETIMEDOUT:
+                break
+            raise
+    return received_bytes
+
+
+def reference_parse(http, raw_request):
+    """
+    Request.__init__() and ._parse_request_header() as in adafruit_httpserver
+    4.4.1, returns (method, path, query_params, http_version, headers)
+    """
+    header_bytes = raw_request[: raw_request.find(b"\r\n\r\n")]
+
+    start_line, headers_string = header_bytes.decode("utf-8").strip().split("\r\n", 1)
+
+    method, path, http_version = start_line.strip().split()
+
+    if "?" not in path:
+        path += "?"
+
+    path, query_string = path.split("?", 1)
+
+    query_params = http.QueryParams(query_string)
+    headers = http.Headers(headers_string)
+
+    return method, path, query_params, http_version, headers
+
+
+def reference_receive(http, server, sock):
+    """Server._receive_request() as in adafruit_httpserver 4.4.1, parsed"""
+    header_bytes = reference_receive_header_bytes(sock, server._buffer)
+    if not header_bytes:
+        return None
+    parsed = reference_parse(http, header_bytes)
+    content_length = int(parsed[4].get_directive("Content-Length", 0))
+    received_body_bytes = header_bytes[header_bytes.find(b"\r\n\r\n") + 4 :]
+    body = server._receive_body_bytes(sock, received_body_bytes, content_length)
+    return parsed + (body,)
+
+
+class Chunked_Socket:
+    """Hands data to recv_into() in chunks of the sizes given, then times out"""
+
+    def __init__(self, data, sizes):
+        self.data = memoryview(data)
+        self.sizes = list(sizes)
+        self.sent = 0
+
+    def recv_into(self, buffer, nbytes=0):
+        left = len(self.data) - self.sent
+        if not left:
+            raise OSError(errno.ETIMEDOUT, "timed out")
+        size = self.sizes.pop(0) if self.sizes else left
+        size = min(size, nbytes or len(buffer), left)
+        buffer[:size] = self.data[self.sent : self.sent + size]
+        self.sent += size
+        return size
+
+
+def chunks(rng, data):
+    """Random chunk sizes to receive data in, mostly all at once"""
+    if rng.random() < 0.5:
+        return [len(data)]
+    sizes = []
+    while sum(sizes) < len(data):
+        sizes.append(rng.randint(1, 64))
+    return sizes
+
+
+def random_request(rng):
+    """A request, mostly well formed"""
+    path = "/" + "/".join(
+        rng.choice(["api", "get-data", "index.html", "x%20y", "é"])
+        for _ in range(rng.randint(0, 3))
+    )
+    if rng.random() < 0.4:
+        path += "?" + "&".join(
+            f"{rng.choice('abc')}={rng.choice(['1', '', 'a=b', '%20', '?'])}"
+            for _ in range(rng.randint(0, 3))
+        )
+    parts = [rng.choice(METHODS), path, rng.choice(["HTTP/1.1", "HTTP/1.0"])]
+    if rng.random() < 0.03:
+        parts.pop(rng.randrange(3))
+    if rng.random() < 0.03:
+        parts.append("extra")
+    start_line = rng.choice(["", " ", "\r\n"]) * (rng.random() < 0.1)
+    start_line += rng.choice([" ", " ", " ", "  ", "\t"]).join(parts)
+    start_line += rng.choice(["", "", " "])
+
+    lines = []
+    body = b""
+    for _ in range(rng.randint(1, 12)):
+        name = rng.choice(NAMES)
+        name = rng.choice([name, name.lower(), name.upper()])
+        length = rng.choice([1, 5, 20, 60]) if rng.random() < 0.95 else 0
+        value = "".join(rng.choice(VALUE_CHARACTERS) for _ in range(length))
+        separator = ": " if rng.random() < 0.98 else rng.choice([":", " : ", ":\t"])
+        lead = rng.choice(SPACES[:3]) if rng.random() < 0.05 else ""
+        lines.append(lead + name + separator + value + rng.choice(["", "", " "]))
+    if rng.random() < 0.2:
+        body = rng.randbytes(rng.randint(0, 300))
+        lines.append(f"Content-Length: {len(body)}")
+    ending = rng.choice(SPACES) if rng.random() < 0.1 else ""
+    head = "\r\n".join([start_line] + lines) + ending + "\r\n\r\n"
+    return head.encode() + body
+
+
+def outcome(parsed, body):
+    """What a parse gave, to compare"""
+    method, path, query_params, http_version, headers = parsed
+    lookups = [headers.get(name) for name in NAMES + [n.lower() for n in NAMES]]
+    return (
+        method,
+        path,
+        query_params._storage,
+        http_version,
+        headers.items(),
+        lookups,
+        body,
+    )
+
+
+def parse_both(http, server, raw_request, sizes):
+    """(old, new) outcome of receiving raw_request in chunks of sizes"""
+    try:
+        got = reference_receive(http, server, Chunked_Socket(raw_request, sizes))
+        expected = outcome(got[:5], got[5])
+    except ValueError:
+        expected = "refused"
+    try:
+        request = server._receive_request(Chunked_Socket(raw_request, sizes), None)
+        got = outcome(
+            (
+                request.method,
+                request.path,
+                request.query_params,
+                request.http_version,
+                request.headers,
+            ),
+            request.body,
+        )
+    except ValueError:
+        got = "refused"
+    return expected, got
+
+
+def peak(receive, sizes):
+    """
+    Peak bytes allocated by receive() taking BROWSER_GET in chunks of sizes,
+    and seconds per call
+    """
+    receive(Chunked_Socket(BROWSER_GET, sizes))
+    sock = Chunked_Socket(BROWSER_GET, sizes)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    receive(sock)
+    allocated = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    socks = [Chunked_Socket(BROWSER_GET, sizes) for _ in range(2000)]
+    start = time.perf_counter()
+    for sock in socks:
+        receive(sock)
+    return allocated, (time.perf_counter() - start) / len(socks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fuzz", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    import adafruit_httpserver as http
+
+    server = http.Server(socket)
+    rng = random.Random(args.seed)
+    problems = []
+    refused = 0
+    for _ in range(args.fuzz):
+        raw_request = random_request(rng)
+        expected, got = parse_both(http, server, raw_request, chunks(rng, raw_request))
+        refused += expected == "refused"
+        if got != expected and len(problems) < 10:
+            problems.append(f"{raw_request!r}: {got}, expected {expected}")
+    print(
+        f"parity: {args.fuzz} requests ({refused} refused by both),"
+        f" {len(problems)} differences"
+    )
+
+    # A request with no headers
+    request = server._receive_request(
+        Chunked_Socket(b"GET /?a=1 HTTP/1.0\r\n\r\n", []), None
+    )
+    if (request.method, request.path, len(request.headers)) != ("GET", "/", 0):
+        problems.append("a request with no headers didn't parse")
+
+    # Headers longer than the buffer
+    long_request = b"GET / HTTP/1.1\r\nCookie: " + b"x" * 2000 + b"\r\n\r\n"
+    if server._receive_request(Chunked_Socket(long_request, [100] * 30), None):
+        problems.append("headers longer than the buffer weren't dropped")
+
+    # Values stay in the bytes until read
+    request = server._receive_request(Chunked_Socket(BROWSER_GET, []), None)
+    storage = request.headers._storage
+    if not isinstance(storage["user-agent"][0], int):
+        problems.append("User-Agent decoded before it was read")
+    user_agent = request.headers.get("User-Agent")
+    if storage["user-agent"][0] is not user_agent or not user_agent.endswith("537.36"):
+        problems.append("User-Agent not kept decoded once read")
+
+    def old(sock):
+        got = reference_receive(http, server, sock)
+        for name in READ_HEADERS:
+            got[4].get(name)
+
+    def new(sock):
+        request = server._receive_request(sock, None)
+        for name in READ_HEADERS:
+            request.headers.get(name)
+
+    print(
+        f"{len(BROWSER_GET)} byte GET, {len(READ_HEADERS)} headers read:"
+        "      peak bytes   us/request"
+    )
+    for sizes, received in (([], "in one recv"), ([200] * 4, "in 200 byte recvs")):
+        for name, receive in (("old parser", old), ("parser", new)):
+            allocated, seconds = peak(receive, sizes)
+            print(
+                f"{name + ' ' + received:<40} {allocated:>11,} {seconds * 1e6:>12.1f}"
+            )
+
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
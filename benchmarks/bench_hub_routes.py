@@ -0,0 +1,228 @@
+"""
+Route lookup in the hub's adafruit_httpserver with 30 routes, the router
+against the old regex matcher, and a parity check between the two.
+
+    python benchmarks/bench_hub_routes.py
+    python benchmarks/bench_hub_routes.py --fuzz 50000
+
+The old matcher is adafruit_httpserver 4.4.1's, as the hub had it, copied in
+below: it built a Route for every request, running re.sub() and re.compile()
+on the request path, then tried each route's regex in turn. The router keeps
+literal paths in a dict and the rest in a trie of segments, all sorted out
+when the routes are added.
+
+Checks that both find the same handler with the same URL parameters for
+every route's own paths, with and without trailing slashes and in every
+method, and for --fuzz random paths. The one difference, that a "." in a
+route path now only matches a ".", is checked separately. Then reports the
+time per lookup for a mix of paths and counts the re calls made by the
+router's lookups, which should be none. CPython caches compiled regexes,
+MicroPython compiles them again each time, so the old matcher costs the
+board more than it does here. Exits 1 if a check fails.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+
+# (path, methods, append_slash)
+ROUTES = [
+    ("/", ["GET"], False),
+    ("/", ["POST"], False),
+    ("/get-data", ["GET"], False),
+    ("/connect-websocket", ["GET"], False),
+    ("/connect-client", ["GET"], False),
+    ("/index.html", ["GET"], False),
+    ("/api/status", ["GET"], True),
+    ("/api/<resource>", ["GET"], False),
+    ("/api/<resource>", ["PUT", "POST"], False),
+    ("/api/bucket/<bucket_id>", ["GET"], True),
+    ("/api/bucket/<bucket_id>/team", ["GET", "POST"], False),
+    ("/api/bucket/<bucket_id>/color/<color>", ["POST"], False),
+    ("/api/bucket/all/team", ["GET"], False),
+    ("/api/game/<game>/teams/<team>/score", ["GET"], False),
+    ("/api/game/<game>/start", ["POST"], False),
+    ("/api/game/current", ["GET"], False),
+    ("/static/....", ["GET"], False),
+    ("/files/.../download", ["GET"], False),
+    ("/example/..../something", ["GET", "POST"], False),
+    ("/example/<name>/", ["GET"], False),
+    ("/settings", ["GET", "POST"], True),
+    ("/settings/wifi", ["GET"], False),
+    ("/settings/<section>/<key>", ["GET", "PUT"], False),
+    ("/logs/<day>/....", ["GET"], False),
+    ("/timer/<minutes>/<seconds>", ["POST"], False),
+    ("/download/<name>.zip", ["GET"], False),
+    ("/reset", ["POST"], False),
+    ("/a/.../c/<d>", ["GET"], False),
+    ("/a/b/<c>/d", ["GET"], False),
+    ("/health", ["GET", "HEAD"], False),
+]
+METHODS = ["GET", "POST", "PUT", "HEAD"]
+WORDS = [
+    "", "api", "bucket", "status", "team", "color", "all", "game", "teams",
+    "score", "start", "current", "static", "files", "download", "example",
+    "something", "settings", "wifi", "logs", "timer", "reset", "a", "b", "c",
+    "d", "health", "1", "42", "red", "x.zip", "app.js", "index.html",
+]  # fmt: skip
+
+
+class Reference_Route:
+    """Route and its matching as in adafruit_httpserver 4.4.1"""
+
+    def __init__(self, path="", methods="GET", handler=None, append_slash=False):
+        self.parameters_names = [
+            name[1:-1] for name in re.compile(r"/[^<>]*/?").split(path) if name != ""
+        ]
+        self.path = re.sub(r"<\w+>", r"([^/]+)", path).replace("....", r".+").replace(
+            "...", r"[^/]+"
+        ) + ("/?" if append_slash else "")
+        self.methods = (
+            set(methods) if isinstance(methods, (set, list, tuple)) else set([methods])
+        )
+        self.handler = handler
+
+    def match(self, other):
+        if not other.methods.issubset(self.methods):
+            return False, {}
+        regex_match = re.match(f"^{self.path}$", other.path)
+        if regex_match is None:
+            return False, {}
+        return True, dict(zip(self.parameters_names, regex_match.groups()))
+
+
+def reference_find_handler(routes, path, method):
+    """_Routes.find_handler(Route(path, method)) as in adafruit_httpserver 4.4.1"""
+    route = Reference_Route(path, method)
+    for _route in routes:
+        matches, keyword_parameters = _route.match(route)
+        if matches:
+            handler = _route.handler
+            return lambda request: handler(request, **keyword_parameters)
+    return None
+
+
+def make_handler(n):
+    def handler(request, **parameters):
+        return n, parameters
+
+    return handler
+
+
+def request_paths(rng, count):
+    """Each route's own paths, with parameters filled in, then random ones"""
+    paths = set()
+    for path, _, _ in ROUTES:
+        for fill in ("1", "red", "x", "1/2"):
+            filled = re.sub(r"<\w+>", fill, path)
+            filled = filled.replace("....", fill).replace("...", fill)
+            for variant in (filled, filled + "/", filled.rstrip("/"), filled + "//"):
+                paths.add(variant or "/")
+    for _ in range(count):
+        paths.add("/" + "/".join(rng.choice(WORDS) for _ in range(rng.randint(0, 6))))
+    return sorted(paths)
+
+
+def outcome(handler):
+    return None if handler is None else handler(None)
+
+
+class Counting_Re:
+    """Stands in for re in route.py, counting the calls made through it"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, name):
+        function = getattr(re, name)
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return function(*args, **kwargs)
+
+        return counted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fuzz", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    from adafruit_httpserver import route as route_module
+
+    reference = []
+    router = route_module._Routes()
+    for n, (path, methods, append_slash) in enumerate(ROUTES):
+        handler = make_handler(n)
+        reference.append(Reference_Route(path, methods, handler, append_slash))
+        router.add(
+            route_module.Route(path, methods, handler, append_slash=append_slash)
+        )
+
+    rng = random.Random(args.seed)
+    paths = request_paths(rng, args.fuzz)
+    problems = []
+    matched = 0
+    for path in paths:
+        for method in METHODS:
+            expected = outcome(reference_find_handler(reference, path, method))
+            got = outcome(router.find_handler(path, method))
+            matched += expected is not None
+            if got != expected and len(problems) < 10:
+                problems.append(f"{method} {path}: {got}, expected {expected}")
+    print(
+        f"parity: {len(paths) * len(METHODS)} lookups"
+        f" ({matched} matching a route), {len(problems)} differences"
+    )
+
+    # A "." in a route path is only a "."
+    if outcome(router.find_handler("/index.html", "GET")) != (5, {}):
+        problems.append("/index.html not found")
+    if router.find_handler("/indexXhtml", "GET") is not None:
+        problems.append("a . in a route path matched another character")
+
+    mix = [rng.choice(paths) for _ in range(1000)]
+    methods = [rng.choice(METHODS[:2]) for _ in mix]
+    rounds = max(1, args.lookups // len(mix))
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path, method in zip(mix, methods):
+            reference_find_handler(reference, path, method)
+    old = (time.perf_counter() - start) / (rounds * len(mix))
+
+    counting = Counting_Re()
+    route_module.re = counting
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path, method in zip(mix, methods):
+            router.find_handler(path, method)
+    new = (time.perf_counter() - start) / (rounds * len(mix))
+    route_module.re = re
+    # The one route that needs a regex, /download/<name>.zip, is tried with
+    # its compiled one, that is no call through re
+    print(
+        f"{len(ROUTES)} routes, per lookup: old matcher {old * 1e6:.1f} us,"
+        f" router {new * 1e6:.1f} us ({old / new:.1f}x),"
+        f" {counting.calls} re calls in {rounds * len(mix)} router lookups"
+    )
+    if counting.calls:
+        problems.append(f"router made {counting.calls} re calls")
+
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
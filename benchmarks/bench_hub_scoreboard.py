@@ -0,0 +1,171 @@
+"""
+Serialization work of the hub's /get-data with 50 phones polling, with
+json.dumps() on every request as before, with the cached Scoreboard, and
+with the Scoreboard and ?since=.
+
+    python benchmarks/bench_hub_scoreboard.py
+    python benchmarks/bench_hub_scoreboard.py --pollers 100 --seconds 300
+
+Plays --seconds of a game in simulated time: the timer changes every second,
+a random bucket changes team every 2.5 seconds and the score with it, and
+the game loop sends the state to WebSocket phones every second, as main.py
+does. Each poller asks for /get-data once a second, at its own offset, the
+way index.html does. The route is the body of main.py's get_data(), without
+the HTTP.
+
+Reports json.dumps() calls, CPU time spent building responses and response
+bytes, per second of game. Checks that a poller merging the ?since=
+responses always has the same state as the full JSON, and that a version
+from before a restart gets everything. Exits 1 if a check fails.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+BUCKETS = 6
+
+
+class Counting_Json:
+    """Stands in for json in scoreboard_commands, counting dumps()"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def dumps(self, value):
+        self.calls += 1
+        return json.dumps(value)
+
+
+def game(seconds, rng):
+    """The changes of a game: [(time, {field: value})], in time order"""
+    changes = []
+    timer = 300
+    teams = ["Red", "Blue"]
+    score = {"red": 0, "blue": 0}
+    for tick in range(seconds * 2):
+        at = tick / 2
+        if tick % 2 == 0:
+            timer -= 1
+            fields = {"timer": f"{timer // 60:02}:{timer % 60:02}"}
+            changes.append((at, fields))
+        if tick % 5 == 0:
+            team = rng.choice(teams)
+            score[team.lower()] += 1
+            changes.append((at, {f"bucket{rng.randrange(BUCKETS) + 1}": team, **score}))
+    return changes
+
+
+def start_state():
+    state = {"timer": "05:00", "red": 0, "blue": 0}
+    for n in range(BUCKETS):
+        state[f"bucket{n + 1}"] = "None"
+    return state
+
+
+def run(mode, changes, args, scoreboard_class, counting, rng):
+    """Plays the game in mode, returns (dumps calls, CPU seconds, bytes, problems)"""
+    state = start_state()
+    scoreboard = scoreboard_class(**state)
+    counting.calls = 0
+    events = [(at, "change", fields) for at, fields in changes]
+    events += [(second, "broadcast", None) for second in range(args.seconds)]
+    offsets = [rng.random() for _ in range(args.pollers)]
+    for poller, offset in enumerate(offsets):
+        events += [(second + offset, "poll", poller) for second in range(args.seconds)]
+    events.sort(key=lambda event: (event[0], event[1] != "change"))
+
+    versions = [None] * args.pollers
+    seen = [{} for _ in range(args.pollers)]
+    problems = []
+    cpu = 0
+    sent = 0
+    for _, kind, data in events:
+        if kind == "change":
+            if mode == "json.dumps":
+                state.update(data)
+            else:
+                scoreboard.update(data)
+            continue
+
+        start = time.process_time()
+        if mode == "json.dumps":
+            counting.calls += 1
+            body = json.dumps(state)
+        elif kind == "broadcast" or mode == "cached":
+            body = scoreboard.json()
+        else:
+            since = versions[data]
+            # As get_data() does it, from the query string
+            since = str(since) if since is not None else None
+            if since is not None and since.isdigit():
+                body = scoreboard.json_since(int(since))
+            else:
+                body = scoreboard.json()
+        cpu += time.process_time() - start
+        sent += len(body)
+
+        if kind == "poll" and mode == "since":
+            reply = json.loads(body)
+            versions[data] = reply.pop("version")
+            seen[data].update(reply)
+            full = json.loads(scoreboard.json())
+            full.pop("version")
+            if seen[data] != full and len(problems) < 5:
+                problems.append(f"poller {data} has {seen[data]}, not {full}")
+
+    if mode == "since":
+        # A poller from before a restart
+        restarted = scoreboard_class(**start_state())
+        stale = restarted.start - 1
+        if json.loads(restarted.json_since(stale)) != json.loads(restarted.json()):
+            problems.append("a version from before a restart didn't get everything")
+    return counting.calls, cpu, sent, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pollers", type=int, default=50)
+    parser.add_argument("--seconds", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    import scoreboard_commands
+
+    counting = Counting_Json()
+    scoreboard_commands.json = counting
+    changes = game(args.seconds, random.Random(args.seed))
+    print(
+        f"{args.pollers} pollers, {args.seconds} s of game,"
+        f" per second:  dumps()  CPU us   bytes"
+    )
+    problems = []
+    for mode in ("json.dumps", "cached", "since"):
+        calls, cpu, sent, found = run(
+            mode,
+            changes,
+            args,
+            scoreboard_commands.Scoreboard,
+            counting,
+            random.Random(args.seed),
+        )
+        problems += found
+        print(
+            f"{mode:<44} {calls / args.seconds:>8.1f} {cpu / args.seconds * 1e6:>7.0f}"
+            f" {sent / args.seconds:>7,.0f}"
+        )
+
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Events/sec and server CPU cost of the hub's Server-Sent Events fan-out, for
+1, 10 and 50 spectators.
+
+    python benchmarks/bench_hub_sse.py
+    python benchmarks/bench_hub_sse.py --events 5000
+
+Runs adafruit_httpserver and asyncio from the deprecated BLE hub's lib-cirpy
+on CPython sockets over localhost, with Server.serve_async(). The spectators
+are sockets in one reader process, which counts the events each one gets.
+The server publishes --events scoreboard events as fast as it can, with
+SSEBroadcaster.publish(), and, for comparison, with SSEResponse.send_event()
+for each spectator in turn, as main_sser.py did for its one client.
+Reports events/sec and the server process's CPU time per event.
+
+Then checks that a spectator that stops reading is dropped within the
+broadcaster's send_timeout while the others get every event. Also checks
+that every spectator got every event in each run. Exits 1 if a check fails.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import selectors
+import socket
+import sys
+import time
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+SUBSCRIBERS = (1, 10, 50)
+SEND_TIMEOUT = 0.1
+SCORE = json.dumps(
+    {"timer": "04:59", "red": 125, "blue": 97, "buckets": ["Red", "Blue", "None"]}
+)
+
+
+def reader(port, count, stalled, results):
+    """
+    Subscribes count sockets and counts the events each gets until the server
+    closes it. The stalled ones never read past the headers.
+    """
+    selector = selectors.DefaultSelector()
+    socks = []
+    for n in range(count):
+        sock = socket.create_connection(("127.0.0.1", port))
+        if n < stalled:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        path = "/stall" if n < stalled else "/events"
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: hub\r\n\r\n".encode())
+        socks.append(sock)
+        if n >= stalled:
+            selector.register(sock, selectors.EVENT_READ, n)
+    counts = [0] * count
+    tails = [b""] * count
+    open_socks = count - stalled
+    while open_socks:
+        for key, _ in selector.select():
+            n = key.data
+            chunk = key.fileobj.recv(65536)
+            if not chunk:
+                selector.unregister(key.fileobj)
+                open_socks -= 1
+                continue
+            data = tails[n] + chunk
+            counts[n] += data.count(b"\ndata: ") + data.startswith(b"data: ")
+            tails[n] = data[-6:]
+    results.put(counts[stalled:])
+    for sock in socks:
+        sock.close()
+
+
+def make_server(http, broadcaster):
+    server = http.Server(socket)
+
+    @server.route("/events")
+    def events(request):
+        return broadcaster.subscribe(request)
+
+    @server.route("/stall")
+    def stall(request):
+        request.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        return broadcaster.subscribe(request)
+
+    server.start("127.0.0.1", 0)
+    return server, server._sock.getsockname()[1]
+
+
+async def run(asyncio, http, count, events, mode, stalled=0, size=0):
+    """
+    Publishes events to count spectators, returns (events/sec, CPU us per
+    event, counts per spectator, longest publish in seconds, broadcaster)
+    """
+    broadcaster = http.SSEBroadcaster(count + stalled, SEND_TIMEOUT if stalled else 5)
+    server, port = make_server(http, broadcaster)
+    serving = asyncio.create_task(server.serve_async())
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=reader, args=(port, count + stalled, stalled, results)
+    )
+    process.start()
+    while broadcaster.subscribers < count + stalled:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+
+    data = SCORE + "x" * size
+    longest = 0
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(events):
+        start = time.perf_counter()
+        if mode == "publish":
+            await broadcaster.publish(data)
+        else:
+            for sse in broadcaster._subscribers:
+                sse.send_event(data)
+            await asyncio.sleep(0)
+        longest = max(longest, time.perf_counter() - start)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    broadcaster.close()
+    serving.cancel()
+    counts = results.get()
+    process.join()
+    return events / wall, cpu / events * 1e6, counts, longest, broadcaster
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    asyncio = _host.load_asyncio()
+    import adafruit_httpserver as http
+
+    failed = False
+    print(f"{args.events} events of {len(SCORE)} bytes")
+    print(f"{'spectators':>10} {'mode':<11} {'events/s':>10} {'CPU us/event':>13}")
+    for count in SUBSCRIBERS:
+        for mode in ("send_event", "publish"):
+            rate, cpu, counts, _, _ = asyncio.run(
+                run(asyncio, http, count, args.events, mode)
+            )
+            print(f"{count:>10} {mode:<11} {rate:>10,.0f} {cpu:>13.1f}")
+            if counts != [args.events] * count:
+                failed = True
+                print(f"  got {min(counts)} to {max(counts)} events")
+
+    # A spectator that stops reading is dropped, the rest carry on
+    events = 200
+    _, _, counts, longest, broadcaster = asyncio.run(
+        run(asyncio, http, 10, events, "publish", stalled=1, size=1024)
+    )
+    print(
+        f"stalled spectator: dropped {broadcaster.dropped},"
+        f" longest publish {longest * 1000:.0f} ms,"
+        f" others got {min(counts)} to {max(counts)} of {events} events"
+    )
+    if broadcaster.dropped != 1 or counts != [events] * 10:
+        failed = True
+    if longest > SEND_TIMEOUT * 2:
+        failed = True
+        print(f"  a publish took over {SEND_TIMEOUT * 2 * 1000:.0f} ms")
+
+    print("failed" if failed else "ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
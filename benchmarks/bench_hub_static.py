@@ -0,0 +1,282 @@
+"""
+Bytes sent and response time of the hub's page for repeat loads, as sent
+before, gzipped, and revalidated with ETag and If-None-Match.
+
+    python benchmarks/bench_hub_static.py
+    python benchmarks/bench_hub_static.py --clients 40 --loads 30
+
+Runs adafruit_httpserver and asyncio from the deprecated BLE hub's lib-cirpy
+on CPython sockets over localhost, with Server.serve_async() in a thread.
+Serves copies of the hub's pages from a temporary directory, with gzipped
+copies written by gzip_pages.py.
+
+Each client is its own process and loads index_sser.html --loads times, one
+load after another, like a player refreshing. "plain" serves it with
+FileResponse as it was, the whole page every load. "gzip" sends the gzipped
+copy to a browser that takes gzip. "revalidate" sends the ETag of the last
+load back in If-None-Match, as a browser does, and gets 304s. Reports bytes
+on the wire per load and p50/p90/p99/max response time in ms. Connections
+past start()'s listen backlog of 10 are retried by the client a second
+later, which shows up in the p99 of every mode.
+
+Checks that the gzipped page unpacks to the page, that clients without gzip
+or with q=0 get the page itself, that only a matching ETag gets a 304 with
+no body, that a page edited after its .gz was written is sent as it is with
+a new ETag, and that each file is hashed once, not on every load. Exits 1
+if a check fails.
+"""
+import argparse
+import gzip
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import _host
+import gzip_pages
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+PAGE = "index_sser.html"
+
+
+def fetch(port, headers=None):
+    """One GET of the page, returns (status line, headers, body, bytes received)"""
+    lines = ["GET / HTTP/1.1", "Host: hub", "User-Agent: bench"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    request = ("\r\n".join(lines) + "\r\n\r\n").encode()
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+        sock.sendall(request)
+        reply = b""
+        while chunk := sock.recv(4096):
+            reply += chunk
+    head, _, body = reply.partition(b"\r\n\r\n")
+    lines = head.decode().split("\r\n")
+    reply_headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(": ")
+        reply_headers[name.lower()] = value
+    return lines[0], reply_headers, body, len(reply)
+
+
+def client(port, loads, mode, results):
+    """Loads the page one after another, puts (latencies, bytes, failures) on results"""
+    latencies = []
+    received = 0
+    failures = []
+    etag = None
+    for _ in range(loads):
+        headers = {}
+        if mode != "plain":
+            headers["Accept-Encoding"] = "gzip, deflate"
+        if mode == "revalidate" and etag:
+            headers["If-None-Match"] = etag
+        start = time.perf_counter()
+        try:
+            status, reply_headers, _, size = fetch(port, headers)
+        except OSError as error:
+            failures.append(str(error))
+            continue
+        latencies.append(time.perf_counter() - start)
+        received += size
+        etag = reply_headers.get("etag", etag)
+        if status.split()[1] not in ("200", "304"):
+            failures.append(status)
+    results.put((latencies, received, failures))
+
+
+class Hub:
+    """The hub's server, serving PAGE from root as mode does, in a thread"""
+
+    def __init__(self, asyncio, http, root):
+        self.asyncio = asyncio
+        self.mode = "plain"
+        self.server = http.Server(socket)
+
+        @self.server.route("/")
+        def page(request):
+            fresh = self.mode != "plain"
+            return http.FileResponse(
+                request, PAGE, root, precompressed=fresh, etag=fresh
+            )
+
+        self.server.start("127.0.0.1", 0)
+        self.port = self.server._sock.getsockname()[1]
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),))
+        self.thread.start()
+
+    async def serve(self):
+        serving = self.asyncio.create_task(self.server.serve_async(max_connections=8))
+        while not self.done.is_set():
+            await self.asyncio.sleep(0.05)
+        serving.cancel()
+        await self.asyncio.sleep(0)
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+
+
+class Counting_Hashlib:
+    """Stands in for hashlib in response.py, counting the hashes started"""
+
+    def __init__(self, hashlib):
+        self.hashlib = hashlib
+        self.count = 0
+
+    def new(self, *args):
+        self.count += 1
+        return self.hashlib.new(*args)
+
+
+def check(hub, root, hashes, problems):
+    """Checks what the page is sent as, appends to problems"""
+    port = hub.port
+    with open(os.path.join(root, PAGE), "rb") as f:
+        page = f.read()
+    hub.mode = "gzip"
+
+    def expect(ok, problem):
+        if not ok:
+            problems.append(problem)
+
+    status, headers, body, _ = fetch(port, {"Accept-Encoding": "gzip, deflate, br"})
+    expect(headers.get("content-encoding") == "gzip", f"gzip asked, got {headers}")
+    expect(gzip.decompress(body) == page, "gzipped page doesn't unpack to the page")
+    expect(headers.get("vary") == "Accept-Encoding", "no Vary: Accept-Encoding")
+    gzip_etag = headers.get("etag", "")
+
+    for accept in (None, "gzip;q=0", "identity"):
+        status, headers, body, _ = fetch(
+            port, {"Accept-Encoding": accept} if accept else {}
+        )
+        expect(
+            body == page and "content-encoding" not in headers,
+            f"Accept-Encoding {accept} got {status}, {len(body)} bytes",
+        )
+        expect(headers.get("vary") == "Accept-Encoding", "no Vary: Accept-Encoding")
+    etag = headers.get("etag", "")
+    expect(etag.startswith('"') and etag != gzip_etag, f"ETags {etag} {gzip_etag}")
+
+    for if_none_match, accept, code in (
+        (etag, None, "304"),
+        (f'"x", W/{etag}', None, "304"),
+        (gzip_etag, "gzip", "304"),
+        (gzip_etag, None, "200"),
+        ('"nothing"', None, "200"),
+    ):
+        headers = {"If-None-Match": if_none_match}
+        if accept:
+            headers["Accept-Encoding"] = accept
+        status, reply_headers, body, _ = fetch(port, headers)
+        expect(status.split()[1] == code, f"If-None-Match {if_none_match} got {status}")
+        if code == "304":
+            expect(not body and "content-length" not in reply_headers, "304 had a body")
+            expect(reply_headers.get("etag") in (etag, gzip_etag), "304 without ETag")
+
+    hashed = hashes.count
+    for _ in range(10):
+        fetch(port, {"Accept-Encoding": "gzip", "If-None-Match": gzip_etag})
+        fetch(port)
+    expect(hashes.count == hashed, f"{hashes.count - hashed} hashes for 20 loads")
+
+    # Edit the page after its .gz was written
+    edited = page.replace(b"</body>", b"<!-- edited --></body>")
+    with open(os.path.join(root, PAGE), "wb") as f:
+        f.write(edited)
+    later = time.time() + 2
+    os.utime(os.path.join(root, PAGE), (later, later))
+    status, headers, body, _ = fetch(
+        port, {"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    expect(
+        status.split()[1] == "200" and body == edited,
+        f"edited page got {status}, {len(body)} bytes",
+    )
+    expect(
+        headers.get("etag") not in (etag, gzip_etag, None), "edited page kept its ETag"
+    )
+    with open(os.path.join(root, PAGE), "wb") as f:
+        f.write(page)
+    gzip_pages.compress(os.path.join(root, PAGE))
+
+
+def spread(values):
+    """p50/p90/p99/max of values in seconds, as ms"""
+    values = sorted(values)
+    return " ".join(
+        f"{values[min(len(values) - 1, int(len(values) * f))] * 1000:8.2f}"
+        for f in (0.5, 0.9, 0.99, 1)
+    )
+
+
+def load(hub, mode, args):
+    """Runs the clients against mode, returns (latencies, bytes per load, failures)"""
+    hub.mode = mode
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    clients = [
+        context.Process(target=client, args=(hub.port, args.loads, mode, results))
+        for _ in range(args.clients)
+    ]
+    for process in clients:
+        process.start()
+    latencies = []
+    received = 0
+    failures = []
+    for _ in clients:
+        got = results.get()
+        latencies += got[0]
+        received += got[1]
+        failures += got[2]
+    for process in clients:
+        process.join()
+    return latencies, received / max(1, len(latencies)), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--loads", type=int, default=20)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    asyncio = _host.load_asyncio()
+    import adafruit_httpserver as http
+    from adafruit_httpserver import response
+
+    hashes = Counting_Hashlib(response.hashlib)
+    response.hashlib = hashes
+    problems = []
+    with tempfile.TemporaryDirectory() as root:
+        for name in os.listdir(HUB):
+            if name.endswith(".html"):
+                shutil.copy(os.path.join(HUB, name), root)
+                gzip_pages.compress(os.path.join(root, name))
+        hub = Hub(asyncio, http, root)
+        try:
+            check(hub, root, hashes, problems)
+            print(
+                f"{args.clients} clients x {args.loads} loads of {PAGE},"
+                f" ms:              p50      p90      p99      max"
+            )
+            for mode in ("plain", "gzip", "revalidate"):
+                latencies, per_load, failures = load(hub, mode, args)
+                print(f"{mode:<10} {per_load:>7,.0f} bytes/load {spread(latencies)}")
+                if failures:
+                    problems.append(f"{mode}: {len(failures)} loads failed")
+        finally:
+            hub.stop()
+
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
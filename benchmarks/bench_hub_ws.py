@@ -0,0 +1,444 @@
+"""
+RFC 6455 checks of the hub's WebsocketHub, and its broadcast throughput to
+1, 10 and 50 phones.
+
+    python benchmarks/bench_hub_ws.py
+    python benchmarks/bench_hub_ws.py --messages 5000
+
+Runs adafruit_httpserver and asyncio from the deprecated BLE hub's lib-cirpy
+on CPython sockets over localhost, with Server.serve_async().
+
+Checks the frames the hub writes against an encoder written from RFC 6455
+section 5.2, for payloads around each length boundary, and the handshake's
+Sec-WebSocket-Accept against the example in section 1.3. Then connects
+clients that check what the hub broadcasts, that pings get a pong with the
+same payload, that a close gets its status code echoed before the hub hangs
+up, that a message split over two writes or two messages in one write are
+read, and that unmasked, fragmented and oversized frames close the
+connection with 1002, 1003 and 1009.
+
+Reports the most memory allocated at once while the hub answers 100 pings,
+against Websocket.receive() answering them, which allocates a buffer for
+each frame.
+
+Then broadcasts --messages scoreboard messages as fast as it can, with
+WebsocketHub.broadcast(), and, for comparison, with Websocket.send_message()
+for each phone in turn, as main.py did for its one phone. The phones are
+sockets in one reader process, which counts the frames each one gets.
+Reports messages/sec and the server process's CPU time per message.
+Exits 1 if a check fails.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import selectors
+import socket
+import struct
+import sys
+import time
+import tracemalloc
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+PHONES = (1, 10, 50)
+BUFFER_SIZE = 1024
+# RFC 6455 section 1.3
+EXAMPLE_KEY = "dGhlIHNhbXBsZSBub25jZQ=="
+EXAMPLE_ACCEPT = "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+TEXT, BINARY, CLOSE, PING, PONG = 1, 2, 8, 9, 10
+SCORE = json.dumps(
+    {"timer": "04:59", "red": 125, "blue": 97, "buckets": ["Red", "Blue", "None"]}
+)
+HANDSHAKE = (
+    "GET /connect-websocket HTTP/1.1\r\nHost: hub\r\nUpgrade: websocket\r\n"
+    f"Connection: Upgrade\r\nSec-WebSocket-Key: {EXAMPLE_KEY}\r\n"
+    "Sec-WebSocket-Version: 13\r\n\r\n"
+).encode()
+
+
+def rfc_frame(opcode, payload, mask=None):
+    """A final frame as RFC 6455 section 5.2 lays it out, masked if mask is given"""
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+    if not mask:
+        return header + payload
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def client_frame(opcode, payload, fin=True):
+    """A masked frame, as a client sends it"""
+    frame = bytearray(rfc_frame(opcode, payload, os.urandom(4)))
+    if not fin:
+        frame[0] &= 0x7F
+    return bytes(frame)
+
+
+def first_frame(data):
+    """Returns ((fin, opcode, masked, payload), rest) of the first frame in data,
+    or (None, data) if it isn't all there"""
+    if len(data) < 2:
+        return None, data
+    length = data[1] & 0x7F
+    header = 2
+    if length == 126:
+        header = 4
+        if len(data) < header:
+            return None, data
+        length = struct.unpack("!H", data[2:4])[0]
+    elif length == 127:
+        header = 10
+        if len(data) < header:
+            return None, data
+        length = struct.unpack("!Q", data[2:10])[0]
+    if len(data) < header + length:
+        return None, data
+    frame = (
+        data[0] & 0x80,
+        data[0] & 0x0F,
+        data[1] & 0x80,
+        data[header : header + length],
+    )
+    return frame, data[header + length :]
+
+
+def parse_frames(data):
+    """Returns ([(fin, opcode, masked, payload)], rest) of the whole frames in data"""
+    frames = []
+    while True:
+        frame, data = first_frame(data)
+        if frame is None:
+            return frames, data
+        frames.append(frame)
+
+
+def check_encoding(http):
+    """Compares Websocket's frames with rfc_frame(), returns problems"""
+    problems = []
+    for length in (0, 1, 125, 126, 127, 65535, 65536, 70000):
+        payload = os.urandom(length)
+        for opcode in (TEXT, BINARY, PING):
+            frame = http.Websocket._prepare_frame(opcode, payload)
+            if bytes(frame) != rfc_frame(opcode, payload):
+                problems.append(f"opcode {opcode} length {length} framed wrong")
+    return problems
+
+
+class Phone:
+    """A non-blocking client socket, driven from the server's asyncio loop"""
+
+    def __init__(self, asyncio, port):
+        self.asyncio = asyncio
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.sock.setblocking(False)
+        self.data = b""
+
+    async def recv(self, timeout=2):
+        """Waits for more bytes, returns b"" once the hub has hung up"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                return self.sock.recv(65536)
+            except BlockingIOError:
+                await self.asyncio.sleep(0.001)
+        raise TimeoutError("phone got nothing")
+
+    async def handshake(self):
+        """Returns the status line and headers of the reply to HANDSHAKE"""
+        self.sock.sendall(HANDSHAKE)
+        while b"\r\n\r\n" not in self.data:
+            chunk = await self.recv()
+            if not chunk:
+                break
+            self.data += chunk
+        head, _, self.data = self.data.partition(b"\r\n\r\n")
+        lines = head.decode().split("\r\n")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(": ")
+            headers[name.lower()] = value
+        return lines[0], headers
+
+    async def frame(self):
+        """Returns the next (fin, opcode, masked, payload), or None on hang up"""
+        while True:
+            frame, self.data = first_frame(self.data)
+            if frame is not None:
+                return frame
+            chunk = await self.recv()
+            if not chunk:
+                return None
+            self.data += chunk
+
+    async def hung_up(self):
+        try:
+            return await self.recv() == b""
+        except ConnectionResetError:
+            return True
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+
+def make_server(http, hub):
+    server = http.Server(socket)
+
+    @server.route("/connect-websocket")
+    def connect(request):
+        return hub.connect(request)
+
+    server.start("127.0.0.1", 0)
+    return server, server._sock.getsockname()[1]
+
+
+async def receive(asyncio, hub, timeout=2):
+    """Waits for the hub to read a message"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        message = hub.receive()
+        if message is not None:
+            return message
+        await asyncio.sleep(0.001)
+    return None
+
+
+async def check_protocol(asyncio, http, problems):
+    """Runs the protocol checks over localhost, appends to problems"""
+    hub = http.WebsocketHub(max_clients=3, buffer_size=BUFFER_SIZE)
+    server, port = make_server(http, hub)
+    serving = asyncio.create_task(server.serve_async())
+
+    def check(ok, problem):
+        if not ok:
+            problems.append(problem)
+
+    phones = [Phone(asyncio, port) for _ in range(3)]
+    for phone in phones:
+        status, headers = await phone.handshake()
+        check(status.endswith("101 Switching Protocols"), f"handshake got {status}")
+        accept = headers.get("sec-websocket-accept")
+        check(accept == EXAMPLE_ACCEPT, f"Sec-WebSocket-Accept {accept}")
+    status, _ = await Phone(asyncio, port).handshake()
+    check(status.endswith("503 Service Unavailable"), f"4th phone got {status}")
+    check(hub.clients == 3, f"{hub.clients} clients connected")
+
+    # Broadcasts, one longer than the send buffer
+    for message in ("hello", os.urandom(300), "x" * 70000):
+        await hub.broadcast(message)
+        payload = message.encode() if isinstance(message, str) else message
+        opcode = TEXT if isinstance(message, str) else BINARY
+        for n, phone in enumerate(phones):
+            frame = await phone.frame()
+            check(
+                frame == (0x80, opcode, 0, payload),
+                f"phone {n} got {frame and frame[:3]} for {len(payload)} bytes",
+            )
+
+    # Ping gets a pong with the same payload
+    phones[0].send(client_frame(PING, b"abc"))
+    check(await receive(asyncio, hub, 0.2) is None, "ping returned as a message")
+    frame = await phones[0].frame()
+    check(frame == (0x80, PONG, 0, b"abc"), f"ping got {frame}")
+
+    # A message split over two writes, then two in one write
+    frame = client_frame(TEXT, b"#ff0000")
+    phones[1].send(frame[:5])
+    check(await receive(asyncio, hub, 0.1) is None, "half a frame read as a message")
+    phones[1].send(frame[5:])
+    message = await receive(asyncio, hub)
+    check(message == "#ff0000", f"split message read as {message!r}")
+    phones[1].send(client_frame(TEXT, b"one") + client_frame(BINARY, b"two"))
+    messages = [await receive(asyncio, hub), await receive(asyncio, hub)]
+    check(messages == ["one", b"two"], f"two messages read as {messages}")
+
+    # Close gets its status code echoed, then the hub hangs up
+    phones[2].send(client_frame(CLOSE, struct.pack("!H", 1000)))
+    await receive(asyncio, hub, 0.1)
+    frame = await phones[2].frame()
+    check(frame == (0x80, CLOSE, 0, b"\x03\xe8"), f"close got {frame}")
+    check(await phones[2].hung_up(), "hub didn't hang up after close")
+    check(hub.clients == 2, f"{hub.clients} clients after a close")
+
+    # Frames a client mustn't send
+    cases = (
+        (rfc_frame(TEXT, b"plain"), 1002),
+        (client_frame(TEXT, b"part", fin=False), 1003),
+        (client_frame(BINARY, bytes(BUFFER_SIZE)), 1009),
+    )
+    for data, code in cases:
+        phone = Phone(asyncio, port)
+        await phone.handshake()
+        phone.send(data)
+        await receive(asyncio, hub, 0.1)
+        frame = await phone.frame()
+        check(
+            frame == (0x80, CLOSE, 0, struct.pack("!H", code)),
+            f"expected close {code}, got {frame}",
+        )
+        check(await phone.hung_up(), f"hub didn't hang up after {code}")
+
+    await check_allocations(asyncio, http, hub, port, problems)
+
+    hub.close()
+    for phone in phones:
+        phone.sock.close()
+    serving.cancel()
+
+
+async def check_allocations(asyncio, http, hub, port, problems):
+    """Compares the peak memory of answering 100 pings, hub against Websocket"""
+    pings = b"".join(client_frame(PING, b"ping") for _ in range(100))
+    phone = Phone(asyncio, port)
+    await phone.handshake()
+    phone.send(pings)
+    await asyncio.sleep(0.05)
+    tracemalloc.start()
+    hub.receive()
+    hub_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    pongs = 0
+    while pongs < 100 and (frame := await phone.frame()) is not None:
+        pongs += frame[1] == PONG
+
+    # A plain Websocket, as main.py used
+    websockets = []
+
+    class Single:
+        @staticmethod
+        def connect(request):
+            websockets.append(http.Websocket(request, buffer_size=BUFFER_SIZE))
+            return websockets[-1]
+
+    server, single_port = make_server(http, Single)
+    serving = asyncio.create_task(server.serve_async())
+    single = Phone(asyncio, single_port)
+    await single.handshake()
+    single.send(pings)
+    await asyncio.sleep(0.05)
+    tracemalloc.start()
+    for _ in range(100):
+        websockets[0].receive()
+    websocket_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    serving.cancel()
+    single.sock.close()
+    phone.sock.close()
+
+    print(
+        f"peak allocated answering 100 pings: WebsocketHub {hub_peak} bytes,"
+        f" Websocket {websocket_peak} bytes"
+    )
+    if pongs != 100:
+        problems.append(f"100 pings got {pongs} pongs")
+    if hub_peak >= BUFFER_SIZE:
+        problems.append(f"answering pings allocated {hub_peak} bytes at once")
+
+
+def reader(port, count, results):
+    """Connects count phones and counts the frames each gets until hung up on"""
+    selector = selectors.DefaultSelector()
+    socks = []
+    for n in range(count):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(HANDSHAKE)
+        socks.append(sock)
+        selector.register(sock, selectors.EVENT_READ, n)
+    counts = [0] * count
+    data = [b""] * count
+    opened = [False] * count
+    open_socks = count
+    while open_socks:
+        for key, _ in selector.select():
+            n = key.data
+            chunk = key.fileobj.recv(65536)
+            if not chunk:
+                selector.unregister(key.fileobj)
+                open_socks -= 1
+                continue
+            data[n] += chunk
+            if not opened[n]:
+                if b"\r\n\r\n" not in data[n]:
+                    continue
+                data[n] = data[n].partition(b"\r\n\r\n")[2]
+                opened[n] = True
+            frames, data[n] = parse_frames(data[n])
+            counts[n] += sum(opcode == TEXT for _, opcode, _, _ in frames)
+    results.put(counts)
+    for sock in socks:
+        sock.close()
+
+
+async def run(asyncio, http, count, messages, mode):
+    """
+    Broadcasts messages to count phones, returns (messages/sec, CPU us per
+    message, frames each phone got)
+    """
+    hub = http.WebsocketHub(max_clients=count, send_timeout=5)
+    server, port = make_server(http, hub)
+    serving = asyncio.create_task(server.serve_async())
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=reader, args=(port, count, results))
+    process.start()
+    while hub.clients < count:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(messages):
+        if mode == "broadcast":
+            await hub.broadcast(SCORE)
+        else:
+            for client in hub._subscribers:
+                client.websocket.send_message(SCORE)
+            await asyncio.sleep(0)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+
+    hub.close()
+    serving.cancel()
+    counts = results.get()
+    process.join()
+    return messages / wall, cpu / messages * 1e6, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    asyncio = _host.load_asyncio()
+    import adafruit_httpserver as http
+
+    problems = check_encoding(http)
+    asyncio.run(check_protocol(asyncio, http, problems))
+    for problem in problems:
+        print("  " + problem)
+    if not problems:
+        print("RFC 6455 checks passed")
+
+    print(f"{args.messages} messages of {len(SCORE)} bytes")
+    print(f"{'phones':>6} {'mode':<12} {'messages/s':>10} {'CPU us/msg':>11}")
+    for count in PHONES:
+        for mode in ("send_message", "broadcast"):
+            rate, cpu, counts = asyncio.run(
+                run(asyncio, http, count, args.messages, mode)
+            )
+            print(f"{count:>6} {mode:<12} {rate:>10,.0f} {cpu:>11.1f}")
+            if counts != [args.messages] * count:
+                problems.append(f"{mode}: got {min(counts)} to {max(counts)}")
+                print("  " + problems[-1])
+
+    failed = bool(problems)
+    print("failed" if failed else "ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
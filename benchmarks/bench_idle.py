@@ -0,0 +1,67 @@
+"""
+Idle cost of the bucket menu: scheduler wakeups per second while the
+"Select a game" screen waits, and worst-case latency from an encoder turn
+to the LCD redraw.
+
+    python benchmarks/bench_idle.py
+    python benchmarks/bench_idle.py --ref HEAD~1
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import _host
+
+
+def measure(bucket, hw, asyncio, idle_seconds=3.0, trials=20):
+    """Runs the real main() against a scripted driver, returns the results"""
+    wakeups = [0]
+    real_create_task = bucket.create_task
+
+    def counting_create_task(coro):
+        return real_create_task(_host.Counted(coro, wakeups))
+
+    bucket.create_task = counting_create_task
+    results = {}
+
+    async def driver():
+        main = asyncio.create_task(bucket.main())
+        # Let the boot splash and colour sweep finish, then sit on the menu
+        await asyncio.sleep(3)
+        start, before = time.perf_counter(), wakeups[0]
+        await asyncio.sleep(idle_seconds)
+        results["wakeups_per_sec"] = (wakeups[0] - before) / (
+            time.perf_counter() - start
+        )
+        worst = 0.0
+        for _ in range(trials):
+            await asyncio.sleep(random.uniform(0.05, 0.1))
+            hw.ENCODER.position += 1
+            t0 = hw.DISPLAY.i2c.watch()
+            await asyncio.sleep(0.1)
+            if hw.DISPLAY.i2c.hit is not None:
+                worst = max(worst, hw.DISPLAY.i2c.hit - t0)
+        results["worst_wake_ms"] = worst * 1000
+        main.cancel()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(driver())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ref", help="git ref to benchmark instead of the tree")
+    args = parser.parse_args()
+    bucket, hw = _host.load_bucket(_host.checkout(args.ref) if args.ref else None)
+    import asyncio
+
+    results = measure(bucket, hw, asyncio)
+    print(f"idle wakeups/sec: {results['wakeups_per_sec']:,.0f}")
+    print(f"worst input wake latency: {results['worst_wake_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
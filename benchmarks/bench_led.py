@@ -0,0 +1,117 @@
+"""
+Cost per LED frame of RGB_Control, and a check that no frame it shows draws
+more than its current budget.
+
+    python benchmarks/bench_led.py
+    python benchmarks/bench_led.py --frames 20000
+
+Times a fill pattern step (one LED set, then show) and a solid frame (every
+LED set, then show) on the 58 LED strip, with and without a budget, with the
+NeoPixel itself stubbed out. Then shows random frames of the game colors
+under a range of budgets. Each frame's draw is worked out from the pixel
+values actually written, so a bookkeeping slip in RGB_Control shows up here.
+Checks that no frame is over budget, and that no frame is dimmed a level
+more than it needs. Exits 1 if a check fails.
+"""
+import argparse
+import random
+import sys
+import time
+
+import _host
+
+LED_COUNT = 58
+BUDGETS = (200, 500, 1000, 1500, 3000)
+
+
+def measured_ma(pixels, led):
+    """Draw of the frame in pixels, from the written channel values"""
+    levels = sum(sum(color) for color in pixels.pixels)
+    return pixels.n * led.IDLE_MA + levels * led.CHANNEL_MA / 255
+
+
+def time_frames(led, budget_ma, gamma, rounds=200):
+    """ns per fill step and per solid frame"""
+    pixels = _host.FakePixels(LED_COUNT)
+    rgb = led.RGB_Control(pixels, budget_ma=budget_ma, gamma=gamma)
+    colors = range(1, len(led.COLOR_NAMES))
+    start = time.perf_counter_ns()
+    for _ in range(rounds // 10):
+        for color in colors:
+            for i in range(LED_COUNT):
+                rgb.set(i, color)
+                rgb.show()
+    steps = rounds // 10 * len(colors) * LED_COUNT
+    step_ns = (time.perf_counter_ns() - start) / steps
+    start = time.perf_counter_ns()
+    for _ in range(rounds):
+        for color in colors:
+            rgb.fill_all(color)
+            rgb.show()
+    solid_ns = (time.perf_counter_ns() - start) / (rounds * len(colors))
+    return step_ns, solid_ns
+
+
+def check_budget(led, budget_ma, frames, rng):
+    """Problems with the frames shown under budget_ma, as a list of strings"""
+    problems = []
+    pixels = _host.FakePixels(LED_COUNT)
+    rgb = led.RGB_Control(pixels, budget_ma=budget_ma, gamma=2.2)
+    dimmed = 0
+    for frame in range(frames):
+        if rng.random() < 0.1:
+            rgb.fill_all(rng.randrange(len(led.COLOR_NAMES)))
+        else:
+            for _ in range(rng.randint(1, 8)):
+                rgb.set(rng.randrange(LED_COUNT), rng.randrange(len(led.COLOR_NAMES)))
+        rgb.show()
+        drawn = measured_ma(pixels, led)
+        if drawn > budget_ma:
+            problems.append(f"frame {frame} draws {drawn:.0f} mA")
+        if rgb.level < led.LEVELS:
+            dimmed += 1
+            brighter = led.strip_ma(rgb._levels, LED_COUNT, rgb.level + 1)
+            if brighter <= budget_ma:
+                problems.append(f"frame {frame} dimmed to {rgb.level} needlessly")
+        if len(problems) > 5:
+            break
+    return problems, dimmed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _host.use_lib()
+    _host.load_asyncio()
+    _host.install_bucket_hardware(led_count=LED_COUNT)
+    import led_commands as led
+
+    for budget_ma, gamma in ((0, 1.0), (1500, 1.0), (1500, 2.2)):
+        step_ns, solid_ns = time_frames(led, budget_ma, gamma)
+        print(
+            f"budget {budget_ma or 'none'} mA, gamma {gamma}:"
+            f" fill step {step_ns / 1000:.1f} us, solid frame {solid_ns / 1000:.1f} us"
+        )
+
+    pixels = _host.FakePixels(LED_COUNT)
+    rgb = led.RGB_Control(pixels)
+    rgb.fill_all(led.WHITE)
+    print(f"full white, no budget: {rgb.current_ma()} mA estimated")
+
+    rng = random.Random(args.seed)
+    failed = False
+    for budget_ma in BUDGETS:
+        problems, dimmed = check_budget(led, budget_ma, args.frames, rng)
+        if problems:
+            failed = True
+            print("  " + "; ".join(problems))
+        print(f"budget {budget_ma} mA: {dimmed} of {args.frames} frames dimmed")
+    print("failed" if failed else "ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
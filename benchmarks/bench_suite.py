@@ -0,0 +1,321 @@
+"""
+Micro-benchmarks of the firmware hot paths as JSON, with a compare mode that
+flags regressions between two result files.
+
+    python benchmarks/bench_suite.py --json after.json
+    python benchmarks/bench_suite.py --ref HEAD~1 --json before.json
+    python benchmarks/bench_suite.py --compare before.json after.json
+
+Each benchmark repeats one operation on the real modules, from the tree or
+--ref, with the _host.py stand-ins for the hardware. It reports ops/sec, the
+best of ROUNDS timed runs, and bytes allocated per op. The rounds take every
+benchmark in turn, so host slowdowns that come and go hit them all alike
+instead of whichever one was running. CPython frees garbage
+as it goes and doesn't count allocations, so the bytes are each op's
+tracemalloc high-water mark above where it started, as in bench_alloc.py,
+median over ALLOC_OPS ops. Benchmarks of code a ref doesn't have are left out
+of its results.
+
+--compare flags a benchmark whose ops/sec fell by more than --threshold, or
+whose bytes per op grew by more than --threshold and ALLOC_SLACK bytes.
+Exits 1 if any did.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import _host
+
+ROUNDS = 25
+RUN_SECONDS = 0.02  # Shortest timed run, ops are batched up to this
+ALLOC_OPS = 200
+ALLOC_SLACK = 16
+LED_COUNT = 58
+
+
+class Null_Bus:
+    """I2C bus that drops every write, so only the LCD driver is timed"""
+
+    def writeto(self, addr, buf):
+        pass
+
+
+async def _no_sleep(delay):
+    pass
+
+
+def run_pattern(rgb, name):
+    """An op that runs one pass of an RGB_Control pattern with no sleeps"""
+    pattern = getattr(rgb, name)
+
+    def op():
+        rgb.loop = True
+        coro = pattern(1, 5, 0.005)
+        try:
+            while True:
+                coro.send(None)
+        except StopIteration:
+            pass
+
+    return op
+
+
+def lcd_write(ctx):
+    from lcd_i2c8574_m import I2cLcd
+
+    lcd = I2cLcd(Null_Bus(), 0x27, (16, 2))
+
+    def op():
+        lcd.move_to(0, 0)
+        lcd.write("RED:  01:15\nBLUE: 02:10", "")
+
+    return op
+
+
+def lcd_write_codes(ctx):
+    from lcd_i2c8574_m import I2cLcd
+
+    lcd = I2cLcd(Null_Bus(), 0x27, (16, 2))
+    codes = bytearray(b"RED:  01:15     BLUE: 02:10     ")
+
+    def op():
+        lcd.move_to(0, 0)
+        lcd.write_codes(codes, 0, 16)
+        lcd.move_to(0, 1)
+        lcd.write_codes(codes, 16, 32)
+
+    return op
+
+
+def rgb_pattern(name):
+    def setup(ctx):
+        import led_commands
+
+        led_commands.sleep = _no_sleep
+        return run_pattern(led_commands.RGB_Control(_host.FakePixels(LED_COUNT)), name)
+
+    return setup
+
+
+def button_update(ctx):
+    from adafruit_debouncer import Button
+
+    button = Button(_host.FakePin(), long_duration_ms=1000)
+    return button.update
+
+
+def time_string(ctx):
+    bucket = ctx["bucket"]
+    seconds = [0]
+
+    def op():
+        seconds[0] = (seconds[0] + 1) % 3600
+        bucket.time_string(seconds[0])
+
+    return op
+
+
+def status_score(ctx):
+    bucket = ctx["bucket"]
+    lcd, score = bucket.LCD, bucket.SCORE
+
+    def op():
+        lcd.show(score, 75, 130)
+
+    return op
+
+
+def status_message(ctx):
+    bucket = ctx["bucket"]
+    return lambda: bucket.display_message("Domination\nReady 05:00")
+
+
+def status_ready(ctx):
+    mode = ctx["bucket"].MODES[5]
+    return mode.set_message
+
+
+def esp_game_message(ctx):
+    """A game message reaching a bucket on its menu, read and dropped"""
+    bucket = ctx["bucket"]
+    inbox = bucket.ESP.inbox
+    read_config = bucket.read_config
+    packet = _host.FakePacket(b"10")
+
+    def op():
+        inbox.append(packet)
+        read_config()
+
+    return op
+
+
+def esp_decode_config(ctx):
+    import config_commands
+
+    config = config_commands.Game_Config(
+        "Territory W",
+        [600, 0, 3000, 6, 1],
+        [(bytes((2, 0, 0, 0, 0, n)), chr(65 + n)) for n in range(6)],
+        7,
+    )
+    msg = config.encode()
+    return lambda: config_commands.decode_config(msg)
+
+
+BENCHMARKS = (
+    ("lcd_write", lcd_write),
+    ("lcd_write_codes", lcd_write_codes),
+    ("rgb_solid", rgb_pattern("solid")),
+    ("rgb_fill", rgb_pattern("fill")),
+    ("rgb_single_blink_cycle", rgb_pattern("single_blink_cycle")),
+    ("button_update", button_update),
+    ("time_string", time_string),
+    ("status_score", status_score),
+    ("status_message", status_message),
+    ("status_ready", status_ready),
+    ("esp_game_message", esp_game_message),
+    ("esp_decode_config", esp_decode_config),
+)
+
+
+def batch_size(op):
+    """Ops to a timed run, so a run takes at least RUN_SECONDS"""
+    count = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(count):
+            op()
+        if time.perf_counter() - start >= RUN_SECONDS:
+            return count
+        count *= 2
+
+
+def ops_per_sec(ops):
+    """Best ops/sec of each (op, batch size) over ROUNDS rounds of them all"""
+    best = [0.0] * len(ops)
+    for _ in range(ROUNDS):
+        for i, (op, count) in enumerate(ops):
+            start = time.perf_counter()
+            for _ in range(count):
+                op()
+            best[i] = max(best[i], count / (time.perf_counter() - start))
+    return best
+
+
+def alloc_bytes(op):
+    """Median of each op's allocation high-water, in bytes"""
+    steps = []
+    tracemalloc.start()
+    for _ in range(ALLOC_OPS):
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        op()
+        steps.append(max(0, tracemalloc.get_traced_memory()[1] - start))
+    tracemalloc.stop()
+    return statistics.median(steps)
+
+
+def scheduler_yields(asyncio):
+    """Yields/sec of the bucket's task set, from bench_asyncio.py"""
+    import bench_asyncio
+
+    return max(bench_asyncio.yield_rate(asyncio, 0.5) for _ in range(3))
+
+
+def run(ref=None):
+    """Results of every benchmark, as name: {"ops_per_sec", "alloc_bytes"}"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        bucket, hw = _host.load_bucket(_host.checkout(ref) if ref else None)
+    import asyncio
+
+    ctx = {"bucket": bucket, "hw": hw, "asyncio": asyncio}
+    names = []
+    ops = []
+    for name, setup in BENCHMARKS:
+        try:
+            op = setup(ctx)
+        except (AttributeError, ImportError, IndexError) as error:
+            print(f"{name}: skipped, {error}", file=sys.stderr)
+            continue
+        names.append(name)
+        ops.append((op, batch_size(op)))
+    results = {}
+    for name, (op, _), rate in zip(names, ops, ops_per_sec(ops)):
+        results[name] = {"ops_per_sec": round(rate, 1), "alloc_bytes": alloc_bytes(op)}
+    results["scheduler_yields"] = {
+        "ops_per_sec": round(scheduler_yields(asyncio), 1),
+        "alloc_bytes": None,
+    }
+    return results
+
+
+def compare(before, after, threshold):
+    """Prints the change in each benchmark, returns the names that regressed"""
+    regressed = []
+    print(f"{'benchmark':<24} {'ops/sec':>12} {'change':>8} {'bytes/op':>10}")
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            print(f"{name:<24} {new['ops_per_sec']:>12,.0f}      new")
+            continue
+        change = new["ops_per_sec"] / old["ops_per_sec"] - 1
+        flags = []
+        if change < -threshold:
+            flags.append("slower")
+        old_bytes, new_bytes = old["alloc_bytes"], new["alloc_bytes"]
+        if old_bytes is not None and new_bytes is not None:
+            grew = new_bytes - old_bytes
+            if grew > ALLOC_SLACK and grew > old_bytes * threshold:
+                flags.append("allocates more")
+            memory = f"{old_bytes:.0f} > {new_bytes:.0f}"
+        else:
+            memory = "-"
+        if flags:
+            regressed.append(name)
+        print(
+            f"{name:<24} {new['ops_per_sec']:>12,.0f} {change:>+8.1%} {memory:>10}"
+            + (" REGRESSION: " + ", ".join(flags) if flags else "")
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ref", help="git ref to benchmark instead of the tree")
+    parser.add_argument("--json", help="file to write the results to")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two files"
+    )
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        regressed = compare(before, after, args.threshold)
+        print(f"{len(regressed)} regressions" if regressed else "no regressions")
+        sys.exit(1 if regressed else 0)
+
+    report = {
+        "ref": args.ref or "tree",
+        "python": platform.python_version(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": run(args.ref),
+    }
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Time per pass of the Domination game loop on the emulator, and per LED
+written by the RGB task, while the teams trade the point.
+
+    python benchmarks/bench_tick.py
+    python benchmarks/bench_tick.py --ref HEAD~1
+
+Each resume of the game task is one pass of the loop, timed around the
+coroutine's send(). Each resume of the RGB task during a fill writes one LED.
+The team switches between Red and Blue every second, so the team checks and
+update_team() are both in the mix.
+"""
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+import _host
+
+DOMINATION = 5
+
+
+class Timed:
+    """Coroutine proxy that times each resume in ns"""
+
+    def __init__(self, coro, times):
+        self.coro = coro
+        self.times = times
+        self.on = False
+
+    def send(self, value):
+        start = time.perf_counter_ns()
+        try:
+            return self.coro.send(value)
+        finally:
+            if self.on:
+                self.times.append(time.perf_counter_ns() - start)
+
+    def throw(self, *args):
+        return self.coro.throw(*args)
+
+    def close(self):
+        return self.coro.close()
+
+
+def measure(bucket, hw, asyncio, seconds=6.0):
+    """Returns the game and RGB tasks' resume times in ns"""
+    times = []
+    rgb_times = []
+    chain = bucket.game_task_chain
+    rgb_control = bucket.RGBS.rgb_control
+    probe = []
+
+    def timed_chain():
+        probe.append(Timed(chain(), times))
+        return probe[-1]
+
+    def timed_rgb_control(rgb):
+        probe.append(Timed(rgb_control(rgb), rgb_times))
+        return probe[-1]
+
+    bucket.game_task_chain = timed_chain
+    bucket.RGBS.rgb_control = timed_rgb_control
+
+    async def driver():
+        main = asyncio.create_task(bucket.main())
+        await _host.start_game(asyncio, hw, DOMINATION, length_steps=8)
+        for timed in probe:
+            timed.on = True
+        for _ in range(int(seconds / 2)):
+            await _host.press(asyncio, hw.RED, 1.3)
+            await _host.press(asyncio, hw.BLUE, 1.3)
+        for timed in probe:
+            timed.on = False
+        main.cancel()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(driver())
+    return times, rgb_times
+
+
+def report(label, times):
+    times = sorted(times)
+    print(f"{label}: {len(times)} resumes")
+    print(f"  mean {statistics.mean(times) / 1000:.2f} us")
+    print(f"  median {statistics.median(times) / 1000:.2f} us")
+    print(f"  p99 {times[int(len(times) * 0.99)] / 1000:.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ref", help="git ref to benchmark instead of the tree")
+    parser.add_argument("--seconds", type=float, default=6.0)
+    args = parser.parse_args()
+    bucket, hw = _host.load_bucket(_host.checkout(args.ref) if args.ref else None)
+    import asyncio
+
+    times, rgb_times = measure(bucket, hw, asyncio, args.seconds)
+    report("game loop", times)
+    report("RGB task", rgb_times)
+
+
+if __name__ == "__main__":
+    main()
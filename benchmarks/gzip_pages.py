@@ -0,0 +1,58 @@
+"""
+Writes a gzipped copy next to each page the hub serves, for FileResponse to
+send to browsers that take gzip.
+
+    python benchmarks/gzip_pages.py
+    python benchmarks/gzip_pages.py path/to/CIRCUITPY
+
+Compresses every .html, .css and .js file in the directory given, the
+deprecated BLE hub's by default, to name.gz beside it. Run it after editing a
+page and copy the .gz files to the board with the pages. FileResponse skips a
+.gz older than its page, so a stale copy is never served, only not used.
+Copies that come out no smaller than the page are removed instead.
+"""
+import argparse
+import gzip
+import os
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+EXTENSIONS = (".html", ".css", ".js")
+
+
+def compress(path):
+    """Writes path.gz, returns its size, or None if it wasn't worth keeping"""
+    with open(path, "rb") as f:
+        data = f.read()
+    # No timestamp in the header, so the copy only changes when the page does
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    gzipped_path = path + ".gz"
+    if len(packed) >= len(data):
+        if os.path.exists(gzipped_path):
+            os.remove(gzipped_path)
+        return None
+    with open(gzipped_path, "wb") as f:
+        f.write(packed)
+    return len(packed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directory", nargs="?", default=HUB)
+    args = parser.parse_args()
+
+    for name in sorted(os.listdir(args.directory)):
+        if not name.endswith(EXTENSIONS):
+            continue
+        path = os.path.join(args.directory, name)
+        size = os.path.getsize(path)
+        packed = compress(path)
+        if packed is None:
+            print(f"{name}: {size} bytes, not smaller gzipped")
+        else:
+            print(f"{name}: {size} > {packed} bytes")
+
+
+if __name__ == "__main__":
+    main()
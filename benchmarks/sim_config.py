@@ -0,0 +1,293 @@
+"""
+Timerbox config broadcast to a field of 6 emulated buckets over a lossy link.
+
+    python benchmarks/sim_config.py
+    python benchmarks/sim_config.py --trials 500
+
+Each bucket is its own copy of main_esp_buckets with its own MAC, and handles
+packets with its real read_config(). The timerbox side is Config_Broadcast,
+as the timerbox standby screen drives it. Every packet, config or ack, is
+dropped with the given probability. Time is virtual, in SCAN_MS steps, with
+each bucket reading one packet per step like its menu loop does.
+
+Checks, for every trial, that every bucket ends up armed with the config and
+its assigned ID, then that a bucket that is switched off stays unarmed.
+
+Then plays the field setup in real time, with each bucket's whole main() in
+one asyncio loop: the config goes out to the buckets on their main menu, and
+one more bucket is left on the standby screen of the same mode, set up by
+hand, when the timerbox sends Start. Checks that the armed buckets go on to
+"Waiting for timer..." with no press and start the game on Start, and that
+the bucket on standby starts it as soon as its encoder is pressed.
+Exits 1 if a check fails.
+"""
+import argparse
+import contextlib
+import io
+import random
+import statistics
+import sys
+
+import _host
+
+BUCKETS = 6
+SCAN_MS = 20
+LIMIT_MS = 30000
+LOSSES = (0.0, 0.1, 0.3, 0.5)
+TIMERBOX_MAC = b"\x02\x00\x00\x00\x00\xff"
+
+
+class Air:
+    """Delivers packets between emulated radios, dropping `loss` of them"""
+
+    def __init__(self, loss, rng):
+        self.loss = loss
+        self.rng = rng
+        self.radios = {}
+        self.off = set()
+
+    def deliver(self, src, dst, msg):
+        if dst in self.off or src in self.off:
+            return
+        if self.rng.random() < self.loss:
+            return
+        self.radios[dst].inbox.append(_host.FakePacket(msg, src))
+
+
+class Radio(_host.FakeESPNow):
+    """FakeESPNow that sends through an Air"""
+
+    def __init__(self, air, mac):
+        super().__init__()
+        self.air = air
+        self.mac = mac
+        air.radios[mac] = self
+
+    def send(self, message, peer=None):
+        for target in [peer] if peer else self.peers:
+            self.air.deliver(self.mac, target.mac, message)
+
+
+def load_field(air):
+    """Imports BUCKETS buckets, returns the modules with their radios wired in"""
+    buckets = []
+    for n in range(BUCKETS):
+        mac = bytes((2, 0, 0, 0, 0, n + 1))
+        with contextlib.redirect_stdout(io.StringIO()):
+            bucket, _ = _host.load_bucket(mac=mac)
+        bucket.ESP.esp = Radio(air, mac)
+        buckets.append(bucket)
+    return buckets
+
+
+def run_trial(buckets, broadcast, timerbox, config, clock):
+    """
+    Runs one broadcast to the field, returns (ms until all armed or LIMIT_MS,
+    mode index each bucket jumped to, -1 if none)
+    """
+    for radio in timerbox.air.radios.values():
+        radio.inbox.clear()
+    modes = [-1] * len(buckets)
+    for bucket in buckets:
+        bucket.initial_state.reset()
+    start = clock[0]
+    broadcast.start(config)
+    while clock[0] - start < LIMIT_MS:
+        for i, bucket in enumerate(buckets):
+            mode = bucket.read_config()
+            if mode >= 0:
+                modes[i] = mode
+        while timerbox.inbox:
+            broadcast.poll(timerbox.read())
+        if broadcast.done:
+            break
+        clock[0] += SCAN_MS
+        broadcast.tick()
+    return clock[0] - start, modes
+
+
+def check_field(buckets, config, modes, armed):
+    """Problems with the buckets that acked, as a list of strings"""
+    problems = []
+    for i, bucket in enumerate(buckets):
+        if not armed[i]:
+            continue
+        state = bucket.initial_state
+        expected = bucket.BUCKET_IDS[i]
+        if state.bucket_id != expected:
+            problems.append(f"bucket {i} has ID {state.bucket_id}, not {expected}")
+        for name, value in zip(config.FIELDS, config.values):
+            if getattr(state, name) != value:
+                problems.append(f"bucket {i} {name}={getattr(state, name)}")
+        if modes[i] < 0 or bucket.MODES[modes[i]].name != config.mode:
+            problems.append(f"bucket {i} didn't switch to {config.mode}")
+    return problems
+
+
+def screen(hw):
+    """The bucket's LCD, as one line"""
+    return " / ".join(hw.DISPLAY.i2c.screen())
+
+
+async def field_start(asyncio, armed, standby, timerbox, broadcast, config):
+    """
+    Arms the buckets in armed from their menus, leaves the one in standby on
+    its standby screen, and sends Start. Returns the problems found.
+    """
+    problems = []
+    standby_bucket, standby_hw = standby
+    tasks = [asyncio.create_task(bucket.main()) for bucket, _ in armed]
+    tasks += [
+        asyncio.create_task(coro)
+        for coro in (
+            standby_bucket.RGBS.rgb_control(standby_bucket.RGB),
+            standby_bucket.button_monitor(),
+            standby_bucket.LCD.display_control(),
+            standby_bucket.ready_mode(
+                [mode.name for mode in standby_bucket.MODES].index(config.mode)
+            ),
+        )
+    ]
+    await asyncio.sleep(3)
+    broadcast.start(config)
+    for _ in range(100):
+        while timerbox.inbox:
+            broadcast.poll(timerbox.read())
+        broadcast.tick()
+        if broadcast.done:
+            break
+        await asyncio.sleep(0.1)
+    if not broadcast.done:
+        problems.append(f"armed {broadcast.status()} in real time")
+    await asyncio.sleep(2)
+    for n, (_, hw) in enumerate(armed):
+        if "Waiting for time" not in screen(hw):
+            problems.append(
+                f"armed bucket {n} on {screen(hw)!r}, not waiting for timer"
+            )
+    if "Waiting for time" in screen(standby_hw):
+        problems.append("the bucket on standby went on without a press")
+    for _, peer in broadcast.peers:
+        timerbox.send(b"Start", peer)
+    timerbox.send(b"Start", _host.FakePeer(mac=standby_bucket.ESP.mac))
+    await asyncio.sleep(2)
+    await _host.press(asyncio, standby_hw.ENC)
+    # Buckets hold off 6 s after Start, as the timerbox counts down
+    await asyncio.sleep(8)
+    for n, (_, hw) in enumerate(armed + [standby]):
+        if "Team" not in screen(hw):
+            name = "the bucket on standby" if n == len(armed) else f"armed bucket {n}"
+            problems.append(f"{name} on {screen(hw)!r} after Start, not playing")
+    for task in tasks:
+        task.cancel()
+    await asyncio.sleep(0)
+    return problems
+
+
+def check_start(rng):
+    """Plays field_start() on a fresh field, returns the problems found"""
+    asyncio = _host.load_asyncio()
+    air = Air(0.0, rng)
+    buckets = []
+    for n in range(BUCKETS + 1):
+        mac = bytes((2, 0, 0, 0, 1, n + 1))
+        with contextlib.redirect_stdout(io.StringIO()):
+            bucket, hw = _host.load_bucket(mac=mac)
+        bucket.ESP.esp = Radio(air, mac)
+        buckets.append((bucket, hw))
+    import config_commands
+
+    timerbox = Radio(air, TIMERBOX_MAC)
+    peers = [
+        (bucket_id, _host.FakePeer(mac=bucket.ESP.mac))
+        for bucket_id, (bucket, _) in zip(buckets[0][0].BUCKET_IDS, buckets[:BUCKETS])
+    ]
+    broadcast = config_commands.Config_Broadcast(timerbox, peers)
+    config = config_commands.Game_Config(
+        "Territory W",
+        [600, 0, 3000, BUCKETS, 1],
+        [(peer.mac, bucket_id) for bucket_id, peer in peers],
+    )
+
+    async def play():
+        await asyncio.sleep(0)
+        return await field_start(
+            asyncio, buckets[:BUCKETS], buckets[-1], timerbox, broadcast, config
+        )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(play())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    air = Air(0.0, rng)
+    buckets = load_field(air)
+    import config_commands
+
+    clock = [0]
+    config_commands.ticks_ms = lambda: clock[0]
+    config_commands.ticks_diff = lambda a, b: a - b
+    timerbox = Radio(air, TIMERBOX_MAC)
+    peers = [
+        (bucket_id, _host.FakePeer(mac=bytes((2, 0, 0, 0, 0, n + 1))))
+        for n, bucket_id in enumerate(buckets[0].BUCKET_IDS[:BUCKETS])
+    ]
+    broadcast = config_commands.Config_Broadcast(timerbox, peers)
+    config = config_commands.Game_Config(
+        "Territory W",
+        [600, 0, 3000, BUCKETS, 1],
+        [(peer.mac, bucket_id) for bucket_id, peer in peers],
+    )
+
+    failed = False
+    for loss in LOSSES:
+        air.loss = loss
+        times = []
+        sends = []
+        for _ in range(args.trials):
+            took, modes = run_trial(buckets, broadcast, timerbox, config, clock)
+            problems = check_field(buckets, config, modes, broadcast.armed)
+            if not broadcast.done:
+                problems.append(f"armed {broadcast.status()} after {took} ms")
+            if problems:
+                failed = True
+                print(f"loss {loss:.0%}:", "; ".join(problems))
+            times.append(took)
+            sends.append(broadcast.sends)
+        times.sort()
+        print(
+            f"loss {loss:.0%}: all armed in median {statistics.median(times):.0f} ms,"
+            f" p95 {times[int(len(times) * 0.95)]} ms, max {times[-1]} ms,"
+            f" {statistics.mean(sends):.1f} configs sent"
+        )
+
+    # A bucket that is switched off never acks, the rest still arm
+    air.loss = 0.1
+    air.off.add(peers[-1][1].mac)
+    took, modes = run_trial(buckets, broadcast, timerbox, config, clock)
+    problems = check_field(buckets, config, modes, broadcast.armed)
+    if broadcast.status() != "ABCDE-":
+        problems.append(f"armed {broadcast.status()}, not ABCDE-")
+    if problems:
+        failed = True
+        print("bucket off:", "; ".join(problems))
+    print(f"bucket off: armed {broadcast.status()} after {took} ms")
+
+    problems = check_start(rng)
+    if problems:
+        failed = True
+        print("start:", "; ".join(problems))
+    print(f"start: {BUCKETS} armed buckets and 1 on standby, {len(problems)} problems")
+
+    print("failed" if failed else "ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+The timerbox's live dashboard in the combined loop, 3 emulated buckets and the
+timerbox playing a game while phones poll the scoreboard.
+
+    python benchmarks/sim_dashboard.py
+    python benchmarks/sim_dashboard.py --phones 10 --seconds 30
+
+Each bucket is its own copy of main_esp_buckets and the timerbox one of
+main_esp_timerbox, all in one asyncio loop in real time, with packets
+arriving instantly as in sim_trace.py. The buckets start Domination W and
+the timerbox runs Basic Timer's start_basictimer() for --seconds, beside its
+encoder and button tasks as on the board. A few seconds in, bucket A is held
+for Red and bucket B for Blue. The game is played twice, without the
+dashboard and then with DASHBOARD_SSID set, the second time with --phones
+processes each loading the page and polling /state every --interval seconds.
+
+Reports how late each of the timer's ticks was on the LCD, p50/max, how far
+the whole game ran over, and the dashboard's JSON builds and phone requests.
+Checks that the ticks with the dashboard are within TOLERANCE_MS of those
+without, that the AP was started on the ESP-NOW channel, that the /state the
+phones got after End has the timerbox's clock and the buckets' own teams and
+scores, from their LCDs, that the JSON was built no more than once per
+update_ms, and that every phone request was answered. Without the dashboard,
+checks that the buckets sent the timerbox no reports, which it wouldn't read.
+Exits 1 if a check fails.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import socket
+import sys
+import time
+
+import _host
+from sim_trace import Air, Radio
+
+BUCKETS = 3
+TOLERANCE_MS = 20
+TIMERBOX_MAC = b"\x02\x00\x00\x00\x00\xff"
+SOUNDBOX_MACS = (b"\x02\x00\x00\x00\x00\xfe", b"\x02\x00\x00\x00\x00\xfd")
+DOMINATION_W = 6
+GREEN_TEAM, RED_TEAM, BLUE_TEAM = range(3)
+# Held on buckets A and B during the game, C is left Green
+HELD = ((RED_TEAM, "RED"), (BLUE_TEAM, "BLUE"))
+
+
+def phone(port, interval, done, results):
+    """
+    Loads the page, then polls /state until done is set, and once more after.
+    Puts (request seconds, failures, timers seen, last state) on results.
+    """
+    latencies = []
+    failures = []
+    timers = set()
+    state = None
+    paths = ["/"]
+    while True:
+        finished = done.is_set()
+        path = paths.pop() if paths else "/state"
+        start = time.perf_counter()
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=10) as sock:
+                sock.sendall(f"GET {path} HTTP/1.1\r\nHost: field\r\n\r\n".encode())
+                reply = b""
+                while chunk := sock.recv(4096):
+                    reply += chunk
+            latencies.append(time.perf_counter() - start)
+            head, _, body = reply.partition(b"\r\n\r\n")
+            if not head.startswith(b"HTTP/1.1 200"):
+                failures.append(head.split(b"\r\n")[0].decode())
+            elif path == "/state":
+                state = json.loads(body)
+                timers.add(state["timer"])
+            elif b"/state" not in body:
+                failures.append("page without /state")
+        except (OSError, ValueError) as error:
+            failures.append(f"{path}: {error!r}")
+        if finished:
+            break
+        time.sleep(interval)
+    results.put((latencies, failures, sorted(timers), state))
+
+
+class Game_Mode:
+    """What start_basictimer() calls back at the end, without the restart screen"""
+
+    async def restart(self):
+        pass
+
+
+def load_field(air, dashboard):
+    """Imports the buckets and the timerbox, returns (buckets, timerbox, ticks)"""
+    os.environ.pop("TRACE", None)
+    buckets = []
+    for n in range(BUCKETS):
+        mac = bytes((2, 0, 0, 0, 0, n + 1))
+        os.environ[f"BUCKET{'ABC'[n]}_MAC"] = mac.hex()
+        with contextlib.redirect_stdout(io.StringIO()):
+            bucket, hw = _host.load_bucket(mac=mac)
+        bucket.ESP.esp = Radio(air, mac)
+        buckets.append((bucket, hw))
+    for n, mac in enumerate(SOUNDBOX_MACS):
+        os.environ[f"SOUNDBOX{n + 1}_MAC"] = mac.hex()
+        Radio(air, mac)
+    if dashboard:
+        os.environ["DASHBOARD_SSID"] = "Field"
+    else:
+        os.environ.pop("DASHBOARD_SSID", None)
+    timerbox, _ = _host.load_timerbox(mac=TIMERBOX_MAC)
+    radio = Radio(air, TIMERBOX_MAC)
+    radio.peers = timerbox.e.peers
+    if timerbox.DASHBOARD is not None:
+        timerbox.DASHBOARD.esp = radio
+    else:
+        timerbox.e = radio
+
+    ticks = []
+    display_message = timerbox.display_message
+
+    def timed_display_message(message):
+        display_message(message)
+        if re.fullmatch(r"\d\d:\d\d", message):
+            ticks.append(time.perf_counter())
+
+    timerbox.display_message = timed_display_message
+    return buckets, timerbox, ticks
+
+
+async def play(asyncio, buckets, timerbox, seconds):
+    """Sets up the buckets, then runs a game of seconds on the timerbox"""
+    tasks = [asyncio.create_task(bucket.main()) for bucket, _ in buckets]
+    tasks.append(asyncio.create_task(timerbox.ENCS.update()))
+    tasks.append(asyncio.create_task(timerbox.button_monitor()))
+    if timerbox.DASHBOARD is not None:
+        tasks.append(asyncio.create_task(timerbox.DASHBOARD.run()))
+    await asyncio.gather(
+        *(_host.start_game(asyncio, hw, DOMINATION_W) for _, hw in buckets)
+    )
+    await asyncio.sleep(1)
+
+    async def hold_buttons():
+        await asyncio.sleep(9)
+        for (_, hw), (_, button) in zip(buckets, HELD):
+            await _host.press(asyncio, getattr(hw, button), 1.2)
+
+    timerbox.initial_state.game_length = seconds
+    holding = asyncio.create_task(hold_buttons())
+    await timerbox.start_basictimer(Game_Mode())
+    await asyncio.sleep(1.5)
+    holding.cancel()
+    for task in tasks:
+        task.cancel()
+    await asyncio.sleep(0)
+
+
+def lateness(ticks):
+    """How late each tick after the first counted second was, and in all, in seconds"""
+    late = [b - a - 1 for a, b in zip(ticks[1:], ticks[2:])]
+    return late, ticks[-1] - ticks[1] - (len(ticks) - 2)
+
+
+def spread(values):
+    """p50/max of values in seconds, as ms"""
+    values = sorted(values)
+    return values[len(values) // 2] * 1000, values[-1] * 1000
+
+
+def bucket_scores(hw):
+    """[red_time, blue_time] from a bucket's score screen"""
+    rows = hw.DISPLAY.i2c.screen()
+    scores = []
+    for row in rows:
+        minutes, seconds = row.split()[-1].split(":")
+        scores.append(int(minutes) * 60 + int(seconds))
+    return scores
+
+
+def check_state(state, buckets, problems):
+    """Checks the phones' last /state against the buckets, appends to problems"""
+    if state is None:
+        problems.append("no /state after End")
+        return
+    if state["status"] != "Ended" or state["timer"] != 0:
+        problems.append(f"status {state['status']}, timer {state['timer']} after End")
+    teams = [team for team, _ in HELD] + [GREEN_TEAM]
+    for bucket_id, (_, hw), team in zip("ABC", buckets, teams):
+        expected = [team] + bucket_scores(hw)
+        if state["buckets"][bucket_id][:3] != expected:
+            problems.append(
+                f"bucket {bucket_id}: {state['buckets'][bucket_id]}, expected {expected}"
+            )
+    for total, index in (("red", 1), ("blue", 2)):
+        summed = sum(bucket[index] for bucket in state["buckets"].values())
+        if state[total] != summed or not summed:
+            problems.append(f"{total} {state[total]}, buckets have {summed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--phones", type=int, default=6)
+    parser.add_argument("--interval", type=float, default=0.25)
+    parser.add_argument("--seconds", type=int, default=20)
+    args = parser.parse_args()
+
+    _host.use_lib()
+    asyncio = _host.load_asyncio()
+    problems = []
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for dashboard in (False, True):
+        buckets, timerbox, ticks = load_field(Air(), dashboard)
+        phones = []
+        if dashboard:
+            ap = sys.modules["wifi"].radio.ap
+            if ap["ssid"] != "Field" or ap["channel"] != 1:
+                problems.append(f"AP started as {ap}, not on the ESP-NOW channel 1")
+            port = _host.FakeSocketPool.ports[80]
+            done = context.Event()
+            queue = context.Queue()
+            phones = [
+                context.Process(target=phone, args=(port, args.interval, done, queue))
+                for _ in range(args.phones)
+            ]
+            for process in phones:
+                process.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(play(asyncio, buckets, timerbox, args.seconds))
+        if len(ticks) != args.seconds + 1:
+            problems.append(f"{len(ticks)} ticks, expected {args.seconds + 1}")
+        results[dashboard] = lateness(ticks)
+        if not dashboard:
+            reports = [
+                packet
+                for packet in timerbox.e.inbox
+                if packet.msg.startswith(b"State|")
+            ]
+            if reports:
+                problems.append(f"{len(reports)} reports sent without a dashboard")
+            continue
+
+        # Phones' last poll is after End, with the loop stopped the dashboard
+        # serves it from here
+        elapsed = time.perf_counter() - start
+        done.set()
+        got = []
+        while len(got) < len(phones):
+            timerbox.DASHBOARD.step()
+            try:
+                got.append(queue.get(timeout=0.01))
+            except Exception:
+                pass
+        for process in phones:
+            process.join()
+        latencies = [latency for result in got for latency in result[0]]
+        failures = [failure for result in got for failure in result[1]]
+        builds = timerbox.DASHBOARD.publishes
+        limit = elapsed * 1000 / timerbox.DASHBOARD.update_ms + 2
+        print(
+            f"dashboard: {builds} JSON builds in {elapsed:.1f} s,"
+            f" {len(latencies)} phone requests, ms p50/max"
+            f" {spread(latencies)[0]:.1f}/{spread(latencies)[1]:.1f},"
+            f" {len(failures)} failed"
+        )
+        if builds > limit:
+            problems.append(f"{builds} JSON builds, more than {limit:.0f}")
+        problems += [f"phone request failed: {failure}" for failure in failures[:5]]
+        for _, _, timers, state in got:
+            if len(timers) < args.seconds // 2:
+                problems.append(f"a phone saw only timers {timers}")
+            check_state(state, buckets, problems)
+
+    print(f"{args.seconds} s game, timer tick lateness, ms:     p50      max  ran over")
+    for dashboard, (late, over) in results.items():
+        p50, worst = spread(late)
+        name = f"with dashboard, {args.phones} phones" if dashboard else "no dashboard"
+        print(f"{name:<44} {p50:>7.2f} {worst:>8.2f} {over * 1000:>9.2f}")
+    if len(results) == 2:
+        off, on = (spread(results[key][0])[1] for key in (False, True))
+        if on > off + TOLERANCE_MS:
+            problems.append(f"ticks up to {on:.1f} ms late, {off:.1f} ms without")
+        off, on = (results[key][1] * 1000 for key in (False, True))
+        if on > off + TOLERANCE_MS:
+            problems.append(f"game ran {on:.1f} ms over, {off:.1f} ms without")
+
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+The hub's result outbox against a CPython stand-in for the results endpoint
+that goes up and down.
+
+    python benchmarks/sim_hub_outbox.py
+    python benchmarks/sim_hub_outbox.py --rate 10 --seed 2
+
+Runs outbox_commands.Result_Outbox from the deprecated BLE hub's lib-cirpy
+with its adafruit_requests.Session on CPython sockets, posting to an
+http.server on localhost. Results are added at --rate a second while the
+endpoint plays through PHASES: up, down with its connections cut, answering
+503, taking a batch then dropping the connection before answering, and
+answering after the outbox has given up waiting. Between phases the hub
+"reboots", opening the outbox again from its file, once with half a record
+written at the end. A drain() is tried every STEP_S seconds when due().
+
+Checks that the endpoint ends up with every result exactly once with what
+was added, that a repeated Idempotency-Key always came with the same
+results, that the outbox never posted again before its backoff had passed,
+that the backlog left at the end went out over one connection, and that the
+file is back to its header. Reports posts, connections, the results the
+endpoint was sent again and dropped, and the time per post of the backlog.
+Exits 1 if a check fails.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import _host
+
+HUB = os.path.join(_host.ROOT, "deprecated", "buckets_networked_ble", "hub")
+STEP_S = 0.02
+# (endpoint mode, seconds), the hub reboots between phases
+PHASES = [
+    ("up", 1.0),
+    ("down", 2.0),
+    ("error", 1.0),
+    ("up", 0.5),
+    ("drop", 1.0),
+    ("late", 1.0),
+    ("down", 1.5),
+]
+TIMEOUT_S = 0.3
+MIN_BACKOFF_MS = 100
+MAX_BACKOFF_MS = 800
+BACKLOG = 40
+
+
+class Endpoint:
+    """The results endpoint, on a fixed port, that can be taken up and down"""
+
+    def __init__(self):
+        self.mode = "down"
+        self.stored = {}
+        self.keys = {}
+        self.resent = 0
+        self.posts = 0
+        self.connections = 0
+        self.problems = []
+        self.lock = threading.Lock()
+        self.open = set()
+        self.server = None
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        self.port = probe.getsockname()[1]
+        probe.close()
+
+    def set_mode(self, mode):
+        if mode == "down" and self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            with self.lock:
+                for sock in self.open:
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+        elif mode != "down" and not self.server:
+            self.server = ThreadingHTTPServer(("127.0.0.1", self.port), self.handler())
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.mode = mode
+
+    def take(self, key, body):
+        """Stores a batch, returns what to answer"""
+        results = json.loads(body)["results"]
+        ids = [result["id"] for result in results]
+        with self.lock:
+            self.posts += 1
+            if self.keys.setdefault(key, ids) != ids:
+                self.problems.append(
+                    f"key {key} came with {ids}, then {self.keys[key]}"
+                )
+            for result in results:
+                if result["id"] in self.stored:
+                    self.resent += 1
+                self.stored[result["id"]] = result
+        return len(results)
+
+    def handler(self):
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with endpoint.lock:
+                    endpoint.connections += 1
+                    endpoint.open.add(self.connection)
+
+            def finish(self):
+                with endpoint.lock:
+                    endpoint.open.discard(self.connection)
+                super().finish()
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                mode = endpoint.mode
+                if mode == "error":
+                    self.answer(503, b"{}")
+                    return
+                taken = endpoint.take(self.headers["Idempotency-Key"], body)
+                if mode == "drop":
+                    self.close_connection = True
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    return
+                if mode == "late":
+                    time.sleep(TIMEOUT_S * 2)
+                self.answer(200, json.dumps({"taken": taken}).encode())
+
+            def answer(self, code, body):
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                # Headers and body in one write, as a real server buffers them
+                self._headers_buffer.append(b"\r\n" + body)
+                try:
+                    self.flush_headers()
+                except OSError:
+                    # The outbox gave up waiting on a late answer
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def watch_posts(outbox, log):
+    """Logs the time of each post and the backoff it was made under"""
+    post = outbox.session.post
+
+    def watched_post(*args, **kwargs):
+        log.append((time.monotonic(), outbox.backoff_ms))
+        return post(*args, **kwargs)
+
+    outbox.session.post = watched_post
+
+
+def open_outbox(outbox_commands, requests, path, url, log):
+    """The outbox as the hub opens it at boot"""
+    outbox = outbox_commands.Result_Outbox(
+        path,
+        "hub-test",
+        url,
+        requests.Session(socket),
+        timeout=TIMEOUT_S,
+        min_backoff_ms=MIN_BACKOFF_MS,
+        max_backoff_ms=MAX_BACKOFF_MS,
+    )
+    watch_posts(outbox, log)
+    return outbox
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=6)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _host.use_lib(os.path.join(HUB, "lib-cirpy"))
+    import adafruit_requests as requests
+    import outbox_commands
+
+    rng = random.Random(args.seed)
+    endpoint = Endpoint()
+    url = f"http://127.0.0.1:{endpoint.port}/results"
+    problems = []
+    added = {}
+    log = []
+
+    def add(outbox):
+        teams = [rng.randrange(4) for _ in range(rng.randint(0, 6))]
+        fields = (rng.randrange(60, 1800), rng.randrange(900), rng.randrange(900))
+        seq = outbox.add(*fields, teams)
+        if seq is None:
+            problems.append("outbox refused a result")
+            return
+        added[f"hub-test-{seq}"] = {
+            "id": f"hub-test-{seq}",
+            "game_length": fields[0],
+            "red": fields[1],
+            "blue": fields[2],
+            "teams": teams,
+        }
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "results.bin")
+        outbox = open_outbox(outbox_commands, requests, path, url, log)
+        for n, (mode, seconds) in enumerate(PHASES):
+            endpoint.set_mode(mode)
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                if rng.random() < args.rate * STEP_S:
+                    add(outbox)
+                if outbox.due():
+                    outbox.drain()
+                time.sleep(STEP_S)
+            if n == 3:
+                # A reset part way through appending a record
+                with open(path, "ab") as file:
+                    file.write(b"\x07" * 7)
+            pending = outbox.pending
+            outbox.session.close()
+            outbox = open_outbox(outbox_commands, requests, path, url, log)
+            if outbox.pending != pending:
+                problems.append(
+                    f"{pending} waiting before a reboot, {outbox.pending} after"
+                )
+
+        # A backlog built up while the endpoint was down goes out in one drain
+        for _ in range(BACKLOG - outbox.pending):
+            add(outbox)
+        backlog = outbox.pending
+        endpoint.set_mode("up")
+        time.sleep(MAX_BACKOFF_MS / 1000)
+        connections = endpoint.connections
+        posts = outbox.posts
+        start = time.perf_counter()
+        outbox.drain()
+        per_post = (time.perf_counter() - start) / max(1, outbox.posts - posts)
+        backlog_connections = endpoint.connections - connections
+        header_left = os.stat(path).st_size == outbox._header_size
+        outbox.session.close()
+    endpoint.set_mode("down")
+
+    print(
+        f"{len(added)} results, {len(log)} posts, {endpoint.posts} reached the"
+        f" endpoint, {endpoint.connections} connections,"
+        f" {endpoint.resent} results sent again and dropped"
+    )
+    print(
+        f"backlog of {backlog}: {outbox.posts - posts} posts over"
+        f" {backlog_connections} connection(s), {per_post * 1000:.2f} ms per post"
+    )
+
+    problems += endpoint.problems
+    if outbox.pending:
+        problems.append(f"{outbox.pending} results still waiting")
+    if not header_left:
+        problems.append("outbox file not cut back to its header")
+    missing = [key for key in added if key not in endpoint.stored]
+    if missing:
+        problems.append(f"{len(missing)} results never reached the endpoint")
+    extra = [key for key in endpoint.stored if key not in added]
+    if extra:
+        problems.append(f"endpoint has results never added: {extra[:5]}")
+    wrong = [key for key in added if endpoint.stored.get(key, added[key]) != added[key]]
+    if wrong:
+        problems.append(f"{len(wrong)} results changed on the way, {wrong[:3]}")
+    if not endpoint.resent:
+        problems.append("no result was sent again, drop and late phases didn't bite")
+    for (at, _), (next_at, backoff_ms) in zip(log, log[1:]):
+        if backoff_ms and (next_at - at) * 1000 < backoff_ms - 1:
+            problems.append(
+                f"posted {(next_at - at) * 1000:.0f} ms after a failure,"
+                f" backoff {backoff_ms} ms"
+            )
+            break
+    if backlog_connections != 1:
+        problems.append(f"backlog went out over {backlog_connections} connections")
+
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if problems else "ok")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Span tracing across 3 emulated buckets and a speakerbox, checked against the
+host clock.
+
+    python benchmarks/sim_trace.py
+    python benchmarks/sim_trace.py --pauses 20
+
+Each bucket is its own copy of main_esp_buckets, and the speakerbox of
+main_esp_speakerbox, all with TRACE on and running in one asyncio loop in
+real time. The timerbox side is a Trace_Buffer sending through Trace_ESP, as
+the timerbox does. Packets arrive instantly. Every node gets its own clock,
+some about to wrap, so trace_merge.py has to unwrap them and work out the
+offsets.
+
+The buckets start Domination W, then the timerbox sends Start and a run of
+Pause and Resume. The time each Pause took to turn a bucket's first LED
+yellow is also taken from the host clock. Checks that every Pause reached
+every bucket's LEDs and the speaker, and that the merged send > slowest
+bucket led is within TOLERANCE_MS of the host clock. One more bucket plays
+along with TRACE off, and has to turn yellow on every tagged Pause too.
+Exits 1 if a check fails.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+import _host
+import trace_merge
+
+BUCKETS = 3
+TOLERANCE_MS = 20
+TIMERBOX_MAC = b"\x02\x00\x00\x00\x00\xff"
+SPEAKER_MAC = b"\x02\x00\x00\x00\x00\xfe"
+DOMINATION_W = 6
+
+
+class Air:
+    """Delivers packets between emulated radios as soon as they're sent"""
+
+    def __init__(self):
+        self.radios = {}
+
+    def deliver(self, src, dst, msg):
+        self.radios[dst].inbox.append(_host.FakePacket(msg, src))
+
+
+class Radio(_host.FakeESPNow):
+    """FakeESPNow that sends through an Air"""
+
+    def __init__(self, air, mac):
+        super().__init__()
+        self.air = air
+        self.mac = mac
+        air.radios[mac] = self
+
+    def send(self, message, peer=None):
+        if isinstance(message, str):
+            message = message.encode()
+        for target in [peer] if peer else self.peers:
+            self.air.deliver(self.mac, target.mac, message)
+
+
+def host_us():
+    return time.perf_counter_ns() // 1000
+
+
+def node_clock(offset, mask):
+    return lambda: (host_us() + offset) & mask
+
+
+def load_nodes(air, rng, mask):
+    """
+    Imports the buckets and speakerbox, returns (buckets, speaker, offsets),
+    and the bucket without TRACE
+    """
+    os.environ["TRACE"] = "1"
+    buckets = []
+    offsets = {}
+    for n in range(BUCKETS):
+        mac = bytes((2, 0, 0, 0, 0, n + 1))
+        with contextlib.redirect_stdout(io.StringIO()):
+            bucket, hw = _host.load_bucket(mac=mac)
+        bucket.ESP.esp = Radio(air, mac)
+        buckets.append((bucket, hw))
+    speaker = _host.load_speakerbox(mac=SPEAKER_MAC)
+    speaker.e.esp = Radio(air, SPEAKER_MAC)
+    # One clock wraps a few seconds in, the rest are anywhere
+    for n, trace in enumerate([b.TRACE for b, _ in buckets] + [speaker.TRACE]):
+        offset = mask - host_us() - 3000000 if n == 0 else rng.randrange(mask)
+        offsets[trace.node] = offset
+        trace.clock = node_clock(offset, mask)
+    os.environ.pop("TRACE")
+    mac = bytes((2, 0, 0, 0, 0, BUCKETS + 1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        untraced, hw = _host.load_bucket(mac=mac)
+    untraced.ESP.esp = Radio(air, mac)
+    return buckets, speaker, offsets, (untraced, hw)
+
+
+def watch_yellow(bucket, hw, waiting, seen):
+    """Records when the bucket first shows a yellow frame after a Pause"""
+    show = hw.RGB_LED.show
+
+    def traced_show():
+        show()
+        span = waiting.get(bucket)
+        if span is not None and bucket.RGB.frame[0] == bucket.YELLOW:
+            seen.setdefault(span, []).append(host_us())
+            del waiting[bucket]
+
+    hw.RGB_LED.show = traced_show
+
+
+async def drive(asyncio, buckets, speaker, timerbox, rng, pauses, truth):
+    """Runs the game, returns {span: host us of send} for the Pauses"""
+    tasks = [asyncio.create_task(bucket.main()) for bucket, _ in buckets]
+    tasks.append(asyncio.create_task(speaker.main()))
+    await asyncio.gather(
+        *(_host.start_game(asyncio, hw, DOMINATION_W) for _, hw in buckets)
+    )
+    await asyncio.sleep(1)
+    timerbox.send("Start")
+    await asyncio.sleep(7)
+    waiting, seen = truth
+    sent = {}
+    for _ in range(pauses):
+        await asyncio.sleep(rng.uniform(0.3, 0.8))
+        sent_at = host_us()
+        timerbox.send("Pause")
+        span = timerbox.trace._next
+        sent[span] = sent_at
+        for bucket, _ in buckets:
+            waiting[bucket] = span
+        await asyncio.sleep(rng.uniform(0.3, 0.8))
+        timerbox.send("Resume")
+    await asyncio.sleep(0.5)
+    timerbox.send("End")
+    await asyncio.sleep(1)
+    for task in tasks:
+        task.cancel()
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pauses", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    air = Air()
+    _host.use_lib()
+    import trace_commands
+
+    mask = trace_commands.TIME_MASK
+    buckets, speaker, offsets, untraced = load_nodes(air, rng, mask)
+    import asyncio
+
+    timerbox_trace = trace_commands.Trace_Buffer(
+        "timerbox", trace_commands.TRACED, clock=node_clock(0, mask)
+    )
+    radio = Radio(air, TIMERBOX_MAC)
+    radio.peers = [_host.FakePeer(mac=mac) for mac in air.radios if mac != TIMERBOX_MAC]
+    timerbox = timerbox_trace.reader(radio, 0)
+    waiting, seen, untraced_seen = {}, {}, {}
+    for bucket, hw in buckets:
+        watch_yellow(bucket, hw, waiting, seen)
+    watch_yellow(*untraced, waiting, untraced_seen)
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        sent = asyncio.run(
+            drive(
+                asyncio,
+                buckets + [untraced],
+                speaker,
+                timerbox,
+                rng,
+                args.pauses,
+                (waiting, seen),
+            )
+        )
+        timerbox_trace.dump()
+        for bucket, _ in buckets:
+            bucket.TRACE.dump()
+    log = out.getvalue().splitlines()
+
+    sends, spans, estimated = trace_merge.merge(trace_merge.parse(log))
+    trace_merge.report(sends, spans, estimated)
+    problems = []
+    for node, offset in offsets.items():
+        error = (estimated.get(node, 0) - offset) % (mask + 1)
+        print(f"{node}: offset off by {error / 1000:.2f} ms")
+    errors = []
+    for span, sent_at in sent.items():
+        nodes = spans.get(span, {})
+        for node in [b.TRACE.node for b, _ in buckets] + [speaker.TRACE.node]:
+            points = [point for point, _ in nodes.get(node, ())]
+            last = "sound" if node.startswith("speaker") else "led"
+            if last not in points:
+                problems.append(f"Pause span {span} has {points} on {node}")
+        if span not in untraced_seen:
+            problems.append(f"Pause span {span} didn't turn the untraced bucket yellow")
+        if len(seen.get(span, ())) != BUCKETS:
+            problems.append(
+                f"Pause span {span} turned {len(seen.get(span, ()))} yellow"
+            )
+            continue
+        truth = max(seen[span]) - sent_at
+        merged = max(
+            at for node in nodes.values() for point, at in node if point == "led"
+        )
+        errors.append(abs(merged - truth) / 1000)
+    if errors:
+        print(
+            f"send > slowest bucket led against the host clock:"
+            f" off by max {max(errors):.2f} ms over {len(errors)} Pauses"
+        )
+        if max(errors) > TOLERANCE_MS:
+            problems.append(f"merged timeline off by {max(errors):.2f} ms")
+    if not spans:
+        problems.append("no spans merged")
+    failed = bool(problems)
+    for problem in problems:
+        print("  " + problem)
+    print("failed" if failed else "ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Time to update N buckets with one file over a lossy ESP-NOW link, broadcast
+with NACK repair against sending to each bucket in turn.
+
+    python benchmarks/sim_transfer.py
+    python benchmarks/sim_transfer.py --file buckets_networked/lib/led_commands.py
+
+Runs the real Transfer_Sender and Transfer_Receivers, each receiver writing
+into its own temp directory, on a virtual clock. Every send costs AIRTIME_MS.
+Each packet is lost with the given probability, separately for each bucket.
+Unicast sends get up to UNICAST_RETRIES radio-level retries, each costing
+airtime. Broadcast sends get none, the NACK rounds repair them. Flash write
+time on the buckets isn't modelled.
+
+Checks that every bucket ends up with an identical file and no leftover
+.part/.xfer/.bak files, and that a bucket reset mid-transfer resumes from its
+state file. Exits 1 if a check fails.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import _host
+
+AIRTIME_MS = 2
+UNICAST_RETRIES = 3
+NODES = (1, 3, 6)
+LOSSES = (0.05, 0.2)
+SENDER_MAC = b"\x02\x00\x00\x00\x00\xff"
+LIMIT_MS = 30 * 60 * 1000
+
+
+class Air:
+    """Delivers packets on a virtual clock, dropping `loss` of them per receiver"""
+
+    def __init__(self, loss, rng, clock):
+        self.loss = loss
+        self.rng = rng
+        self.clock = clock
+        self.radios = {}
+        self.off = set()
+
+    def lost(self):
+        return self.rng.random() < self.loss
+
+    def send(self, src, dst, msg):
+        self.clock[0] += AIRTIME_MS
+        if dst == b"\xff" * 6:
+            for mac, radio in self.radios.items():
+                if mac != src and mac not in self.off and not self.lost():
+                    radio.inbox.append(_host.FakePacket(msg, src))
+            return
+        if dst in self.off:
+            return
+        for attempt in range(1 + UNICAST_RETRIES):
+            if attempt:
+                self.clock[0] += AIRTIME_MS
+            if not self.lost():
+                self.radios[dst].inbox.append(_host.FakePacket(msg, src))
+                return
+
+
+class Radio(_host.FakeESPNow):
+    def __init__(self, air, mac):
+        super().__init__()
+        self.air = air
+        self.mac = mac
+        air.radios[mac] = self
+
+    def send(self, message, peer=None):
+        for target in [peer] if peer else self.peers:
+            self.air.send(self.mac, target.mac, message)
+
+
+def run(sender, receivers, clock):
+    """Steps the sender and receivers until done, returns ms taken"""
+    start = clock[0]
+    radio = sender.esp
+    while sender.step():
+        for receiver in receivers:
+            while receiver.esp.inbox:
+                receiver.handle(receiver.esp.read())
+        while radio.inbox:
+            sender.handle(radio.read())
+        clock[0] += 1
+        if clock[0] - start > LIMIT_MS:
+            break
+    return clock[0] - start
+
+
+def make_field(transfer, air, count, root):
+    """count receivers with fresh directories, returns (receivers, peers)"""
+    receivers = []
+    peers = []
+    for n in range(count):
+        mac = bytes((2, 0, 0, 0, 0, n + 1))
+        directory = os.path.join(root, f"bucket{n}")
+        os.makedirs(directory, exist_ok=True)
+        receivers.append(transfer.Transfer_Receiver(Radio(air, mac), directory))
+        peers.append((chr(65 + n), _host.FakePeer(mac=mac)))
+    return receivers, peers
+
+
+def check_field(receivers, source, name):
+    """Problems with the received files, as a list of strings"""
+    problems = []
+    with open(source, "rb") as f:
+        expected = f.read()
+    for receiver in receivers:
+        directory = receiver.root
+        with open(os.path.join(directory, name), "rb") as f:
+            if f.read() != expected:
+                problems.append(f"{directory}: file differs")
+        left = [n for n in os.listdir(directory) if n != name]
+        if left:
+            problems.append(f"{directory}: left {left}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--file", default=os.path.join(_host.NETWORKED, "main_esp_buckets.py")
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _host.use_lib()
+    _host.install_espnow()
+    import transfer_commands as transfer
+
+    clock = [0]
+    transfer.ticks_ms = lambda: clock[0]
+    transfer.ticks_add = lambda a, b: a + b
+    transfer.ticks_diff = lambda a, b: a - b
+    rng = random.Random(args.seed)
+    size = os.path.getsize(args.file)
+    name = os.path.basename(args.file)
+    chunks = (size + transfer.CHUNK_SIZE - 1) // transfer.CHUNK_SIZE
+    print(f"{name}: {size} bytes, {chunks} chunks")
+    failed = False
+    root = tempfile.mkdtemp(prefix="xfer_")
+    try:
+        for loss in LOSSES:
+            for count in NODES:
+                air = Air(loss, rng, clock)
+                sender_radio = Radio(air, SENDER_MAC)
+
+                # Broadcast to all of them at once
+                field = os.path.join(root, "broadcast")
+                receivers, peers = make_field(transfer, air, count, field)
+                sender = transfer.Transfer_Sender(
+                    sender_radio, args.file, peers, name, gap_ms=0
+                )
+                took = run(sender, receivers, clock)
+                problems = check_field(receivers, args.file, name)
+                broadcast = (took, sender.sends, sender.rounds)
+
+                # One bucket after another, each over unicast
+                field = os.path.join(root, "unicast")
+                receivers, peers = make_field(transfer, air, count, field)
+                took = sends = 0
+                for receiver, peer in zip(receivers, peers):
+                    sender = transfer.Transfer_Sender(
+                        sender_radio, args.file, [peer], name, peer[1], gap_ms=0
+                    )
+                    took += run(sender, [receiver], clock)
+                    sends += sender.sends
+                problems += check_field(receivers, args.file, name)
+                shutil.rmtree(os.path.join(root, "broadcast"))
+                shutil.rmtree(os.path.join(root, "unicast"))
+                if problems:
+                    failed = True
+                    print("  " + "; ".join(problems))
+                print(
+                    f"loss {loss:.0%}, {count} buckets:"
+                    f" broadcast {broadcast[0] / 1000:.1f} s"
+                    f" ({size * count / broadcast[0]:.1f} kB/s total,"
+                    f" {broadcast[1]} sends, {broadcast[2]} rounds),"
+                    f" one by one {took / 1000:.1f} s"
+                    f" ({size * count / took:.1f} kB/s, {sends} sends)"
+                )
+
+        # A bucket reset halfway resumes from its state file
+        air = Air(0.05, rng, clock)
+        sender_radio = Radio(air, SENDER_MAC)
+        field = os.path.join(root, "resume")
+        receivers, peers = make_field(transfer, air, 1, field)
+        sender = transfer.Transfer_Sender(
+            sender_radio, args.file, peers, name, gap_ms=0
+        )
+        receiver = receivers[0]
+        while sender.step() and receiver.received < chunks // 2:
+            while receiver.esp.inbox:
+                receiver.handle(receiver.esp.read())
+            while sender_radio.inbox:
+                sender.handle(sender_radio.read())
+            clock[0] += 1
+        sender.close()
+        before = receiver.received - receiver._unsaved
+        # Power cut: the open file and unsaved bitmap are lost
+        receiver._file.close()
+        receivers = [transfer.Transfer_Receiver(receiver.esp, receiver.root)]
+        receiver.esp.inbox.clear()
+        sender = transfer.Transfer_Sender(
+            sender_radio, args.file, peers, name, gap_ms=0
+        )
+        run(sender, receivers, clock)
+        problems = check_field(receivers, args.file, name)
+        data_sends = sender.sends - sender.rounds
+        if data_sends >= chunks:
+            problems.append(f"resend {data_sends} of {chunks} chunks")
+        if problems:
+            failed = True
+            print("  " + "; ".join(problems))
+        print(
+            f"resume: {before} chunks saved before the reset,"
+            f" {data_sends} of {chunks} sent after it"
+        )
+    finally:
+        shutil.rmtree(root)
+    print("failed" if failed else "ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Lines up span traces from the timerbox, buckets and speakerbox into one
+timeline, with the time each hop of each command took.
+
+    python benchmarks/trace_merge.py timerbox.log bucket*.log speaker*.log
+    python benchmarks/trace_merge.py --timeline 5 *.log
+
+Takes serial logs from nodes running with TRACE = 1, see
+buckets_networked/lib/trace_commands.py, and reads their "trace" lines. Each
+node's times are unwrapped separately, so a log shouldn't have gaps of more
+than 9 minutes between dumps. Span IDs start over when the timerbox restarts,
+so give it the logs of one timerbox power-up.
+
+The nodes' clocks aren't synced, so each node's offset from the timerbox is
+estimated from the spans it saw: the smallest gap between the timerbox
+sending a span and the node reading it is taken as --min-hop-us. That makes
+the radio hop relative to its fastest, the other hops are exact. --offset
+sets a node's offset in microseconds instead, when it is known.
+
+For each command, prints p50/p90/p99/max in ms of every hop, such as
+"bucket recv > bucket handled", and of the slowest node of each kind reaching
+each point, such as "send > slowest bucket led".
+"""
+import argparse
+import re
+
+TIME_WRAP = 1 << 30
+LINE = re.compile(r"trace (\S+) (\d+) (\S+) (\d+)\s*$")
+
+
+def parse(lines):
+    """{node: [(span, point, t_us)]} from log lines, times unwrapped"""
+    events = {}
+    last = {}
+    wraps = {}
+    for line in lines:
+        match = LINE.search(line)
+        if not match:
+            continue
+        node, span, point, t = match.groups()
+        t = int(t)
+        if node in last and t < last[node] - TIME_WRAP // 2:
+            wraps[node] = wraps.get(node, 0) + TIME_WRAP
+        last[node] = t
+        events.setdefault(node, []).append((int(span), point, t + wraps.get(node, 0)))
+    return events
+
+
+def role(node):
+    """The kind of node, bucket-1a2b is a bucket"""
+    return node.split("-")[0]
+
+
+def merge(events, origin="timerbox", offsets=None, min_hop_us=0):
+    """
+    Returns (sends, spans, offsets): sends maps span to (command, t_us) on the
+    origin's clock, spans maps span to {node: [(point, us after the send)]}
+    and offsets maps node to the offset taken off its clock.
+    """
+    sends = {span: (point, t) for span, point, t in events.get(origin, ())}
+    offsets = dict(offsets or {})
+    for node, seen in events.items():
+        if node == origin or node in offsets:
+            continue
+        firsts = {}
+        for span, _, t in seen:
+            if span in sends and span not in firsts:
+                firsts[span] = t
+        if firsts:
+            offsets[node] = (
+                min(t - sends[span][1] for span, t in firsts.items()) - min_hop_us
+            )
+    spans = {}
+    for node, seen in events.items():
+        if node == origin or node not in offsets:
+            continue
+        for span, point, t in seen:
+            if span in sends:
+                at = t - offsets[node] - sends[span][1]
+                spans.setdefault(span, {}).setdefault(node, []).append((point, at))
+    return sends, spans, offsets
+
+
+def hops(sends, spans):
+    """{(command, hop): [us]} for every hop and slowest node of each kind"""
+    times = {}
+    for span, nodes in spans.items():
+        command = sends[span][0]
+        slowest = {}
+        for node, points in nodes.items():
+            kind = role(node)
+            before, since = "send", 0
+            for point, at in points:
+                name = f"{before} > {kind} {point}"
+                times.setdefault((command, name), []).append(at - since)
+                before, since = f"{kind} {point}", at
+                key = f"send > slowest {kind} {point}"
+                slowest[key] = max(slowest.get(key, at), at)
+        for name, at in slowest.items():
+            times.setdefault((command, name), []).append(at)
+    return times
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(sends, spans, offsets):
+    for node, offset in sorted(offsets.items()):
+        print(f"{node}: clock offset {offset} us")
+    print(
+        f"{'command':<9} {'hop':<36} {'n':>4}"
+        f" {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  ms"
+    )
+    for (command, name), values in sorted(hops(sends, spans).items()):
+        values.sort()
+        cells = " ".join(
+            f"{percentile(values, f) / 1000:>8.2f}" for f in (0.5, 0.9, 0.99, 1)
+        )
+        print(f"{command:<9} {name:<36} {len(values):>4} {cells}")
+
+
+def timeline(sends, spans, count):
+    """Prints the first count spans, each node's points in ms after the send"""
+    for span in sorted(spans, key=lambda span: sends[span][1])[:count]:
+        print(f"span {span} {sends[span][0]}")
+        for node, points in sorted(spans[span].items()):
+            steps = ", ".join(f"{point} {at / 1000:.2f}" for point, at in points)
+            print(f"  {node}: {steps}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("logs", nargs="+")
+    parser.add_argument("--origin", default="timerbox")
+    parser.add_argument("--min-hop-us", type=int, default=0)
+    parser.add_argument("--offset", action="append", default=[], help="node=us")
+    parser.add_argument("--timeline", type=int, default=0, help="spans to print")
+    args = parser.parse_args()
+
+    lines = []
+    for path in args.logs:
+        with open(path, errors="replace") as f:
+            lines += f.readlines()
+    offsets = {}
+    for item in args.offset:
+        node, offset = item.split("=")
+        offsets[node] = int(offset)
+    sends, spans, offsets = merge(parse(lines), args.origin, offsets, args.min_hop_us)
+    if not sends:
+        parser.error(f"no spans sent by {args.origin}")
+    timeline(sends, spans, args.timeline)
+    report(sends, spans, offsets)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import board
 import supervisor
 import digitalio
+import storage
+from os import getenv
 
 button = digitalio.DigitalInOut(board.IO7)
 button.switch_to_input(pull=digitalio.Pull.UP)
@@ -9,3 +11,14 @@ if not button.value:
     supervisor.runtime.autoreload = False
 elif button.value:
     supervisor.runtime.autoreload = True
+
+# Set XFER_WRITABLE = 1 in settings.toml on a bucket to take file updates over
+# ESP-NOW. The drive is then read-only over USB, hold the button on IO7 while
+# booting to keep it writable and edit the setting.
+if getenv("XFER_WRITABLE") and button.value:
+    storage.remount("/", readonly=False)
+    # Finish any file swap a reset cut short
+    from transfer_commands import recover
+
+    recover("/")
+    recover("/lib")
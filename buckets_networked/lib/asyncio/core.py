@@ -84,16 +84,43 @@ class SingletonGenerator:
             raise self.exc
 
 
+# "Yield" once onto the ready queue, then raise StopIteration
+# Used for zero-delay sleeps so they skip the timer heap entirely
+class _YieldSingletonGenerator:
+    def __init__(self):
+        self.state = None
+        self.exc = StopIteration()
+
+    def __iter__(self):
+        return self
+
+    def __await__(self):
+        return self
+
+    def __next__(self):
+        if self.state is not None:
+            _ready_queue.push(cur_task)
+            self.state = None
+            return None
+        else:
+            self.exc.__traceback__ = None
+            raise self.exc
+
+
 # Pause task execution for the given time (integer in milliseconds, uPy extension)
 # Use a SingletonGenerator to do it without allocating on the heap
-def sleep_ms(t, sgen=SingletonGenerator()):
+def sleep_ms(t, sgen=SingletonGenerator(), ygen=_YieldSingletonGenerator()):
     """Sleep for *t* milliseconds.
 
     This is a coroutine, and a MicroPython extension.
     """
 
+    if t <= 0:
+        assert ygen.state is None, "Check for a missing `await` in your code"
+        ygen.state = True
+        return ygen
     assert sgen.state is None, "Check for a missing `await` in your code"
-    sgen.state = ticks_add(ticks(), max(0, t))
+    sgen.state = ticks_add(ticks(), t)
     return sgen
 
 
@@ -141,6 +168,17 @@ def _never(sgen=_NeverSingletonGenerator()):
 ################################################################################
 # Queue and poller for stream IO
 
+# Blocking sleep used when there is nothing to poll. Both ports idle the CPU
+# (CircuitPython light-sleeps) inside these rather than spinning.
+try:
+    from time import sleep_ms as _idle_ms
+except ImportError:
+    from time import sleep as _idle
+
+    def _idle_ms(ms):
+        _idle(ms / 1000)
+
+
 
 class IOQueue:
     def __init__(self):
@@ -188,6 +226,11 @@ class IOQueue:
                 break
 
     def wait_io_event(self, dt):
+        if not self.map:
+            # Nothing to poll, so idle the CPU until the next timer is due
+            if dt > 0:
+                _idle_ms(dt)
+            return
         for s, ev in self.poller.ipoll(dt):
             sm = self.map[id(s)]
             # print('poll', s, sm, ev)
@@ -207,6 +250,162 @@ class IOQueue:
                 self.poller.modify(s, select.POLLIN)
 
 
+################################################################################
+# Ready queue for tasks that can run now
+
+
+# Fixed-size FIFO ring of runnable tasks, so `sleep(0)` and already-due timers
+# don't pay for a pairing-heap insert and pop on every yield. The heap only
+# holds future timers and is consulted once per round of the ready queue.
+# Note: tasks on this queue are not linked into any TaskQueue. push() stamps
+# their ph_key with the time they were queued, so however long a task only
+# yields with sleep(0), Task.cancel never takes it for a future timer on the heap.
+class ReadyQueue:
+    def __init__(self, size=16):
+        self.buf = [None] * size
+        self.size = size
+        self.head = 0
+        self.count = 0
+        self.pending = 0  # Tasks left to run in the current round
+
+    def push(self, t):
+        t.ph_key = ticks()
+        if self.count == self.size:
+            # Full, fall back to the heap as "due now"
+            _task_queue.push_head(t)
+            return
+        i = self.head + self.count
+        if i >= self.size:
+            i -= self.size
+        self.buf[i] = t
+        self.count += 1
+
+    def pop(self):
+        t = self.buf[self.head]
+        self.buf[self.head] = None
+        self.head += 1
+        if self.head == self.size:
+            self.head = 0
+        self.count -= 1
+        return t
+
+
+################################################################################
+# Optional per-task accounting of scheduler time
+
+# Prefer microsecond ticks (MicroPython), otherwise scale millisecond ticks
+try:
+    from time import ticks_us as _stats_clock, ticks_diff as _stats_diff
+except ImportError:
+    _stats_clock = ticks
+
+    def _stats_diff(a, b):
+        return ticks_diff(a, b) * 1000
+
+
+# Preallocated table of per-task counters, indexed by slot. The last slot
+# collects any tasks beyond the table size. Recording only updates existing
+# small ints, so it does not allocate while enabled.
+class TaskStats:
+    def __init__(self, size=8, clock=None, diff=None):
+        self.size = size
+        self.clock = clock or _stats_clock
+        self.diff = diff or _stats_diff
+        self.tasks = [None] * size
+        self.resumes = [0] * size
+        self.run_s = [0] * size  # Whole seconds carried out of run_us
+        self.run_us = [0] * size
+        self.max_us = [0] * size
+
+    def record(self, t, t0):
+        us = self.diff(self.clock(), t0)
+        tasks = self.tasks
+        i = 0
+        last = self.size - 1
+        while i < last:
+            if tasks[i] is t:
+                break
+            if tasks[i] is None:
+                tasks[i] = t
+                break
+            i += 1
+        self.resumes[i] += 1
+        total = self.run_us[i] + us
+        if total >= 1000000:
+            self.run_s[i] += 1
+            total -= 1000000
+        self.run_us[i] = total
+        if us > self.max_us[i]:
+            self.max_us[i] = us
+
+    def reset(self):
+        for i in range(self.size):
+            self.tasks[i] = None
+            self.resumes[i] = 0
+            self.run_s[i] = 0
+            self.run_us[i] = 0
+            self.max_us[i] = 0
+
+
+_stats = None
+
+
+def enable_stats(size=8, clock=None, diff=None):
+    """Start recording resume count, run time and longest step for each task.
+
+    *size* is the number of task slots; tasks past the last slot share it.
+    *clock* and *diff* override the tick source, which defaults to
+    ``time.ticks_us`` where available and millisecond ticks otherwise.
+    """
+
+    global _stats
+    _stats = TaskStats(size, clock, diff)
+
+
+def disable_stats():
+    """Stop recording task statistics."""
+
+    global _stats
+    _stats = None
+
+
+def stats_snapshot():
+    """Return a list of ``(name, resumes, run_us, max_us)`` tuples, one per task
+    seen since stats were enabled, or ``None`` if stats are disabled.
+    """
+
+    st = _stats
+    if st is None:
+        return None
+    out = []
+    for i in range(st.size):
+        t = st.tasks[i]
+        if t is None and not st.resumes[i]:
+            continue
+        name = "(other)" if i == st.size - 1 and st.resumes[i] else _task_name(t)
+        out.append((name, st.resumes[i], st.run_s[i] * 1000000 + st.run_us[i], st.max_us[i]))
+    return out
+
+
+def stats_dump(reset=False):
+    """Print task statistics as one compact line per task."""
+
+    snap = stats_snapshot()
+    if snap is None:
+        print("stats disabled")
+        return
+    for name, resumes, run_us, max_us in snap:
+        print("{} n={} run={}ms max={}us".format(name, resumes, run_us // 1000, max_us))
+    if reset:
+        _stats.reset()
+
+
+def _task_name(t):
+    coro = t.coro
+    name = getattr(coro, "__qualname__", None) or getattr(coro, "__name__", None)
+    return name or repr(coro)
+
+
 ################################################################################
 # Main run loop
 
@@ -236,24 +435,43 @@ def run_until_complete(main_task=None):
     global cur_task
     excs_all = (CancelledError, Exception)  # To prevent heap allocation in loop
     excs_stop = (CancelledError, StopIteration)  # To prevent heap allocation in loop
+    rq = _ready_queue
     while True:
-        # Wait until the head of _task_queue is ready to run
-        dt = 1
-        while dt > 0:
-            dt = -1
-            t = _task_queue.peek()
-            if t:
-                # A task waiting on _task_queue; "ph_key" is time to schedule task at
-                dt = max(0, ticks_diff(t.ph_key, ticks()))
-            elif not _io_queue.map:
-                # No tasks can be woken so finished running
-                return
-            # print('(poll {})'.format(dt), len(_io_queue.map))
-            _io_queue.wait_io_event(dt)
+        if not rq.pending:
+            # Start of a round: poll IO, move due timers from _task_queue onto the
+            # ready queue, and only block when nothing at all is runnable
+            while True:
+                t = _task_queue.peek()
+                if rq.count:
+                    dt = 0
+                elif t:
+                    # A task waiting on _task_queue; "ph_key" is time to schedule task at
+                    dt = max(0, ticks_diff(t.ph_key, ticks()))
+                elif not _io_queue.map:
+                    # No tasks can be woken so finished running
+                    return
+                else:
+                    dt = -1
+                # print('(poll {})'.format(dt), len(_io_queue.map))
+                if dt or _io_queue.map:
+                    _io_queue.wait_io_event(dt)
+                t = _task_queue.peek()
+                if t:
+                    now = ticks()
+                    while t and rq.count < rq.size and ticks_diff(t.ph_key, now) <= 0:
+                        rq.push(_task_queue.pop_head())
+                        t = _task_queue.peek()
+                if rq.count:
+                    break
+            rq.pending = rq.count
 
         # Get next task to run and continue it
-        t = _task_queue.pop_head()
+        rq.pending -= 1
+        t = rq.pop()
         cur_task = t
+        st = _stats
+        if st is not None:
+            t0 = st.clock()
         try:
             # Continue running the coroutine, it's responsible for rescheduling itself
             exc = t.data
@@ -305,6 +523,8 @@ def run_until_complete(main_task=None):
                 _exc_context["exception"] = exc
                 _exc_context["future"] = t
                 Loop.call_exception_handler(_exc_context)
+        if st is not None:
+            st.record(t, t0)
 
 
 # Create a new task from a coroutine and run it until it finishes
@@ -415,9 +635,11 @@ def new_event_loop():
     the loop's state, it does not create a new one
     """
 
-    global _task_queue, _io_queue, _exc_context, cur_task
+    global _task_queue, _ready_queue, _io_queue, _exc_context, cur_task
     # TaskQueue of Task instances
     _task_queue = TaskQueue()
+    # FIFO of Task instances that are ready to run now
+    _ready_queue = ReadyQueue()
     # Task queue and poller for stream IO
     _io_queue = IOQueue()
     cur_task = None
@@ -0,0 +1,174 @@
+"""
+Game setup pushed from the timerbox to the buckets over ESP-NOW, so a field of
+buckets can be set up from one place.
+
+Packets are text like the rest of the ESP-NOW messages, so buckets running a
+game just see an unknown message:
+    Config|seq|mode|game_length|cap_length|long_ms|bucket_count|dd_loop|mac=ID,...
+    Armed|seq
+"""
+from binascii import hexlify, unhexlify
+from espnow import Peer  # type: ignore
+from adafruit_ticks import ticks_ms, ticks_diff
+
+CONFIG_TAG = b"Config|"
+ACK_TAG = b"Armed|"
+
+
+class Game_Config:
+    """
+    One game setup for every bucket, with each bucket's ID keyed by its MAC
+
+    Attributes:
+        seq (int): Sequence number, so acks for an older config are ignored.
+        mode (str): Name of the bucket GameMode to run.
+        values (list): Values for FIELDS, in order.
+        ids (list): (mac, bucket ID) pairs, mac as bytes.
+    """
+
+    FIELDS = ("game_length", "cap_length", "long_ms", "bucket_count", "dd_loop")
+
+    def __init__(self, mode, values, ids=(), seq=0):
+        self.seq = seq
+        self.mode = mode
+        self.values = list(values)
+        self.ids = list(ids)
+
+    def encode(self):
+        """The config as a packet"""
+        ids = ",".join(
+            "{}={}".format(hexlify(mac).decode(), bucket_id)
+            for mac, bucket_id in self.ids
+        )
+        fields = "|".join(str(value) for value in self.values)
+        return "Config|{}|{}|{}|{}".format(self.seq, self.mode, fields, ids).encode()
+
+    def apply(self, state):
+        """Copies the config's FIELDS onto a Game_States"""
+        for name, value in zip(self.FIELDS, self.values):
+            setattr(state, name, value)
+
+    def bucket_id(self, mac):
+        """The ID assigned to the bucket with this MAC, or None"""
+        for known, bucket_id in self.ids:
+            if known == mac:
+                return bucket_id
+        return None
+
+
+def decode_config(msg):
+    """The Game_Config in a packet, or None if it isn't a valid config"""
+    if not msg or not msg.startswith(CONFIG_TAG):
+        return None
+    count = len(Game_Config.FIELDS)
+    try:
+        parts = msg.decode().split("|")
+        if len(parts) != count + 4:
+            return None
+        ids = []
+        for item in parts[-1].split(","):
+            if item:
+                mac, bucket_id = item.split("=")
+                ids.append((unhexlify(mac), bucket_id))
+        values = [int(value) for value in parts[3 : 3 + count]]
+        return Game_Config(parts[2], values, ids, int(parts[1]))
+    except ValueError:
+        return None
+
+
+def send_to(esp, mac, msg):
+    """Sends msg to mac, adding it as a peer the first time"""
+    peer = None
+    for known in esp.peers:
+        if known.mac == mac:
+            peer = known
+    if peer is None:
+        peer = Peer(mac=mac)
+        esp.peers.append(peer)
+    try:
+        esp.send(msg, peer)
+    except Exception:
+        # Whoever is waiting on a reply asks again
+        pass
+
+
+def send_ack(esp, mac, config):
+    """Acks config to the timerbox at mac"""
+    send_to(esp, mac, ACK_TAG + str(config.seq).encode())
+
+
+class Config_Broadcast:
+    """
+    Sends a Game_Config to every bucket, then resends it every retry_ms to the
+    buckets that haven't acked until they all have.
+    ESP-NOW drops packets without telling the sender, so an ack is the only
+    sign a bucket has the config.
+
+    Attributes:
+        peers (list): (bucket ID, espnow.Peer) pairs for the buckets.
+        armed (list): Whether each bucket in peers has acked the current config.
+        sends (int): Packets sent for the current config, resends included.
+    """
+
+    def __init__(self, esp, peers, retry_ms=500):
+        self.esp = esp
+        self.peers = peers
+        self.retry_ms = retry_ms
+        self.seq = 0
+        self.msg = None
+        self.armed = [False] * len(peers)
+        self.sends = 0
+        self._sent = ticks_ms()
+
+    def start(self, config):
+        """Numbers config and sends it to every bucket"""
+        self.seq += 1
+        config.seq = self.seq
+        self.msg = config.encode()
+        self.armed = [False] * len(self.peers)
+        self.sends = 0
+        self._send()
+
+    def _send(self):
+        self._sent = ticks_ms()
+        for i, (_, peer) in enumerate(self.peers):
+            if not self.armed[i]:
+                self.sends += 1
+                try:
+                    self.esp.send(self.msg, peer)
+                except Exception:
+                    pass
+
+    @property
+    def done(self):
+        """Whether every bucket has acked"""
+        return all(self.armed)
+
+    def poll(self, packet):
+        """
+        Checks a received packet for an ack of the current config.
+        Returns True if it armed another bucket.
+        """
+        if packet is None or self.msg is None:
+            return False
+        if packet.msg != ACK_TAG + str(self.seq).encode():
+            return False
+        for i, (_, peer) in enumerate(self.peers):
+            if peer.mac == packet.mac and not self.armed[i]:
+                self.armed[i] = True
+                return True
+        return False
+
+    def tick(self):
+        """Resends to the buckets that haven't acked, once retry_ms has passed"""
+        if self.msg is None or self.done:
+            return
+        if ticks_diff(ticks_ms(), self._sent) >= self.retry_ms:
+            self._send()
+
+    def status(self):
+        """The armed bucket IDs, with - for buckets that haven't acked"""
+        return "".join(
+            bucket_id if armed else "-"
+            for (bucket_id, _), armed in zip(self.peers, self.armed)
+        )
@@ -0,0 +1,331 @@
+"""
+Live field scoreboard for spectators, served by the timerbox on its own Wi-Fi
+network, a soft AP on the ESP-NOW channel.
+
+The timerbox already sends every game command. For Start it sends
+REPORT_START instead, and buckets in wireless modes started by that report
+their team and score back to it, once a second or when it changes:
+    State|team|red_time|blue_time
+A plain Start, from a timerbox without a dashboard, gets no reports, as that
+timerbox doesn't read ESP-NOW during a game and they would fill its buffer.
+Field_Dashboard stands in for the timerbox's ESPNow object like Trace_ESP does.
+It takes the reports out of what the timerbox reads and the game state from
+what it sends, and answers phones on port 80 with PAGE and with /state, the
+field as JSON. The JSON is rebuilt at most once per update_ms however many
+reports come in, and each step does a bounded amount of work on non-blocking
+sockets, so the timer loop running beside it keeps its tick.
+"""
+import json
+from errno import EAGAIN
+from asyncio import sleep
+from adafruit_ticks import ticks_ms, ticks_diff
+from config_commands import send_to
+
+STATE_TAG = b"State|"
+# The Start of a timerbox running a dashboard, asking the buckets to report
+REPORT_START = "Start|State"
+# The game state after each command the timerbox sends
+STATUSES = {"Start": "Running", "Pause": "Paused", "Resume": "Running", "End": "Ended"}
+NO_TEAM = -1  # A bucket that hasn't reported yet
+
+PAGE = b"""<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>Field</title>
+<style>
+body{font-family:sans-serif;background:#111;color:#eee;text-align:center;margin:0}
+#timer{font-size:22vw;margin:.2em 0 0}
+#status{color:#aaa}
+.score{display:flex;justify-content:center;gap:2em;font-size:8vw}
+table{margin:1em auto;font-size:6vw;border-collapse:collapse}
+td{padding:.1em .6em}
+.t0{color:#3c3}.t1{color:#e33}.t2{color:#39f}.t3{color:#c3c}.t-1{color:#777}
+</style></head><body>
+<p id="timer">--:--</p><p id="status">Waiting</p>
+<div class="score"><span class="t1" id="red">0</span><span class="t2" id="blue">0</span></div>
+<table id="buckets"></table>
+<script>
+const TEAMS = {"-1": "-", 0: "Green", 1: "Red", 2: "Blue", 3: "Purple"};
+const clock = s => String(Math.floor(s / 60)).padStart(2, "0") + ":" + String(s % 60).padStart(2, "0");
+async function poll() {
+  try {
+    const state = await (await fetch("/state")).json();
+    document.getElementById("timer").textContent = clock(state.timer);
+    document.getElementById("status").textContent = state.status;
+    document.getElementById("red").textContent = clock(state.red);
+    document.getElementById("blue").textContent = clock(state.blue);
+    document.getElementById("buckets").innerHTML = Object.keys(state.buckets).sort().map(id => {
+      const [team, red, blue, active] = state.buckets[id];
+      return `<tr class="t${team}"><td>${id}${active ? " *" : ""}</td><td>${TEAMS[team]}</td>` +
+        `<td>${clock(red)}</td><td>${clock(blue)}</td></tr>`;
+    }).join("");
+  } catch (error) {}
+  setTimeout(poll, 1000);
+}
+poll();
+</script></body></html>
+"""
+
+
+def state_message(team, red_time, blue_time):
+    """A bucket's report of its team and score"""
+    return "State|{}|{}|{}".format(team, red_time, blue_time).encode()
+
+
+def decode_state(msg):
+    """[team, red_time, blue_time] from a report, or None if msg isn't one"""
+    if not msg or not msg.startswith(STATE_TAG):
+        return None
+    parts = msg.decode().split("|")
+    if len(parts) != 4:
+        return None
+    try:
+        return [int(part) for part in parts[1:]]
+    except ValueError:
+        return None
+
+
+def send_state(esp, mac, team, red_time, blue_time):
+    """Reports a bucket's team and score to the timerbox at mac"""
+    send_to(esp, mac, state_message(team, red_time, blue_time))
+
+
+def http_response(content_type, body, status="200 OK"):
+    """A whole HTTP response, the connection closed after it"""
+    head = (
+        "HTTP/1.1 {}\r\nContent-Type: {}\r\nContent-Length: {}\r\n"
+        "Cache-Control: no-store\r\nConnection: close\r\n\r\n"
+    ).format(status, content_type, len(body))
+    return head.encode() + body
+
+
+NOT_FOUND = http_response("text/plain", b"Not found", "404 Not Found")
+
+
+class Phone_Client:
+    """
+    One phone's connection, with a buffer of the dashboard's for its request
+
+    Attributes:
+        sock: The accepted socket, non-blocking.
+        buffer (bytearray): Where the request is received.
+        length (int): Bytes of the request received.
+        reply (memoryview): The response being sent, None until the request is in.
+        sent (int): Bytes of the reply sent.
+        since (int): ticks_ms() when it connected.
+    """
+
+    def __init__(self, sock, buffer, since):
+        self.sock = sock
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+        self.length = 0
+        self.reply = None
+        self.sent = 0
+        self.since = since
+
+
+class Field_Dashboard:
+    """
+    Stands in for an ESPNow object on the timerbox, keeping the field's state
+    from the packets through it, and serves that state to phones.
+
+    Attributes:
+        esp: The ESPNow object (or Trace_ESP) wrapped.
+        ids (dict): Bucket MAC to bucket ID.
+        buckets (dict): Bucket ID to [team, red_time, blue_time, active].
+        status (str): "Waiting", "Running", "Paused" or "Ended".
+        held (list): Packets read while draining that aren't reports, for read().
+        changed (bool): Whether anything changed since the JSON was built.
+        publishes (int): Times the JSON was built.
+        update_ms (int): Least time between builds of the JSON.
+        poll_ms (int): Time between steps of run().
+    """
+
+    MAX_HELD = 16  # Past this, packets wait in the radio's buffer instead
+    TIMEOUT_MS = 3000  # Phones that take longer to send a request are dropped
+
+    def __init__(
+        self, esp, peers, update_ms=500, poll_ms=50, max_clients=4, buffer_size=1024
+    ):
+        self.esp = esp
+        self.ids = {peer.mac: bucket_id for bucket_id, peer in peers}
+        self.buckets = {bucket_id: [NO_TEAM, 0, 0, False] for bucket_id, _ in peers}
+        self.status = "Waiting"
+        self.held = []
+        self.changed = True
+        self.publishes = 0
+        self.update_ms = update_ms
+        self.poll_ms = poll_ms
+        self._timer = 0
+        self._state = None
+        self._published = ticks_ms()
+        self._sock = None
+        self._clients = []
+        self._free = [bytearray(buffer_size) for _ in range(max_clients)]
+        self._page = http_response("text/html", PAGE)
+
+    @property
+    def timer(self):
+        """Seconds left in the game, set by the timer loop"""
+        return self._timer
+
+    @timer.setter
+    def timer(self, seconds):
+        if seconds != self._timer:
+            self._timer = seconds
+            self.changed = True
+
+    def send(self, message, peer=None):
+        status = STATUSES.get(message)
+        if status:
+            self.status = status
+            if message == "Start":
+                for bucket_id in self.buckets:
+                    self.buckets[bucket_id] = [NO_TEAM, 0, 0, False]
+                message = REPORT_START
+            self.changed = True
+        elif message == "Active" and peer is not None:
+            bucket_id = self.ids.get(peer.mac)
+            if bucket_id:
+                self.buckets[bucket_id][3] = True
+                self.changed = True
+        elif message == "Inactive":
+            for bucket in self.buckets.values():
+                bucket[3] = False
+            self.changed = True
+        if peer is None:
+            return self.esp.send(message)
+        return self.esp.send(message, peer)
+
+    def read(self):
+        if self.held:
+            return self.held.pop(0)
+        packet = self.esp.read()
+        while packet is not None and self.fold(packet):
+            packet = self.esp.read()
+        return packet
+
+    def __len__(self):
+        return len(self.held) + len(self.esp)
+
+    def __getattr__(self, name):
+        return getattr(self.esp, name)
+
+    def fold(self, packet):
+        """Takes in packet if it's a bucket's report, returns True if it was"""
+        state = decode_state(packet.msg)
+        if state is None:
+            return False
+        bucket_id = self.ids.get(packet.mac)
+        if bucket_id:
+            bucket = self.buckets[bucket_id]
+            if bucket[:3] != state:
+                bucket[0], bucket[1], bucket[2] = state
+                self.changed = True
+        return True
+
+    def drain(self):
+        """Folds in the reports waiting, holding the other packets for read()"""
+        while len(self.held) < self.MAX_HELD:
+            packet = self.esp.read()
+            if packet is None:
+                return
+            if not self.fold(packet):
+                self.held.append(packet)
+
+    def publish(self):
+        """
+        Builds the response for /state if anything changed and update_ms has
+        passed since the last one. Returns True if it did.
+        """
+        if self._state is not None and (
+            not self.changed or ticks_diff(ticks_ms(), self._published) < self.update_ms
+        ):
+            return False
+        red_time = blue_time = 0
+        for bucket in self.buckets.values():
+            red_time += bucket[1]
+            blue_time += bucket[2]
+        body = json.dumps(
+            {
+                "timer": self._timer,
+                "status": self.status,
+                "red": red_time,
+                "blue": blue_time,
+                "buckets": self.buckets,
+            }
+        )
+        self._state = http_response("application/json", body.encode())
+        self.changed = False
+        self._published = ticks_ms()
+        self.publishes += 1
+        return True
+
+    def start(self, pool, host, port=80):
+        """Listens for phones on host:port"""
+        self._sock = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+        self._sock.setsockopt(pool.SOL_SOCKET, pool.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(len(self._free))
+        self._sock.setblocking(False)
+
+    def step(self):
+        """One pass: drains the radio, publishes, accepts and answers phones"""
+        self.drain()
+        self.publish()
+        if self._sock is None:
+            return
+        now = ticks_ms()
+        while self._free:
+            try:
+                sock, _ = self._sock.accept()
+            except OSError:
+                break
+            sock.setblocking(False)
+            self._clients.append(Phone_Client(sock, self._free.pop(), now))
+        for i in range(len(self._clients) - 1, -1, -1):
+            client = self._clients[i]
+            if not self._serve(client, now):
+                client.sock.close()
+                self._free.append(client.buffer)
+                self._clients.pop(i)
+
+    async def run(self):
+        """Steps the dashboard every poll_ms, for create_task()"""
+        while True:
+            self.step()
+            await sleep(self.poll_ms / 1000)
+
+    def _serve(self, client, now):
+        """One receive or send for client, returns False once it's done with"""
+        if ticks_diff(now, client.since) > self.TIMEOUT_MS:
+            return False
+        try:
+            if client.reply is None:
+                received = client.sock.recv_into(
+                    client.view[client.length :], len(client.buffer) - client.length
+                )
+                if not received:
+                    return False
+                client.length += received
+                request = bytes(client.view[: client.length])
+                if b"\r\n\r\n" not in request and client.length < len(client.buffer):
+                    return True
+                client.reply = memoryview(self._route(request))
+            client.sent += client.sock.send(client.reply[client.sent :])
+        except OSError as error:
+            return error.errno == EAGAIN
+        return client.sent < len(client.reply)
+
+    def _route(self, request):
+        """The response for the request line at the start of request"""
+        parts = request.split(b" ", 2)
+        if parts[0] != b"GET" or len(parts) < 3:
+            return NOT_FOUND
+        target = parts[1].split(b"?", 1)[0]
+        if target == b"/state":
+            return self._state
+        if target in (b"/", b"/index.html"):
+            return self._page
+        return NOT_FOUND
@@ -0,0 +1,192 @@
+"""
+Background LCD updates for the 1602 display, so game logic never waits on I2C.
+"""
+from asyncio import sleep, Event
+
+# Columns taken by each template field: {t} mm:ss, {d} number, {s} short name
+FIELD_WIDTHS = {"t": 5, "d": 3, "s": 6}
+
+
+def char_code(c):
+    """LCD character code for c, with the custom glyphs I2cLcd defines for \\ and ~"""
+    oc = ord(c)
+    if oc == 92:
+        return 6
+    if oc == 126:
+        return 7
+    return oc
+
+
+class Screen_Template:
+    """
+    A screen laid out once, with slots for the values that change.
+    Fields in the text are {t} for mm:ss times, {d} for numbers up to 999 and
+    {s} for names up to 6 characters. Numbers and names are left aligned and
+    padded with spaces, so at the end of a line they look like formatted text.
+    """
+
+    def __init__(self, display_control, text):
+        self.kinds = []
+        self.slots = []
+        parts = text.split("{")
+        marked = parts[0]
+        for part in parts[1:]:
+            kind = part[0]
+            self.kinds.append(kind)
+            # Lay the field out as marker characters to find where it lands
+            marked += chr(len(self.kinds)) * FIELD_WIDTHS[kind] + part[2:]
+        self.base = bytearray(len(display_control.frame))
+        display_control.layout(marked, self.base)
+        for n in range(1, len(self.kinds) + 1):
+            slot = -1
+            for i in range(len(self.base)):
+                if self.base[i] == n:
+                    if slot < 0:
+                        slot = i
+                    self.base[i] = 32
+            self.slots.append(slot)
+
+
+class Display_Control:
+    """Latest-value mailbox for the LCD, drawn by the display_control task"""
+
+    def __init__(self, display, cols=16, rows=2, on_idle=None):
+        self.display = display
+        self.on_idle = on_idle
+        self.cols = cols
+        self.rows = rows
+        self.frame = bytearray(b" " * (cols * rows))
+        self.shown = bytearray(self.frame)
+        self._updated = Event()
+
+    def update(self, message):
+        """Queue a message, replacing any that hasn't been drawn yet"""
+        self.layout(message, self.frame)
+        self._updated.set()
+
+    def template(self, text):
+        """Compiles text with {t}, {d} and {s} fields into a Screen_Template"""
+        return Screen_Template(self, text)
+
+    def show(self, template, a=0, b=0, c=0):
+        """
+        Queue a template with its fields filled from a, b and c, in order.
+        Writes straight into the frame buffer, so it doesn't allocate.
+        """
+        self.frame[:] = template.base
+        slots = template.slots
+        kinds = template.kinds
+        if slots:
+            self._put_field(kinds[0], slots[0], a)
+            if len(slots) > 1:
+                self._put_field(kinds[1], slots[1], b)
+                if len(slots) > 2:
+                    self._put_field(kinds[2], slots[2], c)
+        self._updated.set()
+
+    def layout(self, message, frame):
+        """
+        Lay out a message into frame the way I2cLcd.write does after a clear,
+        including the trailing newline it writes.
+        Lines wrap at the last column, and a newline right after a full line is
+        consumed. Like the driver on a 2 row LCD, lines 3 and 4 land off-screen
+        and line 5 starts over at the top, clearing each row it moves onto.
+        """
+        cols = self.cols
+        for i in range(len(frame)):
+            frame[i] = 32
+        x = y = 0
+        nl = impl_nl = False
+        for c in message:
+            if c == "\n" and impl_nl:
+                impl_nl = False
+                continue
+            if nl:
+                x = 0
+                y += 1
+                nl = impl_nl = False
+                self._clear_row(frame, y)
+            if c == "\n":
+                nl = True
+                continue
+            if x < cols:
+                impl_nl = False
+                if not y & 2:
+                    frame[(y & 1) * cols + x] = char_code(c)
+                x += 1
+            if x >= cols:
+                nl = impl_nl = True
+        # The driver's own trailing newline runs a newline left pending
+        if nl and not impl_nl:
+            self._clear_row(frame, y + 1)
+
+    def _clear_row(self, frame, y):
+        if not y & 2:
+            row = (y & 1) * self.cols
+            for i in range(row, row + self.cols):
+                frame[i] = 32
+
+    def _put_field(self, kind, pos, value):
+        if pos < 0:
+            return
+        if kind == "t":
+            self._put_time(pos, value)
+        elif kind == "d":
+            self._put_number(pos, value)
+        else:
+            self._put_text(pos, value)
+
+    def _put(self, pos, code):
+        if pos < len(self.frame):
+            self.frame[pos] = code
+
+    def _put_time(self, pos, seconds):
+        minutes = min(seconds // 60, 99)
+        seconds = seconds % 60
+        self._put(pos, 48 + minutes // 10)
+        self._put(pos + 1, 48 + minutes % 10)
+        self._put(pos + 2, 58)  # ":"
+        self._put(pos + 3, 48 + seconds // 10)
+        self._put(pos + 4, 48 + seconds % 10)
+
+    def _put_number(self, pos, number):
+        number = max(0, min(number, 999))
+        if number >= 100:
+            self._put(pos, 48 + number // 100)
+            pos += 1
+        if number >= 10:
+            self._put(pos, 48 + number // 10 % 10)
+            pos += 1
+        self._put(pos, 48 + number % 10)
+
+    def _put_text(self, pos, text):
+        for i in range(min(len(text), FIELD_WIDTHS["s"])):
+            self._put(pos + i, char_code(text[i]))
+
+    async def display_control(self):
+        """Async function for drawing the latest frame to the LCD"""
+        frame = self.frame
+        shown = self.shown
+        cols = self.cols
+        while True:
+            await self._updated.wait()
+            self._updated.clear()
+            for y in range(self.rows):
+                row = y * cols
+                x = 0
+                # Rewrite only the runs of characters that changed
+                while x < cols:
+                    if frame[row + x] == shown[row + x]:
+                        x += 1
+                        continue
+                    end = x + 1
+                    while end < cols and frame[row + end] != shown[row + end]:
+                        end += 1
+                    self.display.write_codes_at(frame, row + x, row + end, x, y)
+                    for i in range(row + x, row + end):
+                        shown[i] = frame[i]
+                    x = end
+                    await sleep(0)
+            # The screen is up to date, a pause here doesn't show
+            if self.on_idle:
+                self.on_idle()
@@ -50,6 +50,12 @@ class DisplayWrapper:
         if self.display is not None:
             self.display.clear()
 
+    def write_codes_at(self, codes, start, end, x=0, y=0):
+        """Writes the character codes codes[start:end] at column x of row y"""
+        if self.display is not None:
+            self.display.move_to(x, y)
+            self.display.write_codes(codes, start, end)
+
 
 # UART audio output
 try:
@@ -26,6 +26,7 @@ class I2cLcd:
         self.nx = min(dim[0], 40)
         self.ny = min(dim[1], 4)
         self.backl = 0x08
+        self._buf = bytearray(4)                                  # Reused by _wr, so writing a character doesn't allocate
         self.i2c.writeto(self.i2c_addr, bytearray([0]))          # Init I2C
         sleep_us(20000)                                             # Allow LCD time to powerup
         for _ in range(3):                                       # Send reset 3 times
@@ -102,6 +103,13 @@ class I2cLcd:
                 self.nl = True                # We signal the newline, but it is implicit
                 self.impl_nl = True
 
+    # Writes the raw character codes buf[start:end] at the current cursor pos and advances cursor.
+    # No newline handling or character mapping, the caller lays out the codes (see display_commands.py).
+    def write_codes(self, buf, start, end):
+        for i in range(start, end):
+            self._wr(buf[i], 1)
+        self.x += end - start
+
     # Write a character to one of the 8 CGRAM slots, available as chr(0) through chr(7).     !!! chr(6) and chr(7) already in use for '\' and '~' !!!
     def define_char(self, loc, cmap):   
         self._wr(0x40 | ((loc & 0x7) << 3))         # LCD_CGRAM | ..  # loc restricted to 0..7
@@ -114,6 +122,11 @@ class I2cLcd:
     def _wr(self, data, dbit=0):  # Write to the LCD; dbit: 0..command, 1..data
         b0 = dbit | self.backl | data & 0xf0
         b1 = dbit | self.backl | ((data & 0x0f) << 4)
-        self.i2c.writeto(self.i2c_addr, bytearray((b0 | 0x04, b0, b1 | 0x04, b1)))
+        buf = self._buf
+        buf[0] = b0 | 0x04
+        buf[1] = b0
+        buf[2] = b1 | 0x04
+        buf[3] = b1
+        self.i2c.writeto(self.i2c_addr, buf)
         if not dbit and data <= 3: # The home and clear commands require a worst case delay of 4.1 msec
             sleep_us(5000)
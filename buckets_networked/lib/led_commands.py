@@ -1,27 +1,134 @@
 """
 Customized LED commands for RGB strip via Adafruit NeoPixel.
+
+Colors go through a brightness and gamma table once, when RGB_Control is made,
+so the NeoPixel can stay at brightness=1 and skip its per-channel float math.
+The strip's current is estimated from the colors on it, and frames that would
+draw more than the budget are dimmed to fit.
 """
-from asyncio import sleep
+from asyncio import sleep, Event
 from neopixel import NeoPixel
 
+# Color IDs, indexes into RGB_Control.COLOR and COLOR_NAMES
+OFF, RED, ORANGE, YELLOW, GREEN, BLUE, PURPLE, WHITE = range(8)
+COLOR_NAMES = ("Off", "Red", "Orange", "Yellow", "Green", "Blue", "Purple", "White")
 
-class RGB_Control:
-    """RGB control via Adafruit NeoPixel object"""
+# Rough WS2812B draw: each LED idles at IDLE_MA, plus CHANNEL_MA per channel
+# at 255, in proportion below that
+IDLE_MA = 1
+CHANNEL_MA = 20
+# Steps a frame over budget is dimmed in, LEVELS is full brightness
+LEVELS = 16
+
+
+def color_id(color):
+    """Color ID for a color ID or name, so callers can still pass "Red" etc."""
+    return COLOR_NAMES.index(color) if isinstance(color, str) else color
+
+
+def gamma_table(brightness=100, gamma=1.0):
+    """Output level for each of the 256 input levels, brightness in percent"""
+    scale = 255 * min(max(brightness, 0), 100) / 100
+    return bytes(round(scale * (level / 255) ** gamma) for level in range(256))
+
+
+def strip_ma(levels, count, level=LEVELS):
+    """Estimated draw in mA of count LEDs whose channels add up to levels"""
+    # Rounded up, so a frame that fits by this fits in fact
+    return count * IDLE_MA - (-levels * level * CHANNEL_MA // (255 * LEVELS))
 
-    def __init__(self, rgb: NeoPixel):
+
+class RGB_Control:
+    """
+    RGB control via Adafruit NeoPixel object
+
+    Attributes:
+        budget_ma (int): Most current the strip may draw, 0 for no limit. Set
+            when made, show() works from limits it derives from it.
+        frame (bytearray): The color ID of each LED.
+        level (int): Brightness of the frame on show, out of LEVELS.
+        palette (tuple): COLOR through the gamma table, dimmed to level.
+    """
+
+    def __init__(self, rgb: NeoPixel, budget_ma=0, brightness=100, gamma=1.0):
         self.rgb = rgb
         self.loop = False
-
-    COLOR = {
-        "Red": (255, 0, 0),
-        "Orange": (255, 165, 0),
-        "Yellow": (255, 255, 0),
-        "Green": (0, 255, 0),
-        "Blue": (0, 0, 255),
-        "Purple": (255, 0, 255),
-        "White": (255, 255, 255),
-        "Off": (0, 0, 0),
-    }
+        self.budget_ma = budget_ma
+        self._spare = max(budget_ma - rgb.n * IDLE_MA, 0)
+        # Most channel levels a frame can add up to at full brightness
+        self._cap = self._spare * 255 // CHANNEL_MA
+        table = gamma_table(brightness, gamma)
+        self._full = tuple(tuple(table[c] for c in color) for color in self.COLOR)
+        # Channel levels each color adds to the frame, and the frame's total
+        self._weight = tuple(sum(color) for color in self._full)
+        self._levels = 0
+        self.frame = bytearray(rgb.n)
+        # A frame of each color, so a solid fill is one slice copy
+        self._solid = tuple(bytes((c,)) * rgb.n for c in range(len(self.COLOR)))
+        self._palettes = {LEVELS: self._full}
+        self.level = LEVELS
+        self.palette = self._full
+
+    # Built once and indexed by color ID, so writing a pixel is a tuple index
+    COLOR = (
+        (0, 0, 0),
+        (255, 0, 0),
+        (255, 165, 0),
+        (255, 255, 0),
+        (0, 255, 0),
+        (0, 0, 255),
+        (255, 0, 255),
+        (255, 255, 255),
+    )
+
+    def current_ma(self):
+        """Estimated draw of the frame as shown, in mA"""
+        return strip_ma(self._levels, self.rgb.n, self.level)
+
+    def _fit(self):
+        """Brightest level at which the frame fits the budget"""
+        if not self.budget_ma or self._levels <= self._cap:
+            return LEVELS
+        return self._spare * 255 * LEVELS // (self._levels * CHANNEL_MA)
+
+    def _dim(self, level):
+        """Switches the palette to level, rewriting the LEDs already set"""
+        palette = self._palettes.get(level)
+        if palette is None:
+            palette = tuple(
+                tuple(c * level // LEVELS for c in color) for color in self._full
+            )
+            self._palettes[level] = palette
+        self.level = level
+        self.palette = palette
+        rgb = self.rgb
+        for i, color in enumerate(self.frame):
+            rgb[i] = palette[color]
+
+    def set(self, i, color):
+        """Sets LED i to a color ID, shown on the next show()"""
+        old = self.frame[i]
+        self.frame[i] = color
+        self._levels += self._weight[color] - self._weight[old]
+        self.rgb[i] = self.palette[color]
+
+    def fill_all(self, color):
+        """Sets every LED to a color ID, shown on the next show()"""
+        self.frame[:] = self._solid[color]
+        self._levels = self._weight[color] * self.rgb.n
+        level = self._fit()
+        if level != self.level:
+            self._dim(level)
+        else:
+            self.rgb.fill(self.palette[color])
+
+    def show(self):
+        """Shows the frame, dimmed first if it would go over the budget"""
+        if self.budget_ma and (self._levels > self._cap or self.level < LEVELS):
+            level = self._fit()
+            if level != self.level:
+                self._dim(level)
+        self.rgb.show()
 
     def stop(self):
         """Stop the RGB loop"""
@@ -33,14 +140,14 @@ class RGB_Control:
 
     async def solid(self, color1, color2, delay):
         """Set the LED to a solid color"""
-        self.rgb.fill(self.COLOR[color1])
-        self.rgb.show()
+        self.fill_all(color1)
+        self.show()
 
     async def fill(self, color1, color2, delay):
         """Fill the LED with a specific color and delay"""
         for i in range(self.rgb.n):
-            self.rgb[i] = self.COLOR[color1]
-            self.rgb.show()
+            self.set(i, color1)
+            self.show()
             await sleep(delay)
             await sleep(0)
             if not self.loop:
@@ -54,11 +161,11 @@ class RGB_Control:
     async def single_blink_cycle(self, color1, color2, delay):
         """Blink a single LED on at a time"""
         for i in range(self.rgb.n):
-            self.rgb[i] = self.COLOR[color1]
-            self.rgb.show()
+            self.set(i, color1)
+            self.show()
             await sleep(delay)
-            self.rgb[i] = self.COLOR[color2]
-            self.rgb.show()
+            self.set(i, color2)
+            self.show()
             await sleep(delay)
             if not self.loop:
                 break
@@ -74,14 +181,16 @@ class RGB_Control:
 class RGB_Settings:
     """Class to hold and update RGB setting state"""
 
-    def __init__(self, rgb):
-        self.color1 = "Off"
-        self.color2 = "Off"
+    def __init__(self, rgb, on_idle=None):
+        self.color1 = OFF
+        self.color2 = OFF
         self.pattern = "fill"
         self.delay = 0.005
         self.repeat = 0
         self.hold = False
         self.rgb = rgb
+        self.on_idle = on_idle
+        self._updated = Event()
 
     def state(self):
         return {
@@ -96,31 +205,39 @@ class RGB_Settings:
 
     def update(
         self,
-        color1="Off",
-        color2="Off",
+        color1=OFF,
+        color2=OFF,
         pattern="fill",
         delay=0.005,
         repeat=1,
         hold=False,
     ):
-        """Update the RGB settings"""
+        """Update the RGB settings, colors given as IDs or names"""
         self.rgb.stop()
-        self.color1 = color1
-        self.color2 = color2
+        self.color1 = color_id(color1)
+        self.color2 = color_id(color2)
         self.pattern = pattern
         self.delay = delay
         self.repeat = repeat
         self.hold = hold
+        self._updated.set()
+
+    def idle(self):
+        """Runs on_idle between animation passes, where a pause doesn't show"""
+        if self.on_idle:
+            self.on_idle()
 
     async def rgb_control(self, rgb):
         """Async function for controlling RGB LEDs"""
         while True:
+            self._updated.clear()
             while self.repeat == -1:
                 self.rgb.start()
                 pattern = getattr(rgb, self.pattern, "fill")
                 if callable(pattern):
                     await pattern(self.color1, self.color2, self.delay)
                 self.rgb.stop()
+                self.idle()
                 await sleep(0)
             while self.repeat > 0:
                 self.rgb.start()
@@ -131,5 +248,7 @@ class RGB_Settings:
                 self.rgb.stop()
                 if self.repeat == 0:
                     self.hold = False
+                self.idle()
                 await sleep(0)
-            await sleep(0)
+            # Nothing left to draw, sleep until the next update()
+            await self._updated.wait()
@@ -0,0 +1,217 @@
+"""
+Garbage collection at safe points, so a collection doesn't land mid-animation
+or between a button press and the team change it causes, and an optional
+profile of which phase of the main loop allocates what.
+"""
+from gc import collect, mem_alloc, mem_free  # type: ignore
+from time import monotonic_ns
+from adafruit_ticks import ticks_ms, ticks_diff
+
+
+class Memory_Control:
+    """
+    Runs gc.collect() at known-idle points once the heap is `percent` full.
+    Automatic collection stays enabled as a backstop for heavy allocations.
+
+    Attributes:
+        percent (int): Heap use, in percent, that triggers a collection.
+        check_ms (int): Minimum time between heap checks, since mem_free()
+            walks the whole heap.
+        histogram (list): Collection counts per duration bucket in BOUNDS_MS,
+            the last bucket counting everything slower.
+        low_free (int): Lowest free heap seen before a collection, in bytes.
+        low_after (int): Lowest free heap right after a collection, in bytes.
+            A falling value means live data is growing.
+    """
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50)
+
+    def __init__(self, percent=60, check_ms=250):
+        self.percent = percent
+        self.check_ms = check_ms
+        self._checked = ticks_ms()
+        self.reset()
+
+    def reset(self):
+        """Clear the collection statistics"""
+        self.histogram = [0] * (len(self.BOUNDS_MS) + 1)
+        self.collections = 0
+        self.total_us = 0
+        self.max_us = 0
+        self.low_free = mem_free()
+        self.low_after = self.low_free
+
+    def safe_point(self):
+        """
+        Call where a pause can't be seen, such as right after an LCD update or
+        between animation passes. Collects if the heap is past the threshold,
+        returns True if it did.
+        """
+        now = ticks_ms()
+        if ticks_diff(now, self._checked) < self.check_ms:
+            return False
+        self._checked = now
+        free = mem_free()
+        used = mem_alloc()
+        self.low_free = min(self.low_free, free)
+        if used * 100 < (used + free) * self.percent:
+            return False
+        self.collect()
+        return True
+
+    def collect(self):
+        """Collect now and record how long it took"""
+        start = monotonic_ns()
+        collect()
+        took_us = (monotonic_ns() - start) // 1000
+        self._checked = ticks_ms()
+        self.collections += 1
+        self.total_us += took_us
+        self.max_us = max(self.max_us, took_us)
+        bucket = 0
+        for ms in self.BOUNDS_MS:
+            if took_us <= ms * 1000:
+                break
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.low_after = min(self.low_after, mem_free())
+
+    def dump(self):
+        """Print the free heap and collection statistics"""
+        print(mem_free())
+        print(
+            "gc n={} total={}ms max={}us low_free={} low_after={}".format(
+                self.collections,
+                self.total_us // 1000,
+                self.max_us,
+                self.low_free,
+                self.low_after,
+            )
+        )
+        bounds = ["<={}ms".format(ms) for ms in self.BOUNDS_MS] + [
+            ">{}ms".format(self.BOUNDS_MS[-1])
+        ]
+        print(" ".join("{}:{}".format(b, n) for b, n in zip(bounds, self.histogram)))
+
+
+class Phase_Profile:
+    """
+    Heap allocated by each phase of the main loop, from gc.mem_alloc() deltas.
+    The table is fixed when it is made, so recording doesn't allocate.
+
+    Bytes a phase allocates while running inside another, such as an ESP-NOW
+    read in the game task, are charged to the inner phase only. A collection
+    during a phase can make its delta negative, those calls are counted in
+    skipped instead.
+
+    Attributes:
+        names (tuple): Phase names, indexed by phase number.
+        calls (list): Calls recorded for each phase.
+        bytes (list): Bytes allocated by each phase.
+        max (list): Most bytes allocated by one call of each phase.
+        skipped (list): Calls of each phase a collection spoiled.
+        total (int): Bytes charged to all phases.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.reset()
+
+    def reset(self):
+        """Clear the table"""
+        count = len(self.names)
+        self.calls = [0] * count
+        self.bytes = [0] * count
+        self.max = [0] * count
+        self.skipped = [0] * count
+        self.total = 0
+
+    def record(self, phase, start, inner):
+        """
+        Charges phase with the heap allocated since mem_alloc() was start and
+        total was inner, less what nested phases were charged in between
+        """
+        used = mem_alloc() - start - (self.total - inner)
+        if used < 0:
+            self.skipped[phase] += 1
+            return
+        self.calls[phase] += 1
+        self.bytes[phase] += used
+        self.total += used
+        if used > self.max[phase]:
+            self.max[phase] = used
+
+    def probe(self, coro, phase):
+        """coro, with each resume charged to phase, for create_task()"""
+        return Phase_Probe(coro, self, phase)
+
+    def reader(self, esp, phase):
+        """esp, with each read() charged to phase"""
+        return Phase_Reader(esp, self, phase)
+
+    def dump(self, reset=False):
+        """Print the phases, most bytes first"""
+        order = sorted(range(len(self.names)), key=lambda i: -self.bytes[i])
+        print("alloc total={}".format(self.total))
+        for i in order:
+            print(
+                "{} n={} bytes={} per={} max={} skipped={}".format(
+                    self.names[i],
+                    self.calls[i],
+                    self.bytes[i],
+                    self.bytes[i] // self.calls[i] if self.calls[i] else 0,
+                    self.max[i],
+                    self.skipped[i],
+                )
+            )
+        if reset:
+            self.reset()
+
+
+class Phase_Probe:
+    """Coroutine proxy that charges each resume of a task to a phase"""
+
+    def __init__(self, coro, profile, phase):
+        self.coro = coro
+        self.profile = profile
+        self.phase = phase
+        # Names the task in asyncio's SCHED_STATS dump
+        self.__name__ = profile.names[phase]
+
+    def send(self, value):
+        profile = self.profile
+        start = mem_alloc()
+        inner = profile.total
+        try:
+            return self.coro.send(value)
+        finally:
+            profile.record(self.phase, start, inner)
+
+    def throw(self, *args):
+        return self.coro.throw(*args)
+
+    def close(self):
+        return self.coro.close()
+
+
+class Phase_Reader:
+    """Stands in for an ESPNow object, charging each read() to a phase"""
+
+    def __init__(self, esp, profile, phase):
+        self.esp = esp
+        self.profile = profile
+        self.phase = phase
+
+    def read(self):
+        profile = self.profile
+        start = mem_alloc()
+        inner = profile.total
+        packet = self.esp.read()
+        profile.record(self.phase, start, inner)
+        return packet
+
+    def __len__(self):
+        return len(self.esp)
+
+    def __getattr__(self, name):
+        return getattr(self.esp, name)
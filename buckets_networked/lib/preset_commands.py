@@ -0,0 +1,130 @@
+"""
+Game setups saved to non-volatile memory, so a round can be repeated without
+going back through every setup screen.
+"""
+from binascii import crc32
+from struct import pack, unpack_from
+
+try:
+    from microcontroller import nvm  # type: ignore
+except ImportError:
+    nvm = None
+
+# Bump VERSION when FORMAT, FIELDS or the order of MODES changes, old presets
+# are then ignored instead of loaded into the wrong fields
+MAGIC = b"GT"
+VERSION = 1
+# Mode index, then the Game_States setup fields below in order
+FORMAT = "<BHBBBHHHHB"
+FIELDS = (
+    "lives_count",
+    "id_index",
+    "bucket_count",
+    "team",
+    "game_length",
+    "cap_length",
+    "checkpoint",
+    "long_ms",
+    "dd_loop",
+)
+# Largest value each field can hold, bigger values are saved as this
+LIMITS = tuple(0xFF if kind == "B" else 0xFFFF for kind in FORMAT[2:])
+RECORD_SIZE = 17  # FORMAT and a 16 bit CRC
+HEADER_SIZE = 4  # MAGIC, VERSION and the slot count
+
+LAST_PRESET = 0
+PRESET_NAMES = ("Repeat last", "Preset 1", "Preset 2", "Preset 3")
+
+
+class Preset_Store:
+    """
+    Fixed slots of packed game setups in microcontroller.nvm.
+    Slot LAST_PRESET holds the last game started, the rest are saved by hand.
+
+    Every nvm write is a flash write, so a slot is only written when its bytes
+    change, and the header only when it is missing or from another version.
+
+    Attributes:
+        nvm: The byte store, microcontroller.nvm by default. None disables
+            presets, as on boards without nvm.
+        offset (int): Where the presets start in nvm.
+        slots (int): The number of preset slots, including LAST_PRESET.
+        writes (int): nvm writes since boot.
+    """
+
+    def __init__(self, store=None, offset=0, slots=len(PRESET_NAMES)):
+        self.nvm = store if store is not None else nvm
+        self.offset = offset
+        self.slots = slots
+        self.writes = 0
+        if self.nvm is not None and len(self.nvm) < offset + self.size:
+            self.nvm = None
+
+    @property
+    def size(self):
+        """Bytes of nvm the presets take"""
+        return HEADER_SIZE + self.slots * RECORD_SIZE
+
+    def _header(self):
+        return MAGIC + bytes((VERSION, self.slots))
+
+    def _valid(self):
+        start = self.offset
+        return self.nvm[start : start + HEADER_SIZE] == self._header()
+
+    def _record(self, slot):
+        start = self.offset + HEADER_SIZE + slot * RECORD_SIZE
+        return start, start + RECORD_SIZE
+
+    def _read(self, slot):
+        """The stored record in slot, or None if it is empty or damaged"""
+        if self.nvm is None or not self._valid():
+            return None
+        start, end = self._record(slot)
+        record = self.nvm[start:end]
+        if unpack_from("<H", record, RECORD_SIZE - 2)[0] != (
+            crc32(record[: RECORD_SIZE - 2]) & 0xFFFF
+        ):
+            return None
+        return record
+
+    def mode(self, slot):
+        """The mode index saved in slot, or -1 if it is empty"""
+        record = self._read(slot)
+        return -1 if record is None else record[0]
+
+    def load(self, slot, state):
+        """
+        Sets state's setup fields from slot. Returns the saved mode index, or
+        -1 and leaves state alone if the slot is empty.
+        """
+        record = self._read(slot)
+        if record is None:
+            return -1
+        values = unpack_from(FORMAT, record)
+        for name, value in zip(FIELDS, values[1:]):
+            setattr(state, name, value)
+        return values[0]
+
+    def save(self, slot, mode, state):
+        """Saves mode and state's setup fields in slot, returns True if it wrote"""
+        if self.nvm is None:
+            return False
+        values = [
+            min(max(0, getattr(state, name)), limit)
+            for name, limit in zip(FIELDS, LIMITS)
+        ]
+        record = pack(FORMAT, mode, *values)
+        record += pack("<H", crc32(record) & 0xFFFF)
+        if not self._valid():
+            # First use, or another version: clear every slot in one write
+            fresh = bytearray(self.size)
+            fresh[:HEADER_SIZE] = self._header()
+            self.nvm[self.offset : self.offset + self.size] = fresh
+            self.writes += 1
+        start, end = self._record(slot)
+        if self.nvm[start:end] == record:
+            return False
+        self.nvm[start:end] = record
+        self.writes += 1
+        return True
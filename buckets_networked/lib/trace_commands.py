@@ -0,0 +1,195 @@
+"""
+Span tracing across the timerbox, buckets and speakerbox, to time a command
+from the timerbox to what it does on every other node, such as Pause turning
+every bucket's LEDs yellow.
+
+A span is one command's trip. The timerbox begins it when it sends the
+command, recorded with the command as its point, and the span ID rides on the
+ESP-NOW packet after the message:
+    Pause~1a2b
+Every node records its points of the span, with its own clock, into a ring
+fixed when it is made, and prints them over serial on request as lines of
+    trace <node> <span> <point> <t_us>
+benchmarks/trace_merge.py lines up the nodes' logs into one timeline.
+
+Nodes that receive commands read through a Trace_ESP whether they trace or
+not, with trace None when they don't, so a tagged command still works on them
+and a fleet can trace only some of its nodes.
+"""
+from array import array
+from binascii import hexlify
+
+try:
+    from time import ticks_us  # type: ignore
+
+    def clock_us():
+        return ticks_us() & TIME_MASK
+
+except ImportError:
+    from time import monotonic_ns
+
+    def clock_us():
+        return (monotonic_ns() // 1000) & TIME_MASK
+
+
+SPAN_MARK = b"~"
+TIME_MASK = 0x3FFFFFFF  # Times wrap every 17.9 minutes, trace_merge unwraps them
+NO_SPAN = -1
+# Messages the timerbox tags with a span. Configs and transfers are parsed by
+# field and are left alone, and "30" and "60" are sent on every pass of the
+# timer loop for a second, which would flood the ring. A command is matched on
+# its first field, so the Start of dashboard_commands.REPORT_START is a Start.
+TRACED = ("Start", "Pause", "Resume", "End", "10", "Active", "Inactive")
+
+
+def node_name(role, mac):
+    """role and the last 2 bytes of mac, like bucket-1a2b"""
+    return "{}-{}".format(role, hexlify(mac[-2:]).decode())
+
+
+def untag(msg):
+    """(message, span ID) of a packet, span NO_SPAN if it has none"""
+    mark = msg.rfind(SPAN_MARK)
+    if mark < 0:
+        return msg, NO_SPAN
+    try:
+        return msg[:mark], int(msg[mark + 1 :], 16)
+    except ValueError:
+        return msg, NO_SPAN
+
+
+class Tagged_Packet:
+    """A received packet with its span tag taken off"""
+
+    def __init__(self, packet, msg):
+        self.mac = packet.mac
+        self.msg = msg
+
+
+class Trace_Buffer:
+    """
+    Ring of the last `size` span points seen on this node
+
+    Attributes:
+        node (str): Node name, see node_name().
+        points (tuple): Point names, recorded by index.
+        pending (int): The span of the last tagged message received, until
+            a point is recorded with done=True, otherwise NO_SPAN.
+        last (int): The last point recorded.
+        clock: Function returning microseconds, wrapping at TIME_MASK.
+    """
+
+    def __init__(self, node, points, size=256, clock=None):
+        self.node = node
+        self.points = points
+        self.size = size
+        self.clock = clock or clock_us
+        self.spans = array("H", bytes(2 * size))
+        self.marks = bytearray(size)
+        self.times = array("L", [0]) * size
+        self.head = 0
+        self.count = 0
+        self.pending = NO_SPAN
+        self.last = 0
+        self._next = 0
+
+    def begin(self, point):
+        """Starts a span at point, returns its ID"""
+        self._next = (self._next + 1) & 0xFFFF
+        self.mark(self._next, point)
+        return self._next
+
+    def mark(self, span, point):
+        """Records that span reached point now"""
+        i = self.head
+        self.spans[i] = span
+        self.marks[i] = point
+        self.times[i] = self.clock()
+        self.last = point
+        self.head = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def end(self, point, done=True, follows=None):
+        """
+        Records point for the pending span, if there is one and, with follows,
+        the last point recorded was follows
+        """
+        if self.pending == NO_SPAN:
+            return
+        if follows is not None and self.last != follows:
+            return
+        self.mark(self.pending, point)
+        if done:
+            self.pending = NO_SPAN
+
+    def reader(self, esp, point):
+        """esp, taking tags off what it reads and recording point for them"""
+        return Trace_ESP(esp, self, point)
+
+    def after(self, obj, name, point, done=True, follows=None):
+        """
+        Wraps method `name` of obj to record point for the pending span after
+        each call, see end()
+        """
+        method = getattr(obj, name)
+
+        def traced(*args, **kwargs):
+            result = method(*args, **kwargs)
+            self.end(point, done, follows)
+            return result
+
+        setattr(obj, name, traced)
+
+    def dump(self, reset=False):
+        """Prints the points recorded, oldest first"""
+        start = (self.head - self.count) % self.size
+        for n in range(self.count):
+            i = (start + n) % self.size
+            print(
+                "trace {} {} {} {}".format(
+                    self.node, self.spans[i], self.points[self.marks[i]], self.times[i]
+                )
+            )
+        if reset:
+            self.count = 0
+
+
+class Trace_ESP:
+    """
+    Stands in for an ESPNow object. Tags TRACED messages sent with a new span,
+    takes tags off received ones and records them. With trace None it only
+    takes the tags off.
+    """
+
+    def __init__(self, esp, trace, point):
+        self.esp = esp
+        self.trace = trace
+        self.point = point
+
+    def send(self, message, peer=None):
+        command = message.split("|", 1)[0] if isinstance(message, str) else None
+        if self.trace is not None and command in TRACED:
+            span = self.trace.begin(TRACED.index(command))
+            message = "{}~{:x}".format(message, span)
+        if peer is None:
+            return self.esp.send(message)
+        return self.esp.send(message, peer)
+
+    def read(self):
+        packet = self.esp.read()
+        if packet is None or SPAN_MARK not in packet.msg:
+            return packet
+        msg, span = untag(packet.msg)
+        if span == NO_SPAN:
+            return packet
+        if self.trace is not None:
+            self.trace.pending = span
+            self.trace.mark(span, self.point)
+        return Tagged_Packet(packet, msg)
+
+    def __len__(self):
+        return len(self.esp)
+
+    def __getattr__(self, name):
+        return getattr(self.esp, name)
@@ -0,0 +1,387 @@
+"""
+Streams a file from the timerbox to every bucket at once over ESP-NOW, so code
+and assets can be updated without a USB cable.
+
+The file goes out in CHUNK_SIZE chunks, each with its own CRC, broadcast to
+all the buckets. Between rounds the sender offers the file again and each
+bucket answers with a bitmap of the chunks it is still missing, or that it is
+done, so a round only resends what some bucket lost.
+A bucket writes chunks into <path>.part and keeps its bitmap in <path>.xfer,
+so a transfer that is cut short carries on where it stopped. <path> is only
+replaced once the whole file's CRC matches.
+
+Packets are text, with base64 data, so buckets mid-game that decode every
+message just see an unknown one:
+    Xfer|O|crc|size|path         offer, also the request for status
+    Xfer|D|crc|index|crc|data    one chunk
+    Xfer|N|crc|first|bitmap      missing chunks from first on, hex, 1 = missing
+    Xfer|A|crc                   the bucket has the whole file
+"""
+import os
+from binascii import crc32, hexlify, unhexlify, a2b_base64, b2a_base64
+from espnow import Peer  # type: ignore
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+from config_commands import send_to
+
+TAG = b"Xfer|"
+# 144 bytes is 192 characters of base64, so a chunk fits in a 250 byte packet
+CHUNK_SIZE = 144
+WINDOW = 512  # Chunks covered by one NACK bitmap
+SAVE_EVERY = 16  # Chunks received between saves of the state file
+BROADCAST_MAC = b"\xff\xff\xff\xff\xff\xff"
+
+
+def file_crc(path):
+    """CRC32 of a file, read in blocks"""
+    crc = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(512)
+            if not block:
+                return crc
+            crc = crc32(block, crc)
+
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _has(bitmap, index):
+    return bitmap[index >> 3] & (1 << (index & 7))
+
+
+def recover(directory="/"):
+    """
+    Finishes or undoes swaps cut short by a reset, call from boot.py.
+    A <path>.bak without <path> is put back, one with <path> is removed.
+    """
+    names = os.listdir(directory)
+    for name in names:
+        if not name.endswith(".bak"):
+            continue
+        path = directory.rstrip("/") + "/" + name
+        if name[:-4] in names:
+            _remove(path)
+        else:
+            os.rename(path, path[:-4])
+
+
+class Transfer_Sender:
+    """
+    Sends one file to a set of buckets, in rounds, until they all have it.
+    Call step() until it returns False, and hand it every packet received.
+
+    Each round offers the file, waits wait_ms for answers, then sends every
+    chunk any bucket said it was missing, one per gap_ms.
+
+    Attributes:
+        peers (list): (bucket ID, espnow.Peer) pairs for the buckets that
+            should get the file.
+        done (list): Whether each bucket in peers has the whole file.
+        rounds (int): Rounds started.
+        sends (int): Packets sent, offers included.
+        chunks (int): The number of chunks in the file.
+    """
+
+    def __init__(
+        self,
+        esp,
+        path,
+        peers,
+        dest=None,
+        data_peer=None,
+        gap_ms=3,
+        wait_ms=300,
+        max_rounds=100,
+    ):
+        self.esp = esp
+        self.peers = peers
+        self.gap_ms = gap_ms
+        self.wait_ms = wait_ms
+        self.max_rounds = max_rounds
+        self.size = os.stat(path)[6]
+        self.chunks = (self.size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        self.crc = "{:08x}".format(file_crc(path))
+        offer = "Xfer|O|{}|{}|{}".format(self.crc, self.size, dest or path)
+        self.offer = offer.encode()
+        self.done = [False] * len(peers)
+        self.rounds = 0
+        self.sends = 0
+        self._file = open(path, "rb")
+        self._buf = bytearray(CHUNK_SIZE)
+        self._wanted = bytearray((self.chunks + 7) // 8)
+        self._next_index = self.chunks
+        self._waiting = False
+        self._next = ticks_ms()
+        # Data goes to every bucket in one send, through the broadcast peer
+        self._own_peer = data_peer is None
+        if self._own_peer:
+            data_peer = Peer(mac=BROADCAST_MAC)
+            esp.peers.append(data_peer)
+        self.data_peer = data_peer
+
+    def _send(self, msg, peer):
+        self.sends += 1
+        try:
+            self.esp.send(msg, peer)
+        except Exception:
+            # Lost like any other packet, the next round covers it
+            pass
+
+    def _send_chunk(self, index):
+        self._file.seek(index * CHUNK_SIZE)
+        count = self._file.readinto(self._buf)
+        data = self._buf if count == CHUNK_SIZE else self._buf[:count]
+        head = "Xfer|D|{}|{}|{:08x}|".format(self.crc, index, crc32(data))
+        self._send(head.encode() + b2a_base64(data).rstrip(), self.data_peer)
+
+    def step(self):
+        """Sends the next packet once it is due, returns False when finished"""
+        now = ticks_ms()
+        if ticks_diff(now, self._next) < 0:
+            return True
+        # Chunks left in this round
+        while self._next_index < self.chunks:
+            index = self._next_index
+            self._next_index += 1
+            if _has(self._wanted, index):
+                self._wanted[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+                self._send_chunk(index)
+                self._next = ticks_add(now, self.gap_ms)
+                return True
+        if all(self.done) or self.rounds >= self.max_rounds:
+            self.close()
+            return False
+        if self._waiting:
+            # Answers are in, send what was asked for
+            self._waiting = False
+            self._next_index = 0
+            return True
+        for i, (_, peer) in enumerate(self.peers):
+            if not self.done[i]:
+                self._send(self.offer, peer)
+        self.rounds += 1
+        self._waiting = True
+        self._next = ticks_add(now, self.wait_ms)
+        return True
+
+    def handle(self, packet):
+        """Takes in a bucket's answer, returns False for any other packet"""
+        if packet is None or not packet.msg.startswith(TAG):
+            return False
+        peer = -1
+        for i, (_, known) in enumerate(self.peers):
+            if known.mac == packet.mac:
+                peer = i
+        try:
+            parts = packet.msg.decode().split("|")
+            if peer < 0 or len(parts) < 3 or parts[2] != self.crc:
+                return True
+            if parts[1] == "A":
+                self.done[peer] = True
+            elif parts[1] == "N" and len(parts) == 5:
+                first = int(parts[3])
+                bitmap = unhexlify(parts[4])
+                for bit in range(min(len(bitmap) * 8, self.chunks - first)):
+                    if _has(bitmap, bit):
+                        index = first + bit
+                        self._wanted[index >> 3] |= 1 << (index & 7)
+        except ValueError:
+            pass
+        return True
+
+    def status(self):
+        """The IDs of the buckets that have the file, with - for the others"""
+        return "".join(
+            bucket_id if done else "-"
+            for (bucket_id, _), done in zip(self.peers, self.done)
+        )
+
+    def close(self):
+        """
+        Closes the file and removes the broadcast peer, which would otherwise
+        get a copy of everything the game modes send to all peers
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._own_peer:
+            try:
+                self.esp.peers.remove(self.data_peer)
+            except ValueError:
+                pass
+            self._own_peer = False
+
+
+class Transfer_Receiver:
+    """
+    Receives the files a Transfer_Sender offers, one at a time, into root.
+    Hand it every packet received while the bucket is idle.
+
+    Attributes:
+        root (str): Directory the offered paths are relative to.
+        path (str): The file being received, None when idle.
+        received (int): Chunks of it received so far.
+        on_status: Optional function called with a 2 line message when a
+            transfer starts, finishes or fails.
+    """
+
+    def __init__(self, esp, root="/", on_status=None):
+        self.esp = esp
+        self.root = root.rstrip("/") + "/"
+        self.on_status = on_status
+        self.path = None
+        self.crc = None
+        self.size = 0
+        self.chunks = 0
+        self.received = 0
+        self.bitmap = None
+        self._file = None
+        self._unsaved = 0
+        self._have = None  # crc of the last file completed or already present
+
+    def _status(self, message):
+        if self.on_status:
+            self.on_status(message)
+
+    def handle(self, packet):
+        """Acts on a transfer packet, returns False for any other packet"""
+        if packet is None or not packet.msg.startswith(TAG):
+            return False
+        try:
+            parts = packet.msg.decode().split("|")
+            if parts[1] == "O" and len(parts) == 5:
+                self._offer(packet.mac, parts[2], int(parts[3]), parts[4])
+            elif parts[1] == "D" and len(parts) == 6 and parts[2] == self.crc:
+                self._chunk(int(parts[3]), int(parts[4], 16), parts[5])
+        except OSError as e:
+            print(f"Transfer failed: {e}")
+            self._status("Update failed:\nread-only drive?")
+            self._close()
+            self.path = self.crc = None
+        except ValueError:
+            pass
+        return True
+
+    def _offer(self, mac, crc, size, path):
+        if path.startswith("/") or ".." in path:
+            return
+        if crc == self._have:
+            send_to(self.esp, mac, "Xfer|A|{}".format(crc).encode())
+            return
+        if crc != self.crc:
+            self._close()
+            target = self.root + path
+            if _exists(target) and "{:08x}".format(file_crc(target)) == crc:
+                self._have = crc
+                send_to(self.esp, mac, "Xfer|A|{}".format(crc).encode())
+                return
+            self._start(crc, size, path)
+        self._save()
+        # Report the first window of missing chunks
+        first = 0
+        while first < self.chunks and _has(self.bitmap, first):
+            first += 1
+        bits = bytearray(WINDOW // 8)
+        for bit in range(min(WINDOW, self.chunks - first)):
+            if not _has(self.bitmap, first + bit):
+                bits[bit >> 3] |= 1 << (bit & 7)
+        nack = "Xfer|N|{}|{}|{}".format(crc, first, hexlify(bits).decode())
+        send_to(self.esp, mac, nack.encode())
+
+    def _start(self, crc, size, path):
+        """Picks up a saved transfer of this file, or starts one"""
+        self.crc = crc
+        self.size = size
+        self.path = path
+        self.chunks = (size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        self.bitmap = bytearray((self.chunks + 7) // 8)
+        target = self.root + path
+        header = "{} {}\n".format(crc, size).encode()
+        try:
+            with open(target + ".xfer", "rb") as f:
+                if f.readline() == header:
+                    f.readinto(self.bitmap)
+                    self._file = open(target + ".part", "r+b")
+        except OSError:
+            self._file = None
+        if self._file is None:
+            self.bitmap = bytearray(len(self.bitmap))
+            # Write the whole file up front, so chunks can land anywhere in it
+            with open(target + ".part", "wb") as f:
+                zeros = bytes(CHUNK_SIZE)
+                for _ in range(size // CHUNK_SIZE):
+                    f.write(zeros)
+                f.write(bytes(size % CHUNK_SIZE))
+            self._file = open(target + ".part", "r+b")
+        self.received = 0
+        for index in range(self.chunks):
+            if _has(self.bitmap, index):
+                self.received += 1
+        self._status(f"Receiving:\n{path}")
+
+    def _chunk(self, index, crc, data):
+        if index >= self.chunks or _has(self.bitmap, index):
+            return
+        data = a2b_base64(data)
+        if crc32(data) != crc:
+            return
+        self._file.seek(index * CHUNK_SIZE)
+        self._file.write(data)
+        self.bitmap[index >> 3] |= 1 << (index & 7)
+        self.received += 1
+        self._unsaved += 1
+        if self.received == self.chunks:
+            self._finish()
+        elif self._unsaved >= SAVE_EVERY:
+            self._save()
+
+    def _save(self):
+        """Saves the bitmap, so a reset doesn't lose the chunks received"""
+        if self._file is None or not self._unsaved:
+            return
+        self._file.flush()
+        with open(self.root + self.path + ".xfer", "wb") as f:
+            f.write("{} {}\n".format(self.crc, self.size).encode())
+            f.write(self.bitmap)
+        self._unsaved = 0
+
+    def _finish(self):
+        """Swaps the new file in once its CRC matches"""
+        self._unsaved = 0
+        self._close()
+        target = self.root + self.path
+        if "{:08x}".format(file_crc(target + ".part")) != self.crc:
+            # Can't happen chunk by chunk, so the saved bitmap was stale
+            _remove(target + ".xfer")
+            _remove(target + ".part")
+            self.path = self.crc = None
+            return
+        # Keep the old file until the new one is in place, recover() finishes
+        # the job if the power goes in between
+        if _exists(target):
+            _remove(target + ".bak")
+            os.rename(target, target + ".bak")
+        os.rename(target + ".part", target)
+        _remove(target + ".bak")
+        _remove(target + ".xfer")
+        self._have = self.crc
+        self._status(f"Updated:\n{self.path}")
+        self.path = self.crc = None
+
+    def _close(self):
+        if self._file is not None:
+            self._save()
+            self._file.close()
+            self._file = None
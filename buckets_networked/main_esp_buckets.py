@@ -8,11 +8,12 @@ Imports
 """
 # region
 import espnow  # type: ignore
+from wifi import radio  # type: ignore
 from binascii import unhexlify
 from os import getenv
 from time import monotonic
-from asyncio import sleep, create_task, gather, run, Event
-from gc import enable, mem_free  # type: ignore
+from asyncio import sleep, create_task, gather, run, Event, enable_stats, stats_dump
+from gc import enable  # type: ignore
 from random import randint
 from hardware import (
     DISPLAY,
@@ -27,7 +28,23 @@ from hardware import (
 )
 
 # from audio_commands import Sound_Control
-from led_commands import RGB_Control, RGB_Settings
+from led_commands import (
+    RGB_Control,
+    RGB_Settings,
+    OFF,
+    RED,
+    YELLOW,
+    GREEN,
+    BLUE,
+    PURPLE,
+)
+from display_commands import Display_Control
+from memory_commands import Memory_Control, Phase_Profile
+from preset_commands import Preset_Store, LAST_PRESET, PRESET_NAMES
+from config_commands import decode_config, send_ack
+from dashboard_commands import send_state, REPORT_START
+from transfer_commands import Transfer_Receiver
+from trace_commands import Trace_Buffer, Trace_ESP, node_name
 
 # endregion
 """
@@ -36,6 +53,12 @@ Setting initial variables for use
 # region
 MODES = []
 BUCKET_IDS = ["A", "B", "C", "D", "E", "F"]
+# Team IDs, indexes into the TEAM_ tables. Another team is one more row in each.
+GREEN_TEAM, RED_TEAM, BLUE_TEAM, PURPLE_TEAM = range(4)
+TEAM_LABELS = ("Green", "Red", "Blue", "Purple")
+TEAM_COLORS = (GREEN, RED, BLUE, PURPLE)
+# (RED_LED, BLUE_LED) for each team
+TEAM_BUTTON_LEDS = ((False, False), (True, False), (False, True), (False, False))
 EXTRAS = [
     "You're a nerd",
     "Weiners",
@@ -72,7 +95,7 @@ class Game_States:
         menu_index (int): The current menu index.
         restart_index (int): The current restart index.
         lives_count (int): The number of lives remaining.
-        team (str): The team name: "Red", "Blue", or "Green".
+        team (int): The team ID: RED_TEAM, BLUE_TEAM, or GREEN_TEAM.
         game_length (int): The duration of the game in seconds.
         cap_length (int): The capture point length in seconds.
         checkpoint (int): The checkpoint value.
@@ -90,7 +113,7 @@ class Game_States:
         self.lives_count = 0
         self.id_index = 5
         self.bucket_count = 3
-        self.team = "Green"
+        self.team = GREEN_TEAM
         self.game_length = 0
         self.cap_length = 0
         self.checkpoint = 1
@@ -129,6 +152,17 @@ class Game_States:
         stop = self.bucket_interval * (self.bucket_count - (self.id_index + 1))
         return (start, stop, -1)
 
+    def activation_windows(self):
+        """
+        The (start, stop) game_length windows the current bucket is active in,
+        active while stop < game_length <= start
+        """
+        if not self.bucket_count * self.dd_loop:
+            return []
+        upper = self.bucket_interval_upper
+        lower = self.bucket_interval_lower
+        return [(upper[0], upper[1]), (lower[0], lower[1])]
+
     @property
     def game_length_str(self):
         """A formatted string representation of game length"""
@@ -158,8 +192,8 @@ class Game_States:
 
     def update_team(
         self,
-        team="Green",
-        color2="Off",
+        team=GREEN_TEAM,
+        color2=OFF,
         pattern="fill",
         delay=0.005,
         repeat=1,
@@ -167,10 +201,9 @@ class Game_States:
     ):
         """Updates button LED and RGB state based on team"""
         self.team = team
-        RED_LED.value = "Red" in team
-        BLUE_LED.value = "Blue" in team
-        print(team)
-        RGBS.update(team, color2, pattern, delay, repeat, hold)
+        RED_LED.value, BLUE_LED.value = TEAM_BUTTON_LEDS[team]
+        print(TEAM_LABELS[team])
+        RGBS.update(TEAM_COLORS[team], color2, pattern, delay, repeat, hold)
 
     def reset(self):
         """Resets all state variables to their initial values"""
@@ -179,7 +212,7 @@ class Game_States:
         self.lives_count = 0
         self.id_index = 5
         self.bucket_count = 3
-        self.team = "Green"
+        self.team = GREEN_TEAM
         self.game_length = 0
         self.cap_length = 0
         self.checkpoint = 1
@@ -191,6 +224,48 @@ class Game_States:
         self.blue_time = 0
 
 
+class Activation_Schedule:
+    """
+    A bucket's active windows compiled once at game start, so the game loop
+    only compares game_length against the next transition
+
+    Attributes:
+        edges (list): Alternating start and stop game_lengths, descending.
+        next (int): The game_length of the next transition, -1 after the last.
+        active (bool): Whether the bucket is active at the last advance().
+    """
+
+    def __init__(self, windows, game_length):
+        self.edges = []
+        for start, stop in sorted(windows, reverse=True):
+            if start <= stop:
+                continue
+            if self.edges and start >= self.edges[-1]:
+                # Overlaps or touches the window before it, so merge them
+                self.edges[-1] = min(self.edges[-1], stop)
+            else:
+                self.edges.append(start)
+                self.edges.append(stop)
+        self.index = 0
+        self.next = -1
+        self.active = False
+        self.advance(game_length)
+
+    def advance(self, game_length):
+        """Moves past the transitions game_length has reached"""
+        edges = self.edges
+        while self.index < len(edges) and game_length <= edges[self.index]:
+            self.index += 1
+        self.next = edges[self.index] if self.index < len(edges) else -1
+        self.active = self.index & 1 == 1
+
+    def until_active(self, game_length):
+        """Seconds until the next activation, or -1 if active or none are left"""
+        if self.active or self.next < 0:
+            return -1
+        return game_length - self.next
+
+
 class ENC_States:
     """Manages encoder rotation"""
 
@@ -199,15 +274,13 @@ class ENC_States:
         self.last_position = self.encoder.position
         self._was_rotated = Event()
 
-    async def update(self):
-        """Updates the pressed state of the encoder"""
-        while True:
-            if (
-                self.encoder.position != self.last_position
-                and not self._was_rotated.is_set()
-            ):
-                self._was_rotated.set()
-            await sleep(0)
+    def update(self):
+        """Updates the rotated state of the encoder"""
+        if (
+            self.encoder.position != self.last_position
+            and not self._was_rotated.is_set()
+        ):
+            self._was_rotated.set()
 
     def encoder_handler(self, x, y):
         """Handles encoder rotation"""
@@ -222,20 +295,88 @@ class ENC_States:
                 return x - y
 
 
+class Input_Wake:
+    """
+    Paces input scans so idle screens can sleep between them
+
+    Screens that only wait on input await wait() instead of sleep(0), and are
+    woken once per scan. While one is waiting, scans drop to every idle_ms so
+    the event loop can idle the CPU in between.
+    """
+
+    def __init__(self, idle_ms=20, on_idle=None):
+        self.idle = False
+        self.waking = False
+        self.idle_s = idle_ms / 1000
+        self.on_idle = on_idle
+        self._scanned = Event()
+
+    def scanned(self):
+        """Wakes any screen waiting on input, called after each scan"""
+        self.waking = self.idle
+        self._scanned.set()
+        self._scanned.clear()
+
+    async def wait(self):
+        """Waits for the next input scan"""
+        self.idle = True
+        if self.on_idle:
+            self.on_idle()
+        try:
+            await self._scanned.wait()
+        finally:
+            self.idle = self.waking = False
+
+    def pace(self):
+        """Sleep until the next scan is due"""
+        return sleep(self.idle_s if self.idle else 0)
+
+
 async def button_monitor():
-    """Async function for monitoring button presses"""
+    """Async function for monitoring button presses and encoder rotation"""
     while True:
         ENCB.update()
         REDB.update()
         BLUEB.update()
-        await sleep(0)
+        ENCS.update()
+        INPUT.scanned()
+        if INPUT.waking:
+            # Let the woken screen act on this scan first. If it moves on
+            # instead of waiting again, scan again straight away so the next
+            # screen doesn't see this scan's one-shot presses.
+            while INPUT.waking:
+                await sleep(0)
+            if not INPUT.idle:
+                continue
+        await INPUT.pace()
 
 
 initial_state = Game_States()
 ENCS = ENC_States()
+# Set GC_PERCENT in settings.toml to change how full the heap gets before collecting
+MEM = Memory_Control(getenv("GC_PERCENT") or 60)
+INPUT = Input_Wake(on_idle=MEM.safe_point)
 # SOUND = Sound_Control(AUDIO_OUT)
-RGB = RGB_Control(RGB_LED)
-RGBS = RGB_Settings(RGB)
+# LED_BUDGET_MA caps the strip's estimated draw, so full-white fills don't brown
+# out the battery. LED_BRIGHTNESS is in percent, LED_GAMMA a string like "2.2".
+RGB = RGB_Control(
+    RGB_LED,
+    budget_ma=getenv("LED_BUDGET_MA") or 1500,
+    brightness=getenv("LED_BRIGHTNESS") or 100,
+    gamma=float(getenv("LED_GAMMA") or 1),
+)
+RGBS = RGB_Settings(RGB, on_idle=MEM.safe_point)
+LCD = Display_Control(DISPLAY, on_idle=MEM.safe_point)
+PRESETS = Preset_Store()
+# A Start that came in on a standby screen, see read_config()
+HELD_START = []
+# The timerbox's Start, and its Start asking for reports to its dashboard
+STARTS = (b"Start", REPORT_START.encode())
+# Per-second status screens, filled in place by LCD.show
+SCORE = LCD.template("RED:  {t}\nBLUE: {t}")
+NEXT_SCORE = LCD.template("Next in {t}\nR {t}  B {t}")
+TEAM_CLOCK = tuple(LCD.template(f"{label} Team\n{{t}}") for label in TEAM_LABELS)
+COUNTDOWN = LCD.template("Countdown\n{t}")
 
 # endregion
 """
@@ -249,14 +390,22 @@ def time_string(seconds):
     return f"{seconds // 60:02d}:{seconds % 60:02d}"
 
 
+def show_crazyking(state, schedule):
+    """Scores, with a countdown while the bucket waits for its next window"""
+    wait = schedule.until_active(state.game_length)
+    if wait < 0:
+        LCD.show(SCORE, state.red_time, state.blue_time)
+    else:
+        LCD.show(NEXT_SCORE, wait, state.red_time, state.blue_time)
+
+
 def display_message(message):
     """
-    Displays a string to the 1602 LCD
+    Displays a string to the 1602 LCD, drawn in the background by LCD.display_control
 
     Note: if a line is already 16chars when a n\\ is added, it will skip the next line
     """
-    DISPLAY.clear()
-    DISPLAY.write(message)
+    LCD.update(message)
 
 
 # endregion
@@ -266,28 +415,138 @@ Primary function to select GameMode instance, then pass control to it
 # region
 
 
+def menu_message(presets):
+    """The main menu entry at menu_index, a mode or a saved setup"""
+    index = initial_state.menu_index
+    if index < len(MODES):
+        return f"Select a game:\n{MODES[index].name}"
+    slot, mode = presets[index - len(MODES)]
+    return f"{PRESET_NAMES[slot]}:\n{MODES[mode].name}"
+
+
 async def main_menu():
     """Main menu for scrolling and displaying game options"""
+    HELD_START.clear()
     display_message(EXTRAS[randint(0, len(EXTRAS) - 1)])
     RGBS.update(pattern="solid")
     await sleep(0.5)
-    for color in ["Red", "Blue", "Green"]:
-        initial_state.update_team(color, hold=True)
+    for team in (RED_TEAM, BLUE_TEAM, GREEN_TEAM):
+        initial_state.update_team(team, hold=True)
         while RGBS.hold:
             await sleep(0)
-    display_message(f"Select a game:\n{MODES[initial_state.menu_index].name}")
+    # Saved setups follow the modes in the menu, as (slot, mode index)
+    presets = []
+    for slot in range(PRESETS.slots):
+        mode = PRESETS.mode(slot)
+        if 0 <= mode < len(MODES):
+            presets.append((slot, mode))
+    display_message(menu_message(presets))
     while True:
         if ENCS._was_rotated.is_set():
             initial_state.menu_index = ENCS.encoder_handler(
                 initial_state.menu_index, 1
-            ) % len(MODES)
-            display_message(f"Select a game:\n{MODES[initial_state.menu_index].name}")
+            ) % (len(MODES) + len(presets))
+            display_message(menu_message(presets))
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        if ENCB.long_press:
+            dump_stats()
+        mode = read_config()
+        if mode >= 0:
+            await ready_mode(mode, armed=True)
+            return
+        await INPUT.wait()
     await sleep(0.1)
-    display_message(f"Running:\n{MODES[initial_state.menu_index].name}")
-    await MODES[initial_state.menu_index].game_setup()
+    if initial_state.menu_index < len(MODES):
+        display_message(f"Running:\n{MODES[initial_state.menu_index].name}")
+        await MODES[initial_state.menu_index].game_setup()
+        return
+    slot = presets[initial_state.menu_index - len(MODES)][0]
+    await ready_mode(PRESETS.load(slot, initial_state))
+
+
+async def ready_mode(mode, armed=False):
+    """
+    Goes straight to a mode's standby screen, skipping the setup screens, for a
+    preset or a config from the timerbox already in initial_state. armed, for
+    a config, takes a mode that uses the TimerBox on to waiting for its Start.
+    """
+    initial_state.menu_index = mode
+    game_mode = MODES[mode]
+    display_message(f"Running:\n{game_mode.name}")
+    if game_mode.has_team:
+        initial_state.update_team(initial_state.team, delay=0.0025)
+    await game_mode.standby_screen(armed)
+
+
+def read_config(hold_start=False):
+    """
+    Applies a game config from the timerbox to initial_state and acks it, if
+    one has arrived. Returns the config's mode index, or -1.
+    File transfers are handed to RECEIVER. With hold_start, a Start from the
+    timerbox is kept in HELD_START for wait_for_timer(), until a config
+    replaces the game it was for. Other packets are dropped, the screens that
+    call this don't use them.
+    """
+    packet = ESP.read()
+    config = None
+    while packet is not None:
+        config = decode_config(packet.msg)
+        if config is not None:
+            break
+        if hold_start and packet.msg in STARTS:
+            HELD_START[:] = [packet]
+        elif RECEIVER:
+            RECEIVER.handle(packet)
+        packet = ESP.read()
+    if config is None:
+        return -1
+    mode = -1
+    for i, game_mode in enumerate(MODES):
+        if game_mode.name == config.mode:
+            mode = i
+    if mode < 0:
+        print(f"Config for unknown mode {config.mode}")
+        return -1
+    config.apply(initial_state)
+    HELD_START.clear()
+    bucket_id = config.bucket_id(radio.mac_address)
+    if bucket_id in BUCKET_IDS:
+        initial_state.id_index = BUCKET_IDS.index(bucket_id)
+    send_ack(ESP, packet.mac, config)
+    return mode
+
+
+def report_state(mac, state):
+    """
+    Reports the team and score to the timerbox at mac for its dashboard, see
+    dashboard_commands.py. mac is None when the game wasn't started by a
+    timerbox running a dashboard.
+    """
+    if mac is not None:
+        send_state(ESP, mac, state.team, state.red_time, state.blue_time)
+
+
+async def wait_for_timer(state):
+    """
+    Blinks the team color until the timerbox's Start, or a double press of the
+    encoder to play without it. Returns the MAC to report the state to, that of
+    a timerbox whose Start asked for reports, otherwise None.
+    """
+    display_message("Waiting for timer...")
+    RGBS.update(color1=TEAM_COLORS[state.team], pattern="single_blink_cycle", repeat=-1)
+    while True:
+        msg = None
+        if HELD_START:
+            msg = HELD_START.pop()
+        elif ESP:
+            msg = ESP.read()
+        if msg is not None and msg.msg in STARTS:
+            await sleep(6)
+            return msg.mac if msg.msg == STARTS[1] else None
+        if ENCB.short_count > 1:
+            return None
+        await sleep(0)
 
 
 # endregion
@@ -301,33 +560,39 @@ async def start_attrition(game_mode):
     """Function for Attrition game mode"""
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
-    display_message(f"{local_state.team} Lives Left\n{local_state.lives_count}")
-    RGBS.update(local_state.team)
+    lives = LCD.template(f"{TEAM_LABELS[local_state.team]} Lives Left\n{{d}}")
+    LCD.show(lives, local_state.lives_count)
+    RGBS.update(TEAM_COLORS[local_state.team])
     while local_state.lives_count > 0:
         if REDB.short_count > 0 or BLUEB.short_count > 0:
             local_state.lives_count -= 1
-            display_message(f"{local_state.team} Lives Left\n{local_state.lives_count}")
-            RGBS.update(color2=local_state.team, pattern="fill_cycle", delay=0.001)
+            LCD.show(lives, local_state.lives_count)
+            RGBS.update(
+                color2=TEAM_COLORS[local_state.team], pattern="fill_cycle", delay=0.001
+            )
             await sleep(0)
         if REDB.long_press or BLUEB.long_press:
             local_state.lives_count = min(
                 initial_state.lives_count, local_state.lives_count + 1
             )
-            display_message(f"{local_state.team} Lives Left\n{local_state.lives_count}")
+            LCD.show(lives, local_state.lives_count)
             await sleep(0)
         if ENCB.long_press:
             display_message("exiting...")
             await sleep(0.5)
             break
         await sleep(0)
-    display_message(f"{local_state.team} Lives Left\n{local_state.lives_count}")
+    LCD.show(lives, local_state.lives_count)
     RGBS.update(
-        color1=local_state.team, color2="Green", pattern="fill_cycle", repeat=-1
+        color1=TEAM_COLORS[local_state.team],
+        color2=GREEN,
+        pattern="fill_cycle",
+        repeat=-1,
     )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -336,21 +601,20 @@ async def start_deathclicks(game_mode):
     """Function for Death Clicks game mode"""
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
-    display_message(f"{local_state.team} team\nDeaths {local_state.lives_count}")
-    RGBS.update(local_state.team)
+    deaths = LCD.template(f"{TEAM_LABELS[local_state.team]} team\nDeaths {{d}}")
+    LCD.show(deaths, local_state.lives_count)
+    RGBS.update(TEAM_COLORS[local_state.team])
     while not ENCB.long_press:
         if REDB.short_count > 0 or BLUEB.short_count > 0:
             local_state.lives_count += 1
-            display_message(
-                f"{local_state.team} team\nDeaths {local_state.lives_count}"
+            LCD.show(deaths, local_state.lives_count)
+            RGBS.update(
+                color2=TEAM_COLORS[local_state.team], pattern="fill_cycle", delay=0.001
             )
-            RGBS.update(color2=local_state.team, pattern="fill_cycle", delay=0.001)
             await sleep(0)
         if REDB.long_press or BLUEB.long_press:
             local_state.lives_count = max(0, local_state.lives_count - 1)
-            display_message(
-                f"{local_state.team} team\nDeaths {local_state.lives_count}"
-            )
+            LCD.show(deaths, local_state.lives_count)
             await sleep(0)
         await sleep(0)
     await sleep(0.1)
@@ -361,10 +625,11 @@ async def start_control(game_mode):
     """Function for Control game mode"""
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
-    display_message(
-        f"{game_mode.name} {local_state.game_length_str}\n{local_state.team} {local_state.cap_length_str}"
+    status = LCD.template(
+        f"{game_mode.name} {{t}}\n{TEAM_LABELS[local_state.team]} {{t}}"
     )
-    RGBS.update(color1="Green")
+    LCD.show(status, local_state.game_length, local_state.cap_length)
+    RGBS.update(color1=GREEN)
     clock = monotonic()
     await sleep(0)
     while (local_state.game_length > 0 and not local_state.cap_state) or (
@@ -376,17 +641,15 @@ async def start_control(game_mode):
                 local_state.cap_length = (
                     (local_state.cap_length - 1) // local_state.checkpoint + 1
                 ) * local_state.checkpoint
-                RGBS.update(color1="Green", delay=0.001)
+                RGBS.update(color1=GREEN, delay=0.001)
             if REDB.fell or BLUEB.fell:
                 local_state.cap_state = True
-                RGBS.update(color1=local_state.team, delay=0.001)
+                RGBS.update(color1=TEAM_COLORS[local_state.team], delay=0.001)
             if monotonic() - clock >= 1:
                 local_state.game_length = max(0, local_state.game_length - 1)
                 if local_state.cap_state:
                     local_state.cap_length -= 1
-                display_message(
-                    f"{game_mode.name} {local_state.game_length_str}\n{local_state.team} {local_state.cap_length_str}"
-                )
+                LCD.show(status, local_state.game_length, local_state.cap_length)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -397,16 +660,16 @@ async def start_control(game_mode):
         await sleep(0)
     if local_state.cap_length == 0:
         display_message(f"{game_mode.name} {local_state.cap_length_str}\nPoint Locked")
-        RGBS.update(color1=local_state.team, pattern="fill_cycle", repeat=-1)
-    else:
-        display_message(
-            f"{game_mode.name} {local_state.game_length_str}\n{local_state.team} {local_state.cap_length_str}"
+        RGBS.update(
+            color1=TEAM_COLORS[local_state.team], pattern="fill_cycle", repeat=-1
         )
+    else:
+        LCD.show(status, local_state.game_length, local_state.cap_length)
         RGBS.update()
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -414,17 +677,16 @@ async def start_control(game_mode):
 async def start_crazyking(game_mode):
     """Function for DoorDash/moving KotH game mode"""
     local_state = initial_state.shallow_copy()
-    await sleep(0.5)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
+    schedule = Activation_Schedule(
+        initial_state.activation_windows(), local_state.game_length
     )
+    await sleep(0.5)
+    show_crazyking(local_state, schedule)
     clock = monotonic()
     await sleep(0)
     while local_state.game_length > 0:
         if local_state.timer_state:
-            if local_state.game_length in range(
-                *initial_state.bucket_interval_upper
-            ) or local_state.game_length in range(*initial_state.bucket_interval_lower):
+            if schedule.active:
                 if not local_state.cap_state:
                     local_state.update_team()
                     local_state.cap_state = True
@@ -433,22 +695,22 @@ async def start_crazyking(game_mode):
                     RGBS.update(delay=0.0025)
                     local_state.cap_state = False
             if local_state.cap_state:
-                if REDB.fell and local_state.team != "Red":
-                    local_state.update_team("Red", delay=0.0025)
-                elif BLUEB.fell and local_state.team != "Blue":
-                    local_state.update_team("Blue", delay=0.0025)
+                if REDB.fell and local_state.team != RED_TEAM:
+                    local_state.update_team(RED_TEAM, delay=0.0025)
+                elif BLUEB.fell and local_state.team != BLUE_TEAM:
+                    local_state.update_team(BLUE_TEAM, delay=0.0025)
                 if BLUEB.long_press and REDB.long_press:
-                    local_state.update_team("Green", delay=0.0025)
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             if monotonic() - clock >= 1:
                 local_state.game_length -= 1
                 if local_state.cap_state:
-                    if local_state.team == "Red":
+                    if local_state.team == RED_TEAM:
                         local_state.red_time += 1
-                    elif local_state.team == "Blue":
+                    elif local_state.team == BLUE_TEAM:
                         local_state.blue_time += 1
-                display_message(
-                    f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-                )
+                if local_state.game_length <= schedule.next:
+                    schedule.advance(local_state.game_length)
+                show_crazyking(local_state, schedule)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -457,28 +719,33 @@ async def start_crazyking(game_mode):
             await sleep(0.5)
             break
         await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     if local_state.red_time > local_state.blue_time:
         local_state.update_team(
-            team="Red", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=RED_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     elif local_state.blue_time > local_state.red_time:
         local_state.update_team(
-            team="Blue", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=BLUE_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     else:
         local_state.update_team(
-            team="Purple", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=PURPLE_TEAM,
+            color2=GREEN,
+            pattern="fill_cycle",
+            delay=0.0025,
+            repeat=-1,
         )
     RGBS.update(
-        color1=local_state.team, color2="Green", pattern="fill_cycle", repeat=-1
+        color1=TEAM_COLORS[local_state.team],
+        color2=GREEN,
+        pattern="fill_cycle",
+        repeat=-1,
     )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -489,23 +756,8 @@ async def start_crazykingw(game_mode):
     await sleep(0.5)
     message = b"empty"
     msg_dec = message.decode()
-    display_message("Waiting for timer...")
-    RGBS.update(color1=local_state.team, pattern="single_blink_cycle", repeat=-1)
-    while True:
-        if ESP:
-            msg = ESP.read()
-            if msg.msg is not None and msg.msg != message:
-                message = msg.msg
-                msg_dec = message.decode()
-                if msg_dec == "Start":
-                    await sleep(6)
-                    break
-        if ENCB.short_count > 1:
-            break
-        await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    dashboard = await wait_for_timer(local_state)
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     await sleep(0)
     local_state.update_team()
     clock = monotonic()
@@ -513,21 +765,20 @@ async def start_crazykingw(game_mode):
     while True:
         if local_state.timer_state:
             if local_state.cap_state:
-                if REDB.fell and local_state.team != "Red":
-                    local_state.update_team("Red", delay=0.0025)
-                elif BLUEB.fell and local_state.team != "Blue":
-                    local_state.update_team("Blue", delay=0.0025)
+                if REDB.fell and local_state.team != RED_TEAM:
+                    local_state.update_team(RED_TEAM, delay=0.0025)
+                elif BLUEB.fell and local_state.team != BLUE_TEAM:
+                    local_state.update_team(BLUE_TEAM, delay=0.0025)
                 if BLUEB.long_press and REDB.long_press:
-                    local_state.update_team("Green", delay=0.0025)
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             if monotonic() - clock >= 1:
                 if local_state.cap_state:
-                    if local_state.team == "Red":
+                    if local_state.team == RED_TEAM:
                         local_state.red_time += 1
-                    elif local_state.team == "Blue":
+                    elif local_state.team == BLUE_TEAM:
                         local_state.blue_time += 1
-                display_message(
-                    f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-                )
+                LCD.show(SCORE, local_state.red_time, local_state.blue_time)
+                report_state(dashboard, local_state)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -543,11 +794,11 @@ async def start_crazykingw(game_mode):
                 msg_dec = message.decode()
                 if msg_dec == "Pause":
                     local_state.timer_state = False
-                    RGBS.update("Yellow", delay=0.0025)
+                    RGBS.update(YELLOW, delay=0.0025)
                 elif msg_dec == "Resume":
                     local_state.timer_state = True
                     if local_state.cap_state:
-                        RGBS.update(local_state.team, delay=0.0025)
+                        RGBS.update(TEAM_COLORS[local_state.team], delay=0.0025)
                     else:
                         RGBS.update(delay=0.0025)
                 elif msg_dec == "Active":
@@ -560,25 +811,27 @@ async def start_crazykingw(game_mode):
                 elif msg_dec == "End":
                     break
         await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     if local_state.red_time > local_state.blue_time:
         local_state.update_team(
-            team="Red", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=RED_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     elif local_state.blue_time > local_state.red_time:
         local_state.update_team(
-            team="Blue", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=BLUE_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     else:
         local_state.update_team(
-            team="Purple", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=PURPLE_TEAM,
+            color2=GREEN,
+            pattern="fill_cycle",
+            delay=0.0025,
+            repeat=-1,
         )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -587,9 +840,7 @@ async def start_domination(game_mode):
     """Function for Domination game mode"""
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     await sleep(0)
     local_state.update_team()
     clock = monotonic()
@@ -597,24 +848,22 @@ async def start_domination(game_mode):
     while local_state.game_length > 0:
         if local_state.timer_state:
             if REDB.long_press:
-                if local_state.team != "Red":
-                    local_state.update_team("Red", delay=0.0025)
-                elif local_state.team == "Red":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != RED_TEAM:
+                    local_state.update_team(RED_TEAM, delay=0.0025)
+                elif local_state.team == RED_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             elif BLUEB.long_press:
-                if local_state.team != "Blue":
-                    local_state.update_team("Blue", delay=0.0025)
-                elif local_state.team == "Blue":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != BLUE_TEAM:
+                    local_state.update_team(BLUE_TEAM, delay=0.0025)
+                elif local_state.team == BLUE_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             if monotonic() - clock >= 1:
                 local_state.game_length -= 1
-                if local_state.team == "Red":
+                if local_state.team == RED_TEAM:
                     local_state.red_time += 1
-                elif local_state.team == "Blue":
+                elif local_state.team == BLUE_TEAM:
                     local_state.blue_time += 1
-                display_message(
-                    f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-                )
+                LCD.show(SCORE, local_state.red_time, local_state.blue_time)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -623,25 +872,27 @@ async def start_domination(game_mode):
             await sleep(0.5)
             break
         await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     if local_state.red_time > local_state.blue_time:
         local_state.update_team(
-            team="Red", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=RED_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     elif local_state.blue_time > local_state.red_time:
         local_state.update_team(
-            team="Blue", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=BLUE_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     else:
         local_state.update_team(
-            team="Purple", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=PURPLE_TEAM,
+            color2=GREEN,
+            pattern="fill_cycle",
+            delay=0.0025,
+            repeat=-1,
         )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -652,23 +903,8 @@ async def start_dominationw(game_mode):
     await sleep(0.5)
     message = b"empty"
     msg_dec = message.decode()
-    display_message("Waiting for timer...")
-    RGBS.update(color1=local_state.team, pattern="single_blink_cycle", repeat=-1)
-    while True:
-        if ESP:
-            msg = ESP.read()
-            if msg.msg is not None and msg.msg != message:
-                message = msg.msg
-                msg_dec = message.decode()
-                if msg_dec == "Start":
-                    await sleep(6)
-                    break
-        if ENCB.short_count > 1:
-            break
-        await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    dashboard = await wait_for_timer(local_state)
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     await sleep(0)
     local_state.update_team()
     clock = monotonic()
@@ -676,23 +912,22 @@ async def start_dominationw(game_mode):
     while True:
         if local_state.timer_state:
             if REDB.long_press:
-                if local_state.team != "Red":
-                    local_state.update_team("Red", delay=0.0025)
-                elif local_state.team == "Red":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != RED_TEAM:
+                    local_state.update_team(RED_TEAM, delay=0.0025)
+                elif local_state.team == RED_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             elif BLUEB.long_press:
-                if local_state.team != "Blue":
-                    local_state.update_team("Blue", delay=0.0025)
-                elif local_state.team == "Blue":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != BLUE_TEAM:
+                    local_state.update_team(BLUE_TEAM, delay=0.0025)
+                elif local_state.team == BLUE_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             if monotonic() - clock >= 1:
-                if local_state.team == "Red":
+                if local_state.team == RED_TEAM:
                     local_state.red_time += 1
-                elif local_state.team == "Blue":
+                elif local_state.team == BLUE_TEAM:
                     local_state.blue_time += 1
-                display_message(
-                    f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-                )
+                LCD.show(SCORE, local_state.red_time, local_state.blue_time)
+                report_state(dashboard, local_state)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -708,32 +943,34 @@ async def start_dominationw(game_mode):
                 msg_dec = message.decode()
                 if msg_dec == "Pause":
                     local_state.timer_state = False
-                    RGBS.update("Yellow", delay=0.0025)
+                    RGBS.update(YELLOW, delay=0.0025)
                 elif msg_dec == "Resume":
                     local_state.timer_state = True
-                    RGBS.update(local_state.team, delay=0.0025)
+                    RGBS.update(TEAM_COLORS[local_state.team], delay=0.0025)
                 elif msg_dec == "End":
                     break
         await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     if local_state.red_time > local_state.blue_time:
         local_state.update_team(
-            team="Red", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=RED_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     elif local_state.blue_time > local_state.red_time:
         local_state.update_team(
-            team="Blue", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=BLUE_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     else:
         local_state.update_team(
-            team="Purple", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=PURPLE_TEAM,
+            color2=GREEN,
+            pattern="fill_cycle",
+            delay=0.0025,
+            repeat=-1,
         )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -744,23 +981,8 @@ async def start_kothw(game_mode):
     await sleep(0.5)
     message = b"empty"
     msg_dec = message.decode()
-    display_message("Waiting for timer...")
-    RGBS.update(color1=local_state.team, pattern="single_blink_cycle", repeat=-1)
-    while True:
-        if ESP:
-            msg = ESP.read()
-            if msg.msg is not None and msg.msg != message:
-                message = msg.msg
-                msg_dec = message.decode()
-                if msg_dec == "Start":
-                    await sleep(6)
-                    break
-        if ENCB.short_count > 1:
-            break
-        await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    dashboard = await wait_for_timer(local_state)
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     await sleep(0)
     local_state.update_team()
     clock = monotonic()
@@ -768,23 +990,22 @@ async def start_kothw(game_mode):
     while True:
         if local_state.timer_state:
             if REDB.long_press:
-                if local_state.team != "Red":
-                    local_state.update_team("Red", delay=0.0025)
-                elif local_state.team == "Red":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != RED_TEAM:
+                    local_state.update_team(RED_TEAM, delay=0.0025)
+                elif local_state.team == RED_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             elif BLUEB.long_press:
-                if local_state.team != "Blue":
-                    local_state.update_team("Blue", delay=0.0025)
-                elif local_state.team == "Blue":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != BLUE_TEAM:
+                    local_state.update_team(BLUE_TEAM, delay=0.0025)
+                elif local_state.team == BLUE_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             if monotonic() - clock >= 1:
-                if local_state.team == "Red":
+                if local_state.team == RED_TEAM:
                     local_state.red_time += 1
-                elif local_state.team == "Blue":
+                elif local_state.team == BLUE_TEAM:
                     local_state.blue_time += 1
-                display_message(
-                    f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-                )
+                LCD.show(SCORE, local_state.red_time, local_state.blue_time)
+                report_state(dashboard, local_state)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -800,32 +1021,34 @@ async def start_kothw(game_mode):
                 msg_dec = message.decode()
                 if msg_dec == "Pause":
                     local_state.timer_state = False
-                    RGBS.update("Yellow", delay=0.0025)
+                    RGBS.update(YELLOW, delay=0.0025)
                 elif msg_dec == "Resume":
                     local_state.timer_state = True
-                    RGBS.update(local_state.team, delay=0.0025)
+                    RGBS.update(TEAM_COLORS[local_state.team], delay=0.0025)
                 elif msg_dec == "End":
                     break
         await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     if local_state.red_time > local_state.blue_time:
         local_state.update_team(
-            team="Red", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=RED_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     elif local_state.blue_time > local_state.red_time:
         local_state.update_team(
-            team="Blue", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=BLUE_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     else:
         local_state.update_team(
-            team="Purple", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=PURPLE_TEAM,
+            color2=GREEN,
+            pattern="fill_cycle",
+            delay=0.0025,
+            repeat=-1,
         )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -836,9 +1059,7 @@ async def start_lockout(game_mode):
     await sleep(0.5)
     local_state.red_time = local_state.game_length
     local_state.blue_time = local_state.game_length
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     await sleep(0)
     local_state.update_team()
     clock = monotonic()
@@ -846,23 +1067,21 @@ async def start_lockout(game_mode):
     while local_state.red_time > 0 and local_state.blue_time > 0:
         if local_state.timer_state:
             if REDB.long_press:
-                if local_state.team != "Red":
-                    local_state.update_team("Red", delay=0.0025)
-                elif local_state.team == "Red":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != RED_TEAM:
+                    local_state.update_team(RED_TEAM, delay=0.0025)
+                elif local_state.team == RED_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             elif BLUEB.long_press:
-                if local_state.team != "Blue":
-                    local_state.update_team("Blue", delay=0.0025)
-                elif local_state.team == "Blue":
-                    local_state.update_team("Green", delay=0.0025)
+                if local_state.team != BLUE_TEAM:
+                    local_state.update_team(BLUE_TEAM, delay=0.0025)
+                elif local_state.team == BLUE_TEAM:
+                    local_state.update_team(GREEN_TEAM, delay=0.0025)
             if monotonic() - clock >= 1:
-                if local_state.team == "Red":
+                if local_state.team == RED_TEAM:
                     local_state.red_time -= 1
-                elif local_state.team == "Blue":
+                elif local_state.team == BLUE_TEAM:
                     local_state.blue_time -= 1
-                display_message(
-                    f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-                )
+                LCD.show(SCORE, local_state.red_time, local_state.blue_time)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -871,16 +1090,17 @@ async def start_lockout(game_mode):
             await sleep(0.5)
             break
         await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     RGBS.update(
-        color1=local_state.team, color2="Green", pattern="fill_cycle", repeat=-1
+        color1=TEAM_COLORS[local_state.team],
+        color2=GREEN,
+        pattern="fill_cycle",
+        repeat=-1,
     )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -890,7 +1110,7 @@ async def start_territory(game_mode):
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
     hold_time = 0
-    display_message(f"{local_state.team} Team\n{local_state.game_length_str}")
+    LCD.show(TEAM_CLOCK[local_state.team], local_state.game_length)
     await sleep(0)
     local_state.update_team()
     clock = monotonic()
@@ -900,10 +1120,10 @@ async def start_territory(game_mode):
             if REDB.fell or BLUEB.fell:
                 hold_time = monotonic()
                 local_state.cap_state = True
-                color = "Red" if REDB.fell else "Blue"
+                color = RED if REDB.fell else BLUE
                 RGBS.update(
                     color1=color,
-                    color2=local_state.team,
+                    color2=TEAM_COLORS[local_state.team],
                     pattern="solid_blink",
                     delay=0.25,
                     repeat=-1,
@@ -916,32 +1136,28 @@ async def start_territory(game_mode):
                 and monotonic() - hold_time >= local_state.long_ms / 1000
             ):
                 if not REDB.value:
-                    if local_state.team == "Green":
-                        local_state.update_team(team="Red", delay=0.0025)
-                    elif local_state.team == "Blue":
-                        local_state.update_team(team="Green", delay=0.0025)
+                    if local_state.team == GREEN_TEAM:
+                        local_state.update_team(team=RED_TEAM, delay=0.0025)
+                    elif local_state.team == BLUE_TEAM:
+                        local_state.update_team(team=GREEN_TEAM, delay=0.0025)
                 elif not BLUEB.value:
-                    if local_state.team == "Green":
-                        local_state.update_team(team="Blue", delay=0.0025)
-                    elif local_state.team == "Red":
-                        local_state.update_team(team="Green", delay=0.0025)
+                    if local_state.team == GREEN_TEAM:
+                        local_state.update_team(team=BLUE_TEAM, delay=0.0025)
+                    elif local_state.team == RED_TEAM:
+                        local_state.update_team(team=GREEN_TEAM, delay=0.0025)
                 hold_time = monotonic()
-                color = "Red" if not REDB.value else "Blue"
+                color = RED if not REDB.value else BLUE
                 RGBS.update(
                     color1=color,
-                    color2=local_state.team,
+                    color2=TEAM_COLORS[local_state.team],
                     pattern="solid_blink",
                     delay=0.25,
                     repeat=-1,
                 )
-                display_message(
-                    f"{local_state.team} Team \n{local_state.game_length_str}"
-                )
+                LCD.show(TEAM_CLOCK[local_state.team], local_state.game_length)
             if monotonic() - clock >= 1:
                 local_state.game_length -= 1
-                display_message(
-                    f"{local_state.team} Team\n{local_state.game_length_str}"
-                )
+                LCD.show(TEAM_CLOCK[local_state.team], local_state.game_length)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -951,12 +1167,12 @@ async def start_territory(game_mode):
             await sleep(0.5)
             break
         await sleep(0)
-    display_message(f"{local_state.team} Team\nPoint Locked")
-    RGBS.update(color1=local_state.team, pattern="fill_cycle", repeat=-1)
+    display_message(f"{TEAM_LABELS[local_state.team]} Team\nPoint Locked")
+    RGBS.update(color1=TEAM_COLORS[local_state.team], pattern="fill_cycle", repeat=-1)
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -968,23 +1184,11 @@ async def start_territoryw(game_mode):
     hold_time = 0
     message = b"empty"
     msg_dec = message.decode()
-    display_message("Waiting for timer...")
-    RGBS.update(color1=local_state.team, pattern="single_blink_cycle", repeat=-1)
-    while True:
-        if ESP:
-            msg = ESP.read()
-            if msg.msg is not None and msg.msg != message:
-                message = msg.msg
-                msg_dec = message.decode()
-                if msg_dec == "Start":
-                    await sleep(6)
-                    break
-        if ENCB.short_count > 1:
-            break
-        await sleep(0)
-    display_message(f"{local_state.team} Team\n{local_state.game_length_str}")
+    dashboard = await wait_for_timer(local_state)
+    LCD.show(TEAM_CLOCK[local_state.team], local_state.game_length)
     await sleep(0)
     local_state.update_team()
+    report_state(dashboard, local_state)
     clock = monotonic()
     await sleep(0)
     while True:
@@ -992,10 +1196,10 @@ async def start_territoryw(game_mode):
             if REDB.fell or BLUEB.fell:
                 hold_time = monotonic()
                 local_state.cap_state = True
-                color = "Red" if REDB.fell else "Blue"
+                color = RED if REDB.fell else BLUE
                 RGBS.update(
                     color1=color,
-                    color2=local_state.team,
+                    color2=TEAM_COLORS[local_state.team],
                     pattern="solid_blink",
                     delay=0.25,
                     repeat=-1,
@@ -1008,27 +1212,26 @@ async def start_territoryw(game_mode):
                 and monotonic() - hold_time >= local_state.long_ms / 1000
             ):
                 if not REDB.value:
-                    if local_state.team == "Green":
-                        local_state.update_team(team="Red", delay=0.0025)
-                    elif local_state.team == "Blue":
-                        local_state.update_team(team="Green", delay=0.0025)
+                    if local_state.team == GREEN_TEAM:
+                        local_state.update_team(team=RED_TEAM, delay=0.0025)
+                    elif local_state.team == BLUE_TEAM:
+                        local_state.update_team(team=GREEN_TEAM, delay=0.0025)
                 elif not BLUEB.value:
-                    if local_state.team == "Green":
-                        local_state.update_team(team="Blue", delay=0.0025)
-                    elif local_state.team == "Red":
-                        local_state.update_team(team="Green", delay=0.0025)
+                    if local_state.team == GREEN_TEAM:
+                        local_state.update_team(team=BLUE_TEAM, delay=0.0025)
+                    elif local_state.team == RED_TEAM:
+                        local_state.update_team(team=GREEN_TEAM, delay=0.0025)
                 hold_time = monotonic()
-                color = "Red" if not REDB.value else "Blue"
+                color = RED if not REDB.value else BLUE
                 RGBS.update(
                     color1=color,
-                    color2=local_state.team,
+                    color2=TEAM_COLORS[local_state.team],
                     pattern="solid_blink",
                     delay=0.25,
                     repeat=-1,
                 )
-                display_message(
-                    f"{local_state.team} Team \n{local_state.game_length_str}"
-                )
+                LCD.show(TEAM_CLOCK[local_state.team], local_state.game_length)
+                report_state(dashboard, local_state)
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
             await sleep(0.1)
@@ -1045,19 +1248,19 @@ async def start_territoryw(game_mode):
                 if msg_dec == "Pause":
                     local_state.timer_state = False
                     local_state.cap_state = False
-                    RGBS.update("Yellow", delay=0.0025)
+                    RGBS.update(YELLOW, delay=0.0025)
                 elif msg_dec == "Resume":
                     local_state.timer_state = True
-                    RGBS.update(local_state.team, delay=0.0025)
+                    RGBS.update(TEAM_COLORS[local_state.team], delay=0.0025)
                 elif msg_dec == "End":
                     break
         await sleep(0)
-    display_message(f"{local_state.team} Team\nPoint Locked")
-    RGBS.update(color1=local_state.team, pattern="fill_cycle", repeat=-1)
+    display_message(f"{TEAM_LABELS[local_state.team]} Team\nPoint Locked")
+    RGBS.update(color1=TEAM_COLORS[local_state.team], pattern="fill_cycle", repeat=-1)
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -1067,11 +1270,11 @@ async def start_hotpockets(game_mode):
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
     hold_time = 0
-    display_message(f"Countdown\n{local_state.game_length_str}")
+    LCD.show(COUNTDOWN, local_state.game_length)
     clock = monotonic()
     RGBS.update(
-        color1="Green",
-        color2="Purple",
+        color1=GREEN,
+        color2=PURPLE,
         pattern="solid_blink",
         delay=0.5,
         repeat=-1,
@@ -1080,7 +1283,7 @@ async def start_hotpockets(game_mode):
     while local_state.game_length > 0:
         if monotonic() - clock >= 1:
             local_state.game_length -= 1
-            display_message(f"Countdown\n{local_state.game_length_str}")
+            LCD.show(COUNTDOWN, local_state.game_length)
             clock = monotonic()
         await sleep(0)
     display_message(f"HotPockets\nHill neutral")
@@ -1091,10 +1294,10 @@ async def start_hotpockets(game_mode):
             if REDB.fell or BLUEB.fell:
                 hold_time = monotonic()
                 local_state.cap_state = True
-                color = "Red" if REDB.fell else "Blue"
+                color = RED if REDB.fell else BLUE
                 RGBS.update(
                     color1=color,
-                    color2=local_state.team,
+                    color2=TEAM_COLORS[local_state.team],
                     pattern="solid_blink",
                     delay=0.25,
                     repeat=-1,
@@ -1107,25 +1310,25 @@ async def start_hotpockets(game_mode):
                 and monotonic() - hold_time >= local_state.long_ms / 1000
             ):
                 if not REDB.value:
-                    if local_state.team == "Green":
-                        local_state.update_team(team="Red", delay=0.0025)
-                    elif local_state.team == "Blue":
-                        local_state.update_team(team="Green", delay=0.0025)
+                    if local_state.team == GREEN_TEAM:
+                        local_state.update_team(team=RED_TEAM, delay=0.0025)
+                    elif local_state.team == BLUE_TEAM:
+                        local_state.update_team(team=GREEN_TEAM, delay=0.0025)
                 elif not BLUEB.value:
-                    if local_state.team == "Green":
-                        local_state.update_team(team="Blue", delay=0.0025)
-                    elif local_state.team == "Red":
-                        local_state.update_team(team="Green", delay=0.0025)
+                    if local_state.team == GREEN_TEAM:
+                        local_state.update_team(team=BLUE_TEAM, delay=0.0025)
+                    elif local_state.team == RED_TEAM:
+                        local_state.update_team(team=GREEN_TEAM, delay=0.0025)
                 hold_time = monotonic()
-                color = "Red" if not REDB.value else "Blue"
+                color = RED if not REDB.value else BLUE
                 RGBS.update(
                     color1=color,
-                    color2=local_state.team,
+                    color2=TEAM_COLORS[local_state.team],
                     pattern="solid_blink",
                     delay=0.25,
                     repeat=-1,
                 )
-                display_message(f"{local_state.team} Team \nCAPTURED")
+                display_message(f"{TEAM_LABELS[local_state.team]} Team \nCAPTURED")
                 break
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -1135,14 +1338,17 @@ async def start_hotpockets(game_mode):
             await sleep(0.5)
             break
         await sleep(0)
-    display_message(f"{local_state.team} Team \nCAPTURED")
+    display_message(f"{TEAM_LABELS[local_state.team]} Team \nCAPTURED")
     RGBS.update(
-        color1="Green", color2=local_state.team, pattern="fill_cycle", repeat=-1
+        color1=GREEN,
+        color2=TEAM_COLORS[local_state.team],
+        pattern="fill_cycle",
+        repeat=-1,
     )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -1151,9 +1357,7 @@ async def start_rangoon(game_mode):
     """Function for Rangoon/BTA game mode"""
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     await sleep(0)
     local_state.update_team()
     clock = monotonic()
@@ -1161,21 +1365,19 @@ async def start_rangoon(game_mode):
     while local_state.game_length > 0:
         if local_state.timer_state:
             if REDB.rose or BLUEB.rose:
-                local_state.update_team(team="Green", delay=0.0025)
+                local_state.update_team(team=GREEN_TEAM, delay=0.0025)
             if REDB.fell or BLUEB.fell:
                 if not REDB.value:
-                    local_state.update_team(team="Red", delay=0.0025)
+                    local_state.update_team(team=RED_TEAM, delay=0.0025)
                 elif not BLUEB.value:
-                    local_state.update_team(team="Blue", delay=0.0025)
+                    local_state.update_team(team=BLUE_TEAM, delay=0.0025)
             if monotonic() - clock >= 1:
                 local_state.game_length -= 1
-                if local_state.team == "Red":
+                if local_state.team == RED_TEAM:
                     local_state.red_time += 1
-                elif local_state.team == "Blue":
+                elif local_state.team == BLUE_TEAM:
                     local_state.blue_time += 1
-                display_message(
-                    f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-                )
+                LCD.show(SCORE, local_state.red_time, local_state.blue_time)
                 clock = monotonic()
         if ENCB.short_count > 1:
             local_state.timer_state = not local_state.timer_state
@@ -1184,25 +1386,27 @@ async def start_rangoon(game_mode):
             await sleep(0.5)
             break
         await sleep(0)
-    display_message(
-        f"RED:  {local_state.red_time_str}\nBLUE: {local_state.blue_time_str}"
-    )
+    LCD.show(SCORE, local_state.red_time, local_state.blue_time)
     if local_state.red_time > local_state.blue_time:
         local_state.update_team(
-            team="Red", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=RED_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     elif local_state.blue_time > local_state.red_time:
         local_state.update_team(
-            team="Blue", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=BLUE_TEAM, color2=GREEN, pattern="fill_cycle", delay=0.0025, repeat=-1
         )
     else:
         local_state.update_team(
-            team="Purple", color2="Green", pattern="fill_cycle", delay=0.0025, repeat=-1
+            team=PURPLE_TEAM,
+            color2=GREEN,
+            pattern="fill_cycle",
+            delay=0.0025,
+            repeat=-1,
         )
     while True:
         if ENCB.short_count > 0:
             break
-        await sleep(0)
+        await INPUT.wait()
     await sleep(0.1)
     await game_mode.restart()
 
@@ -1239,36 +1443,48 @@ class GameMode:
         self.has_loop = has_loop
         self.has_timerbox = has_timerbox
         self.final_func_str = f"start_{self.name.replace(' ', '').lower()}"
+        self.ready = self.ready_template()
 
-    def set_message(self):
-        self.display_messages = {
-            0: f"{self.name}\nReady",
-            1: f"{self.name} Ready\nTeam lives {initial_state.lives_count}",
-            2: f"{self.name}\nReady {initial_state.game_length_str}",
-            3: f"{self.name} Ready\n{initial_state.team} {initial_state.game_length_str} {initial_state.cap_length_str}",
-            4: f"{self.name}\nReady Team {initial_state.team}",
-            5: f"{self.name} Ready\n{initial_state.game_length_str} {initial_state.bucket_id}",
-            6: f"{self.name}\nReady w TimerBox",
-            7: f"{self.name}\nReady {initial_state.game_length_str} {int(initial_state.long_ms/1000)}s",
-        }
-        message = 0
+    def ready_template(self):
+        """
+        Compiles this mode's ready screen, or returns None for the layouts with
+        a variable width value mid-line, which set_message formats as text
+        """
         if self.has_lives:
-            message = 1
+            return LCD.template(f"{self.name} Ready\nTeam lives {{d}}")
         elif self.has_id:
-            message = 5
+            return LCD.template(f"{self.name} Ready\n{{t}} {{s}}")
         elif self.has_team:
             if self.has_game_length:
-                message = 3
-            else:
-                message = 4
+                return None
+            return LCD.template(f"{self.name}\nReady Team {{s}}")
         elif self.has_game_length:
             if self.has_long_press:
-                message = 7
-            else:
-                message = 2
+                return None
+            return LCD.template(f"{self.name}\nReady {{t}}")
         elif self.has_timerbox:
-            message = 6
-        return self.display_messages[message]
+            return LCD.template(f"{self.name}\nReady w TimerBox")
+        return LCD.template(f"{self.name}\nReady")
+
+    def set_message(self):
+        """Shows this mode's ready screen with the current setup"""
+        if self.ready is None:
+            if self.has_team:
+                display_message(
+                    f"{self.name} Ready\n{TEAM_LABELS[initial_state.team]} {initial_state.game_length_str} {initial_state.cap_length_str}"
+                )
+            else:
+                display_message(
+                    f"{self.name}\nReady {initial_state.game_length_str} {int(initial_state.long_ms/1000)}s"
+                )
+        elif self.has_lives:
+            LCD.show(self.ready, initial_state.lives_count)
+        elif self.has_id:
+            LCD.show(self.ready, initial_state.game_length, initial_state.bucket_id)
+        elif self.has_team:
+            LCD.show(self.ready, TEAM_LABELS[initial_state.team])
+        else:
+            LCD.show(self.ready, initial_state.game_length)
 
     async def game_setup(self):
         if self.has_lives:
@@ -1297,7 +1513,7 @@ class GameMode:
                 display_message(f"{self.name}\nLives: {initial_state.lives_count}")
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         await sleep(0)
 
     async def identity_screen(self):
@@ -1312,7 +1528,7 @@ class GameMode:
                 display_message(f"{self.name}\nBucket ID: {initial_state.bucket_id}")
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         display_message(f"{self.name}\nBucket Count: {initial_state.bucket_count}")
         await sleep(0)
         while True:
@@ -1325,7 +1541,7 @@ class GameMode:
                 )
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         display_message(f"{self.name}\nLoop Count: {initial_state.dd_loop}")
         await sleep(0)
         while True:
@@ -1336,7 +1552,7 @@ class GameMode:
                 display_message(f"{self.name}\nLoop Count: {initial_state.dd_loop}")
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         await sleep(0)
 
     async def team_screen(self):
@@ -1345,16 +1561,16 @@ class GameMode:
         display_message(f"{self.name}\nTeam:")
         while True:
             if REDB.rose:
-                initial_state.update_team("Red", delay=0.0025)
-                display_message(f"{self.name}\nTeam {initial_state.team}")
+                initial_state.update_team(RED_TEAM, delay=0.0025)
+                display_message(f"{self.name}\nTeam {TEAM_LABELS[initial_state.team]}")
                 await sleep(0.1)
             if BLUEB.rose:
-                initial_state.update_team("Blue", delay=0.0025)
-                display_message(f"{self.name}\nTeam {initial_state.team}")
+                initial_state.update_team(BLUE_TEAM, delay=0.0025)
+                display_message(f"{self.name}\nTeam {TEAM_LABELS[initial_state.team]}")
                 await sleep(0.1)
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         await sleep(0)
 
     async def timer_screen(self):
@@ -1369,7 +1585,7 @@ class GameMode:
                 display_message(f"{self.name}\nTime: {initial_state.game_length_str}")
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         if self.has_cap_length:
             display_message(f"{self.name}\nCap time: {initial_state.cap_length_str}")
             await sleep(0)
@@ -1383,7 +1599,7 @@ class GameMode:
                     )
                 if ENCB.short_count > 0:
                     break
-                await sleep(0)
+                await INPUT.wait()
         if self.has_checkpoint:
             display_message(f"{self.name}\nCheckpoint: {initial_state.checkpoint}s")
             await sleep(0)
@@ -1397,7 +1613,7 @@ class GameMode:
                     )
                 if ENCB.short_count > 0:
                     break
-                await sleep(0)
+                await INPUT.wait()
         await sleep(0)
 
     async def long_press_screen(self):
@@ -1414,7 +1630,7 @@ class GameMode:
                 )
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         await sleep(0)
 
     async def tbcheck_screen(self):
@@ -1424,24 +1640,35 @@ class GameMode:
         while True:
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         await sleep(0)
 
-    async def standby_screen(self):
+    async def standby_screen(self, armed=False):
         """
         Pre-game confirmation screen.
-        Also handles restarting or reseting the mode.
+        Also handles restarting or reseting the mode. A mode that uses the
+        TimerBox starts without the confirmation when armed by a config.
         """
         while True:
             await sleep(0.5)
-            display_message(self.set_message())
+            self.set_message()
             RGBS.update()
             await sleep(0.5)
-            while True:
+            while not (armed and self.has_timerbox):
                 if ENCB.short_count > 0:
                     break
-                ESP.read()
-                await sleep(0)
+                if ENCB.long_press:
+                    await self.preset_screen()
+                    self.set_message()
+                mode = read_config(self.has_timerbox)
+                if mode >= 0:
+                    if MODES[mode] is not self:
+                        return await ready_mode(mode, armed=True)
+                    armed = True
+                    self.set_message()
+                await INPUT.wait()
+            armed = False
+            PRESETS.save(LAST_PRESET, initial_state.menu_index, initial_state)
             display_message(f"{self.name}\nStarting...")
             await sleep(0)
             await self.run_final_function()
@@ -1451,6 +1678,25 @@ class GameMode:
                 pass
         return
 
+    async def preset_screen(self):
+        """Screen for saving the current setup as a preset, from standby"""
+        await sleep(0.5)
+        options = ["Cancel"] + list(PRESET_NAMES[LAST_PRESET + 1 :])
+        index = 0
+        display_message(f"Save preset:\n{options[index]}")
+        while True:
+            if ENCS._was_rotated.is_set():
+                index = ENCS.encoder_handler(index, 1) % len(options)
+                display_message(f"Save preset:\n{options[index]}")
+            if ENCB.short_count > 0:
+                break
+            await INPUT.wait()
+        if index:
+            PRESETS.save(LAST_PRESET + index, initial_state.menu_index, initial_state)
+            display_message(f"Saved:\n{options[index]}")
+            await sleep(1)
+        await sleep(0)
+
     async def restart(self):
         """Function for restarting the program"""
         await sleep(0.5)
@@ -1468,13 +1714,17 @@ class GameMode:
                 )
             if ENCB.short_count > 0:
                 break
-            await sleep(0)
+            await INPUT.wait()
         await sleep(0.5)
-        print(mem_free())
+        MEM.dump()
+        if SCHED_STATS:
+            stats_dump(reset=True)
+        if TRACE:
+            TRACE.dump(reset=True)
         if initial_state.restart_index == 1:
             if self.has_team:
                 initial_state.update_team(
-                    "Blue" if initial_state.team == "Red" else "Red"
+                    BLUE_TEAM if initial_state.team == RED_TEAM else RED_TEAM
                 )
             else:
                 initial_state.update_team()
@@ -1516,7 +1766,14 @@ ESP-NOW setup
 """
 # region
 
-ESP = espnow.ESPNow()
+# Room for the packets of a file transfer that arrive between input scans
+ESP = espnow.ESPNow(buffer_size=8192)
+# Updates over ESP-NOW need the drive writable, see boot.py
+RECEIVER = (
+    Transfer_Receiver(ESP, on_status=display_message)
+    if getenv("XFER_WRITABLE")
+    else None
+)
 
 # endregion
 """
@@ -1526,6 +1783,48 @@ Main program
 
 enable()
 
+# Set SCHED_STATS = 1 in settings.toml to print per-task loop time on restart
+SCHED_STATS = getenv("SCHED_STATS")
+if SCHED_STATS:
+    enable_stats()
+
+# Set ALLOC_PROFILE = 1 in settings.toml to record the heap each phase of the
+# loop allocates, printed by a long encoder press on the main menu. When it is
+# off nothing is wrapped, so it costs nothing.
+INPUT_PHASE, ESPNOW_PHASE, GAME_PHASE, DISPLAY_PHASE, LED_PHASE = range(5)
+PROFILE = None
+if getenv("ALLOC_PROFILE"):
+    PROFILE = Phase_Profile(("input", "espnow", "game", "display", "leds"))
+    ESP = PROFILE.reader(ESP, ESPNOW_PHASE)
+
+
+def profiled(coro, phase):
+    """coro, charged to phase when ALLOC_PROFILE is on"""
+    return PROFILE.probe(coro, phase) if PROFILE else coro
+
+
+# Set TRACE = 1 in settings.toml, on every node, to trace timerbox commands to
+# the LEDs: when the packet is read, when the game updates the LEDs for it and
+# when the first frame for it is shown. See trace_commands.py.
+TRACE_POINTS = ("recv", "handled", "led")
+RECV_POINT, HANDLED_POINT, LED_POINT = range(3)
+TRACE = None
+if getenv("TRACE"):
+    TRACE = Trace_Buffer(node_name("bucket", radio.mac_address), TRACE_POINTS)
+    TRACE.after(RGBS, "update", HANDLED_POINT, done=False, follows=RECV_POINT)
+    TRACE.after(RGB, "show", LED_POINT, follows=HANDLED_POINT)
+# Without TRACE as well, a timerbox tracing tags its commands
+ESP = Trace_ESP(ESP, TRACE, RECV_POINT)
+
+
+def dump_stats():
+    """Prints the ALLOC_PROFILE and TRACE tables that are on, and clears them"""
+    if PROFILE:
+        PROFILE.dump(reset=True)
+    if TRACE:
+        TRACE.dump(reset=True)
+
+
 # SOUND.set_vol(30)
 
 
@@ -1537,11 +1836,11 @@ async def game_task_chain():
 
 
 async def main():
-    game_task = create_task(game_task_chain())
-    rgb_task = create_task(RGBS.rgb_control(RGB))
-    enc_task = create_task(ENCS.update())
-    button_task = create_task(button_monitor())
-    await gather(game_task, rgb_task, enc_task, button_task)
+    game_task = create_task(profiled(game_task_chain(), GAME_PHASE))
+    rgb_task = create_task(profiled(RGBS.rgb_control(RGB), LED_PHASE))
+    button_task = create_task(profiled(button_monitor(), INPUT_PHASE))
+    display_task = create_task(profiled(LCD.display_control(), DISPLAY_PHASE))
+    await gather(game_task, rgb_task, button_task, display_task)
 
 
 ENCB.update()
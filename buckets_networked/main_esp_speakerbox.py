@@ -4,15 +4,29 @@ Primary file, speakerbox, last updated 2025-10-01
 """
 
 import espnow  # type: ignore
+from os import getenv
+from wifi import radio  # type: ignore
 from asyncio import sleep, run
 from hardware import AUDIO_OUT
 from audio_commands import Sound_Control
+from trace_commands import Trace_Buffer, Trace_ESP, node_name
+from dashboard_commands import REPORT_START
 
 e = espnow.ESPNow(buffer_size=1024)
 
 sounds = Sound_Control(AUDIO_OUT)
 sounds.set_vol(30)
 
+# Set TRACE = 1 in settings.toml, on every node, to record when each command
+# was read and its sound started, printed when the game ends, see
+# trace_commands.py
+TRACE = None
+if getenv("TRACE"):
+    TRACE = Trace_Buffer(node_name("speaker", radio.mac_address), ("recv", "sound"))
+    TRACE.after(sounds, "play_track", 1)
+# Without TRACE as well, a timerbox tracing tags its commands
+e = Trace_ESP(e, TRACE, 0)
+
 
 async def main():
     print("Starting main")
@@ -25,7 +39,7 @@ async def main():
                 print(msg.msg)
                 message = msg.msg
                 msg_dec = message.decode()
-                if msg_dec == "Start":
+                if msg_dec in ("Start", REPORT_START):
                     sounds.play_track(28)
                     await sleep(0.1)
                 elif msg_dec == "60":
@@ -41,8 +55,12 @@ async def main():
                 elif msg_dec in ["Pause", "Resume"]:
                     sounds.play_track(35)
                     await sleep(0.1)
+                elif msg_dec == "End":
+                    if TRACE:
+                        TRACE.dump(reset=True)
                 else:
                     pass
+        await sleep(0)
 
 
 if __name__ == "__main__":
@@ -9,7 +9,7 @@ Imports
 # region
 import espnow  # type: ignore
 from binascii import unhexlify
-from os import getenv
+from os import getenv, listdir, stat
 from time import monotonic
 from asyncio import sleep, create_task, gather, run, Event
 from gc import enable, mem_free  # type: ignore
@@ -19,6 +19,10 @@ from hardware import (
     ENCODER,
     ENCB,
 )
+from config_commands import Game_Config, Config_Broadcast
+from transfer_commands import Transfer_Sender
+from trace_commands import Trace_Buffer, TRACED
+from dashboard_commands import Field_Dashboard
 
 
 # endregion
@@ -28,6 +32,10 @@ Setting initial variables for use
 # region
 MODES = []
 BUCKET_IDS = ["A", "B", "C", "D", "E", "F"]
+# Bucket modes that use a long press time, set here before pushing them
+LONG_PRESS_MODES = ("Territory W",)
+# Files to push to the buckets, laid out as on the bucket, e.g. updates/lib/x.py
+UPDATE_DIR = "/updates"
 EXTRAS = [
     "You're a nerd",
     "Weiners",
@@ -61,6 +69,10 @@ class Game_States:
         game_length (int): The duration of the game in seconds.
         cap_length (int): The capture point length in seconds.
         checkpoint (int): The checkpoint value.
+        long_ms (int): The long press duration in milliseconds, for the buckets.
+        bucket_mode (str): The bucket mode pushed to the buckets, "" to set
+            them by hand.
+        update_file (str): The file under UPDATE_DIR to send, "" for all.
         timer_state (bool): The state of the timer (True for running, False for paused).
         cap_state (bool): The state of the capture.
         red_time (int): The remaining time for the red team.
@@ -77,7 +89,10 @@ class Game_States:
         self.game_length = 0
         self.cap_length = 0
         self.checkpoint = 1
+        self.long_ms = 5000
         self.dd_loop = 2
+        self.bucket_mode = ""
+        self.update_file = ""
         self.timer_state = True
         self.cap_state = False
         self.red_time = 0
@@ -159,7 +174,10 @@ class Game_States:
         self.game_length = 0
         self.cap_length = 0
         self.checkpoint = 1
+        self.long_ms = 5000
         self.dd_loop = 2
+        self.bucket_mode = ""
+        self.update_file = ""
         self.timer_state = True
         self.cap_state = False
         self.red_time = 0
@@ -219,6 +237,18 @@ def time_string(seconds):
     return f"{seconds // 60:02d}:{seconds % 60:02d}"
 
 
+def update_files():
+    """Paths of the files in UPDATE_DIR and its subdirectories, one level deep"""
+    paths = []
+    for name in sorted(listdir(UPDATE_DIR)):
+        if stat(f"{UPDATE_DIR}/{name}")[0] & 0x4000:
+            subs = sorted(listdir(f"{UPDATE_DIR}/{name}"))
+            paths += [f"{name}/{sub}" for sub in subs]
+        else:
+            paths.append(name)
+    return paths
+
+
 def display_message(message):
     """
     Displays a string to the 1602 LCD
@@ -267,6 +297,8 @@ async def start_basictimer(game_mode):
     local_state = initial_state.shallow_copy()
     await sleep(0.5)
     display_message(local_state.game_length_str)
+    if DASHBOARD is not None:
+        DASHBOARD.timer = local_state.game_length
     e.send("Start")
     await sleep(6)
     clock = monotonic()
@@ -280,6 +312,8 @@ async def start_basictimer(game_mode):
                     except:
                         pass
                 display_message(local_state.game_length_str)
+                if DASHBOARD is not None:
+                    DASHBOARD.timer = local_state.game_length
                 clock = monotonic()
             if local_state.game_length == 60:
                 try:
@@ -337,6 +371,8 @@ async def start_doordash(game_mode):
     bucket_interval = initial_state.bucket_interval
     print(bucket_interval)
     display_message(local_state.game_length_str)
+    if DASHBOARD is not None:
+        DASHBOARD.timer = local_state.game_length
     e.send("Start")
     await sleep(6)
     clock = monotonic()
@@ -373,6 +409,8 @@ async def start_doordash(game_mode):
                     except:
                         pass
                 display_message(local_state.game_length_str)
+                if DASHBOARD is not None:
+                    DASHBOARD.timer = local_state.game_length
                 clock = monotonic()
         if ENCB.short_count > 1:
             if local_state.timer_state == True:
@@ -401,6 +439,50 @@ async def start_doordash(game_mode):
     await game_mode.restart()
 
 
+async def start_updatebuckets(game_mode):
+    """
+    Sends the picked file, or every file in UPDATE_DIR, to all the buckets.
+    Buckets only take it with XFER_WRITABLE set, and load it on their next
+    restart. Long press to stop.
+    """
+    await sleep(0.5)
+    paths = [initial_state.update_file]
+    if not initial_state.update_file:
+        try:
+            paths = update_files()
+        except OSError:
+            paths = []
+    stopped = False
+    for path in paths:
+        sender = Transfer_Sender(e, f"{UPDATE_DIR}/{path}", BUCKET_PEERS, dest=path)
+        shown = ""
+        while sender.step():
+            packet = e.read()
+            while packet is not None:
+                sender.handle(packet)
+                packet = e.read()
+            message = f"{path}\nR{sender.rounds} {sender.status()}"
+            if message != shown:
+                display_message(message)
+                shown = message
+            if ENCB.long_press:
+                sender.close()
+                stopped = True
+                break
+            await sleep(0)
+        print(
+            f"{path}: {sender.chunks} chunks, {sender.sends} sends,"
+            f" {sender.rounds} rounds, {sender.status()}"
+        )
+        if stopped:
+            break
+    display_message("Update stopped" if stopped else f"Update done\n{len(paths)} files")
+    await sleep(0.5)
+    while ENCB.short_count == 0:
+        await sleep(0)
+    await game_mode.restart()
+
+
 # endregion
 """
 GameMode class and instantiation
@@ -418,6 +500,8 @@ class GameMode:
         has_game_length=False,
         has_cap_length=False,
         has_checkpoint=False,
+        bucket_modes=(),
+        has_file=False,
     ):
         self.name = name
         self.has_lives = has_lives
@@ -426,6 +510,8 @@ class GameMode:
         self.has_game_length = has_game_length
         self.has_cap_length = has_cap_length
         self.has_checkpoint = has_checkpoint
+        self.bucket_modes = bucket_modes
+        self.has_file = has_file
         self.final_func_str = f"start_{self.name.replace(' ', '').lower()}"
 
     def set_message(self):
@@ -435,9 +521,12 @@ class GameMode:
             3: f"{self.name} Ready\n{initial_state.team} {initial_state.game_length_str} {initial_state.cap_length_str}",
             4: f"{self.name}\nReady Team {initial_state.team}",
             5: f"{self.name} Ready\n{initial_state.game_length_str} {initial_state.bucket_id}",
+            6: f"{self.name}\n{initial_state.update_file or 'All files'}",
         }
         message = 1
-        if self.has_lives:
+        if self.has_file:
+            message = 6
+        elif self.has_lives:
             message = 1
         elif self.has_id:
             message = 5
@@ -459,6 +548,10 @@ class GameMode:
             await self.team_screen()
         if self.has_game_length:
             await self.timer_screen()
+        if self.bucket_modes:
+            await self.bucket_mode_screen()
+        if self.has_file:
+            await self.file_screen()
         await self.standby_screen()
 
     async def counter_screen(self):
@@ -568,18 +661,90 @@ class GameMode:
                 await sleep(0)
         await sleep(0)
 
+    async def bucket_mode_screen(self):
+        """Screen for picking the mode pushed to the buckets, or Manual"""
+        await sleep(0.5)
+        options = ("Manual",) + self.bucket_modes
+        index = 0
+        display_message(f"Bucket mode:\n{options[index]}")
+        while True:
+            if ENCS._was_rotated.is_set():
+                index = ENCS.encoder_handler(index, 1) % len(options)
+                display_message(f"Bucket mode:\n{options[index]}")
+            if ENCB.short_count > 0:
+                break
+            await sleep(0)
+        initial_state.bucket_mode = options[index] if index else ""
+        if initial_state.bucket_mode in LONG_PRESS_MODES:
+            display_message(
+                f"{self.name} \nLong press: {initial_state.long_ms // 1000}s"
+            )
+            await sleep(0)
+            while True:
+                if ENCS._was_rotated.is_set():
+                    initial_state.long_ms = max(
+                        1000, ENCS.encoder_handler(initial_state.long_ms, 1000)
+                    )
+                    display_message(
+                        f"{self.name} \nLong press: {initial_state.long_ms // 1000}s"
+                    )
+                if ENCB.short_count > 0:
+                    break
+                await sleep(0)
+        await sleep(0)
+
+    async def file_screen(self):
+        """Screen for picking the file in UPDATE_DIR to send, or all of them"""
+        await sleep(0.5)
+        try:
+            options = ["All files"] + update_files()
+        except OSError:
+            options = ["All files"]
+        index = 0
+        display_message(f"Send file:\n{options[index]}")
+        while True:
+            if ENCS._was_rotated.is_set():
+                index = ENCS.encoder_handler(index, 1) % len(options)
+                display_message(f"Send file:\n{options[index]}")
+            if ENCB.short_count > 0:
+                break
+            await sleep(0)
+        initial_state.update_file = options[index] if index else ""
+        await sleep(0)
+
+    def bucket_config(self):
+        """The current setup as a Game_Config for the buckets"""
+        return Game_Config(
+            initial_state.bucket_mode,
+            [getattr(initial_state, name) for name in Game_Config.FIELDS],
+            [(peer.mac, bucket_id) for bucket_id, peer in BUCKET_PEERS],
+        )
+
     async def standby_screen(self):
         """
         Pre-game confirmation screen.
+        Pushes the bucket mode to the buckets and shows which have it.
         Also handles restarting or reseting the mode.
         """
         while True:
             await sleep(0.5)
             display_message(self.set_message())
+            if initial_state.bucket_mode:
+                BROADCAST.start(self.bucket_config())
             await sleep(0.5)
+            if initial_state.bucket_mode:
+                display_message(
+                    f"{initial_state.bucket_mode}\nArmed {BROADCAST.status()}"
+                )
             while True:
                 if ENCB.short_count > 0:
                     break
+                if initial_state.bucket_mode:
+                    if BROADCAST.poll(e.read()):
+                        display_message(
+                            f"{initial_state.bucket_mode}\nArmed {BROADCAST.status()}"
+                        )
+                    BROADCAST.tick()
                 await sleep(0)
             display_message(f"{self.name}\nStarting...")
             await sleep(0)
@@ -609,6 +774,8 @@ class GameMode:
             await sleep(0)
         await sleep(0.5)
         print(mem_free())
+        if TRACE:
+            TRACE.dump(reset=True)
         if initial_state.restart_index == 1:
             if self.has_team:
                 initial_state.update_team(
@@ -628,8 +795,18 @@ class GameMode:
 
 
 MODES = [
-    GameMode("Basic Timer", has_game_length=True),
-    GameMode("DoorDash", has_id=True, has_game_length=True),
+    GameMode(
+        "Basic Timer",
+        has_game_length=True,
+        bucket_modes=("Domination W", "KOTH W", "Territory W"),
+    ),
+    GameMode(
+        "DoorDash",
+        has_id=True,
+        has_game_length=True,
+        bucket_modes=("Crazy King W",),
+    ),
+    GameMode("Update Buckets", has_file=True),
 ]
 # endregion
 """
@@ -637,14 +814,46 @@ ESP-NOW setup
 """
 # region
 
-e = espnow.ESPNow()
+# Room for the buckets' answers to a file offer, see start_updatebuckets
+e = espnow.ESPNow(buffer_size=4096)
 e.peers.append(espnow.Peer(mac=unhexlify(getenv("SOUNDBOX1_MAC")))),  # type: ignore
 e.peers.append(espnow.Peer(mac=unhexlify(getenv("SOUNDBOX2_MAC")))),  # type: ignore
-e.peers.append(espnow.Peer(mac=unhexlify(getenv("BUCKETA_MAC")))),  # type: ignore
-e.peers.append(espnow.Peer(mac=unhexlify(getenv("BUCKETB_MAC")))),  # type: ignore
-e.peers.append(espnow.Peer(mac=unhexlify(getenv("BUCKETC_MAC")))),  # type: ignore
-e.peers.append(espnow.Peer(mac=unhexlify(getenv("BUCKETD_MAC")))),  # type: ignore
-e.peers.append(espnow.Peer(mac=unhexlify(getenv("BUCKETE_MAC")))),  # type: ignore
+# Buckets follow the soundboxes in BUCKET_IDS order, start_doordash counts on
+# it. Set BUCKETA_MAC and on in settings.toml, up to the number of buckets.
+BUCKET_PEERS = []
+for bucket_id in BUCKET_IDS:
+    bucket_mac = getenv(f"BUCKET{bucket_id}_MAC")
+    if not bucket_mac:
+        break
+    BUCKET_PEERS.append((bucket_id, espnow.Peer(mac=unhexlify(bucket_mac))))
+    e.peers.append(BUCKET_PEERS[-1][1])
+BROADCAST = Config_Broadcast(e, BUCKET_PEERS)
+# Set TRACE = 1 in settings.toml, on every node, to tag game commands with a
+# span ID and print when each was sent on the restart screen, see
+# trace_commands.py
+TRACE = None
+if getenv("TRACE"):
+    TRACE = Trace_Buffer("timerbox", TRACED)
+    e = TRACE.reader(e, 0)
+# Set DASHBOARD_SSID in settings.toml, and DASHBOARD_PASSWORD (8 characters or
+# more) unless the network is to be open, for a live scoreboard spectators
+# load from http://192.168.4.1 on the timerbox's own network, see
+# dashboard_commands.py
+DASHBOARD = None
+if getenv("DASHBOARD_SSID"):
+    from wifi import radio  # type: ignore
+    from socketpool import SocketPool  # type: ignore
+
+    # ESP-NOW goes out on the channel the radio is on, so the AP has to be on
+    # the buckets' channel, 1 unless ESPNOW_CHANNEL says otherwise
+    radio.start_ap(
+        getenv("DASHBOARD_SSID"),
+        getenv("DASHBOARD_PASSWORD") or "",
+        channel=getenv("ESPNOW_CHANNEL") or 1,
+    )
+    DASHBOARD = Field_Dashboard(e, BUCKET_PEERS)
+    DASHBOARD.start(SocketPool(radio), str(radio.ipv4_address_ap))
+    e = DASHBOARD
 
 # endregion
 """
@@ -666,7 +875,10 @@ async def main():
     game_task = create_task(game_task_chain())
     enc_task = create_task(ENCS.update())
     button_task = create_task(button_monitor())
-    await gather(game_task, enc_task, button_task)
+    tasks = [game_task, enc_task, button_task]
+    if DASHBOARD is not None:
+        tasks.append(create_task(DASHBOARD.run()))
+    await gather(*tasks)
 
 
 if __name__ == "__main__":
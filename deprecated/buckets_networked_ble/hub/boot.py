@@ -0,0 +1,13 @@
+import board
+import digitalio
+import storage
+from os import getenv
+
+button = digitalio.DigitalInOut(board.GP6)
+button.switch_to_input(pull=digitalio.Pull.UP)
+
+# Set RESULTS_URL in settings.toml to keep game results on flash until they're
+# uploaded, see outbox_commands.py. The drive is then read-only over USB, hold
+# the encoder button while booting to keep it writable and edit the setting.
+if getenv("RESULTS_URL") and button.value:
+    storage.remount("/", readonly=False)
@@ -63,6 +63,7 @@ from .response import (
     Websocket,
 )
 from .route import Route, as_route
+from .broadcast import SSEBroadcaster, WebsocketHub
 from .server import (
     Server,
     NO_REQUEST,
@@ -80,6 +81,7 @@ from .status import (
     PARTIAL_CONTENT_206,
     MOVED_PERMANENTLY_301,
     FOUND_302,
+    NOT_MODIFIED_304,
     TEMPORARY_REDIRECT_307,
     PERMANENT_REDIRECT_308,
     BAD_REQUEST_400,
@@ -87,7 +89,9 @@ from .status import (
     FORBIDDEN_403,
     NOT_FOUND_404,
     METHOD_NOT_ALLOWED_405,
+    PAYLOAD_TOO_LARGE_413,
     TOO_MANY_REQUESTS_429,
+    REQUEST_HEADER_FIELDS_TOO_LARGE_431,
     INTERNAL_SERVER_ERROR_500,
     NOT_IMPLEMENTED_501,
     SERVICE_UNAVAILABLE_503,
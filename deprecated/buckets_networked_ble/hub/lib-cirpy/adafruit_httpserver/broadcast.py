@@ -0,0 +1,456 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 donutcat
+#
+# SPDX-License-Identifier: MIT
+"""
+`adafruit_httpserver.broadcast`
+====================================================
+* Author(s): donutcat
+"""
+
+try:
+    from typing import Dict, Union
+    from socket import socket
+    from socketpool import SocketPool
+except ImportError:
+    pass
+
+from errno import EAGAIN, ECONNRESET, ENOTCONN, ETIMEDOUT
+from time import monotonic
+
+from .request import Request
+from .response import Response, SSEResponse, Websocket, _send_bytes_async
+from .status import SERVICE_UNAVAILABLE_503
+
+
+class _Broadcaster:
+    """
+    Sends the same bytes to a set of clients, dropping the ones too slow to take them.
+    Subclasses keep their clients in ``_subscribers`` and say how to reach each one.
+    """
+
+    dropped: int
+    """Clients dropped so far, for being too slow or gone."""
+
+    def __init__(self, send_timeout: float) -> None:
+        self.send_timeout = send_timeout
+        self._subscribers = []
+        self.dropped = 0
+
+    @staticmethod
+    def _connection(subscriber) -> Union["SocketPool.Socket", "socket.socket"]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _disconnect(subscriber) -> None:
+        raise NotImplementedError
+
+    def _remove(self, subscriber) -> None:
+        self._subscribers.remove(subscriber)
+        self._disconnect(subscriber)
+
+    def _drop(self, subscriber) -> None:
+        self._remove(subscriber)
+        self.dropped += 1
+
+    async def _send_to_all(self, payload: memoryview) -> int:
+        """
+        Sends ``payload`` to every client. Returns once every client has it or has been
+        dropped, at most ``send_timeout`` seconds later, with the number that got it.
+        """
+        # pylint: disable=import-outside-toplevel
+        from asyncio import wait_for_ms, TimeoutError as Timeout
+
+        # Most sockets take the whole payload at once, wait only for the ones that don't
+        lagging = []
+        for subscriber in self._subscribers[:]:
+            sent = _send_now(self._connection(subscriber), payload)
+            if sent < 0:
+                self._drop(subscriber)
+            elif sent < len(payload):
+                lagging.append((subscriber, sent))
+
+        deadline = monotonic() + self.send_timeout
+        for subscriber, sent in lagging:
+            remaining_ms = int((deadline - monotonic()) * 1000)
+            try:
+                if remaining_ms > 0 and await wait_for_ms(
+                    _send_bytes_async(self._connection(subscriber), payload[sent:]),
+                    remaining_ms,
+                ):
+                    continue
+            except Timeout:
+                pass
+            self._drop(subscriber)
+
+        return len(self._subscribers)
+
+
+class SSEBroadcaster(_Broadcaster):
+    """
+    Sends every Server-Sent Event to a set of clients, e.g. every phone watching a game.
+
+    Each event is serialized once and the same bytes are written to every subscriber.
+    A subscriber that can't take an event within ``send_timeout`` seconds is dropped, so one
+    slow phone doesn't hold up the rest. Use with `Server.serve_async`, ``publish()`` is a
+    coroutine.
+
+    Example::
+
+        spectators = SSEBroadcaster(max_subscribers=8)
+
+        @server.route("/events", GET)
+        def events(request: Request):
+            return spectators.subscribe(request)
+
+        async def game_loop():
+            while True:
+                await spectators.publish(timer_string())
+                await asyncio.sleep(1)
+    """
+
+    def __init__(self, max_subscribers: int = 8, send_timeout: float = 0.5) -> None:
+        """
+        :param int max_subscribers: Clients that can subscribe at once, others get a 503.
+        :param float send_timeout: Seconds a subscriber has to take an event before it is
+          dropped.
+        """
+        super().__init__(send_timeout)
+        self.max_subscribers = max_subscribers
+
+    @property
+    def subscribers(self) -> int:
+        """Number of clients subscribed."""
+        return len(self._subscribers)
+
+    @staticmethod
+    def _connection(subscriber: SSEResponse):
+        return subscriber._request.connection  # pylint: disable=protected-access
+
+    @staticmethod
+    def _disconnect(subscriber: SSEResponse) -> None:
+        subscriber._close_connection()  # pylint: disable=protected-access
+
+    def subscribe(self, request: Request) -> Response:
+        """
+        Subscribes the client making ``request``. Returns the response for the route handler
+        to return, an `SSEResponse`, or a 503 if ``max_subscribers`` are already subscribed.
+        """
+        if len(self._subscribers) >= self.max_subscribers:
+            return Response(
+                request, "Too many subscribers", status=SERVICE_UNAVAILABLE_503
+            )
+        request.connection.setblocking(False)
+        sse = SSEResponse(request)
+        self._subscribers.append(sse)
+        return sse
+
+    async def publish(  # pylint: disable=too-many-arguments
+        self,
+        data: str,
+        event: str = None,
+        id: int = None,  # pylint: disable=redefined-builtin,invalid-name
+        retry: int = None,
+        custom_fields: Dict[str, str] = None,
+    ) -> int:
+        """
+        Sends an event to every subscriber, see `SSEResponse.send_event` for the arguments.
+        Returns once every subscriber has it or has been dropped, at most ``send_timeout``
+        seconds later. Returns the number of subscribers that got it.
+        """
+        # pylint: disable=protected-access
+        message = SSEResponse._format_event(data, event, id, retry, custom_fields)
+        return await self._send_to_all(memoryview(message.encode("utf-8")))
+
+    def close(self) -> None:
+        """Closes every subscriber's connection."""
+        for sse in self._subscribers:
+            self._disconnect(sse)
+        self._subscribers.clear()
+
+
+class _HubClient:  # pylint: disable=too-few-public-methods
+    """A `Websocket` of a `WebsocketHub` and the bytes read from it but not yet handled."""
+
+    def __init__(self, websocket: Websocket, buffer_size: int) -> None:
+        self.websocket = websocket
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.length = 0
+
+        # The frame at the start of the buffer, set by WebsocketHub._next_frame()
+        self.opcode = 0
+        self.start = 0
+        self.end = 0
+
+
+class WebsocketHub(_Broadcaster):
+    """
+    Keeps a set of `Websocket` connections, sends every message to all of them and reads
+    what they send back.
+
+    Each message is framed once, into a buffer kept between messages, and the same bytes
+    are written to every client. A client that can't take a message within
+    ``send_timeout`` seconds is dropped. Frames from clients are read into a buffer kept
+    for each client and unmasked in place. Pings get their pong and closes their close
+    without allocating, only data messages are copied out. Fragmented messages aren't
+    reassembled: a client that sends a continuation frame, or a data frame without FIN,
+    is closed with 1003, as is a frame too long for its buffer with 1009.
+
+    Use with `Server.serve_async`, ``broadcast()`` is a coroutine. Read from the clients
+    with ``receive()``, not with `Websocket.receive`.
+
+    Example::
+
+        phones = WebsocketHub(max_clients=8)
+
+        @server.route("/connect-websocket", GET)
+        def connect_client(request: Request):
+            return phones.connect(request)
+
+        async def game_loop():
+            while True:
+                while (message := phones.receive()) is not None:
+                    handle(message)
+                await phones.broadcast(timer_string())
+                await asyncio.sleep(1)
+    """
+
+    # Close status codes, RFC 6455 section 7.4.1
+    PROTOCOL_ERROR = 1002
+    UNSUPPORTED_DATA = 1003
+    MESSAGE_TOO_BIG = 1009
+
+    def __init__(
+        self, max_clients: int = 8, send_timeout: float = 0.5, buffer_size: int = 1024
+    ) -> None:
+        """
+        :param int max_clients: Clients that can connect at once, others get a 503.
+        :param float send_timeout: Seconds a client has to take a message before it is
+          dropped.
+        :param int buffer_size: Size of each client's receive buffer, the longest frame a
+          client can send. Also the size the send buffer starts at, it grows to fit longer
+          messages.
+        """
+        super().__init__(send_timeout)
+        self.max_clients = max_clients
+        self._buffer_size = buffer_size
+        self._frame = bytearray(buffer_size)
+        self._control = memoryview(bytearray(2 + 125))
+        self._next = 0
+
+    @property
+    def clients(self) -> int:
+        """Number of clients connected."""
+        return len(self._subscribers)
+
+    @staticmethod
+    def _connection(subscriber: _HubClient):
+        # pylint: disable=protected-access
+        return subscriber.websocket._request.connection
+
+    @staticmethod
+    def _disconnect(subscriber: _HubClient) -> None:
+        subscriber.websocket._close_connection()  # pylint: disable=protected-access
+        subscriber.websocket.closed = True
+
+    def connect(self, request: Request) -> Response:
+        """
+        Connects the client making ``request``. Returns the response for the route handler to
+        return, a `Websocket`, or a 503 if ``max_clients`` are already connected.
+        """
+        if len(self._subscribers) >= self.max_clients:
+            return Response(request, "Too many clients", status=SERVICE_UNAVAILABLE_503)
+        websocket = Websocket(request, buffer_size=self._buffer_size)
+        self._subscribers.append(_HubClient(websocket, self._buffer_size))
+        return websocket
+
+    async def broadcast(self, message: Union[str, bytes], opcode: int = None) -> int:
+        """
+        Sends ``message`` to every client. Returns once every client has it or has been
+        dropped, at most ``send_timeout`` seconds later. Returns the number of clients that
+        got it.
+
+        :param str message: Message to be sent.
+        :param int opcode: Opcode of the message. Defaults to TEXT if message is a string and
+                           BINARY for bytes.
+        """
+        if opcode is None:
+            opcode = Websocket.TEXT if isinstance(message, str) else Websocket.BINARY
+        if isinstance(message, str):
+            message = message.encode()
+
+        # pylint: disable=protected-access
+        frame_length = Websocket._header_length(len(message)) + len(message)
+        if len(self._frame) < frame_length:
+            self._frame = bytearray(frame_length)
+        frame = memoryview(self._frame)
+        Websocket._write_frame(frame, opcode, message)
+        return await self._send_to_all(frame[:frame_length])
+
+    def receive(self) -> Union[str, bytes, None]:
+        """
+        Returns the next message any client has sent, or None if there is none yet. Answers
+        pings and closes on the way. Text messages are returned as strings, binary as bytes.
+        """
+        for _ in range(len(self._subscribers)):
+            if not self._subscribers:
+                break
+            # Start after the client read last, so one chatty client can't starve the rest
+            self._next = (self._next + 1) % len(self._subscribers)
+            client = self._subscribers[self._next]
+            while not client.websocket.closed:
+                if self._next_frame(client):
+                    message = self._handle_frame(client)
+                    if message is not None:
+                        return message
+                elif client.websocket.closed or not self._read(client):
+                    break
+        return None
+
+    def _read(self, client: _HubClient) -> bool:
+        """Reads what the client sent into its buffer. Returns False if nothing was read."""
+        if client.length == len(client.buffer):
+            self._fail(client, self.MESSAGE_TOO_BIG)
+            return False
+        try:
+            received = self._connection(client).recv_into(client.view[client.length :])
+        except OSError as error:
+            if error.errno in (EAGAIN, ETIMEDOUT):  # Nothing sent yet
+                return False
+            if error.errno in (ECONNRESET, ENOTCONN):  # Client disconnected
+                self._remove(client)
+                return False
+            raise error
+        if not received:  # Client hung up
+            self._remove(client)
+            return False
+        client.length += received
+        return True
+
+    def _next_frame(self, client: _HubClient) -> bool:
+        """
+        Checks for a whole frame at the start of the client's buffer, unmasks its payload in
+        place and sets ``opcode``, ``start`` and ``end`` of the client to it. Fails the
+        connection on frames RFC 6455 doesn't allow a client to send, or that don't fit.
+        """
+        buffer = client.buffer
+        if client.length < 2:
+            return False
+        if not buffer[1] & 0b10000000:  # Frames from clients must be masked
+            self._fail(client, self.PROTOCOL_ERROR)
+            return False
+
+        payload_length = buffer[1] & 0b01111111
+        header_length = 2
+        if payload_length == 126:
+            header_length = 4
+        elif payload_length == 127:
+            header_length = 10
+        header_length += 4  # Mask
+        if client.length < header_length:
+            return False
+        if header_length > 6:
+            payload_length = 0
+            for i in range(2, header_length - 4):
+                payload_length = (payload_length << 8) | buffer[i]
+
+        opcode = buffer[0] & 0b00001111
+        if opcode >= Websocket.CLOSE and (
+            payload_length > 125 or not buffer[0] & Websocket.FIN
+        ):
+            self._fail(client, self.PROTOCOL_ERROR)
+            return False
+        if opcode == Websocket.CONT or not buffer[0] & Websocket.FIN:
+            # Fragmented messages aren't reassembled, see the class docstring
+            self._fail(client, self.UNSUPPORTED_DATA)
+            return False
+        if header_length + payload_length > len(buffer):
+            self._fail(client, self.MESSAGE_TOO_BIG)
+            return False
+        if client.length < header_length + payload_length:
+            return False
+
+        mask = header_length - 4
+        for i in range(payload_length):
+            buffer[header_length + i] ^= buffer[mask + (i & 3)]
+        client.opcode = opcode
+        client.start = header_length
+        client.end = header_length + payload_length
+        return True
+
+    def _handle_frame(self, client: _HubClient) -> Union[str, bytes, None]:
+        """Answers or returns the frame found by ``_next_frame()`` and drops it from the buffer."""
+        payload = client.view[client.start : client.end]
+        message = None
+
+        if client.opcode == Websocket.PING:
+            self._send_control(client, Websocket.PONG, payload)
+        elif client.opcode == Websocket.CLOSE:
+            # Echo the status code back, then close
+            self._send_control(client, Websocket.CLOSE, payload[:2])
+            if not client.websocket.closed:
+                self._remove(client)
+            return None
+        elif client.opcode in (Websocket.TEXT, Websocket.BINARY):
+            message = bytes(payload)
+            if client.opcode == Websocket.TEXT:
+                try:
+                    message = message.decode()
+                except UnicodeError:
+                    pass
+
+        # Move what follows the frame to the start of the buffer
+        remaining = client.length - client.end
+        if remaining:
+            client.view[:remaining] = client.view[client.end : client.length]
+        client.length = remaining
+        return message
+
+    def _send_control(
+        self, client: _HubClient, opcode: int, payload: memoryview
+    ) -> None:
+        # pylint: disable=protected-access
+        frame_length = Websocket._write_frame(self._control, opcode, payload)
+        # Control frames are tiny, a client that can't take one at once is too slow
+        sent = _send_now(self._connection(client), self._control[:frame_length])
+        if sent < frame_length:
+            self._drop(client)
+
+    def _fail(self, client: _HubClient, status_code: int) -> None:
+        """Closes the connection with ``status_code``, RFC 6455 section 7.1.7."""
+        self._control[2] = status_code >> 8
+        self._control[3] = status_code & 0xFF
+        self._control[0] = Websocket.FIN | Websocket.CLOSE
+        self._control[1] = 2
+        _send_now(self._connection(client), self._control[:4])
+        self._remove(client)
+
+    def close(self) -> None:
+        """Closes every client's connection."""
+        for client in self._subscribers:
+            client.websocket.close()
+        self._subscribers.clear()
+
+
+def _send_now(
+    conn: Union["SocketPool.Socket", "socket.socket"],
+    buffer: memoryview,
+) -> int:
+    """
+    Sends as much of ``buffer`` as the non-blocking ``conn`` takes without waiting.
+    Returns the bytes sent, or -1 if the client hung up.
+    """
+    bytes_sent = 0
+    bytes_to_send = len(buffer)
+    while bytes_sent < bytes_to_send:
+        try:
+            bytes_sent += conn.send(buffer[bytes_sent:])
+        except BrokenPipeError:
+            return -1
+        except OSError as exc:
+            if exc.errno == EAGAIN:
+                break
+            if exc.errno in (ECONNRESET, ENOTCONN):
+                return -1
+            raise
+    return bytes_sent
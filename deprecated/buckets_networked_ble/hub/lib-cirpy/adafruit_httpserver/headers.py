@@ -47,12 +47,17 @@ class Headers(_IFieldStorage):
 
         "CONTENT-TYPE" in headers
         # True
+
+    The values of a ``Request``'s headers are kept as their offsets in the received bytes,
+    each is decoded when it is first read.
     """
 
-    _storage: Dict[str, List[str]]
+    _storage: Dict[str, List[Union[str, int]]]
 
     def __init__(self, headers: Union[str, Dict[str, str]] = None) -> None:
         self._storage = {}
+        self._raw = None
+        self._raw_end = 0
 
         if isinstance(headers, str):
             for header_line in headers.strip().splitlines():
@@ -71,11 +76,12 @@ class Headers(_IFieldStorage):
 
     def get(self, field_name: str, default: str = None) -> Union[str, None]:
         """Returns the value for the given header name, or default if not found."""
-        return super().get(field_name.lower(), default)
+        values = self._storage.get(field_name.lower())
+        return self._decoded(values)[0] if values else default
 
     def get_list(self, field_name: str) -> List[str]:
         """Get the list of values of a field."""
-        return super().get_list(field_name.lower())
+        return self._decoded(super().get_list(field_name.lower()))
 
     def get_directive(self, name: str, default: str = None) -> Union[str, None]:
         """
@@ -120,7 +126,7 @@ class Headers(_IFieldStorage):
 
     def setdefault(self, name: str, default: str = None):
         """Sets the value for the given header name if it does not exist."""
-        return self._storage.setdefault(name.lower(), [default])
+        return self._decoded(self._storage.setdefault(name.lower(), [default]))
 
     def update(self, headers: Dict[str, str]):
         """Updates the headers with the given dict."""
@@ -137,7 +143,7 @@ class Headers(_IFieldStorage):
         )
 
     def __getitem__(self, name: str):
-        return super().__getitem__(name.lower())
+        return self._decoded(self._storage[name.lower()])[0]
 
     def __setitem__(self, name: str, value: str):
         self._storage[name.lower()] = [value]
@@ -147,3 +153,40 @@ class Headers(_IFieldStorage):
 
     def __contains__(self, key: str):
         return super().__contains__(key.lower())
+
+    def __repr__(self) -> str:
+        for values in self._storage.values():
+            self._decoded(values)
+        return super().__repr__()
+
+    def _add_raw(self, raw: bytes, start: int, end: int) -> None:
+        """
+        Adds the headers in ``raw[start:end]``, one per line, from the bytes of a request.
+        Only the names are decoded, each value is kept as its offset in ``raw``.
+        """
+        self._raw = raw
+        self._raw_end = end
+        view = memoryview(raw)
+        while start < end:
+            line_end = raw.find(b"\r\n", start, end)
+            if line_end < 0:
+                line_end = end
+            separator = raw.find(b": ", start, line_end)
+            if separator < 0:
+                raise ValueError("Header without a value")
+            self._add_field_value(
+                str(view[start:separator], "utf-8").lower(), separator + 2
+            )
+            start = line_end + 2
+
+    def _decoded(self, values: List[Union[str, int]]) -> List[str]:
+        """Decodes in place the values that are still offsets in a request's bytes."""
+        if self._raw is None:
+            return values
+        for index, value in enumerate(values):
+            if isinstance(value, int):
+                end = self._raw.find(b"\r\n", value, self._raw_end)
+                if end < 0:
+                    end = self._raw_end
+                values[index] = str(memoryview(self._raw)[value:end], "utf-8")
+        return values
@@ -332,6 +332,10 @@ class Request:  # pylint: disable=too-many-instance-attributes
         if raw_request is None:
             raise ValueError("raw_request cannot be None")
 
+        self._header_length = raw_request.find(b"\r\n\r\n")
+        if self._header_length < 0:
+            self._header_length = len(raw_request)
+
         try:
             (
                 self.method,
@@ -339,7 +343,7 @@ class Request:  # pylint: disable=too-many-instance-attributes
                 self.query_params,
                 self.http_version,
                 self.headers,
-            ) = self._parse_request_header(self._raw_header_bytes)
+            ) = self._parse_request_header(raw_request, self._header_length)
         except Exception as error:
             raise ValueError("Unparseable raw_request: ", raw_request) from error
 
@@ -443,40 +447,62 @@ class Request:  # pylint: disable=too-many-instance-attributes
     @property
     def _raw_header_bytes(self) -> bytes:
         """Returns headers bytes."""
-        empty_line_index = self.raw_request.find(b"\r\n\r\n")
-
-        return self.raw_request[:empty_line_index]
+        return self.raw_request[: self._header_length]
 
     @property
     def _raw_body_bytes(self) -> bytes:
         """Returns body bytes."""
-        empty_line_index = self.raw_request.find(b"\r\n\r\n")
-
-        return self.raw_request[empty_line_index + 4 :]
+        return self.raw_request[self._header_length + 4 :]
 
     @staticmethod
     def _parse_request_header(
-        header_bytes: bytes,
+        raw_request: bytes, header_length: int
     ) -> Tuple[str, str, QueryParams, str, Headers]:
-        """Parse HTTP Start line to method, path, query_params and http_version."""
+        """
+        Parse HTTP Start line to method, path, query_params and http_version, and find the
+        headers in the first ``header_length`` bytes of ``raw_request``.
 
-        start_line, headers_string = (
-            header_bytes.decode("utf-8").strip().split("\r\n", 1)
-        )
+        Only the start line and the header names are decoded, ``Headers`` decodes each value
+        when it is read.
+        """
+        start, end = _strip(raw_request, 0, header_length)
 
-        method, path, http_version = start_line.strip().split()
+        line_end = raw_request.find(b"\r\n", start, end)
+        if line_end < 0:
+            line_end = end
 
-        if "?" not in path:
-            path += "?"
+        method, path, http_version = str(
+            memoryview(raw_request)[start:line_end], "utf-8"
+        ).split()
 
-        path, query_string = path.split("?", 1)
+        query_start = path.find("?")
+        query_string = ""
+        if 0 <= query_start:
+            path, query_string = path[:query_start], path[query_start + 1 :]
 
         query_params = QueryParams(query_string)
-        headers = Headers(headers_string)
+
+        headers = Headers()
+        headers._add_raw(  # pylint: disable=protected-access
+            raw_request, _strip(raw_request, line_end, end)[0], end
+        )
 
         return method, path, query_params, http_version, headers
 
 
+# What str.strip() strips, in ASCII
+_WHITESPACE = (9, 10, 11, 12, 13, 28, 29, 30, 31, 32)
+
+
+def _strip(data: bytes, start: int, end: int) -> Tuple[int, int]:
+    """Start and end of ``data[start:end]`` without the whitespace around it."""
+    while start < end and data[start] in _WHITESPACE:
+        start += 1
+    while start < end and data[end - 1] in _WHITESPACE:
+        end -= 1
+    return start, end
+
+
 def _debug_unsupported_form_content_type(content_type: str) -> None:
     """Warns when an unsupported form content type is used."""
     print(
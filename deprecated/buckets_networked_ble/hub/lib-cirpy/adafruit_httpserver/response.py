@@ -16,7 +16,7 @@ except ImportError:
 
 import os
 import json
-from binascii import b2a_base64
+from binascii import b2a_base64, hexlify
 import hashlib
 from errno import EAGAIN, ECONNRESET, ETIMEDOUT, ENOTCONN
 
@@ -25,6 +25,7 @@ from .exceptions import (
     FileNotExistsError,
     ParentDirectoryReferenceError,
 )
+from .methods import GET, HEAD
 from .mime_types import MIMETypes
 from .request import Request
 from .status import (
@@ -33,6 +34,7 @@ from .status import (
     OK_200,
     MOVED_PERMANENTLY_301,
     FOUND_302,
+    NOT_MODIFIED_304,
     TEMPORARY_REDIRECT_307,
     PERMANENT_REDIRECT_308,
 )
@@ -145,6 +147,85 @@ class Response:  # pylint: disable=too-few-public-methods
         except (BrokenPipeError, OSError):
             pass
 
+    def _send_pending(self, send, *args) -> "_PendingWrites":
+        """
+        Calls ``send`` with the connection swapped for a `_PendingWrites`, so the bytes it
+        sends can be written later with ``_PendingWrites.flush()``.
+        """
+        connection = self._request.connection
+        pending = _PendingWrites()
+        self._request.connection = pending
+        try:
+            send(*args)
+        finally:
+            self._request.connection = connection
+        return pending
+
+    async def _send_async(self) -> None:
+        """
+        Same as ``_send()``, but waits in ``asyncio`` whenever the socket can't take more,
+        instead of retrying until it can. Used by `Server.serve_async`.
+        """
+        pending = self._send_pending(self._send)
+        await pending.flush(self._request.connection)
+        if pending.closed:
+            self._close_connection()
+
+
+class _PendingWrites:
+    """
+    Stands in for a connection while a response is sent, keeping what is sent to write
+    it from ``asyncio`` afterwards. Keeps views of the buffers instead of copies.
+    """
+
+    def __init__(self) -> None:
+        self.parts = []
+        self.closed = False
+
+    def send(self, buffer: Union[bytes, bytearray, memoryview]) -> int:
+        self.parts.append(buffer)
+        return len(buffer)
+
+    def close(self) -> None:
+        self.closed = True
+
+    async def flush(self, conn: Union["SocketPool.Socket", "socket.socket"]) -> bool:
+        """Writes the parts to ``conn``. Returns ``False`` if the client hung up."""
+        for part in self.parts:
+            if not await _send_bytes_async(conn, part):
+                return False
+        self.parts.clear()
+        return True
+
+
+async def _send_bytes_async(
+    conn: Union["SocketPool.Socket", "socket.socket"],
+    buffer: Union[bytes, bytearray, memoryview],
+) -> bool:
+    """
+    Writes all of ``buffer`` to the non-blocking ``conn``, waiting in ``asyncio``'s IO
+    queue while its send buffer is full. Returns ``False`` if the client hung up.
+    """
+    from asyncio import core  # pylint: disable=import-outside-toplevel
+
+    bytes_sent = 0
+    bytes_to_send = len(buffer)
+    view = memoryview(buffer)
+    while bytes_sent < bytes_to_send:
+        try:
+            bytes_sent += conn.send(view[bytes_sent:])
+        except BrokenPipeError:
+            return False
+        except OSError as exc:
+            if exc.errno == EAGAIN:
+                # pylint: disable=protected-access
+                await core._io_queue.queue_write(conn)
+                continue
+            if exc.errno in (ECONNRESET, ENOTCONN):
+                return False
+            raise
+    return True
+
 
 class FileResponse(Response):  # pylint: disable=too-few-public-methods
     """
@@ -156,6 +237,11 @@ class FileResponse(Response):  # pylint: disable=too-few-public-methods
     If browsers should download the file instead of displaying it, use ``as_attachment`` and
     ``download_filename`` arguments.
 
+    If there is a gzipped copy of the file next to it, e.g. ``index.html.gz``, it is sent instead
+    to clients that accept gzip, as long as it isn't older than the file. Each file gets a strong
+    ``ETag`` from a hash of its content, worked out once and kept until the file changes, and a
+    request with a matching ``If-None-Match`` gets a ``304 Not Modified`` with no body.
+
     Example::
 
         @server.route(path, method)
@@ -164,6 +250,9 @@ class FileResponse(Response):  # pylint: disable=too-few-public-methods
             return FileResponse(request, filename='index.html', root_path='/www')
     """
 
+    _etags: Dict[str, Tuple[int, int, str]] = {}
+    """ETag of each file sent so far, with the size and modification time it was worked out for."""
+
     def __init__(  # pylint: disable=too-many-arguments
         self,
         request: Request,
@@ -179,6 +268,8 @@ class FileResponse(Response):  # pylint: disable=too-few-public-methods
         buffer_size: int = 1024,
         head_only: bool = False,
         safe: bool = True,
+        precompressed: bool = True,
+        etag: bool = True,
     ) -> None:
         """
         :param Request request: Request that this is a response to.
@@ -194,6 +285,10 @@ class FileResponse(Response):  # pylint: disable=too-few-public-methods
         :param int buffer_size: Size of the buffer used to send the file. Defaults to ``1024``.
         :param bool head_only: If ``True``, only headers will be sent. Defaults to ``False``.
         :param bool safe: If ``True``, checks if ``filename`` is valid. Defaults to ``True``.
+        :param bool precompressed: If ``True``, sends the gzipped copy of the file to clients that
+          accept gzip, if there is one. Defaults to ``True``.
+        :param bool etag: If ``True``, sends an ``ETag`` and answers a matching
+          ``If-None-Match`` with ``304 Not Modified``. Defaults to ``True``.
         """
         if safe:
             self._verify_file_path_is_valid(filename)
@@ -209,12 +304,17 @@ class FileResponse(Response):  # pylint: disable=too-few-public-methods
         self._root_path = root_path or self._request.server.root_path
         self._full_file_path = self._combine_path(self._root_path, self._filename)
         self._content_type = content_type or MIMETypes.get_for_filename(self._filename)
-        self._file_length = self._get_file_length(self._full_file_path)
+        self._file_length, modified = self._get_file_stat(self._full_file_path)
 
         self._buffer_size = buffer_size
         self._head_only = head_only
         self._safe = safe
 
+        if precompressed:
+            self._use_gzipped_copy(modified)
+        if etag:
+            self._check_etag()
+
         if as_attachment:
             self._headers.setdefault(
                 "Content-Disposition",
@@ -252,28 +352,154 @@ class FileResponse(Response):  # pylint: disable=too-few-public-methods
         return root_path + filename
 
     @staticmethod
-    def _get_file_length(file_path: str) -> int:
+    def _get_file_stat(file_path: str) -> Tuple[int, int]:
         """
-        Tries to get the length of the file at ``file_path``.
+        Tries to get the length and modification time of the file at ``file_path``.
         Raises ``FileNotExistsError`` if file does not exist.
         """
         try:
             stat = os.stat(file_path)
-            st_mode, st_size = stat[0], stat[6]
+            st_mode, st_size, st_mtime = stat[0], stat[6], stat[8]
             assert (st_mode & 0o170000) == 0o100000  # Check if it is a regular file
-            return st_size
+            return st_size, st_mtime
         except (OSError, AssertionError):
             raise FileNotExistsError(file_path)  # pylint: disable=raise-missing-from
 
+    @staticmethod
+    def _get_file_length(file_path: str) -> int:
+        """
+        Tries to get the length of the file at ``file_path``.
+        Raises ``FileNotExistsError`` if file does not exist.
+        """
+        return FileResponse._get_file_stat(file_path)[0]
+
+    def _use_gzipped_copy(self, modified: int) -> None:
+        """Switches to the gzipped copy of the file, if there is one and the client takes it."""
+        gzipped_path = self._full_file_path + ".gz"
+        try:
+            gzipped_length, gzipped_modified = self._get_file_stat(gzipped_path)
+        except FileNotExistsError:
+            return
+        if gzipped_modified < modified:  # Left over from an older version of the file
+            return
+
+        self._headers.setdefault("Vary", "Accept-Encoding")
+        if not _accepts_gzip(self._request.headers.get("Accept-Encoding", "")):
+            return
+        self._full_file_path = gzipped_path
+        self._file_length = gzipped_length
+        self._headers.setdefault("Content-Encoding", "gzip")
+
+    def _check_etag(self) -> None:
+        """Sends the file's ``ETag``, and only headers if the client already has the file."""
+        etag = self._get_etag(self._full_file_path, self._buffer_size)
+        self._headers.setdefault("ETag", etag)
+
+        if_none_match = self._request.headers.get("If-None-Match")
+        if (
+            self._request.method in (GET, HEAD)
+            and if_none_match is not None
+            and _etag_matches(if_none_match, etag)
+        ):
+            self._status = NOT_MODIFIED_304
+            self._head_only = True
+            self._file_length = None
+
+    @staticmethod
+    def _get_etag(file_path: str, buffer_size: int) -> str:
+        """
+        Strong ``ETag`` of the file at ``file_path``. Worked out from the file's content the first
+        time and again only when the file's size or modification time changes.
+        """
+        file_length, modified = FileResponse._get_file_stat(file_path)
+        cached = FileResponse._etags.get(file_path)
+        if cached is not None and cached[0] == file_length and cached[1] == modified:
+            return cached[2]
+
+        digest = hashlib.new("sha1")
+        buffer = _take_buffer(buffer_size)
+        try:
+            with open(file_path, "rb") as file:
+                while bytes_read := file.readinto(buffer):
+                    digest.update(memoryview(buffer)[:bytes_read])
+        finally:
+            _give_back_buffer(buffer)
+
+        etag = '"' + hexlify(digest.digest()[:8]).decode() + '"'
+        FileResponse._etags[file_path] = (file_length, modified, etag)
+        return etag
+
     def _send(self) -> None:
         self._send_headers(self._file_length, self._content_type)
 
         if not self._head_only:
-            with open(self._full_file_path, "rb") as file:
-                while bytes_read := file.read(self._buffer_size):
-                    self._send_bytes(self._request.connection, bytes_read)
+            buffer = _take_buffer(self._buffer_size)
+            view = memoryview(buffer)
+            try:
+                with open(self._full_file_path, "rb") as file:
+                    while bytes_read := file.readinto(buffer):
+                        self._send_bytes(self._request.connection, view[:bytes_read])
+            finally:
+                _give_back_buffer(buffer)
         self._close_connection()
 
+    async def _send_async(self) -> None:
+        connection = self._request.connection
+        pending = self._send_pending(
+            self._send_headers, self._file_length, self._content_type
+        )
+        sending = await pending.flush(connection)
+
+        if sending and not self._head_only:
+            buffer = _take_buffer(self._buffer_size)
+            view = memoryview(buffer)
+            try:
+                with open(self._full_file_path, "rb") as file:
+                    while bytes_read := file.readinto(buffer):
+                        if not await _send_bytes_async(connection, view[:bytes_read]):
+                            break
+                        self._size += bytes_read
+            finally:
+                _give_back_buffer(buffer)
+        self._close_connection()
+
+
+_free_buffers = []
+
+
+def _take_buffer(size: int) -> bytearray:
+    """
+    A buffer of ``size`` bytes for reading files, one given back earlier if there is one.
+    Responses sent at once by `Server.serve_async` each take their own.
+    """
+    for i, buffer in enumerate(_free_buffers):
+        if len(buffer) == size:
+            return _free_buffers.pop(i)
+    return bytearray(size)
+
+
+def _give_back_buffer(buffer: bytearray) -> None:
+    _free_buffers.append(buffer)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an ``Accept-Encoding`` header lists gzip, and not with ``q=0``."""
+    for coding in accept_encoding.split(","):
+        name, _, parameters = coding.partition(";")
+        if name.strip().lower() == "gzip":
+            quality = parameters.strip().replace(" ", "")
+            return quality not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an ``If-None-Match`` header lists ``etag``, compared weakly as RFC 9110 asks."""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
 
 class ChunkedResponse(Response):  # pylint: disable=too-few-public-methods
     """
@@ -527,6 +753,19 @@ class SSEResponse(Response):  # pylint: disable=too-few-public-methods
         :param int retry: (Optional) The time (in milliseconds) to wait before retrying the event.
         :param Dict[str, str] custom_fields: (Optional) Custom fields to be sent with the event.
         """
+        message = self._format_event(data, event, id, retry, custom_fields)
+
+        self._send_bytes(self._request.connection, message.encode("utf-8"))
+
+    @staticmethod
+    def _format_event(  # pylint: disable=too-many-arguments
+        data: str,
+        event: str = None,
+        id: int = None,  # pylint: disable=redefined-builtin,invalid-name
+        retry: int = None,
+        custom_fields: Dict[str, str] = None,
+    ) -> str:
+        """The event as it is sent, see ``send_event()``."""
         message = f"data: {data}\n"
         if event:
             message += f"event: {event}\n"
@@ -538,8 +777,7 @@ class SSEResponse(Response):  # pylint: disable=too-few-public-methods
             for field, value in custom_fields.items():
                 message += f"{field}: {value}\n"
         message += "\n"
-
-        self._send_bytes(self._request.connection, message.encode("utf-8"))
+        return message
 
     def close(self):
         """
@@ -753,28 +991,42 @@ class Websocket(Response):  # pylint: disable=too-few-public-methods
             raise error
 
     @staticmethod
-    def _prepare_frame(opcode: int, message: bytes) -> bytearray:
-        frame = bytearray()
-
-        frame.append(Websocket.FIN | opcode)  # Setting FIN bit
-
-        payload_length = len(message)
-
-        # Message under 126 bytes, use 1 byte for length
+    def _header_length(payload_length: int) -> int:
+        # Under 126 bytes the length fits in the second byte, up to 65535 in 2 more, else 8
         if payload_length < 126:
-            frame.append(payload_length)
+            return 2
+        if payload_length < 65536:
+            return 4
+        return 10
 
-        # Message between 126 and 65535 bytes, use 2 bytes for length
-        elif payload_length < 65536:
-            frame.append(126)
-            frame.extend(payload_length.to_bytes(2, "big"))
+    @staticmethod
+    def _write_frame(
+        frame: Union[bytearray, memoryview], opcode: int, message: bytes
+    ) -> int:
+        """
+        Writes an unmasked, final frame with ``message`` as the payload to the start of
+        ``frame``, which must be long enough. Returns the length of the frame.
+        """
+        payload_length = len(message)
+        header_length = Websocket._header_length(payload_length)
 
-        # Message over 65535 bytes, use 8 bytes for length
+        frame[0] = Websocket.FIN | opcode  # Setting FIN bit
+        if header_length == 2:
+            frame[1] = payload_length
         else:
-            frame.append(127)
-            frame.extend(payload_length.to_bytes(8, "big"))
+            frame[1] = 126 if header_length == 4 else 127
+            for i in range(header_length - 1, 1, -1):
+                frame[i] = payload_length & 0xFF
+                payload_length >>= 8
+
+        frame_length = header_length + len(message)
+        frame[header_length:frame_length] = message
+        return frame_length
 
-        frame.extend(message)
+    @staticmethod
+    def _prepare_frame(opcode: int, message: bytes) -> bytearray:
+        frame = bytearray(Websocket._header_length(len(message)) + len(message))
+        Websocket._write_frame(frame, opcode, message)
         return frame
 
     def send_message(
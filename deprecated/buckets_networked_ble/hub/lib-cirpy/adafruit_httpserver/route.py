@@ -45,6 +45,13 @@ class Route:
 
         self.handler = handler
 
+        self._append_slash = append_slash
+        self._segments = _split_pattern(path)
+        # Paths the router can't split into segments are matched by regex, compiled once here
+        self._regex = None
+        if self._segments is None:
+            self._regex = re.compile(f"^{self.path}$")
+
     @staticmethod
     def _validate_path(path: str, append_slash: bool) -> None:
         if not path.startswith("/"):
@@ -102,7 +109,9 @@ class Route:
         if not other.methods.issubset(self.methods):
             return False, {}
 
-        regex_match = re.match(f"^{self.path}$", other.path)
+        if self._regex is None:
+            self._regex = re.compile(f"^{self.path}$")
+        regex_match = self._regex.match(other.path)
         if regex_match is None:
             return False, {}
 
@@ -170,19 +179,109 @@ def as_route(
     return route_decorator
 
 
+# Segments of a route path that aren't literal text
+_PARAMETER = 0  # <name>, one segment, passed to the handler
+_ANY = 1  # ..., one segment
+_REST = 2  # ...., one or more segments
+
+_REGEX_CHARACTERS = "\\^$*+?{}[]|()<>"
+
+
+def _split_pattern(path: str) -> Union[Tuple[Union[str, int], ...], None]:
+    """
+    Splits a route path into its segments, with `_PARAMETER`, `_ANY` and `_REST` for the
+    parameters and wildcards. Returns ``None`` for paths that need a regex to match, with a
+    parameter or wildcard in part of a segment or regex syntax of their own.
+    """
+    segments = []
+    for segment in path[1:].split("/"):
+        if segment == "....":
+            segments.append(_REST)
+        elif segment == "...":
+            segments.append(_ANY)
+        elif (
+            segment.startswith("<")
+            and segment.endswith(">")
+            and len(segment) > 2
+            and all(c.isalpha() or c.isdigit() or c == "_" for c in segment[1:-1])
+        ):
+            segments.append(_PARAMETER)
+        elif "..." in segment or any(c in _REGEX_CHARACTERS for c in segment):
+            return None
+        else:
+            segments.append(segment)
+    return tuple(segments)
+
+
+class _Node:  # pylint: disable=too-few-public-methods
+    """A node of the `_Routes` trie, one segment into a path."""
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.parameter: "_Node" = None
+        self.any: "_Node" = None
+        self.rest: "_Node" = None
+        self.routes: List[Tuple[int, Route]] = []  # Routes whose path ends here
+
+
 class _Routes:
-    """A collection of routes and their corresponding handlers."""
+    """
+    A collection of routes and their corresponding handlers.
+
+    Routes are sorted out once, when added: paths of only literal text go in a dict, paths
+    with parameters or wildcards in a trie of their segments, and the few that need a regex
+    have it compiled then. Finding a handler looks a path up in those without building a
+    `Route` or a regex for it. When several routes match, the one added first is used, as
+    when each was tried in turn.
+
+    A ``.`` in a route path matches only a ``.``, ``...`` and ``....`` are the wildcards.
+    """
 
     def __init__(self) -> None:
         self._routes: List[Route] = []
+        self._exact: Dict[str, List[Tuple[int, Route]]] = {}
+        self._trie = _Node()
+        self._in_trie = False
+        self._regex_routes: List[Tuple[int, Route]] = []
 
     def add(self, route: Route):
         """Adds a route and its handler to the collection."""
+        # pylint: disable=protected-access
+        entry = (len(self._routes), route)
         self._routes.append(route)
 
-    def find_handler(self, route: Route) -> Union[Callable["...", "Response"], None]:
+        segments = route._segments
+        if segments is None:
+            self._regex_routes.append(entry)
+            return
+        if all(isinstance(segment, str) for segment in segments):
+            path = "/" + "/".join(segments)
+            self._exact.setdefault(path, []).append(entry)
+            if route._append_slash:
+                self._exact.setdefault(path + "/", []).append(entry)
+            return
+
+        self._in_trie = True
+        node = self._trie
+        for segment in segments:
+            if segment == _PARAMETER:
+                node.parameter = node.parameter or _Node()
+                node = node.parameter
+            elif segment == _ANY:
+                node.any = node.any or _Node()
+                node = node.any
+            elif segment == _REST:
+                node.rest = node.rest or _Node()
+                node = node.rest
+            else:
+                node = node.children.setdefault(segment, _Node())
+        node.routes.append(entry)
+
+    def find_handler(
+        self, path: str, method: str
+    ) -> Union[Callable["...", "Response"], None]:
         """
-        Finds a handler for a given route.
+        Finds a handler for a request for ``path`` with ``method``.
 
         If route used URL parameters, the handler will be wrapped to pass the parameters to the
         handler.
@@ -195,24 +294,92 @@ class _Routes:
                 request.path == "/example/123" # True
                 my_parameter == "123" # True
         """
-        found_route, _route = False, None
-
-        for _route in self._routes:
-            matches, keyword_parameters = _route.match(route)
+        # [index, route, parameter values] of the first added route that matches so far
+        found = [len(self._routes), None, None]
 
-            if matches:
-                found_route = True
+        for index, route in self._exact.get(path, ()):
+            if method in route.methods:
+                found = [index, route, ()]
                 break
 
-        if not found_route:
+        if self._in_trie and path.startswith("/"):
+            self._search(self._trie, path[1:].split("/"), 0, [], method, found)
+
+        for index, route in self._regex_routes:
+            if index >= found[0]:
+                break
+            if method in route.methods:
+                # pylint: disable=protected-access
+                regex_match = route._regex.match(path)
+                if regex_match is not None:
+                    found = [index, route, regex_match.groups()]
+                    break
+
+        _, route, values = found
+        if route is None:
             return None
+        if not values:
+            return route.handler
 
-        handler = _route.handler
+        handler = route.handler
+        keyword_parameters = dict(zip(route.parameters_names, values))
 
         def wrapped_handler(request):
             return handler(request, **keyword_parameters)
 
         return wrapped_handler
 
+    def _search(  # pylint: disable=too-many-arguments
+        self,
+        node: _Node,
+        segments: List[str],
+        position: int,
+        values: List[str],
+        method: str,
+        found: list,
+    ) -> None:
+        """
+        Walks the trie from ``node`` along ``segments[position:]``, every branch that matches,
+        and puts the first added route that matches the whole path in ``found``.
+        """
+        remaining = len(segments) - position
+
+        # Routes ending here, with an optional trailing slash for append_slash ones
+        if node.routes and (
+            remaining == 0 or (remaining == 1 and segments[position] == "")
+        ):
+            for index, route in node.routes:
+                if index >= found[0]:
+                    break
+                # pylint: disable=protected-access
+                if method in route.methods and (remaining == 0 or route._append_slash):
+                    found[0], found[1], found[2] = index, route, tuple(values)
+                    break
+
+        if remaining == 0:
+            return
+
+        segment = segments[position]
+        child = node.children.get(segment)
+        if child is not None:
+            self._search(child, segments, position + 1, values, method, found)
+
+        if segment:  # Parameters and wildcards are never empty
+            if node.parameter is not None:
+                values.append(segment)
+                self._search(
+                    node.parameter, segments, position + 1, values, method, found
+                )
+                values.pop()
+            if node.any is not None:
+                self._search(node.any, segments, position + 1, values, method, found)
+
+        if node.rest is not None:
+            # One or more whole segments, as long as they aren't just one empty one
+            for taken in range(0 if segment else 1, remaining):
+                self._search(
+                    node.rest, segments, position + taken + 1, values, method, found
+                )
+
     def __repr__(self) -> str:
         return f"_Routes({repr(self._routes)})"
@@ -29,9 +29,16 @@ from .exceptions import (
 from .headers import Headers
 from .methods import GET, HEAD
 from .request import Request
-from .response import Response, FileResponse
+from .response import Response, FileResponse, _send_bytes_async
 from .route import _Routes, Route
-from .status import BAD_REQUEST_400, UNAUTHORIZED_401, FORBIDDEN_403, NOT_FOUND_404
+from .status import (
+    BAD_REQUEST_400,
+    UNAUTHORIZED_401,
+    FORBIDDEN_403,
+    NOT_FOUND_404,
+    PAYLOAD_TOO_LARGE_413,
+    REQUEST_HEADER_FIELDS_TOO_LARGE_431,
+)
 
 
 NO_REQUEST = "no_request"
@@ -250,32 +257,44 @@ class Server:  # pylint: disable=too-many-instance-attributes
 
         request = Request(self, sock, client_address, header_bytes)
 
-        content_length = int(request.headers.get_directive("Content-Length", 0))
+        content_length = _content_length(request)
         received_body_bytes = request.body
 
         # Receiving remaining body bytes
-        request.body = self._receive_body_bytes(
-            sock, received_body_bytes, content_length
-        )
+        if len(received_body_bytes) != content_length:
+            request.body = self._receive_body_bytes(
+                sock, received_body_bytes, content_length
+            )
 
         return request
 
     def _receive_header_bytes(
         self, sock: Union["SocketPool.Socket", "socket.socket"]
     ) -> bytes:
-        """Receive bytes until a empty line is received."""
-        received_bytes = bytes()
-        while b"\r\n\r\n" not in received_bytes:
+        """
+        Receive bytes into the buffer until a empty line is received, and return them.
+        Returns no bytes if the headers don't fit in the buffer.
+        """
+        view = memoryview(self._buffer)
+        size = len(self._buffer)
+        length = 0
+        while length < size:
             try:
-                length = sock.recv_into(self._buffer, len(self._buffer))
-                received_bytes += self._buffer[:length]
+                received = sock.recv_into(view[length:], size - length)
             except OSError as ex:
                 if ex.errno == ETIMEDOUT:
                     break
                 raise
             except Exception as ex:
                 raise ex
-        return received_bytes
+            if not received:
+                break
+            length += received
+            if _find_header_end(view, length - received, length) >= 0:
+                break
+        else:
+            return b""
+        return bytes(view[:length])
 
     def _receive_body_bytes(
         self,
@@ -373,7 +392,7 @@ class Server:  # pylint: disable=too-many-instance-attributes
                 return CONNECTION_TIMED_OUT
 
             # Find a handler for the route
-            handler = self._routes.find_handler(Route(request.path, request.method))
+            handler = self._routes.find_handler(request.path, request.method)
 
             # Handle the request
             response = self._handle_request(request, handler)
@@ -409,6 +428,180 @@ class Server:  # pylint: disable=too-many-instance-attributes
             conn.close()
             raise error  # Raise the exception again to be handled by the user.
 
+    async def serve_async(
+        self, host: str = None, port: int = 80, *, max_connections: int = 4
+    ) -> None:
+        """
+        Serve HTTP requests from an ``asyncio`` task, alongside the program's other tasks.
+        Starts the server if it isn't started yet, returns when it is stopped by calling
+        ``.stop()``.
+
+        Unlike ``.poll()``, nothing here blocks: the listening socket and every connection
+        wait in ``asyncio``'s IO queue, so a slow client only holds up its own request.
+        Up to ``max_connections`` requests are handled at once, each read into its own
+        buffer of ``request_buffer_size`` bytes, so memory use stays fixed. Further clients
+        wait in the listen backlog. A request whose headers don't fit its buffer gets a
+        431, one whose body doesn't a 413, and a client that hasn't sent its whole
+        request within ``socket_timeout`` is dropped.
+
+        :param str host: host name or IP address, not needed if the server is started
+        :param int port: port
+        :param int max_connections: requests handled at once
+
+        Example::
+
+            async def main():
+                await asyncio.gather(
+                    server.serve_async(str(wifi.radio.ipv4_address)),
+                    game_loop(),
+                )
+
+            asyncio.run(main())
+        """
+        # pylint: disable=import-outside-toplevel,protected-access
+        from asyncio import core, create_task, Event
+
+        if self.stopped:
+            self.start(host, port)
+
+        buffers = [bytearray(len(self._buffer)) for _ in range(max_connections)]
+        freed = Event()
+        try:
+            while not self.stopped:
+                if not buffers:
+                    freed.clear()
+                    await freed.wait()
+                    continue
+                await core._io_queue.queue_read(self._sock)
+                while buffers and not self.stopped:
+                    try:
+                        conn, client_address = self._sock.accept()
+                    except OSError as error:
+                        if error.errno in (EAGAIN, ECONNRESET):
+                            break
+                        raise
+                    conn.setblocking(False)
+                    create_task(
+                        self._serve_connection(
+                            conn, client_address, buffers.pop(), buffers, freed
+                        )
+                    )
+        except core.CancelledError:
+            if not self.stopped:
+                self.stop()
+            raise
+
+    async def _serve_connection(  # pylint: disable=too-many-arguments
+        self,
+        conn: Union["SocketPool.Socket", "socket.socket"],
+        client_address: Tuple[str, int],
+        buffer: bytearray,
+        buffers: List[bytearray],
+        freed: "Event",
+    ) -> None:
+        """Handles one connection for ``.serve_async()``, then gives back its buffer."""
+        # pylint: disable=import-outside-toplevel
+        from asyncio import wait_for_ms, TimeoutError as Timeout
+
+        _debug_start_time = monotonic()
+        try:
+            try:
+                request = await wait_for_ms(
+                    self._receive_request_async(conn, client_address, buffer),
+                    int(self._timeout * 1000),
+                )
+            except Timeout:
+                request = None
+            if request is None:
+                conn.close()
+                return
+
+            if len(request.body) < _content_length(request):
+                response = Response(
+                    request, "Request too large", status=PAYLOAD_TOO_LARGE_413
+                )
+            else:
+                handler = self._routes.find_handler(request.path, request.method)
+                response = self._handle_request(request, handler)
+
+            if response is None:
+                conn.close()
+                return
+
+            self._set_default_server_headers(response)
+            await response._send_async()  # pylint: disable=protected-access
+
+            if self.debug:
+                _debug_response_sent(response, monotonic() - _debug_start_time)
+
+        except Exception as error:  # pylint: disable=broad-except
+            if self.debug:
+                _debug_exception_in_handler(error)
+            conn.close()
+        finally:
+            buffers.append(buffer)
+            freed.set()
+
+    async def _receive_request_async(
+        self,
+        conn: Union["SocketPool.Socket", "socket.socket"],
+        client_address: Tuple[str, int],
+        buffer: bytearray,
+    ) -> Union[Request, None]:
+        """
+        Reads a request into ``buffer``, waiting in ``asyncio``'s IO queue for each part.
+        Stops when the buffer is full, so the body may be cut short.
+        Returns ``None`` if the client hung up, or once it is answered with a 431 when
+        the headers don't fit.
+        """
+        # pylint: disable=import-outside-toplevel,protected-access
+        from asyncio import core
+
+        view = memoryview(buffer)
+        size = len(buffer)
+        length = 0
+        request = None
+        header_end = -1
+        while length < size:
+            await core._io_queue.queue_read(conn)
+            try:
+                received = conn.recv_into(view[length:], size - length)
+            except OSError as error:
+                if error.errno == EAGAIN:
+                    continue
+                if error.errno == ECONNRESET:
+                    return None
+                raise
+            if not received:
+                return None
+            length += received
+
+            if header_end < 0:
+                header_end = _find_header_end(view, length - received, length)
+                if header_end < 0:
+                    continue
+            if request is None:
+                request = Request(self, conn, client_address, bytes(view[:length]))
+                end = header_end + 4 + _content_length(request)
+            if end <= length:
+                break
+
+        if request is None:
+            # The headers filled the buffer, there's no Request to build a Response on
+            status = REQUEST_HEADER_FIELDS_TOO_LARGE_431
+            await _send_bytes_async(
+                conn,
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n"
+                f"Content-Length: {len(status.text)}\r\nConnection: close\r\n\r\n"
+                f"{status.text}".encode(),
+            )
+            return None
+
+        if len(request.raw_request) != min(length, end):
+            # The body came in after the headers, or more than Content-Length came
+            request.raw_request = bytes(view[: min(length, end)])
+        return request
+
     def require_authentication(self, auths: List[Union[Basic, Token, Bearer]]) -> None:
         """
         Requires authentication for all routes and files in ``root_path``.
@@ -491,6 +684,21 @@ class Server:  # pylint: disable=too-many-instance-attributes
             raise ValueError("Server.socket_timeout must be a positive numeric value.")
 
 
+def _content_length(request: Request) -> int:
+    return int(request.headers.get_directive("Content-Length", 0))
+
+
+def _find_header_end(view: memoryview, start: int, end: int) -> int:
+    """
+    Index of the empty line after the headers in ``view[:end]``, or -1 if it isn't there.
+    Only looks at the bytes from ``start`` on and the 3 before them, so only the bytes
+    just received are copied to search them.
+    """
+    start = max(0, start - 3)
+    found = bytes(view[start:end]).find(b"\r\n\r\n")
+    return found if found < 0 else start + found
+
+
 def _debug_warning_exposed_files(root_path: str):
     """Warns about exposing all files on the device."""
     print(
@@ -47,6 +47,8 @@ MOVED_PERMANENTLY_301 = Status(301, "Moved Permanently")
 
 FOUND_302 = Status(302, "Found")
 
+NOT_MODIFIED_304 = Status(304, "Not Modified")
+
 TEMPORARY_REDIRECT_307 = Status(307, "Temporary Redirect")
 
 PERMANENT_REDIRECT_308 = Status(308, "Permanent Redirect")
@@ -61,8 +63,12 @@ NOT_FOUND_404 = Status(404, "Not Found")
 
 METHOD_NOT_ALLOWED_405 = Status(405, "Method Not Allowed")
 
+PAYLOAD_TOO_LARGE_413 = Status(413, "Payload Too Large")
+
 TOO_MANY_REQUESTS_429 = Status(429, "Too Many Requests")
 
+REQUEST_HEADER_FIELDS_TOO_LARGE_431 = Status(431, "Request Header Fields Too Large")
+
 INTERNAL_SERVER_ERROR_500 = Status(500, "Internal Server Error")
 
 NOT_IMPLEMENTED_501 = Status(501, "Not Implemented")
@@ -468,6 +468,12 @@ class Session:
         for sock in free_sockets:
             self._close_socket(sock)
 
+    def close(self) -> None:
+        """Close every socket the session holds, in use or not, to start afresh
+        after a request failed part way"""
+        for sock in list(self._open_sockets.values()):
+            self._close_socket(sock)
+
     def _get_socket(
         self, host: str, port: int, proto: str, *, timeout: float = 1
     ) -> CircuitPythonSocketType:
@@ -562,41 +568,36 @@ class Session:
         json: Any,
     ):
         # pylint: disable=too-many-arguments
-        self._send(socket, bytes(method, "utf-8"))
-        self._send(socket, b" /")
-        self._send(socket, bytes(path, "utf-8"))
-        self._send(socket, b" HTTP/1.1\r\n")
+        # The request goes out in one send, not a send per piece. On a socket
+        # kept open for another request, a piece sent while the last is
+        # unacked waits on the peer's delayed ACK.
+        head = [method, " /", path, " HTTP/1.1\r\n"]
         if "Host" not in headers:
-            self._send(socket, b"Host: ")
-            self._send(socket, bytes(host, "utf-8"))
-            self._send(socket, b"\r\n")
+            head += ["Host: ", host, "\r\n"]
         if "User-Agent" not in headers:
-            self._send(socket, b"User-Agent: Adafruit CircuitPython\r\n")
+            head.append("User-Agent: Adafruit CircuitPython\r\n")
         # Iterate over keys to avoid tuple alloc
         for k in headers:
-            self._send(socket, k.encode())
-            self._send(socket, b": ")
-            self._send(socket, headers[k].encode())
-            self._send(socket, b"\r\n")
+            head += [k, ": ", headers[k], "\r\n"]
         if json is not None:
             assert data is None
             data = json_module.dumps(json)
-            self._send(socket, b"Content-Type: application/json\r\n")
+            head.append("Content-Type: application/json\r\n")
         if data:
             if isinstance(data, dict):
-                self._send(
-                    socket, b"Content-Type: application/x-www-form-urlencoded\r\n"
-                )
+                head.append("Content-Type: application/x-www-form-urlencoded\r\n")
                 _post_data = ""
                 for k in data:
                     _post_data = "{}&{}={}".format(_post_data, k, data[k])
                 data = _post_data[1:]
             if isinstance(data, str):
                 data = bytes(data, "utf-8")
-            self._send(socket, b"Content-Length: %d\r\n" % len(data))
-        self._send(socket, b"\r\n")
+            head.append("Content-Length: %d\r\n" % len(data))
+        head.append("\r\n")
+        request = "".join(head).encode()
         if data:
-            self._send(socket, bytes(data))
+            request += bytes(data)
+        self._send(socket, request)
 
     # pylint: disable=too-many-branches, too-many-statements, unused-argument, too-many-arguments, too-many-locals
     def request(
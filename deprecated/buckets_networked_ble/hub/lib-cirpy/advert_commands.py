@@ -0,0 +1,132 @@
+"""
+The game as a BLE advertisement, so any number of phones and boards can follow
+it by scanning, without connecting.
+
+The state goes in Adafruit manufacturer data, under a key from the range
+Adafruit leaves to its customers, as one fixed layout:
+    version   B   LAYOUT_VERSION
+    status    B   index in STATUSES
+    timer     H   seconds left in the game
+    red_time  H   seconds held by red
+    blue_time H   seconds held by blue
+    teams     3s  the team ID of each of up to MAX_BUCKETS buckets, as the
+                  buckets number them, a nibble each, bucket 1 in the high
+                  nibble of the first byte, NO_TEAM for none
+Any change to the layout bumps LAYOUT_VERSION. Scanners match the version along
+with the key, so a layout they don't know is dropped by the radio before it
+reaches Python. With the flags, the whole advertisement is ADVERTISEMENT_SIZE
+bytes, inside the 31 of a legacy advertisement, which every phone can scan.
+"""
+import struct
+from micropython import const
+from adafruit_ble.advertising import Advertisement, LazyObjectField
+from adafruit_ble.advertising.adafruit import (
+    MANUFACTURING_DATA_ADT,
+    ADAFRUIT_COMPANY_ID,
+)
+from adafruit_ble.advertising.standard import ManufacturerData
+
+STATE_KEY = const(0xF0B7)
+LAYOUT_VERSION = const(1)
+LAYOUT = "<BBHHH3s"
+STATE_SIZE = struct.calcsize(LAYOUT)
+# Flags, then manufacturer data: its header, company ID and the keyed field
+ADVERTISEMENT_SIZE = 3 + 2 + 2 + 3 + STATE_SIZE
+LEGACY_SIZE = const(31)
+
+STATUSES = ("Waiting", "Running", "Paused", "Ended")
+NO_TEAM = const(0xF)
+MAX_BUCKETS = const(6)
+
+
+def encode_state(status, timer, red_time, blue_time, teams=()):
+    """
+    The state as laid out in the advertisement. Times past 0xFFFF are capped
+    and teams after MAX_BUCKETS are left out.
+    """
+    slots = bytearray(b"\xff" * ((MAX_BUCKETS + 1) // 2))
+    for i, team in enumerate(teams[:MAX_BUCKETS]):
+        if not 0 <= team < NO_TEAM:
+            team = NO_TEAM
+        if i % 2:
+            slots[i // 2] = (slots[i // 2] & 0xF0) | team
+        else:
+            slots[i // 2] = (team << 4) | (slots[i // 2] & 0x0F)
+    return struct.pack(
+        LAYOUT,
+        LAYOUT_VERSION,
+        STATUSES.index(status),
+        min(timer, 0xFFFF),
+        min(red_time, 0xFFFF),
+        min(blue_time, 0xFFFF),
+        slots,
+    )
+
+
+def decode_state(data):
+    """
+    (status, timer, red_time, blue_time, teams) from the bytes of an
+    advertisement, teams as IDs in bucket order up to the last one with a
+    team. None if data isn't this layout version.
+    """
+    if not data or len(data) != STATE_SIZE or data[0] != LAYOUT_VERSION:
+        return None
+    _, status, timer, red_time, blue_time, slots = struct.unpack(LAYOUT, data)
+    if status >= len(STATUSES):
+        return None
+    teams = []
+    for i in range(MAX_BUCKETS):
+        teams.append(slots[i // 2] & 0x0F if i % 2 else slots[i // 2] >> 4)
+    while teams and teams[-1] == NO_TEAM:
+        teams.pop()
+    return STATUSES[status], timer, red_time, blue_time, teams
+
+
+class Field_Advertisement(Advertisement):
+    """
+    Broadcasts the game's state, see encode_state(). Pass this class to
+    BLERadio.start_scan() to get only these, then read state.
+    """
+
+    match_prefixes = (
+        struct.pack(
+            "<BHBHB",
+            MANUFACTURING_DATA_ADT,
+            ADAFRUIT_COMPANY_ID,
+            2 + STATE_SIZE,
+            STATE_KEY,
+            LAYOUT_VERSION,
+        ),
+    )
+    manufacturer_data = LazyObjectField(
+        ManufacturerData,
+        "manufacturer_data",
+        advertising_data_type=MANUFACTURING_DATA_ADT,
+        company_id=ADAFRUIT_COMPANY_ID,
+        key_encoding="<H",
+    )
+
+    def __init__(self, *, entry=None):
+        super().__init__(entry=entry)
+        if entry:
+            return
+        self.flags.general_discovery = True
+        self.flags.le_only = True
+
+    @property
+    def state(self):
+        """(status, timer, red_time, blue_time, teams), None if there's none"""
+        if self.manufacturer_data is None:
+            return None
+        return decode_state(self.manufacturer_data.data.get(STATE_KEY))
+
+    def update(self, status, timer, red_time, blue_time, teams=()):
+        """
+        Sets the state to advertise. Returns True if it changed, and
+        advertising has to be started again to send it.
+        """
+        data = encode_state(status, timer, red_time, blue_time, teams)
+        if self.manufacturer_data.data.get(STATE_KEY) == data:
+            return False
+        self.manufacturer_data.data[STATE_KEY] = data
+        return True
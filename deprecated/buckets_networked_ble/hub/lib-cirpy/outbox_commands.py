@@ -0,0 +1,232 @@
+import os
+import struct
+from random import randint
+from adafruit_ticks import ticks_ms, ticks_diff
+from adafruit_requests import OutOfRetries
+
+# Team IDs as the buckets number them
+TEAMS = ("Green", "Red", "Blue", "Purple")
+NO_TEAM = 0xFF
+
+
+class Result_Outbox:
+    """
+    Game results waiting to be uploaded, kept on flash until the endpoint has
+    them, so a field with no internet loses nothing.
+
+    The file is a header, b"RO", a layout version and the last sequence
+    number the endpoint took, followed by one fixed size record per game:
+    its sequence number, game length, red and blue time, and the team each
+    of up to MAX_BUCKETS buckets ended on. Results are appended as games end,
+    and the file is cut back to the header once everything has been taken.
+
+    drain() posts the waiting results in batches of batch_size through one
+    adafruit_requests.Session, which keeps the socket open between the posts.
+    Every result carries an "id" made of the device name and its sequence
+    number, and every post an Idempotency-Key, so the endpoint can drop a
+    batch it already has when an answer got lost and it's sent again. After
+    a failure nothing is sent until the backoff, doubling up to max_backoff_ms,
+    has passed. Each post blocks for up to timeout seconds, max_batches
+    keeps a drain() short enough to run beside a game.
+    """
+
+    HEADER = "<2sBBI"
+    RECORD = "<IHHH6s"
+    MAGIC = b"RO"
+    VERSION = 1
+    MAX_BUCKETS = 6
+
+    def __init__(
+        self,
+        path,
+        device,
+        url,
+        session,
+        batch_size=8,
+        timeout=0.5,
+        max_records=1024,
+        min_backoff_ms=2000,
+        max_backoff_ms=300000,
+    ):
+        self.path = path
+        self.device = device
+        self.url = url
+        self.session = session
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_records = max_records
+        self.min_backoff_ms = min_backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self.backoff_ms = 0
+        self.posts = 0
+        self.failures = 0
+        self._failed_at = ticks_ms()
+        self._header_size = struct.calcsize(self.HEADER)
+        self._record_size = struct.calcsize(self.RECORD)
+        self._record = bytearray(self._record_size)
+        self.acked = 0
+        self._records = 0
+        self._first = 0  # Index of the first record not yet taken
+        self._load()
+
+    @property
+    def pending(self):
+        """Number of results not yet taken by the endpoint"""
+        return self._records - self._first
+
+    @property
+    def next_seq(self):
+        """Sequence number the next result gets"""
+        return self.acked + self.pending + 1
+
+    def add(self, game_length, red_time, blue_time, teams=()):
+        """
+        Appends a result, teams as IDs in bucket order. Returns its sequence
+        number, or None if the outbox is full or the flash read-only.
+        """
+        if self._records >= self.max_records:
+            return None
+        seq = self.next_seq
+        slots = bytearray(b"\xff" * self.MAX_BUCKETS)
+        for i, team in enumerate(teams[: self.MAX_BUCKETS]):
+            slots[i] = team
+        struct.pack_into(
+            self.RECORD, self._record, 0, seq, game_length, red_time, blue_time, slots
+        )
+        try:
+            with open(self.path, "ab") as file:
+                file.write(self._record)
+        except OSError:
+            return None
+        self._records += 1
+        return seq
+
+    def results(self, start, count):
+        """Up to count results from record index start, as dicts for the endpoint"""
+        results = []
+        with open(self.path, "rb") as file:
+            file.seek(self._header_size + start * self._record_size)
+            for _ in range(min(count, self._records - start)):
+                file.readinto(self._record)
+                seq, game_length, red_time, blue_time, slots = struct.unpack(
+                    self.RECORD, self._record
+                )
+                results.append(
+                    {
+                        "id": "{}-{}".format(self.device, seq),
+                        "game_length": game_length,
+                        "red": red_time,
+                        "blue": blue_time,
+                        "teams": [team for team in slots if team != NO_TEAM],
+                    }
+                )
+        return results
+
+    def due(self):
+        """Whether there are results waiting and the backoff has passed"""
+        return self.pending > 0 and (
+            ticks_diff(ticks_ms(), self._failed_at) >= self.backoff_ms
+        )
+
+    def back_off(self):
+        """Holds off sending after a failure, twice as long as the last time"""
+        self.failures += 1
+        self.backoff_ms = min(
+            self.max_backoff_ms, max(self.min_backoff_ms, self.backoff_ms * 2)
+        )
+        # Spread out devices that lost the endpoint at the same moment
+        self.backoff_ms -= randint(0, self.backoff_ms // 4)
+        self._failed_at = ticks_ms()
+
+    def drain(self, max_batches=None):
+        """
+        Posts the waiting results, a batch at a time, until they're all taken
+        or a post fails. Returns the number taken.
+        """
+        taken = 0
+        batches = 0
+        while self.pending and (max_batches is None or batches < max_batches):
+            results = self.results(self._first, self.batch_size)
+            first = self.acked + 1
+            key = "{}-{}-{}".format(self.device, first, first + len(results) - 1)
+            try:
+                response = self.session.post(
+                    self.url,
+                    json={"device": self.device, "results": results},
+                    headers={"Idempotency-Key": key},
+                    timeout=self.timeout,
+                )
+                status = response.status_code
+                # Reads the rest of the answer, so the socket can be used again
+                response.close()
+            except (OSError, RuntimeError, ValueError, OutOfRetries):
+                self.session.close()
+                status = None
+            self.posts += 1
+            batches += 1
+            # 409 is an endpoint saying it has these already
+            if status is None or not (200 <= status < 300 or status == 409):
+                self.back_off()
+                break
+            self._ack(len(results))
+            taken += len(results)
+            self.backoff_ms = 0
+        return taken
+
+    def _ack(self, count):
+        """Records that the endpoint took the next count results"""
+        self.acked += count
+        self._first += count
+        if not self.pending:
+            self._records = self._first = 0
+            self._rewrite()
+            return
+        with open(self.path, "r+b") as file:
+            file.write(
+                struct.pack(self.HEADER, self.MAGIC, self.VERSION, 0, self.acked)
+            )
+
+    def _load(self):
+        """Reads the header and counts the records, starting a file if there's none"""
+        try:
+            size = os.stat(self.path)[6]
+            with open(self.path, "rb") as file:
+                header = file.read(self._header_size)
+        except OSError:
+            size, header = 0, b""
+        if len(header) == self._header_size:
+            magic, version, _, acked = struct.unpack(self.HEADER, header)
+            if magic == self.MAGIC and version == self.VERSION:
+                self.acked = acked
+                self._records = (size - self._header_size) // self._record_size
+                if self._records:
+                    with open(self.path, "rb") as file:
+                        file.seek(self._header_size)
+                        file.readinto(self._record)
+                    first_seq = struct.unpack_from("<I", self._record)[0]
+                    self._first = min(self._records, max(0, acked + 1 - first_seq))
+                if size != self._header_size + self._records * self._record_size:
+                    # A write cut short by a reset, keep the whole records
+                    self._rewrite()
+                return
+        try:
+            self._rewrite()
+        except OSError:
+            pass
+
+    def _rewrite(self):
+        """Writes the file again with only the results not yet taken"""
+        kept = []
+        if self.pending:
+            with open(self.path, "rb") as file:
+                file.seek(self._header_size + self._first * self._record_size)
+                for _ in range(self.pending):
+                    kept.append(file.read(self._record_size))
+        with open(self.path, "wb") as file:
+            file.write(
+                struct.pack(self.HEADER, self.MAGIC, self.VERSION, 0, self.acked)
+            )
+            for record in kept:
+                file.write(record)
+        self._records = len(kept)
+        self._first = 0
@@ -0,0 +1,80 @@
+import json
+from random import randint
+
+
+class Scoreboard:
+    """
+    Game state for the web page, kept serialized between changes.
+
+    Each field is serialized once when it changes, and the JSON sent to
+    clients is joined from those pieces only when something has changed since
+    it was last asked for. Every change bumps the version, which is sent as
+    "version". A client that sends it back with json_since() gets only the
+    fields changed since then.
+    """
+
+    MAX_CACHED = 8  # Versions whose json_since() is kept, most pollers are on the last
+
+    def __init__(self, **fields):
+        # Start somewhere random, so a client still polling from before a
+        # restart is very unlikely to land in this run's range of versions
+        self.start = randint(0, 1 << 24)
+        self.version = self.start
+        self._values = {}
+        self._pieces = {}
+        self._changed = {}
+        self._json = None
+        self._since = {}
+        self.update(fields)
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    def __setitem__(self, name, value):
+        self.update({name: value})
+
+    def update(self, fields):
+        """Sets several fields as one change, returns True if any of them changed"""
+        changed = False
+        for name, value in fields.items():
+            if name in self._values and self._values[name] == value:
+                continue
+            if not changed:
+                self.version += 1
+                self._json = None
+                self._since.clear()
+                changed = True
+            self._values[name] = value
+            self._pieces[name] = json.dumps(name) + ": " + json.dumps(value)
+            self._changed[name] = self.version
+        return changed
+
+    def json(self):
+        """Every field and the version, as a JSON object"""
+        if self._json is None:
+            self._json = self._join(self._pieces.values())
+        return self._json
+
+    def json_since(self, since):
+        """
+        The fields changed after version since and the version, as a JSON
+        object. Everything if since isn't a version of this run.
+        """
+        if not self.start <= since <= self.version:
+            return self.json()
+        cached = self._since.get(since)
+        if cached is None:
+            if len(self._since) >= self.MAX_CACHED:
+                self._since.clear()
+            cached = self._join(
+                piece
+                for name, piece in self._pieces.items()
+                if self._changed[name] > since
+            )
+            self._since[since] = cached
+        return cached
+
+    def _join(self, pieces):
+        fields = ", ".join(pieces)
+        version = f'{{"version": {self.version}'
+        return version + (", " + fields if fields else "") + "}"
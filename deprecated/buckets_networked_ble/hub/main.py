@@ -1,11 +1,20 @@
+import asyncio
 import board
 import busio
-import json
 import socketpool
 import wifi
 import os
-from time import monotonic, sleep
-from adafruit_httpserver import Server, Request, Response, Websocket, GET
+from time import monotonic
+from adafruit_httpserver import (
+    Server,
+    Request,
+    Response,
+    FileResponse,
+    WebsocketHub,
+    GET,
+)
+from scoreboard_commands import Scoreboard
+from outbox_commands import Result_Outbox, TEAMS
 
 
 # region wifi webpage setup
@@ -18,50 +27,156 @@ server = Server(pool, debug=True)
 wifi.radio.start_ap(ssid, password)
 print("Connected to", ssid)
 
-websocket: Websocket = None
+# Every phone connected gets the game, up to 8 of them
+phones = WebsocketHub(max_clients=8)
 
 
 @server.route("/", GET)
 def client(request: Request):
-    return Response(request, "index.html", "text/html")
+    return FileResponse(request, "index.html", "/")
 
 
 @server.route("/connect-websocket", GET)
 def connect_client(request: Request):
-    global websocket  # pylint: disable=global-statement
-    if websocket is not None:
-        websocket.close()  # Close any existing connection
-    websocket = Websocket(request)
-    return websocket
+    return phones.connect(request)
 
 
 @server.route("/get-data", GET)
 def get_data(request: Request):
-    return Response(request, json.dumps(dataDict), content_type="application/json")
+    # Pollers send back the version they have and get only what changed since
+    since = request.query_params.get("since")
+    if since is not None and since.isdigit():
+        body = scoreboard.json_since(int(since))
+    else:
+        body = scoreboard.json()
+    return Response(request, body, content_type="application/json")
 
 
 server.start(host=str(os.getenv("AP_IP")), port=80)
 # endregion
 
+# region result upload
+# Set RESULTS_URL in settings.toml to upload each game's result there, and
+# RESULTS_SSID/RESULTS_PASSWORD for the network that reaches it. Results wait
+# in /results.bin until it can be reached, see outbox_commands.py, which
+# needs the drive writable, see boot.py.
+outbox = None
+if os.getenv("RESULTS_URL"):
+    import adafruit_requests
+    from binascii import hexlify
+
+    outbox = Result_Outbox(
+        "/results.bin",
+        "hub-" + hexlify(wifi.radio.mac_address[-3:]).decode(),
+        os.getenv("RESULTS_URL"),
+        adafruit_requests.Session(pool),
+    )
+# endregion
+
 # region ble setup
+# The game is also advertised over BLE, for phones and boards that follow it
+# by scanning instead of joining the AP, see advert_commands.py and
+# main_bletest.py. Boards without BLE carry on without it.
+ADVERT_INTERVAL = 0.25  # Seconds between advertisements
+try:
+    from adafruit_ble import BLERadio
+    from advert_commands import Field_Advertisement
+
+    ble = BLERadio()
+    advert = Field_Advertisement()
+except (ImportError, RuntimeError):
+    ble = None
+
+
+def advertise(status):
+    """Starts advertising the game again if it changed"""
+    if ble is not None and advert.update(
+        status,
+        timer,
+        scoreboard["red"],
+        scoreboard["blue"],
+        [TEAMS.index(scoreboard["bucket1"])],
+    ):
+        ble.stop_advertising()
+        ble.start_advertising(advert, interval=ADVERT_INTERVAL)
+
 
 # endregion
 
 
-next_message_time = monotonic()
-team_message_time = monotonic()
-timer = 300
-dataDict = {"timer": timer, "bucket1": "Red"}
-while True:
-    server.poll()
-    if websocket is not None and monotonic() > next_message_time + 1:
-        timer -= 1
-        timestr = f"{timer // 60:02}:{timer % 60:02}"
-        dataDict["timer"] = timestr
-        json_string = json.dumps(dataDict)
-        next_message_time = monotonic()
-    if monotonic() > team_message_time + 2.5:
-        dataDict["bucket1"] = "Blue" if dataDict["bucket1"] == "Red" else "Red"
-        team_message_time = monotonic()
-
-    sleep(0.01)
+async def game_loop():
+    global timer
+    advertise("Waiting")
+    next_message_time = monotonic()
+    team_message_time = monotonic()
+    while True:
+        # The scoreboard takes nothing from phones, but reading answers their
+        # pings and closes, and keeps what they send from filling the buffers
+        while phones.receive() is not None:
+            pass
+
+        if not phones.clients:
+            next_message_time = monotonic()
+        elif monotonic() > next_message_time + 1:
+            # Every second that passed, so a pass held up by a post or a slow
+            # phone doesn't lose time on the clock
+            elapsed = min(int(monotonic() - next_message_time), timer)
+            next_message_time += elapsed
+            timer -= elapsed
+            timestr = f"{timer // 60:02}:{timer % 60:02}"
+            scoreboard["timer"] = timestr
+            team = scoreboard["bucket1"].lower()
+            scoreboard[team] = scoreboard[team] + elapsed
+            if timer == 0:
+                if outbox:
+                    outbox.add(
+                        GAME_LENGTH,
+                        scoreboard["red"],
+                        scoreboard["blue"],
+                        [TEAMS.index(scoreboard["bucket1"])],
+                    )
+                timer = GAME_LENGTH
+                scoreboard.update({"red": 0, "blue": 0})
+            await phones.broadcast(scoreboard.json())
+            advertise("Running")
+        if monotonic() > team_message_time + 2.5:
+            scoreboard["bucket1"] = "Blue" if scoreboard["bucket1"] == "Red" else "Red"
+            team_message_time = monotonic()
+            advertise("Running" if phones.clients else "Waiting")
+
+        await asyncio.sleep(0.01)
+
+
+async def upload_loop():
+    """
+    Uploads the results waiting in the outbox whenever the endpoint can be
+    reached. Both connecting and posting block the loop, so it connects only
+    while no phone is following the game, and posts one batch a pass.
+    """
+    while True:
+        if outbox.due() and (wifi.radio.connected or not phones.clients):
+            try:
+                if not wifi.radio.connected:
+                    wifi.radio.connect(
+                        os.getenv("RESULTS_SSID"), os.getenv("RESULTS_PASSWORD")
+                    )
+            except ConnectionError:
+                outbox.back_off()
+            else:
+                taken = outbox.drain(max_batches=1)
+                print(f"Uploaded {taken} results, {outbox.pending} waiting")
+        await asyncio.sleep(1)
+
+
+async def main():
+    # Requests are served between game loop passes, a slow phone no longer holds it up
+    tasks = [server.serve_async(), game_loop()]
+    if outbox:
+        tasks.append(upload_loop())
+    await asyncio.gather(*tasks)
+
+
+GAME_LENGTH = 300
+timer = GAME_LENGTH
+scoreboard = Scoreboard(timer=timer, bucket1="Red", red=0, blue=0)
+asyncio.run(main())
@@ -1,10 +1,10 @@
-from time import monotonic
+import asyncio
 import board
 import neopixel
 import socketpool
 import wifi
 import os
-from adafruit_httpserver import Server, Request, Response, SSEResponse, GET, POST
+from adafruit_httpserver import Server, Request, FileResponse, SSEBroadcaster, GET, POST
 
 pixel_pin = board.NEOPIXEL  # Change to the appropriate pin for your board
 num_pixels = 1  # Change to the number of NeoPixels on your strip
@@ -23,13 +23,13 @@ server = Server(pool, debug=True)
 wifi.radio.start_ap(ssid, password)
 print("Connected to", ssid)
 
-sse_response: SSEResponse = None
-next_event_time = monotonic()
+# Every phone watching gets the timer, up to 8 of them
+spectators = SSEBroadcaster(max_subscribers=8)
 
 
 @server.route("/", GET)
 def client(request: Request):
-    return Response(request, "index_sser.html", "text/html")
+    return FileResponse(request, "index_sser.html", "/")
 
 
 @server.route("/", POST)
@@ -44,26 +44,34 @@ def buttonpress(request: Request):
     if "BLUE" in raw_text:
         pixels.fill((0, 0, 255))
     #  reload site
-    return Response(request, "index_sser.html", content_type="text/html")
+    return FileResponse(request, "index_sser.html", "/")
 
 
 @server.route("/connect-client", GET)
 def connect_client(request: Request):
-    global sse_response  # pylint: disable=global-statement
-    if sse_response is not None:
-        sse_response.close()  # Close any existing connection
-    sse_response = SSEResponse(request)
-    return sse_response
+    return spectators.subscribe(request)
 
 
-server.start(host=str(os.getenv("AP_IP")), port=80)
-timer = 300
+GAME_LENGTH = 300
+
 
-while True:
-    server.poll()
-    # Send an event every second
-    if sse_response is not None and next_event_time < monotonic():
+async def timer_loop():
+    timer = GAME_LENGTH
+    while True:
+        # Send an event every second, the timer only runs while someone watches
+        await asyncio.sleep(1)
+        if not spectators.subscribers:
+            continue
         timer -= 1
         timestr = f"{timer // 60:02}:{timer % 60:02}"
-        sse_response.send_event(str(timestr))
-        next_event_time = monotonic() + 1
+        await spectators.publish(timestr)
+        if timer == 0:
+            timer = GAME_LENGTH
+
+
+async def main():
+    await asyncio.gather(server.serve_async(), timer_loop())
+
+
+server.start(host=str(os.getenv("AP_IP")), port=80)
+asyncio.run(main())
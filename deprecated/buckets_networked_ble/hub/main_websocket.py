@@ -1,3 +1,4 @@
+import asyncio
 from time import monotonic
 import json
 import board
@@ -5,7 +6,7 @@ import neopixel
 import socketpool
 import wifi
 import os
-from adafruit_httpserver import Server, Request, Response, Websocket, GET, POST
+from adafruit_httpserver import Server, Request, FileResponse, WebsocketHub, GET, POST
 
 pixel_pin = board.NEOPIXEL  # Change to the appropriate pin for your board
 num_pixels = 1  # Change to the number of NeoPixels on your strip
@@ -22,44 +23,48 @@ server = Server(pool, debug=True)
 wifi.radio.start_ap(ssid, password)
 print("Connected to", ssid)
 
-websocket: Websocket = None
+# Every phone connected gets the timer, up to 8 of them
+phones = WebsocketHub(max_clients=8)
 
 
 @server.route("/", GET)
 def client(request: Request):
-    return Response(request, "index_websocket.html", "text/html")
+    return FileResponse(request, "index_websocket.html", "/")
 
 
 @server.route("/connect-websocket", GET)
 def connect_client(request: Request):
-    global websocket  # pylint: disable=global-statement
-    if websocket is not None:
-        websocket.close()  # Close any existing connection
-    websocket = Websocket(request)
-    return websocket
+    return phones.connect(request)
 
 
-server.start(host=str(os.getenv("AP_IP")), port=80)
-next_message_time = monotonic()
-team_message_time = monotonic()
-timer = 300
-dataDict = {"timer": timer, "bucket1": "Red"}
-while True:
-    server.poll()
-
-    if websocket is not None:
-        if (data := websocket.receive(True)) is not None:
+async def game_loop():
+    next_message_time = monotonic()
+    team_message_time = monotonic()
+    timer = 300
+    dataDict = {"timer": timer, "bucket1": "Red"}
+    while True:
+        while (data := phones.receive()) is not None:
             r, g, b = int(data[1:3], 16), int(data[3:5], 16), int(data[5:7], 16)
             pixels.fill((r, g, b))
 
-    if websocket is not None and monotonic() > next_message_time + 1:
-        timer -= 1
-        timestr = f"{timer // 60:02}:{timer % 60:02}"
-        dataDict["timer"] = timestr
-        json_string = json.dumps(dataDict)
-        websocket.send_message(json_string)
-        next_message_time = monotonic()
-
-    if monotonic() > team_message_time + 2.5:
-        dataDict["bucket1"] = "Blue" if dataDict["bucket1"] == "Red" else "Red"
-        team_message_time = monotonic()
+        if phones.clients and monotonic() > next_message_time + 1:
+            timer -= 1
+            timestr = f"{timer // 60:02}:{timer % 60:02}"
+            dataDict["timer"] = timestr
+            json_string = json.dumps(dataDict)
+            await phones.broadcast(json_string)
+            next_message_time = monotonic()
+
+        if monotonic() > team_message_time + 2.5:
+            dataDict["bucket1"] = "Blue" if dataDict["bucket1"] == "Red" else "Red"
+            team_message_time = monotonic()
+
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    await asyncio.gather(server.serve_async(), game_loop())
+
+
+server.start(host=str(os.getenv("AP_IP")), port=80)
+asyncio.run(main())